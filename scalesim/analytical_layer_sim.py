@@ -0,0 +1,553 @@
+"""
+This file contains the 'analytical_layer_sim' class that estimates the report data for a single
+layer in closed form, without generating the operand, prefetch and demand matrices. It provides the
+same interface as 'single_layer_sim' so that the simulator can use either of them.
+"""
+
+import math
+import time
+
+from scalesim.scale_config import scale_config as cfg
+from scalesim.topology_utils import topologies as topo
+from scalesim.layout_utils import layouts as layout
+from scalesim.memory.analytical_read_buffer import analytical_read_buffer
+from scalesim.memory.analytical_write_buffer import analytical_write_buffer
+
+
+class analytical_layer_sim:
+    """
+    Class which estimates the compute cycles, utilization, SRAM and DRAM traffic of a single layer
+    from the spatio-temporal dimensions (S_r, S_c, T) of the layer and the array and SRAM sizes.
+
+    The compute side (cycles without stalls, mapping efficiency, compute utilization and SRAM
+    accesses) follows the fold structure of the systolic_compute_* classes and is exact for dense
+    layers. With the user provided bandwidths, the memory side (DRAM traffic, stalls and the DRAM
+    start/stop cycles) follows the buffers along the fold order: the ifmap and filter buffers
+    over the lines of their fetch streams and the ofmap buffer over its fill level. In the
+    estimate bandwidth mode, the DRAM reads are estimated from the operand footprints and the
+    number of times the folds come back to them.
+    """
+    #
+    def __init__(self):
+        """
+        __init__ method
+        """
+        self.layer_id = 0
+        self.dataflow = ''
+        self.topo = topo()
+        self.layout = layout()
+        self.config = cfg()
+
+        self.verbose = True
+
+        # Models of the buffers, with the user provided bandwidths
+        self.ifmap_buf = analytical_read_buffer()
+        self.filter_buf = analytical_read_buffer()
+        self.ofmap_buf = analytical_write_buffer()
+
+        # Wall clock time (s) of the estimates
+        self.run_time = 0
+
+        # Report items : Compute report
+        self.overall_cycles = 0
+        self.total_cycles = 0
+        self.stall_cycles = 0
+        self.num_compute = 0
+        self.num_mac_unit = 0
+        self.overall_util = 0
+        self.mapping_eff = 0
+        self.compute_util = 0
+
+        # Report items : BW report
+        self.avg_ifmap_sram_bw = 0
+        self.avg_filter_sram_bw = 0
+        self.avg_ofmap_sram_bw = 0
+        self.avg_ifmap_dram_bw = 0
+        self.avg_filter_dram_bw = 0
+        self.avg_ofmap_dram_bw = 0
+
+        # Report items : Detailed Access report
+        self.ifmap_sram_start_cycle = 0
+        self.ifmap_sram_stop_cycle = 0
+        self.ifmap_sram_reads = 0
+
+        self.filter_sram_start_cycle = 0
+        self.filter_sram_stop_cycle = 0
+        self.filter_sram_reads = 0
+
+        self.ofmap_sram_start_cycle = 0
+        self.ofmap_sram_stop_cycle = 0
+        self.ofmap_sram_writes = 0
+
+        self.ifmap_dram_start_cycle = 0
+        self.ifmap_dram_stop_cycle = 0
+        self.ifmap_dram_reads = 0
+
+        self.filter_dram_start_cycle = 0
+        self.filter_dram_stop_cycle = 0
+        self.filter_dram_reads = 0
+
+        self.ofmap_dram_start_cycle = 0
+        self.ofmap_dram_stop_cycle = 0
+        self.ofmap_dram_writes = 0
+
+        self.params_set_flag = False
+        self.runs_ready = False
+        self.report_items_ready = False
+
+    #
+    def set_params(self,
+                   layer_id=0,
+                   config_obj=cfg(), topology_obj=topo(), layout_obj=layout(),
+                   verbose=True):
+        """
+        Method to set the run parameters for housekeeping.
+        """
+        self.layer_id = layer_id
+        self.config = config_obj
+        self.topo = topology_obj
+        self.layout = layout_obj
+
+        self.dataflow = self.config.get_dataflow()
+
+        arr_dims = self.config.get_array_dims()
+        self.num_mac_unit = arr_dims[0] * arr_dims[1]
+        self.verbose = verbose
+
+        self.params_set_flag = True
+
+    #
+    def run(self):
+        """
+        Method to estimate the report data of the layer. First the fold structure of the dataflow
+        gives the stall free cycles and the SRAM accesses, then the DRAM traffic is estimated from
+        the operand footprints and the buffer sizes, and finally the stalls from the DRAM traffic
+        and the interface bandwidths.
+        """
+        assert self.params_set_flag, 'Parameters are not set. Run set_params()'
+        run_start = time.perf_counter()
+
+        arr_row, arr_col = self.config.get_array_dims()
+
+        # 1. Layer dimensions
+        # Calculating the window size makes sure that the hyper-parameters are available for
+        # calc_spatio_temporal_params()
+        window_size = self.topo.get_layer_window_size(self.layer_id)
+        num_filters = self.topo.get_layer_num_filters(self.layer_id)
+        num_ofmap_px = self.topo.get_layer_num_ofmap_px(self.layer_id)
+        self.num_compute = num_ofmap_px * window_size
+
+        s_row, s_col, t_time = \
+            self.topo.calc_spatio_temporal_params(df=self.dataflow, layer_id=self.layer_id)
+
+        row_fold = math.ceil(s_row / arr_row)
+        col_fold = math.ceil(s_col / arr_col)
+        num_folds = row_fold * col_fold
+
+        # 2. Compute: stall free cycles, mapping efficiency and compute utilization
+        # Each fold fills the array, streams T elements and drains. The demand lines per fold and
+        # the cycles used for the utilization are the ones of the systolic_compute_* classes.
+        if self.dataflow == 'os':
+            lines_per_fold = t_time + arr_row + arr_col - 2
+            cycles_per_fold = lines_per_fold
+        else:
+            lines_per_fold = 2 * arr_row + arr_col + t_time - 2
+            cycles_per_fold = lines_per_fold + arr_col - 1
+
+        num_demand_lines = num_folds * lines_per_fold
+
+        # Summed over all the folds, the used rows and cols of the array add up to S_r * S_c
+        mac_used_all_folds = s_row * s_col
+        mapping_eff = mac_used_all_folds / (arr_row * arr_col * num_folds)
+        compute_util = (mac_used_all_folds * t_time) \
+                       / (arr_row * arr_col * cycles_per_fold * num_folds)
+
+        # 3. SRAM accesses
+        if self.dataflow == 'os':
+            self.ifmap_sram_reads = col_fold * s_row * t_time
+            self.filter_sram_reads = row_fold * t_time * s_col
+            self.ofmap_sram_writes = s_row * s_col + num_folds * (arr_row + arr_col)
+        elif self.dataflow == 'ws':
+            self.ifmap_sram_reads = col_fold * t_time * s_row
+            self.filter_sram_reads = s_row * s_col
+            self.ofmap_sram_writes = row_fold * t_time * s_col
+        else:
+            self.ifmap_sram_reads = s_row * s_col
+            self.filter_sram_reads = col_fold * s_row * t_time
+            self.ofmap_sram_writes = row_fold * s_col * t_time
+
+        # 4. DRAM accesses and stalls
+        self.ofmap_dram_writes = self.ofmap_sram_writes
+        if self.dataflow == 'os':
+            self.ofmap_dram_writes = num_ofmap_px
+
+        if self.config.use_user_dram_bandwidth():
+            self.stall_cycles = self.run_buffers(s_row, s_col, t_time, lines_per_fold)
+        else:
+            self.estimate_dram_reads(row_fold, col_fold)
+            self.stall_cycles = 0
+
+        # The cycles are counted from 0, the last demand line is serviced in cycle lines - 1
+        self.total_cycles = num_demand_lines - 1 + self.stall_cycles
+        self.overall_util = (self.num_compute * 100) / (self.total_cycles * self.num_mac_unit)
+        self.mapping_eff = mapping_eff * 100
+        self.compute_util = compute_util * 100
+
+        # 5. Start and stop cycles
+        # The SRAM reads start after the fill delay of the first fold and the last accesses are
+        # approximated by the end of the run.
+        hit_latency = 1
+        if self.dataflow == 'os':
+            self.ifmap_sram_start_cycle = hit_latency
+            self.filter_sram_start_cycle = hit_latency
+            self.ofmap_sram_start_cycle = t_time - 1
+        elif self.dataflow == 'ws':
+            self.ifmap_sram_start_cycle = arr_row + hit_latency
+            self.filter_sram_start_cycle = hit_latency
+            self.ofmap_sram_start_cycle = 2 * arr_row - 1
+        else:
+            self.ifmap_sram_start_cycle = hit_latency
+            self.filter_sram_start_cycle = arr_row + hit_latency
+            self.ofmap_sram_start_cycle = 2 * arr_row - 1
+
+        self.ifmap_sram_stop_cycle = self.total_cycles
+        self.filter_sram_stop_cycle = self.total_cycles
+        self.ofmap_sram_stop_cycle = self.total_cycles
+
+        if self.config.use_user_dram_bandwidth():
+            self.ifmap_dram_start_cycle, self.ifmap_dram_stop_cycle = \
+                self.ifmap_buf.get_external_access_start_stop_cycles()
+            self.filter_dram_start_cycle, self.filter_dram_stop_cycle = \
+                self.filter_buf.get_external_access_start_stop_cycles()
+            self.ofmap_dram_start_cycle, self.ofmap_dram_stop_cycle = \
+                self.ofmap_buf.get_external_access_start_stop_cycles()
+        else:
+            self.estimate_dram_start_stop_cycles(lines_per_fold)
+
+        self.ifmap_sram_start_cycle = float(self.ifmap_sram_start_cycle)
+        self.ifmap_sram_stop_cycle = float(self.ifmap_sram_stop_cycle)
+        self.filter_sram_start_cycle = float(self.filter_sram_start_cycle)
+        self.filter_sram_stop_cycle = float(self.filter_sram_stop_cycle)
+        self.ofmap_sram_start_cycle = float(self.ofmap_sram_start_cycle)
+        self.ofmap_sram_stop_cycle = float(self.ofmap_sram_stop_cycle)
+        self.ifmap_dram_start_cycle = float(self.ifmap_dram_start_cycle)
+        self.ifmap_dram_stop_cycle = float(self.ifmap_dram_stop_cycle)
+        self.filter_dram_start_cycle = float(self.filter_dram_start_cycle)
+        self.filter_dram_stop_cycle = float(self.filter_dram_stop_cycle)
+        self.ofmap_dram_start_cycle = float(self.ofmap_dram_start_cycle)
+        self.ofmap_dram_stop_cycle = float(self.ofmap_dram_stop_cycle)
+
+        self.run_time = time.perf_counter() - run_start
+        self.runs_ready = True
+
+    #
+    def run_buffers(self, s_row, s_col, t_time, lines_per_fold):
+        """
+        Method to run the folds through the models of the buffers, with the user provided
+        bandwidths. The ifmap and filter buffers are walked along their fetch streams in the order
+        the folds read them, which gives the DRAM reads and the demand lines of the prefetches.
+        The stalls of these lines follow the prefetches back to back as in read_buffer, and the
+        ofmap writes of every fold stall the array when they fill the ofmap buffer. Returns the
+        stall cycles.
+        """
+        arr_row, arr_col = self.config.get_array_dims()
+        row_fold = math.ceil(s_row / arr_row)
+        col_fold = math.ceil(s_col / arr_col)
+
+        ifmap_buf_kb, filter_buf_kb, ofmap_buf_kb = self.config.get_mem_sizes()
+        active_buf_frac = 0.5   # Same as in single_layer_sim
+        ifmap_bw = self.config.ifmap_sram_bank_bandwidth
+        filter_bw = self.config.filter_sram_bank_bandwidth
+        ofmap_bw = self.config.get_bandwidths_as_list()[0]
+
+        # Fetch streams of the operands: blocks stacked along the folds of the rows or the cols of
+        # the array, as [number of blocks, rows, cols, cols used by the last block, rolled out]
+        row_fold_stream = [row_fold, t_time, arr_row, s_row - (row_fold - 1) * arr_row, True]
+        col_fold_stream = [col_fold, s_row, arr_col, s_col - (col_fold - 1) * arr_col, False]
+        if self.dataflow == 'os':
+            ifmap_stream = row_fold_stream
+            filter_stream = [col_fold, t_time, arr_col, col_fold_stream[3], True]
+        elif self.dataflow == 'ws':
+            ifmap_stream = row_fold_stream
+            filter_stream = col_fold_stream
+        else:
+            ifmap_stream = col_fold_stream
+            filter_stream = row_fold_stream
+
+        self.ifmap_buf = analytical_read_buffer()
+        self.ifmap_buf.set_params(total_size_elems=1024 * ifmap_buf_kb,
+                                  active_buf_frac=active_buf_frac, bandwidth=ifmap_bw,
+                                  num_blocks=ifmap_stream[0], block_rows=ifmap_stream[1],
+                                  block_cols=ifmap_stream[2], last_block_cols=ifmap_stream[3],
+                                  rollout=ifmap_stream[4])
+        self.ifmap_buf.set_conv_windows(
+            ifmap_dims=[int(x) for x in self.topo.get_layer_ifmap_dims(self.layer_id)],
+            ofmap_dims=[int(x) for x in self.topo.get_layer_ofmap_dims(self.layer_id)],
+            filter_dims=[int(x) for x in self.topo.get_layer_filter_dims(self.layer_id)],
+            num_channels=int(self.topo.get_layer_num_channels(self.layer_id)),
+            strides=[int(x) for x in self.topo.get_layer_strides(self.layer_id)],
+            pixels_along_rows=self.dataflow == 'ws')
+        self.filter_buf = analytical_read_buffer()
+        self.filter_buf.set_params(total_size_elems=1024 * filter_buf_kb,
+                                   active_buf_frac=active_buf_frac, bandwidth=filter_bw,
+                                   num_blocks=filter_stream[0], block_rows=filter_stream[1],
+                                   block_cols=filter_stream[2], last_block_cols=filter_stream[3],
+                                   rollout=filter_stream[4])
+        self.ofmap_buf = analytical_write_buffer()
+        self.ofmap_buf.set_params(total_size_elems=1024 * ofmap_buf_kb,
+                                  active_buf_frac=active_buf_frac, bandwidth=ofmap_bw)
+
+        stall_cycles = 0
+        for fold_id in range(row_fold * col_fold):
+            fc, fr = divmod(fold_id, row_fold)
+            fold_start = fold_id * lines_per_fold
+            row_used = min(arr_row, s_row - fr * arr_row)
+            col_used = min(arr_col, s_col - fc * arr_col)
+            row_delta = arr_row - row_used
+            first_row = fr * arr_row
+
+            # The demands of the fold and its ofmap writes, see the systolic_compute_* classes
+            if self.dataflow == 'os':
+                self.ifmap_buf.read_skewed_block(fr, fold_start, row_used)
+                self.filter_buf.read_skewed_block(fc, fold_start, col_used)
+                self.ofmap_buf.set_fold_writes(fold_start + t_time - 1 + row_delta, row_used,
+                                               col_used)
+            else:
+                if self.dataflow == 'ws':
+                    self.ifmap_buf.read_skewed_block(fr, fold_start + arr_row, row_used)
+                    self.filter_buf.read_block_rows(fc, first_row, first_row + row_used,
+                                                    fold_start + row_delta, col_used)
+                else:
+                    self.ifmap_buf.read_block_rows(fc, first_row, first_row + row_used,
+                                                   fold_start + row_delta, col_used)
+                    self.filter_buf.read_skewed_block(fr, fold_start + arr_row, row_used)
+                self.ofmap_buf.set_fold_writes(fold_start + 2 * arr_row - 1, t_time, col_used)
+
+            stall_cycles = self.get_fold_stall_cycles(stall_cycles, fold_start + lines_per_fold)
+
+        # The ofmap buffer is emptied after the last demand line
+        self.ofmap_buf.empty_all_buffers(row_fold * col_fold * lines_per_fold - 1 + stall_cycles)
+
+        self.ifmap_dram_reads = self.ifmap_buf.get_num_accesses()
+        self.filter_dram_reads = self.filter_buf.get_num_accesses()
+        self.ofmap_dram_writes = self.ofmap_buf.get_num_accesses()
+
+        return stall_cycles
+
+    #
+    def get_fold_stall_cycles(self, stall_cycles, end_line):
+        """
+        Method to add the stalls of the demand lines of a fold, up to end_line (excluded), to
+        stall_cycles. The lines which made ifmap or filter prefetches stall for the longest of
+        these and of their ofmap writes, as in double_buffered_scratchpad, the others only for the
+        ofmap writes.
+        """
+        ifmap_lines = self.ifmap_buf.get_prefetch_demand_lines()
+        filter_lines = self.filter_buf.get_prefetch_demand_lines()
+
+        for demand_line in sorted(set(ifmap_lines + filter_lines)):
+            stall_cycles = self.ofmap_buf.write_lines(demand_line, stall_cycles)
+            cycle = demand_line + stall_cycles
+            ifmap_stalls = self.ifmap_buf.get_prefetch_stall(cycle,
+                                                             ifmap_lines.count(demand_line))
+            filter_stalls = self.filter_buf.get_prefetch_stall(cycle,
+                                                               filter_lines.count(demand_line))
+            ofmap_stalls = self.ofmap_buf.write_lines(demand_line + 1, stall_cycles) \
+                           - stall_cycles
+            stall_cycles += max(ifmap_stalls, filter_stalls, ofmap_stalls, 0)
+
+        return self.ofmap_buf.write_lines(end_line, stall_cycles)
+
+    #
+    def estimate_dram_reads(self, row_fold, col_fold):
+        """
+        Method to estimate the DRAM reads in the estimate bandwidth mode. An operand is read from
+        DRAM once if it fits in the active half of its buffer. Otherwise it is read again every
+        time the folds come back to it: the operand streamed over the row folds once per column
+        fold, and in the os dataflow the filter block of a column fold once per row fold unless
+        the block fits.
+        """
+        ifmap_h, ifmap_w = self.topo.get_layer_ifmap_dims(self.layer_id)
+        num_channels = self.topo.get_layer_num_channels(self.layer_id)
+        ifmap_footprint = ifmap_h * ifmap_w * num_channels
+        filter_footprint = self.topo.get_layer_window_size(self.layer_id) \
+                           * self.topo.get_layer_num_filters(self.layer_id)
+
+        ifmap_buf_kb, filter_buf_kb, _ = self.config.get_mem_sizes()
+        active_buf_frac = 0.5   # Same as in single_layer_sim
+        ifmap_active_words = int(math.ceil(1024 * ifmap_buf_kb * active_buf_frac))
+        filter_active_words = int(math.ceil(1024 * filter_buf_kb * active_buf_frac))
+
+        ifmap_passes = 1
+        filter_passes = 1
+        if self.dataflow == 'os':
+            ifmap_passes = col_fold
+            filter_block_words = filter_footprint / col_fold
+            if filter_block_words > filter_active_words:
+                filter_passes = row_fold
+        elif self.dataflow == 'ws':
+            ifmap_passes = col_fold
+        else:
+            filter_passes = col_fold
+
+        self.ifmap_dram_reads = ifmap_footprint
+        if ifmap_footprint > ifmap_active_words:
+            self.ifmap_dram_reads *= ifmap_passes
+
+        self.filter_dram_reads = filter_footprint
+        if filter_footprint > filter_active_words:
+            self.filter_dram_reads *= filter_passes
+
+    #
+    def estimate_dram_start_stop_cycles(self, lines_per_fold):
+        """
+        Method to estimate the first and last cycle of the DRAM accesses in the estimate bandwidth
+        mode, with the backing buffer bandwidths it uses.
+        """
+        arr_row, arr_col = self.config.get_array_dims()
+        ifmap_buf_kb, filter_buf_kb, ofmap_buf_kb = self.config.get_mem_sizes()
+        active_buf_frac = 0.5   # Same as in single_layer_sim
+        ifmap_active_words = int(math.ceil(1024 * ifmap_buf_kb * active_buf_frac))
+        filter_active_words = int(math.ceil(1024 * filter_buf_kb * active_buf_frac))
+        ofmap_active_words = int(math.ceil(1024 * ofmap_buf_kb * active_buf_frac))
+        ifmap_bw = 10
+        filter_bw = 10
+        ofmap_bw = arr_col
+
+        # The active buffers of ifmap and filter are filled before the compute starts. Operands
+        # that fit completely are done by then, the others keep streaming till the last fold.
+        self.ifmap_dram_start_cycle, self.ifmap_dram_stop_cycle = \
+            self.get_read_dram_start_stop_cycles(self.ifmap_dram_reads, ifmap_active_words,
+                                                 ifmap_bw, lines_per_fold)
+        self.filter_dram_start_cycle, self.filter_dram_stop_cycle = \
+            self.get_read_dram_start_stop_cycles(self.filter_dram_reads, filter_active_words,
+                                                 filter_bw, lines_per_fold)
+
+        # The ofmap buffer is drained once its active half is full, and completely at the end
+        drain_cycles = math.ceil(min(self.ofmap_dram_writes, ofmap_active_words) / ofmap_bw)
+        if self.ofmap_dram_writes > ofmap_active_words:
+            writes_per_cycle = self.ofmap_sram_writes / (self.total_cycles + 1)
+            self.ofmap_dram_start_cycle = \
+                self.ofmap_sram_start_cycle + math.ceil(ofmap_active_words / writes_per_cycle)
+        else:
+            self.ofmap_dram_start_cycle = self.total_cycles
+        self.ofmap_dram_stop_cycle = self.total_cycles + drain_cycles
+
+    #
+    def get_read_dram_start_stop_cycles(self, dram_reads, active_words, bandwidth, lines_per_fold):
+        """
+        Method to estimate the first and last cycle of the DRAM reads of an operand.
+        """
+        prefetch_cycles = math.ceil(min(dram_reads, active_words) / bandwidth)
+        start_cycle = -1 * prefetch_cycles
+        if dram_reads > active_words:
+            stop_cycle = max(self.total_cycles - lines_per_fold, 0)
+        else:
+            stop_cycle = -1
+
+        return start_cycle, stop_cycle
+
+    # Traces are not generated in the analytical mode
+    def save_traces(self, top_path):
+        """
+        Method kept for interface compatibility with single_layer_sim, no traces are generated.
+        """
+        assert self.params_set_flag, 'Parameters are not set'
+
+    # There is no memory service loop in the analytical mode
+    def set_progress_callback(self, progress_callback=None):
+        """
+        Method kept for interface compatibility with single_layer_sim, the progress of a layer is
+        not reported.
+        """
+
+    # There are no SRAM traces in the analytical mode
+    def set_keep_sram_traces(self, keep_sram_traces=True):
+        """
+        Method kept for interface compatibility with single_layer_sim.
+        """
+
+    #
+    def get_perf_items(self):
+        """
+        Method to get the profile of the layer, in the format of single_layer_sim. The estimates
+        are a single stage which does not allocate any matrix.
+        """
+        return [['analytical', self.run_time, 0, 0]]
+
+    #
+    def calc_report_data(self):
+        """
+        Method to calculate the bandwidth report data once the estimates are ready.
+        """
+        assert self.runs_ready, 'Runs are not done yet'
+
+        self.avg_ifmap_sram_bw = self.ifmap_sram_reads / self.total_cycles
+        self.avg_filter_sram_bw = self.filter_sram_reads / self.total_cycles
+        self.avg_ofmap_sram_bw = self.ofmap_sram_writes / self.total_cycles
+
+        self.overall_cycles = int(self.ofmap_dram_stop_cycle
+                                  - min(self.ifmap_dram_start_cycle, self.filter_dram_start_cycle))
+
+        self.avg_ifmap_dram_bw = self.ifmap_dram_reads / \
+                                (self.ifmap_dram_stop_cycle - self.ifmap_dram_start_cycle + 1)
+        self.avg_filter_dram_bw = self.filter_dram_reads / \
+                                (self.filter_dram_stop_cycle - self.filter_dram_start_cycle + 1)
+        self.avg_ofmap_dram_bw = self.ofmap_dram_writes / \
+                                (self.ofmap_dram_stop_cycle - self.ofmap_dram_start_cycle + 1)
+
+        self.report_items_ready = True
+
+    #
+    def get_layer_id(self):
+        """
+        Method to return layer id.
+        """
+        assert self.params_set_flag, 'Parameters are not set yet'
+        return self.layer_id
+
+    #
+    def get_compute_report_items(self):
+        """
+        Method to get the data for the compute report.
+        """
+        if not self.report_items_ready:
+            self.calc_report_data()
+
+        items = [self.overall_cycles,
+                 self.total_cycles,
+                 self.stall_cycles,
+                 self.overall_util,
+                 self.mapping_eff,
+                 self.compute_util]
+        return items
+
+    #
+    def get_bandwidth_report_items(self):
+        """
+        Method to get the data for the bandwidth report.
+        """
+        if not self.report_items_ready:
+            self.calc_report_data()
+
+        items = [self.avg_ifmap_sram_bw, self.avg_filter_sram_bw, self.avg_ofmap_sram_bw]
+        items += [self.avg_ifmap_dram_bw, self.avg_filter_dram_bw, self.avg_ofmap_dram_bw]
+
+        return items
+
+    #
+    def get_detail_report_items(self):
+        """
+        Method to get the data for the detailed report.
+        """
+        if not self.report_items_ready:
+            self.calc_report_data()
+
+        items = [self.ifmap_sram_start_cycle, self.ifmap_sram_stop_cycle, self.ifmap_sram_reads]
+        items += [self.filter_sram_start_cycle, self.filter_sram_stop_cycle, self.filter_sram_reads]
+        items += [self.ofmap_sram_start_cycle, self.ofmap_sram_stop_cycle, self.ofmap_sram_writes]
+        items += [self.ifmap_dram_start_cycle, self.ifmap_dram_stop_cycle, self.ifmap_dram_reads]
+        items += [self.filter_dram_start_cycle, self.filter_dram_stop_cycle, self.filter_dram_reads]
+        items += [self.ofmap_dram_start_cycle, self.ofmap_dram_stop_cycle, self.ofmap_dram_writes]
+
+        return items
@@ -0,0 +1,339 @@
+"""
+This file contains the 'batch' class which runs several topologies against the same configuration.
+The layers of all the topologies are scheduled on one shared pool of worker processes, the most
+expensive layers first, and every topology gets its own report directory. A summary of all the
+topologies is written at the top of the log directory.
+
+Usage:
+    python3 -m scalesim.batch -c <config> -t "topologies/ispass25_models/*.csv" -p <log dir> -j 8
+"""
+
+import argparse
+import copy
+import glob
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from scalesim.scale_config import scale_config
+from scalesim.topology_utils import topologies
+from scalesim.layout_utils import layouts
+from scalesim.simulator import simulator
+
+
+#
+def get_topology_files(patterns):
+    """
+    Function to expand a list of topology files and glob patterns into the sorted list of the
+    matching files, without duplicates.
+    """
+    topofiles = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        if len(matches) == 0:
+            print('WARNING: scalesim.batch: No topology file matches ' + pattern)
+        for topofile in matches:
+            if topofile not in topofiles:
+                topofiles.append(topofile)
+
+    return topofiles
+
+
+#
+def is_gemm_topology(topofile):
+    """
+    Function to check whether a topology file holds MNK (GEMM) inputs, from the number of columns
+    of its header: conv topologies have at least 8 columns, MNK ones have 4.
+    """
+    with open(topofile, 'r') as f:
+        header = f.readline()
+
+    columns = [x for x in header.strip().split(',') if not x.strip() == '']
+    return len(columns) == 4
+
+
+#
+def get_layer_cost(config_obj, topo_obj, layer_id):
+    """
+    Function to estimate the relative cost of simulating a layer, used to schedule the expensive
+    layers first. The cost is the number of elements of the demand matrices: the number of folds
+    times the cycles and the array ports per fold.
+    """
+    arr_row, arr_col = config_obj.get_array_dims()
+
+    # The spatio-temporal dimensions are derived from the layer hyperparameters
+    topo_obj.get_layer_window_size(layer_id)
+    sr, sc, t = topo_obj.calc_spatio_temporal_params(df=config_obj.get_dataflow(),
+                                                     layer_id=layer_id)
+
+    num_folds = math.ceil(sr / arr_row) * math.ceil(sc / arr_col)
+    cycles_per_fold = t + 2 * arr_row + arr_col
+
+    return num_folds * cycles_per_fold * (arr_row + arr_col)
+
+
+class batch:
+    """
+    Class which runs a set of topologies with the same configuration on a shared pool of worker
+    processes, and summarizes the results of every topology.
+    """
+    #
+    def __init__(self):
+        """
+        __init__ method
+        """
+        self.config = scale_config()
+        self.top_path = './'
+        self.num_jobs = 1
+        self.verbose = True
+
+        # Entries are [model name, topology file, simulator object]
+        self.models = []
+        self.results_list = []
+
+        self.params_set_flag = False
+        self.batch_done_flag = False
+
+    #
+    def set_params(self,
+                   config_obj=scale_config(),
+                   topofiles=[],
+                   input_type='auto',
+                   top_path='./',
+                   num_jobs=1,
+                   save_trace=False,
+                   verbose=True,
+                   cache_dir='',
+                   cache_size_mb=1024,
+                   resume=False
+                   ):
+        """
+        Method to set the configuration and the topologies of the batch. input_type is 'conv',
+        'gemm', or 'auto' to detect the type of every topology file from its header. The report
+        directory of each topology is named after the topology.
+        """
+        assert input_type in ['auto', 'conv', 'gemm'], 'Invalid input type ' + str(input_type)
+
+        self.config = config_obj
+        self.top_path = top_path
+        self.num_jobs = max(1, int(num_jobs))
+        self.verbose = verbose
+
+        self.models = []
+        model_names = []
+        for topofile in topofiles:
+            if input_type == 'auto':
+                mnk_inputs = is_gemm_topology(topofile)
+            else:
+                mnk_inputs = input_type == 'gemm'
+
+            topo_obj = topologies()
+            topo_obj.load_arrays(topofile=topofile, mnk_inputs=mnk_inputs)
+
+            layout_obj = layouts()
+            if self.config.using_ifmap_custom_layout or self.config.using_filter_custom_layout:
+                layout_obj.load_arrays(layoutfile=self.config.get_layout_path(),
+                                       mnk_inputs=mnk_inputs)
+
+            model_name = topo_obj.get_current_topo_name()
+            if model_name in model_names:
+                model_name += '_' + str(len(model_names))
+            model_names.append(model_name)
+
+            # Every model is reported in its own directory, named after the model
+            model_config = copy.deepcopy(self.config)
+            model_config.run_name = model_name
+
+            model_sim = simulator()
+            model_sim.set_params(config_obj=model_config,
+                                 topo_obj=topo_obj,
+                                 layout_obj=layout_obj,
+                                 top_path=self.top_path,
+                                 verbosity=False,
+                                 save_trace=save_trace,
+                                 num_jobs=self.num_jobs,
+                                 cache_dir=cache_dir,
+                                 cache_size_mb=cache_size_mb,
+                                 resume=resume)
+
+            self.models.append([model_name, topofile, model_sim])
+
+        self.params_set_flag = True
+
+    #
+    def run(self):
+        """
+        Method to run all the models. The layers to simulate across all the models are submitted
+        to one pool, largest first, so that the long layers do not end up alone at the tail of the
+        batch. The reports of a model are written once all its layers are done.
+        """
+        assert self.params_set_flag, 'Batch parameters are not set'
+
+        if not os.path.isdir(self.top_path):
+            os.makedirs(self.top_path)
+
+        pooled_models = []
+        for model_id, (model_name, _, model_sim) in enumerate(self.models):
+            model_sim.prepare_run()
+
+            # Models which run in the current process (e.g. in the analytical mode)
+            if model_sim.num_jobs == 1:
+                model_sim.run_serial()
+                model_sim.finish_run()
+                self.print_model_done(model_id)
+            else:
+                pooled_models.append(model_id)
+
+        # Entries are [cost, model id, layer id]
+        pending_layers = []
+        for model_id in pooled_models:
+            model_sim = self.models[model_id][2]
+            for layer_id in model_sim.get_layers_to_simulate():
+                cost = get_layer_cost(model_sim.conf, model_sim.topo, layer_id)
+                pending_layers.append([cost, model_id, layer_id])
+        pending_layers.sort(key=lambda entry: entry[0], reverse=True)
+
+        if len(pooled_models) > 0:
+            if self.verbose:
+                print('Batch: ' + str(len(pooled_models)) + ' models, '
+                      + str(len(pending_layers)) + ' layers to simulate on '
+                      + str(self.num_jobs) + ' processes')
+
+            with ProcessPoolExecutor(max_workers=self.num_jobs) as executor:
+                futures = {}
+                for model_id in pooled_models:
+                    futures[model_id] = {}
+                for _, model_id, layer_id in pending_layers:
+                    model_sim = self.models[model_id][2]
+                    futures[model_id][layer_id] = model_sim.submit_layer(executor, layer_id)
+
+                for model_id in pooled_models:
+                    model_sim = self.models[model_id][2]
+                    model_sim.collect_layer_results(futures[model_id])
+                    model_sim.finish_run()
+                    self.print_model_done(model_id)
+
+        self.results_list = [model_sim.get_results() for _, _, model_sim in self.models]
+        self.batch_done_flag = True
+
+    #
+    def print_model_done(self, model_id):
+        """
+        Method to print the completion of a model for verbose runs.
+        """
+        if not self.verbose:
+            return
+
+        model_name, _, model_sim = self.models[model_id]
+        print('Model ' + model_name + ' done: ' + str(model_sim.get_total_cycles())
+              + ' cycles, reports in ' + model_sim.top_path)
+
+    #
+    def get_results(self):
+        """
+        Method to get the results of the models, as a list of [model name, scale_results object].
+        """
+        assert self.batch_done_flag, 'Batch is not done yet'
+
+        return [[self.models[i][0], self.results_list[i]] for i in range(len(self.models))]
+
+    #
+    def write_summary(self):
+        """
+        Method to write BATCH_SUMMARY.csv, with the totals of every model, in the log directory.
+        """
+        assert self.batch_done_flag, 'Batch is not done yet'
+
+        summary_name = os.path.join(self.top_path, 'BATCH_SUMMARY.csv')
+        summary = open(summary_name, 'w')
+        header = 'Model, Topology File, Num Layers, '
+        header += 'Total Cycles (incl. prefetch), Total Cycles, Stall Cycles, Compute Util %, '
+        header += 'SRAM IFMAP Reads, SRAM Filter Reads, SRAM OFMAP Writes, '
+        header += 'DRAM IFMAP Reads, DRAM Filter Reads, DRAM OFMAP Writes,\n'
+        summary.write(header)
+
+        for model_id, (model_name, topofile, _) in enumerate(self.models):
+            totals = self.results_list[model_id].get_totals()
+            items = [model_name, topofile, totals['num_layers']]
+            items += [totals['overall_cycles'], totals['total_cycles'], totals['stall_cycles']]
+            items += [totals['compute_util']]
+            items += [totals['ifmap_sram_reads'], totals['filter_sram_reads'],
+                      totals['ofmap_sram_writes']]
+            items += [totals['ifmap_dram_reads'], totals['filter_dram_reads'],
+                      totals['ofmap_dram_writes']]
+            summary.write(', '.join([str(x) for x in items]) + ',\n')
+
+        summary.close()
+
+        if self.verbose:
+            print('Batch summary written to ' + summary_name)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-c', metavar='Config file', type=str,
+                        default="./configs/scale.cfg",
+                        help="Path to the config file"
+                        )
+    parser.add_argument('-t', metavar='Topology files', type=str, nargs='+',
+                        required=True,
+                        help="Paths or glob patterns (quoted) of the topology files"
+                        )
+    parser.add_argument('-i', metavar='input type', type=str,
+                        default="auto",
+                        help="Type of the input topologies, gemm: MNK, conv: conv, "
+                             "auto: detected from the header of each file"
+                        )
+    parser.add_argument('-p', metavar='log dir', type=str,
+                        default="./results/",
+                        help="Path to log dir"
+                        )
+    parser.add_argument('-s', metavar='save trace', type=str,
+                        default="N",
+                        help="Save Trace: (Y/N)"
+                        )
+    parser.add_argument('-j', '--jobs', metavar='num jobs', type=int,
+                        default=os.cpu_count(),
+                        help="Number of worker processes shared by all the topologies"
+                        )
+    parser.add_argument('--resume', action='store_true',
+                        help="Skip the layers completed by a previous run in the same log dir"
+                        )
+    parser.add_argument('--profile', action='store_true',
+                        help="Record the time, elements and bytes of every stage of the layer "
+                             "simulations in the PERF_REPORT.csv of each topology"
+                        )
+    parser.add_argument('--cache-dir', metavar='cache dir', type=str,
+                        default="",
+                        help="Path to a result cache directory, reused across runs (off by default)"
+                        )
+    parser.add_argument('--cache-size', metavar='cache size', type=float,
+                        default=1024,
+                        help="Size cap of the result cache in MB"
+                        )
+
+    args = parser.parse_args()
+
+    config = scale_config()
+    config.read_conf_file(args.c)
+    if args.profile:
+        config.set_profiling(True)
+
+    batch_topofiles = get_topology_files(args.t)
+    if len(batch_topofiles) == 0:
+        print('ERROR: scalesim.batch: No topology file found')
+        print('Exiting')
+        exit()
+
+    b = batch()
+    b.set_params(config_obj=config,
+                 topofiles=batch_topofiles,
+                 input_type=args.i,
+                 top_path=args.p,
+                 num_jobs=args.jobs,
+                 save_trace=args.s == 'Y',
+                 cache_dir=args.cache_dir,
+                 cache_size_mb=args.cache_size,
+                 resume=args.resume)
+    b.run()
+    b.write_summary()
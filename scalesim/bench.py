@@ -0,0 +1,264 @@
+"""
+This file contains the benchmark suite of the simulator. Representative layers are simulated for
+every dataflow with single_layer_sim, the time spent in each stage of the simulation is written to
+a json file and, optionally, compared to the one of a baseline run on the same machine, e.g. of
+the code before a change.
+
+Usage:
+    python3 -m scalesim.bench -o bench.json
+    python3 -m scalesim.bench -o bench_new.json -b bench.json
+"""
+
+import argparse
+import copy
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from scalesim.scale_config import scale_config
+from scalesim.topology_utils import topologies
+from scalesim.layout_utils import layouts
+from scalesim.single_layer_sim import single_layer_sim
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Name, topology file (relative to the repo root), MNK inputs, layer id
+BENCH_LAYERS = [
+    ['alexnet_part', 'topologies/conv_nets/alexnet_part.csv', False, 0],
+    ['Resnet18', 'topologies/conv_nets/Resnet18.csv', False, 13],
+    ['vit_s', 'topologies/GEMM_mnk/vit_s.csv', True, 0],
+]
+BENCH_DATAFLOWS = ['os', 'ws', 'is']
+
+STAGES = ['operand_matrix', 'prefetch_matrices', 'demand_matrices',
+          'service_memory_requests', 'save_traces']
+
+
+#
+def get_bench_cases(root=REPO_ROOT, case_filter=''):
+    """
+    Function to list the benchmark cases as [case name, topology file, MNK inputs, layer id,
+    dataflow]. Only the cases whose name contains case_filter are kept.
+    """
+    cases = []
+    for name, topofile, mnk_inputs, layer_id in BENCH_LAYERS:
+        for dataflow in BENCH_DATAFLOWS:
+            case_name = name + '/' + str(layer_id) + '/' + dataflow
+            if case_filter not in case_name:
+                continue
+            cases.append([case_name, os.path.join(root, topofile), mnk_inputs, layer_id, dataflow])
+
+    return cases
+
+
+#
+def run_case(config, topo, layer_id, save_trace=True):
+    """
+    Function to simulate one layer and get the time spent in each stage, in seconds.
+    """
+    layer_sim = single_layer_sim()
+    layer_sim.set_params(layer_id=layer_id, config_obj=config, topology_obj=topo,
+                         layout_obj=layouts(), verbose=False)
+    layer_sim.set_keep_sram_traces(save_trace)
+
+    start = time.perf_counter()
+    layer_sim.run()
+    if save_trace:
+        trace_dir = tempfile.mkdtemp(prefix='scalesim_bench_')
+        try:
+            layer_sim.save_traces(trace_dir)
+        finally:
+            shutil.rmtree(trace_dir)
+    total_time = time.perf_counter() - start
+
+    stage_times = layer_sim.get_stage_times()
+    stage_times['total'] = total_time
+
+    return stage_times
+
+
+#
+def run_bench(config, cases, repeats=1, save_trace=True, verbose=True):
+    """
+    Function to run the benchmark cases. Every case is run repeats times and the minimum time of
+    each stage is kept. Returns the results as a json serializable dictionary.
+    """
+    arr_h, arr_w = config.get_array_dims()
+    results = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'host': platform.node(),
+        'array': [arr_h, arr_w],
+        'bandwidth_mode': 'USER' if config.use_user_dram_bandwidth() else 'CALC',
+        'repeats': repeats,
+        'save_trace': save_trace,
+        'cases': {}
+    }
+
+    topo_objs = {}
+    for case_name, topofile, mnk_inputs, layer_id, dataflow in cases:
+        if topofile not in topo_objs:
+            topo = topologies()
+            topo.load_arrays(topofile=topofile, mnk_inputs=mnk_inputs)
+            topo_objs[topofile] = topo
+        topo = topo_objs[topofile]
+
+        case_config = copy.deepcopy(config)
+        case_config.set_dataflow(dataflow)
+
+        best_times = {}
+        for _ in range(repeats):
+            stage_times = run_case(case_config, topo, layer_id, save_trace=save_trace)
+            for stage, stage_time in stage_times.items():
+                if stage not in best_times or stage_time < best_times[stage]:
+                    best_times[stage] = stage_time
+
+        results['cases'][case_name] = {
+            'topology': os.path.basename(topofile),
+            'layer': topo.get_layer_name(layer_id),
+            'dataflow': dataflow,
+            'times': best_times
+        }
+
+        if verbose:
+            print(case_name + ': ' + "{:.3f}".format(best_times['total']) + ' s')
+
+    return results
+
+
+#
+def print_results(results):
+    """
+    Function to print the stage times of all the cases.
+    """
+    print('Case, ' + ', '.join(STAGES) + ', total (s)')
+    for case_name, case in results['cases'].items():
+        times = case['times']
+        log = [case_name] + ["{:.3f}".format(times.get(stage, 0.0)) for stage in STAGES]
+        log += ["{:.3f}".format(times['total'])]
+        print(', '.join(log))
+
+
+#
+def is_same_machine(results, baseline):
+    """
+    Function to check that a baseline run was made on the same machine as the current run, the
+    timings of different machines are not comparable.
+    """
+    for setting in ['host', 'platform']:
+        if not results.get(setting) == baseline.get(setting):
+            print('ERROR: The baseline was run on a different machine (' + setting + ': '
+                  + str(baseline.get(setting)) + '), generate it on this one with -o')
+            return False
+
+    return True
+
+
+#
+def compare_results(results, baseline, tolerance=0.1):
+    """
+    Function to compare the stage times of a run with the ones of a baseline run, for the cases
+    found in both. Prints the speedup of each stage (baseline time / new time) and returns the
+    names of the cases whose total time is more than tolerance (fraction) slower than the baseline.
+    """
+    regressions = []
+
+    for setting in ['array', 'bandwidth_mode', 'save_trace']:
+        if not results.get(setting) == baseline.get(setting):
+            print('WARNING: The baseline was run with a different ' + setting + ': '
+                  + str(baseline.get(setting)))
+
+    print('Case, ' + ', '.join(STAGES) + ', total (speedup vs baseline)')
+    for case_name, case in results['cases'].items():
+        if case_name not in baseline['cases']:
+            continue
+        times = case['times']
+        baseline_times = baseline['cases'][case_name]['times']
+
+        log = [case_name]
+        for stage in STAGES + ['total']:
+            if stage in times and stage in baseline_times and times[stage] > 0:
+                log.append("{:.2f}".format(baseline_times[stage] / times[stage]) + 'x')
+            else:
+                log.append('-')
+        print(', '.join(log))
+
+        if times['total'] > baseline_times['total'] * (1 + tolerance):
+            regressions.append(case_name)
+
+    for case_name in regressions:
+        print('WARNING: ' + case_name + ' is slower than the baseline')
+
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-c', metavar='Config file', type=str,
+                        default=os.path.join(REPO_ROOT, 'configs', 'scale.cfg'),
+                        help="Path to the config file, the dataflow is set by each case"
+                        )
+    parser.add_argument('-d', metavar='Root dir', type=str,
+                        default=REPO_ROOT,
+                        help="Directory the benchmark topology paths are relative to"
+                        )
+    parser.add_argument('-k', metavar='Case filter', type=str,
+                        default='',
+                        help="Only run the cases whose name (topology/layer/dataflow) contains "
+                             "this string"
+                        )
+    parser.add_argument('-r', metavar='Repeats', type=int,
+                        default=1,
+                        help="Number of runs of every case, the fastest one is kept"
+                        )
+    parser.add_argument('-s', metavar='save trace', type=str,
+                        default="Y",
+                        help="Include the trace writing in the timings: (Y/N)"
+                        )
+    parser.add_argument('-o', metavar='Output file', type=str,
+                        default='',
+                        help="Path to the json file to write the results to"
+                        )
+    parser.add_argument('-b', metavar='Baseline file', type=str,
+                        default='',
+                        help="Path to the json results of a baseline run on the same machine "
+                             "to compare against"
+                        )
+    parser.add_argument('--tolerance', metavar='Tolerance', type=float,
+                        default=0.1,
+                        help="Slowdown of the total time over the baseline, as a fraction, "
+                             "reported as a regression"
+                        )
+
+    args = parser.parse_args()
+
+    config = scale_config()
+    config.read_conf_file(args.c)
+
+    bench_cases = get_bench_cases(root=args.d, case_filter=args.k)
+    if len(bench_cases) == 0:
+        print('ERROR: scalesim.bench: No benchmark case matches ' + args.k)
+        exit()
+
+    bench_results = run_bench(config, bench_cases, repeats=max(1, args.r),
+                              save_trace=args.s == 'Y')
+    print_results(bench_results)
+
+    if not args.o == '':
+        with open(args.o, 'w') as f:
+            json.dump(bench_results, f, indent=2)
+
+    if not args.b == '':
+        with open(args.b, 'r') as f:
+            baseline_results = json.load(f)
+        if not is_same_machine(bench_results, baseline_results):
+            exit(1)
+        if len(compare_results(bench_results, baseline_results, args.tolerance)) > 0:
+            exit(1)
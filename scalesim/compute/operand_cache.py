@@ -0,0 +1,271 @@
+"""
+This file contains the 'operand_cache' class, a cache of the operand matrices of the layers. The
+operand matrices only depend on the layer shape, the offsets, the address dtype and the sparsity
+settings, not on the dataflow, the array, SRAM or bandwidth parameters. Sweeps over the latter
+therefore reuse them instead of generating the addresses again. The entries are kept in a least
+recently used cache within the process, of capped size, and optionally written as .npy files to a
+directory, shared by the processes and the runs, from which they are memory mapped.
+"""
+
+import hashlib
+import os
+import shutil
+from collections import OrderedDict
+
+import numpy as np
+
+
+# Bump this whenever a change in operand_matrix changes the matrices of a layer,
+# so that the entries written by older versions are not reused.
+OPERAND_CACHE_FORMAT_VERSION = '1'
+
+# Matrices of an entry, in the order of the files of the entry
+OPERAND_MATRICES = ['ifmap', 'filter', 'ofmap', 'ifmap_original', 'sparse_filter']
+
+# Cache of this process, created by get_operand_cache()
+PROCESS_OPERAND_CACHE = None
+
+
+#
+def get_operand_cache(config_obj):
+    """
+    Function to get the operand cache of this process with the settings of the given configuration.
+    Returns None if the cache is off. The cache is created again when the settings change.
+    """
+    global PROCESS_OPERAND_CACHE
+
+    max_size_mb, cache_dir, max_disk_size_mb = config_obj.get_operand_cache()
+    if max_size_mb <= 0 and cache_dir == '':
+        PROCESS_OPERAND_CACHE = None
+        return None
+
+    if PROCESS_OPERAND_CACHE is None or \
+            not PROCESS_OPERAND_CACHE.get_settings() == (max_size_mb, cache_dir, max_disk_size_mb):
+        PROCESS_OPERAND_CACHE = operand_cache(max_size_mb=max_size_mb, cache_dir=cache_dir,
+                                              max_disk_size_mb=max_disk_size_mb)
+
+    return PROCESS_OPERAND_CACHE
+
+
+class operand_cache:
+    """
+    Class which stores and retrieves the operand matrices of the layers, addressed by the hash of
+    the operand matrix signature of the layer. The matrices handed out are read only, since they
+    are shared by all the runs which use them.
+    """
+    #
+    def __init__(self, max_size_mb=512, cache_dir='', max_disk_size_mb=4096):
+        """
+        __init__ method
+        """
+        self.max_size_mb = max_size_mb
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.cache_dir = cache_dir
+        self.max_disk_size_mb = max_disk_size_mb
+        self.max_disk_size_bytes = int(max_disk_size_mb * 1024 * 1024)
+
+        # Entries are key -> [matrices, size in bytes], least recently used first
+        self.entries = OrderedDict()
+        self.size_bytes = 0
+
+        self.num_hits = 0
+        self.num_disk_hits = 0
+        self.num_misses = 0
+
+        if not self.cache_dir == '' and not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+    #
+    def get_settings(self):
+        """
+        Method to get the size cap (MB), the directory and the disk size cap (MB) of the cache.
+        """
+        return self.max_size_mb, self.cache_dir, self.max_disk_size_mb
+
+    #
+    @staticmethod
+    def get_key(signature):
+        """
+        Method to get the cache key (content hash) for an operand matrix signature.
+        """
+        key_string = OPERAND_CACHE_FORMAT_VERSION + '|' + '|'.join([str(x) for x in signature])
+        return hashlib.sha256(key_string.encode('utf-8')).hexdigest()
+
+    #
+    def get_entry_dir(self, key):
+        """
+        Method to get the directory of a cache entry on disk.
+        """
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    #
+    def lookup(self, signature):
+        """
+        Method to get the operand matrices stored for the given signature, as a dictionary indexed
+        by the names of OPERAND_MATRICES. Returns None on a miss.
+        """
+        key = self.get_key(signature)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.num_hits += 1
+            return self.entries[key][0]
+
+        matrices = self.load_from_disk(key)
+        if matrices is None:
+            self.num_misses += 1
+            return None
+
+        self.num_disk_hits += 1
+        self.add_entry(key, matrices)
+        return matrices
+
+    #
+    def store(self, signature, matrices):
+        """
+        Method to add the operand matrices of a layer to the cache, and to the cache directory if
+        one is used. The matrices are made read only.
+        """
+        key = self.get_key(signature)
+
+        stored_matrices = {}
+        for name in OPERAND_MATRICES:
+            stored_matrices[name] = matrices[name]
+            stored_matrices[name].setflags(write=False)
+
+        if not self.cache_dir == '':
+            self.write_to_disk(key, stored_matrices)
+        self.add_entry(key, stored_matrices)
+
+    #
+    def add_entry(self, key, matrices):
+        """
+        Method to add an entry to the in process cache, evicting the least recently used entries
+        until it fits in its size cap. Memory mapped matrices do not count towards the size.
+        """
+        if self.max_size_bytes <= 0:
+            return
+
+        size = 0
+        counted = []
+        for name in OPERAND_MATRICES:
+            matrix = matrices[name]
+            if isinstance(matrix, np.memmap) or any([matrix is x for x in counted]):
+                continue
+            size += matrix.nbytes
+            counted.append(matrix)
+
+        if size > self.max_size_bytes:
+            return
+
+        self.entries[key] = [matrices, size]
+        self.size_bytes += size
+        while self.size_bytes > self.max_size_bytes:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.size_bytes -= evicted_size
+
+    #
+    def load_from_disk(self, key):
+        """
+        Method to memory map the matrices of an entry of the cache directory. Returns None if the
+        directory is not used or the entry is not there.
+        """
+        if self.cache_dir == '':
+            return None
+
+        entry_dir = self.get_entry_dir(key)
+        done_filename = os.path.join(entry_dir, 'done')
+        if not os.path.isfile(done_filename):
+            return None
+
+        matrices = {}
+        for name in OPERAND_MATRICES:
+            filename = os.path.join(entry_dir, name + '.npy')
+            if name == 'ifmap_original' and not os.path.isfile(filename):
+                # The original IFMAP matrix is the IFMAP matrix itself unless sparsity drops columns
+                matrices[name] = matrices['ifmap']
+                continue
+            matrices[name] = np.load(filename, mmap_mode='r')
+
+        # Mark the entry as recently used
+        os.utime(done_filename, None)
+
+        return matrices
+
+    #
+    def write_to_disk(self, key, matrices):
+        """
+        Method to write the matrices of an entry to the cache directory. The entry is written to a
+        temporary directory first, so that the other processes never see a partial entry.
+        """
+        entry_dir = self.get_entry_dir(key)
+        if os.path.isdir(entry_dir):
+            return
+
+        tmp_dir = entry_dir + '.tmp' + str(os.getpid())
+        if not os.path.isdir(tmp_dir):
+            os.makedirs(tmp_dir)
+
+        for name in OPERAND_MATRICES:
+            if name == 'ifmap_original' and matrices[name] is matrices['ifmap']:
+                continue
+            np.save(os.path.join(tmp_dir, name + '.npy'), matrices[name])
+        open(os.path.join(tmp_dir, 'done'), 'w').close()
+
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # Written by another process in the meantime
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        self.evict_disk()
+
+    #
+    def get_disk_entries(self):
+        """
+        Method to list the entries of the cache directory as [key, size in bytes, last use time],
+        least recently used first.
+        """
+        entries = []
+        if self.cache_dir == '' or not os.path.isdir(self.cache_dir):
+            return entries
+
+        for prefix in os.listdir(self.cache_dir):
+            prefix_dir = os.path.join(self.cache_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for key in os.listdir(prefix_dir):
+                entry_dir = os.path.join(prefix_dir, key)
+                done_filename = os.path.join(entry_dir, 'done')
+                if not os.path.isfile(done_filename):
+                    continue
+
+                size = 0
+                for filename in os.listdir(entry_dir):
+                    size += os.path.getsize(os.path.join(entry_dir, filename))
+                entries.append([key, size, os.path.getmtime(done_filename)])
+
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    #
+    def evict_disk(self):
+        """
+        Method to remove the least recently used entries of the cache directory until it fits in
+        its size cap. The files of an entry still memory mapped by a process stay readable by it.
+        """
+        entries = self.get_disk_entries()
+        total_size = sum([entry[1] for entry in entries])
+
+        for key, size, _ in entries:
+            if total_size <= self.max_disk_size_bytes:
+                break
+            shutil.rmtree(self.get_entry_dir(key), ignore_errors=True)
+            total_size -= size
+
+    #
+    def print_info(self):
+        """
+        Method to print the hits and misses of the cache.
+        """
+        print("Operand cache: \t" + str(self.num_hits) + " hits, " + str(self.num_disk_hits)
+              + " disk hits, " + str(self.num_misses) + " misses")
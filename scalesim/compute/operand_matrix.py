@@ -9,6 +9,7 @@ import math
 from scalesim.topology_utils import topologies as topoutil
 from scalesim.layout_utils import layouts as layoututil
 from scalesim.scale_config import scale_config as cfg
+from scalesim.compute.sparsity_kernels import get_nm_sparsity_pattern, compact_nonzero_blocks
 
 
 class operand_matrix(object):
@@ -43,6 +44,9 @@ class operand_matrix(object):
         self.ifmap_offset, self.filter_offset, self.ofmap_offset = 0, 10000000, 20000000
         self.matrix_offset_arr = [0, 10000000, 20000000]
 
+        # Integer type of the addresses, set from the config
+        self.address_dtype = 'int32'
+
         # Address matrices
         self.ifmap_addr_matrix = np.ones((self.ofmap_px_per_filt, self.conv_window_size), dtype=int)
         self.filter_addr_matrix = np.ones((self.conv_window_size, self.num_filters), dtype=int)
@@ -114,12 +118,16 @@ class operand_matrix(object):
         # Assign the offsets
         self.ifmap_offset, self.filter_offset, self.ofmap_offset \
             = self.config.get_offsets()
+        self.address_dtype = self.config.get_address_dtype()
 
         # Address matrices: This is needed to take into account the updated dimensions
         self.ifmap_addr_matrix = \
-            np.ones((self.ofmap_px_per_filt * self.batch_size, self.conv_window_size), dtype='>i4')
-        self.filter_addr_matrix = np.ones((self.conv_window_size, self.num_filters), dtype='>i4')
-        self.ofmap_addr_matrix = np.ones((self.ofmap_px_per_filt, self.num_filters), dtype='>i4')
+            np.ones((self.ofmap_px_per_filt * self.batch_size, self.conv_window_size),
+                    dtype=self.address_dtype)
+        self.filter_addr_matrix = \
+            np.ones((self.conv_window_size, self.num_filters), dtype=self.address_dtype)
+        self.ofmap_addr_matrix = \
+            np.ones((self.ofmap_px_per_filt, self.num_filters), dtype=self.address_dtype)
         self.params_set_flag = True
 
         # TODO: This should be called from top level
@@ -153,10 +161,89 @@ class operand_matrix(object):
 
         retcode = retcode_1 + retcode_2 + retcode_3
         if retcode == 0:
+            self.set_address_matrices_dtype()
             self.matrices_ready_flag = True
 
         return retcode
 
+    #
+    def get_operand_signature(self):
+        """
+        Method to get the list of the parameters which the operand matrices depend on: the layer
+        shape, the offsets, the address dtype and the sparsity settings.
+        """
+        assert self.params_set_flag, 'Parameters not set yet. Run set_params()'
+
+        signature = [self.ifmap_rows, self.ifmap_cols, self.filter_rows, self.filter_cols,
+                     self.num_input_channels, self.num_filters, self.row_stride, self.col_stride,
+                     self.batch_size]
+        signature += [self.ifmap_offset, self.filter_offset, self.ofmap_offset,
+                      self.config.get_address_dtype()]
+        signature += [self.config.sparsity_support]
+        if self.config.sparsity_support:
+            signature += [self.sparsity_ratio_N, self.sparsity_ratio_M,
+                          self.config.sparsity_optimized_mapping]
+            if self.config.sparsity_optimized_mapping:
+                signature += [self.config.sparsity_block_size, self.config.sparsity_rand_seed]
+
+        return [str(x) for x in signature]
+
+    #
+    def get_operand_matrices(self):
+        """
+        Method to get all the matrices created by create_operand_matrices(), as a dictionary
+        indexed by the names of operand_cache.OPERAND_MATRICES.
+        """
+        assert self.matrices_ready_flag, 'Matrices not ready or matrix gen failed'
+
+        return {'ifmap': self.ifmap_addr_matrix,
+                'filter': self.filter_addr_matrix,
+                'ofmap': self.ofmap_addr_matrix,
+                'ifmap_original': self.ifmap_addr_matrix_original,
+                'sparse_filter': self.sparse_filter_array}
+
+    #
+    def set_operand_matrices(self, matrices):
+        """
+        Method to use matrices created earlier for the same signature (see get_operand_signature())
+        instead of creating them.
+        """
+        assert self.params_set_flag, 'Parameters not set yet. Run set_params()'
+
+        self.ifmap_addr_matrix = matrices['ifmap']
+        self.filter_addr_matrix = matrices['filter']
+        self.ofmap_addr_matrix = matrices['ofmap']
+        self.ifmap_addr_matrix_original = matrices['ifmap_original']
+        self.sparse_filter_array = matrices['sparse_filter']
+        self.address_dtype = str(self.ifmap_addr_matrix.dtype)
+        self.matrices_ready_flag = True
+
+    #
+    def set_address_matrices_dtype(self):
+        """
+        Method to convert the address matrices to the address dtype of the config. If the largest
+        address does not fit in it, int64 is used instead.
+        """
+        address_matrices = [self.ifmap_addr_matrix, self.filter_addr_matrix,
+                            self.ofmap_addr_matrix, self.ifmap_addr_matrix_original]
+        max_addr = max([int(np.amax(x)) for x in address_matrices if x.size > 0] + [0])
+        if max_addr > np.iinfo(self.address_dtype).max:
+            print('WARNING: operand_matrix: Addresses exceed ' + self.address_dtype
+                  + ', using int64')
+            self.address_dtype = 'int64'
+
+        # The original IFMAP matrix is the IFMAP matrix itself unless sparsity drops columns
+        same_ifmap = self.ifmap_addr_matrix_original is self.ifmap_addr_matrix
+
+        self.ifmap_addr_matrix = self.ifmap_addr_matrix.astype(self.address_dtype, copy=False)
+        self.filter_addr_matrix = self.filter_addr_matrix.astype(self.address_dtype, copy=False)
+        self.ofmap_addr_matrix = self.ofmap_addr_matrix.astype(self.address_dtype, copy=False)
+        if same_ifmap:
+            self.ifmap_addr_matrix_original = self.ifmap_addr_matrix
+        else:
+            self.ifmap_addr_matrix_original = \
+                self.ifmap_addr_matrix_original.astype(self.address_dtype, copy=False)
+
     # creates the ifmap operand
     def create_ifmap_matrix(self):
         """
@@ -272,59 +359,49 @@ class operand_matrix(object):
         self.filter_addr_matrix = self.calc_filter_elem_addr(row_indices, col_indices)
 
         if self.config.sparsity_support is True:
+            num_rows = self.filter_addr_matrix.shape[0]
             if self.config.sparsity_optimized_mapping is False:
-                pattern = np.concatenate([np.ones(self.sparsity_ratio_N, dtype=int),
-                                        np.zeros(self.sparsity_ratio_M - self.sparsity_ratio_N,
-                                                dtype=int)])
-                num_repeats = (self.filter_addr_matrix.shape[0] + \
-                            self.sparsity_ratio_M - 1) // self.sparsity_ratio_M
-                column_values = np.tile(pattern, num_repeats)[:self.filter_addr_matrix.shape[0]]
-                self.sparse_filter_array = \
-                    np.tile(column_values[:, np.newaxis], (1, self.filter_addr_matrix.shape[1]))
+                self.sparse_filter_array = get_nm_sparsity_pattern(num_rows,
+                                                                   self.sparsity_ratio_N,
+                                                                   self.sparsity_ratio_M)
+                self.sparse_filter_array = np.tile(self.sparse_filter_array,
+                                                   (1, self.filter_addr_matrix.shape[1]))
 
             else:
+                # Random N of every column, drawn in the order of the columns
                 ratio_M = self.config.sparsity_block_size
-                num_repeats = (self.filter_addr_matrix.shape[0] + ratio_M - 1) // ratio_M
-                columns = []
                 np.random.seed(self.config.sparsity_rand_seed)
-                for col_idx in range(self.filter_addr_matrix.shape[1]):
-                    ratio_N = np.random.randint(1, ratio_M // 2 + 1)
-                    pattern = np.concatenate([np.ones(ratio_N, dtype=int), 
-                                            np.zeros(ratio_M - ratio_N, dtype=int)])
-                    column_values = np.tile(pattern, num_repeats)[:self.filter_addr_matrix.shape[0]]
-                    columns.append(column_values)
-                self.sparse_filter_array = np.column_stack(columns)
+                ratio_N = np.random.randint(1, ratio_M // 2 + 1,
+                                            size=self.filter_addr_matrix.shape[1])
+                self.sparse_filter_array = get_nm_sparsity_pattern(num_rows, ratio_N, ratio_M)
 
             self.filter_addr_matrix = np.multiply(self.filter_addr_matrix, self.sparse_filter_array)
 
             if self.config.sparsity_optimized_mapping is False:
-                sparse_filter_matrix = []
-                for col_num in range(self.filter_addr_matrix.shape[1]):
-                    col_data = self.filter_addr_matrix[:, col_num]
-                    condensed_col = []
-
-                    for i in range(0, self.filter_addr_matrix.shape[0], self.sparsity_ratio_M):
-                        block = col_data[i : i+self.sparsity_ratio_M]
-                        block_nonzero = block[block != 0]
-
-                        if len(block_nonzero) < self.sparsity_ratio_N:
-                            padding_num = self.sparsity_ratio_N - len(block_nonzero)
-                            block_nonzero = np.pad(block_nonzero, (0, padding_num), constant_values=0)
-                        elif len(block_nonzero) > self.sparsity_ratio_N:
-                            assert len(block_nonzero) <= self.sparsity_ratio_N, (
-                                f"Excess non-zero entries ({len(block_nonzero)}) with sparsity ratio "
-                                f"set to {self.sparsity_ratio_N}:{self.sparsity_ratio_M}"
-                                )
-
-                        condensed_col.extend(block_nonzero)
-
-                    sparse_filter_matrix.append(condensed_col)
-
-                sparse_filter_matrix = np.array(sparse_filter_matrix).T
-                
-                while sparse_filter_matrix.shape[0] > 0 and np.all(sparse_filter_matrix[-1] == 0):
-                    sparse_filter_matrix = sparse_filter_matrix[:-1]
-                self.filter_addr_matrix = sparse_filter_matrix
+                # Keep the N non zero elements of every block of M rows, the last block is padded
+                remainder = num_rows % self.sparsity_ratio_M
+                if remainder != 0:
+                    padding_rows = self.sparsity_ratio_M - remainder
+                    self.filter_addr_matrix = np.vstack([
+                        self.filter_addr_matrix,
+                        np.zeros((padding_rows, self.filter_addr_matrix.shape[1]),
+                                 dtype=self.filter_addr_matrix.dtype)
+                    ])
+
+                sparse_filter_matrix, max_nonzero = \
+                    compact_nonzero_blocks(self.filter_addr_matrix, self.sparsity_ratio_M,
+                                           self.sparsity_ratio_N)
+                assert max_nonzero <= self.sparsity_ratio_N, (
+                    f"Excess non-zero entries ({max_nonzero}) with sparsity ratio "
+                    f"set to {self.sparsity_ratio_N}:{self.sparsity_ratio_M}"
+                    )
+
+                # Drop the trailing rows without any non zero element
+                nonzero_rows = np.flatnonzero(np.any(sparse_filter_matrix != 0, axis=1))
+                num_kept_rows = 0
+                if nonzero_rows.size > 0:
+                    num_kept_rows = nonzero_rows[-1] + 1
+                self.filter_addr_matrix = sparse_filter_matrix[:num_kept_rows]
             else:
                 remainder = self.filter_addr_matrix.shape[0] % (2 * self.config.sparsity_block_size)
 
@@ -335,27 +412,13 @@ class operand_matrix(object):
                         np.zeros((padding_rows, self.filter_addr_matrix.shape[1]), dtype=int)
                     ])
 
+                # Every block of BlockSize rows keeps up to BlockSize / 2 non zero elements
                 sparse_filter_matrix = np.zeros((self.filter_addr_matrix.shape[0] // 2, self.filter_addr_matrix.shape[1]), dtype=int)
-
-                for col in range(self.filter_addr_matrix.shape[1]):
-                    compressed_col = []  # To store the compressed column values
-                    for start_row in range(0, self.filter_addr_matrix.shape[0], self.config.sparsity_block_size * 2):
-                        block1 = self.filter_addr_matrix[start_row : start_row + self.config.sparsity_block_size, col]
-                        padded_block1 = np.zeros(self.config.sparsity_block_size // 2, dtype=int)
-                        non_zero_block1 = block1[block1 != 0]
-                        padded_block1[:min(len(non_zero_block1), self.config.sparsity_block_size // 2)] = non_zero_block1[: self.config.sparsity_block_size // 2]
-
-                        block2 = self.filter_addr_matrix[start_row + self.config.sparsity_block_size : start_row + self.config.sparsity_block_size * 2, col]
-                        padded_block2 = np.zeros(self.config.sparsity_block_size // 2, dtype=int)
-                        non_zero_block2 = block2[block2 != 0]
-                        padded_block2[:min(len(non_zero_block2), self.config.sparsity_block_size // 2)] = non_zero_block2[: self.config.sparsity_block_size // 2]
-
-                        combined_block = np.concatenate([padded_block1, padded_block2])
-
-                        compressed_col.extend(combined_block)
-
-                    # Update the column in the compressed matrix
-                    sparse_filter_matrix[:len(compressed_col), col] = compressed_col
+                compressed_matrix, _ = \
+                    compact_nonzero_blocks(self.filter_addr_matrix,
+                                           self.config.sparsity_block_size,
+                                           self.config.sparsity_block_size // 2)
+                sparse_filter_matrix[:compressed_matrix.shape[0], :] = compressed_matrix
 
                 # Replace the original matrix with the compressed matrix
                 self.filter_addr_matrix = sparse_filter_matrix
@@ -495,7 +558,7 @@ class operand_matrix(object):
            (ifmap_interline_order[0], ifmap_interline_order[1], ifmap_interline_order[2], 
             ifmap_intraline_order[0], ifmap_intraline_order[1], ifmap_intraline_order[2]))
 
-        return ifmap_overall_data_pad.reshape(1,-1)
+        return ifmap_overall_data_pad.reshape(1,-1).astype(self.address_dtype)
         
     # function to get a part or the full filter operand
     def get_filter_matrix_part(self, start_row=0, num_rows=-1, start_col=0,
@@ -634,7 +697,7 @@ class operand_matrix(object):
             filter_intraline_order[0], filter_intraline_order[1], filter_intraline_order[2], filter_intraline_order[3]))
 
         print(f"finalized filter.shape = {filter_overall_data_pad.shape}")
-        return filter_overall_data_pad.reshape(1,-1)
+        return filter_overall_data_pad.reshape(1,-1).astype(self.address_dtype)
     
     # function to get a part or the full ofmap operand
     def get_ofmap_matrix_part(self, start_row=0, num_rows=-1, start_col=0,
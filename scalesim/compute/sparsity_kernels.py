@@ -0,0 +1,135 @@
+"""
+This module contains the array kernels of the row-wise sparsity paths: the N:M sparsity patterns of
+the filter columns, the compaction of the non zero filter elements of every block of rows (N:M and
+optimized mapping, ELLPACK block representation) and the custom skew of the ifmap demands of the
+optimized mapping. The compaction and skew kernels run the numba compiled versions of
+'sparsity_kernels_numba' when numba is installed, and the whole array NumPy versions otherwise.
+Both give the same results.
+"""
+
+import math
+
+import numpy as np
+
+
+#
+def get_nm_sparsity_pattern(num_rows, ratio_n, ratio_m):
+    """
+    Function to get the N:M sparsity pattern of a filter matrix of num_rows rows: in every block of
+    ratio_m rows of a column, the first N elements are kept (1) and the others dropped (0).
+    ratio_n is either one N for all the columns or an array with the N of every column.
+    """
+    ratio_n_np = np.asarray(ratio_n).reshape((1, -1))
+    row_pos = (np.arange(num_rows) % ratio_m).reshape((num_rows, 1))
+
+    return (row_pos < ratio_n_np).astype(int)
+
+
+#
+def compact_nonzero_blocks_numpy(matrix_np, block_rows, keep):
+    """
+    NumPy version of compact_nonzero_blocks().
+    """
+    rows, cols = matrix_np.shape
+    num_blocks = rows // block_rows
+    blocks_np = matrix_np.reshape((num_blocks, block_rows, cols))
+
+    # Position of every non zero element among the non zero elements of its block
+    nonzero_np = blocks_np != 0
+    pos_np = np.cumsum(nonzero_np, axis=1) - 1
+    kept_np = nonzero_np & (pos_np < keep)
+
+    out_np = np.zeros((num_blocks, keep, cols), dtype=matrix_np.dtype)
+    block_ids, _, col_ids = np.nonzero(kept_np)
+    out_np[block_ids, pos_np[kept_np], col_ids] = blocks_np[kept_np]
+
+    max_count = 0
+    if num_blocks > 0 and block_rows > 0:
+        max_count = int(np.amax(np.sum(nonzero_np, axis=1)))
+
+    return out_np.reshape((num_blocks * keep, cols)), max_count
+
+
+#
+def skew_matrix_row_sparsity_numpy(input_matrix, out_matrix, block_size, num_copies):
+    """
+    NumPy version of the skew of skew_matrix_row_sparsity(), one block column at a time.
+    """
+    rows = input_matrix.shape[0]
+    out_rows = out_matrix.shape[0]
+    num_block_cols = out_matrix.shape[1] // block_size
+
+    for block_col in range(min(num_block_cols, out_rows)):
+        src_col = (block_col // num_copies) * block_size
+        dst_col = block_col * block_size
+        num_valid = min(rows, out_rows - block_col)
+        out_matrix[block_col:block_col + num_valid, dst_col:dst_col + block_size] = \
+            input_matrix[:num_valid, src_col:src_col + block_size]
+
+
+#
+def get_numba_kernels():
+    """
+    Function to get the module of the numba compiled kernels. It is imported on first use, so that
+    numba is only loaded by the runs with sparsity. Returns None if numba is not installed.
+    """
+    try:
+        from scalesim.compute import sparsity_kernels_numba
+    except ImportError:
+        return None
+
+    return sparsity_kernels_numba
+
+
+#
+def compact_nonzero_blocks(matrix_np, block_rows, keep, use_numba=True):
+    """
+    Function to compact the non zero elements of every block of block_rows rows of each column of
+    a matrix, in order, into keep elements, padded with zeros and dropping the ones beyond keep.
+    The number of rows must be a multiple of block_rows. Returns the compacted matrix, with keep
+    rows per block, and the largest number of non zero elements found in a block.
+    """
+    numba_kernels = get_numba_kernels() if use_numba else None
+    if numba_kernels is not None:
+        return numba_kernels.compact_nonzero_blocks(np.ascontiguousarray(matrix_np), block_rows,
+                                                    keep)
+
+    return compact_nonzero_blocks_numpy(matrix_np, block_rows, keep)
+
+
+#
+def skew_matrix_row_sparsity(input_matrix, arr_row, block_size, use_numba=True):
+    """
+    Function to add the custom skew of the optimized mapping of the row-wise sparsity to a fold of
+    the ifmap demands, which spans two tiles. The columns are padded to 2 * arr_row and split into
+    blocks of block_size columns. Every block is repeated block_size / 2 times and the k-th block
+    column is delayed by k lines, with null (-1) requests elsewhere. The output has
+    rows + arr_row - 1 lines, the block columns which start beyond it are dropped.
+    """
+    # Step 1: Ensure the number of columns is arr_row * 2 as we are combining 2 tiles
+    num_tiles = 2
+    num_cols = input_matrix.shape[1]
+    if num_cols < arr_row * num_tiles:
+        padding = arr_row * num_tiles - num_cols
+        input_matrix = np.pad(input_matrix, ((0, 0), (0, padding)), constant_values=-1)
+
+    # Step 2: Split into blocks, the last one padded with null requests
+    num_cols = input_matrix.shape[1]
+    num_blocks = int(math.ceil(num_cols / block_size))
+    if num_blocks * block_size > num_cols:
+        padding = num_blocks * block_size - num_cols
+        input_matrix = np.pad(input_matrix, ((0, 0), (0, padding)), constant_values=-1)
+
+    # Step 3 and 4: Repeat every block block_size / 2 times and skew the block columns
+    num_copies = block_size // num_tiles
+    out_rows = input_matrix.shape[0] + arr_row - 1
+    out_matrix = np.full((out_rows, num_blocks * num_copies * block_size), -1,
+                         dtype=input_matrix.dtype)
+    numba_kernels = get_numba_kernels() if use_numba else None
+    if numba_kernels is not None:
+        numba_kernels.skew_matrix_row_sparsity(np.ascontiguousarray(input_matrix), out_matrix,
+                                               block_size, num_copies)
+    else:
+        skew_matrix_row_sparsity_numpy(input_matrix, out_matrix, block_size, num_copies)
+
+    return out_matrix
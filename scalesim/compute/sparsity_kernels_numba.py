@@ -0,0 +1,58 @@
+"""
+This module contains the numba compiled versions of the compaction and skew kernels of
+'sparsity_kernels', which imports it on first use. The compiled code is cached on disk, next to the
+module, so that it is only compiled by the first run.
+"""
+
+import numpy as np
+from numba import njit
+
+
+#
+@njit(cache=True)
+def compact_nonzero_blocks(matrix_np, block_rows, keep):
+    """
+    Numba version of sparsity_kernels.compact_nonzero_blocks().
+    """
+    rows, cols = matrix_np.shape
+    num_blocks = rows // block_rows
+    out_np = np.zeros((num_blocks * keep, cols), dtype=matrix_np.dtype)
+    counts = np.zeros(cols, dtype=np.int64)
+
+    # Row by row, counting the non zero elements of the current block of every column
+    max_count = 0
+    for block in range(num_blocks):
+        counts[:] = 0
+        for row in range(block * block_rows, (block + 1) * block_rows):
+            for col in range(cols):
+                elem = matrix_np[row, col]
+                if elem != 0:
+                    if counts[col] < keep:
+                        out_np[block * keep + counts[col], col] = elem
+                    counts[col] += 1
+        for col in range(cols):
+            if counts[col] > max_count:
+                max_count = counts[col]
+
+    return out_np, max_count
+
+
+#
+@njit(cache=True)
+def skew_matrix_row_sparsity(input_matrix, out_matrix, block_size, num_copies):
+    """
+    Numba version of the skew of sparsity_kernels.skew_matrix_row_sparsity().
+    """
+    rows = input_matrix.shape[0]
+    out_rows = out_matrix.shape[0]
+    num_block_cols = out_matrix.shape[1] // block_size
+
+    # Line by line, block column k of line i comes from line i - k of the input
+    for line in range(out_rows):
+        first_block_col = max(0, line - rows + 1)
+        last_block_col = min(num_block_cols - 1, line)
+        for block_col in range(first_block_col, last_block_col + 1):
+            src_col = (block_col // num_copies) * block_size
+            dst_col = block_col * block_size
+            for elem in range(block_size):
+                out_matrix[line, dst_col + elem] = input_matrix[line - block_col, src_col + elem]
@@ -7,8 +7,9 @@ for IFMAP, Filter, and OFMAP operations.
 
 import math
 import numpy as np
-from tqdm import tqdm
 from scalesim.scale_config import scale_config as cfg
+from scalesim.compute.systolic_kernels import get_fold_bounds, pad_fold, stack_folds, \
+    diagonal_rollout, get_null_demand_matrix, get_fold_window, write_fold
 
 
 class systolic_compute_is:
@@ -35,6 +36,9 @@ class systolic_compute_is:
         self.arr_row = 0
         self.arr_col = 0
 
+        # Integer type of the addresses in the prefetch and demand matrices
+        self.address_dtype = np.int32
+
         self.row_fold = 1
         self.col_fold = 1
 
@@ -59,6 +63,7 @@ class systolic_compute_is:
         self.params_set_flag = False
         self.prefetch_mat_ready_flag = False
         self.demand_mat_ready_flag = False
+        self.demand_metrics_ready_flag = False
 
     #
     def set_params(self,
@@ -76,6 +81,10 @@ class systolic_compute_is:
         self.filter_op_mat = filter_op_mat
         self.ofmap_op_mat = ofmap_op_mat
 
+        # The prefetch and demand matrices keep the address dtype of the operand matrices
+        self.address_dtype = np.result_type(self.ifmap_op_mat.dtype, self.filter_op_mat.dtype,
+                                            self.ofmap_op_mat.dtype)
+
         self.ifmap_op_mat_trans = np.transpose(self.ifmap_op_mat)
 
         ifmap_col = self.ifmap_op_mat.shape[1]
@@ -114,24 +123,16 @@ class systolic_compute_is:
         """
         assert self.params_set_flag, 'Parameters are not set'
 
+        fold_prefetch_list = []
         for fc in range(self.col_fold):
-            start_col_idx = fc * self.arr_col
-            end_col_idx = min(start_col_idx + self.arr_col, self.Sc)
-
-            delta = self.arr_col - (end_col_idx - start_col_idx)
+            start_col_idx, end_col_idx, _ = get_fold_bounds(fc, self.arr_col, self.Sc)
 
             this_fold_prefetch = self.ifmap_op_mat_trans[:,start_col_idx: end_col_idx]
 
             #If there is under utilization, fill them with null requests
-            if delta > 0:
-                null_req_mat = np.ones((self.Sr, delta)) * -1
-                this_fold_prefetch = np.concatenate((this_fold_prefetch, null_req_mat), axis=1)
+            fold_prefetch_list.append(pad_fold(this_fold_prefetch, self.arr_col))
 
-            if fc == 0:
-                self.ifmap_prefetch_matrix = this_fold_prefetch
-            else:
-                self.ifmap_prefetch_matrix = \
-                    np.concatenate((self.ifmap_prefetch_matrix, this_fold_prefetch), axis=0)
+        self.ifmap_prefetch_matrix = stack_folds(fold_prefetch_list)
 
         # Note: ISSUE #15: no skewing happens in the IFMAP for IS so this issue does not apply.
 
@@ -142,54 +143,20 @@ class systolic_compute_is:
         """
         assert self.params_set_flag, 'Parameters are not set'
 
+        fold_prefetch_list = []
         for fr in range(self.row_fold):
-            row_start_id = fr * self.arr_row
-            row_end_id = min(row_start_id + self.arr_row, self.Sr)
-
-            delta = self.arr_row - (row_end_id - row_start_id)
+            row_start_id, row_end_id, _ = get_fold_bounds(fr, self.arr_row, self.Sr)
 
             this_fold_prefetch = self.filter_op_mat[row_start_id:row_end_id, :]
             this_fold_prefetch = np.transpose(this_fold_prefetch)
+            fold_prefetch_list.append(pad_fold(this_fold_prefetch, self.arr_row))
 
-            if delta > 0:
-                null_req_mat = np.ones((self.T, delta)) * -1
-                this_fold_prefetch = np.concatenate((this_fold_prefetch, null_req_mat), axis=1)
-
-            if fr == 0:
-                self.filter_prefetch_matrix = this_fold_prefetch
-            else:
-                self.filter_prefetch_matrix = \
-                    np.concatenate((self.filter_prefetch_matrix, this_fold_prefetch), axis=0)
+        self.filter_prefetch_matrix = stack_folds(fold_prefetch_list)
 
         # Fixing ISSUE #15, #16
         # Roll out the matrices along the diagonal to account for temporal locality when there is a
         # skew in demand
-
-        M, N = self.filter_prefetch_matrix.shape
-        num_elems = M * N
-        num_diags = M + N
-        prefetches = np.zeros((1, num_elems))
-        idx = 0
-
-        pbar = tqdm(total=M * N, disable=True)
-        # print('DEBUG: Total = ' + str(num_elems) + ' Diags = ' + str(num_diags))
-
-        for diag_id in range(num_diags):
-            max_row_id = min(diag_id, M - 1)
-            min_row_id = max(0, diag_id - N + 1)
-            valid_rows = max_row_id - min_row_id + 1
-
-            for offset in range(valid_rows):
-                row_id = max_row_id - offset
-                col_id = diag_id - row_id
-
-                elem = self.filter_prefetch_matrix[row_id][col_id]
-                prefetches[0, idx] = elem
-                idx += 1
-                pbar.update(1)
-
-        pbar.close()
-        self.filter_prefetch_matrix = prefetches
+        self.filter_prefetch_matrix = diagonal_rollout(self.filter_prefetch_matrix)
 
     #
     def create_demand_matrices(self):
@@ -200,6 +167,7 @@ class systolic_compute_is:
         """
         assert self.params_set_flag, 'Parameters are not set'
 
+        self.reset_demand_metrics()
         self.create_ifmap_demand_mat()
         self.create_filter_demand_mat()
         self.create_ofmap_demand_mat()
@@ -213,49 +181,100 @@ class systolic_compute_is:
         assert self.ofmap_demand_matrix.shape[1] == self.arr_col, 'OFMAP demands exceed the cols'
 
         self.demand_mat_ready_flag = True
+        self.demand_metrics_ready_flag = True
+
+    #
+    def reset_demand_metrics(self):
+        """
+        Method to reset the requests and the per fold metrics gathered while creating the demands.
+        """
+        self.ifmap_reads = 0
+        self.filter_reads = 0
+        self.ofmap_writes = 0
+
+        self.mapping_efficiency_per_fold = []
+        self.compute_utility_per_fold = []
 
     #
-    def create_ifmap_demand_mat(self):
+    def get_demand_fold_lines(self):
         """
-        Method to create IFMAP demand matrix.
+        Method to get the number of folds of the demand matrices and the number of lines of every
+        fold, which are the same for the IFMAP, Filter and OFMAP demands.
         """
         assert self.params_set_flag, 'Parameters are not set'
 
-        inter_fold_gap_suffix = self.arr_row + self.arr_col + self.T - 2
-        inter_fold_gap_suffix_mat = np.ones((inter_fold_gap_suffix, self.arr_col)) * -1
+        fold_lines = 2 * self.arr_row + self.arr_col + self.T - 2
+        return self.row_fold * self.col_fold, fold_lines
 
-        for fc in range(self.col_fold):
-            for fr in range(self.row_fold):
-                row_start_id = fr * self.arr_row
-                row_end_idx = min(row_start_id + self.arr_row, self.Sr)
-                row_delta = self.arr_row - (row_end_idx - row_start_id)
-
-                col_start_id = fc * self.arr_col
-                col_end_idx = min(col_start_id + self.arr_col, self.Sc)
-                col_delta = self.arr_col - (col_end_idx - col_start_id)
-
-                # Indexing the cols with row start and row end idx are correct
-                # See the comment on ifmap_prefetch generation
-                this_fold_demand = \
-                    self.ifmap_op_mat_trans[row_start_id:row_end_idx, col_start_id: col_end_idx]
-                self.ifmap_reads += this_fold_demand.shape[0] * this_fold_demand.shape[1]
+    #
+    def get_demand_fold_period(self):
+        """
+        Method to get the number of folds of the inner loop over the folds, after which the demands
+        come back to the same rows of the operand matrices with the next column fold.
+        """
+        assert self.params_set_flag, 'Parameters are not set'
 
-                # Take into account under utilization
-                if col_delta > 0:
-                    null_req_mat = np.ones((this_fold_demand.shape[0], col_delta)) * -1
-                    this_fold_demand = np.concatenate((this_fold_demand, null_req_mat), axis=1)
+        return self.row_fold
 
-                if row_delta > 0:
-                    null_req_mat = np.ones((row_delta, self.arr_col)) * -1
-                    this_fold_demand = np.concatenate((this_fold_demand, null_req_mat), axis=0)
+    #
+    def get_demand_blocks(self, block_lines=0):
+        """
+        Generator of the IFMAP, Filter and OFMAP demand matrices as consecutive blocks of lines,
+        one fold per block or block_lines lines per block if set. Only one block of each matrix is
+        alive at a time. The requests and metrics are ready once all the blocks are consumed.
+        """
+        assert self.params_set_flag, 'Parameters are not set'
+
+        self.reset_demand_metrics()
+        num_folds, fold_lines = self.get_demand_fold_lines()
+        if block_lines <= 0:
+            block_lines = fold_lines
+
+        for first_line in range(0, num_folds * fold_lines, block_lines):
+            self.create_ifmap_demand_mat(first_line, block_lines)
+            self.create_filter_demand_mat(first_line, block_lines)
+            self.create_ofmap_demand_mat(first_line, block_lines)
 
-                # The IFMAP elems are needed to be filled in reverse order to ensure that
-                # top element is pushed in last to maintain alignment with the input elements
-                this_fold_demand = np.flip(this_fold_demand, 0)
+            yield self.ifmap_demand_matrix, self.filter_demand_matrix, self.ofmap_demand_matrix
 
-                # Account for the cycles for partial sum generation and accumulation
-                this_fold_demand = \
-                    np.concatenate((this_fold_demand, inter_fold_gap_suffix_mat), axis=0)
+        self.demand_metrics_ready_flag = True
+
+    #
+    def create_ifmap_demand_mat(self, first_line=0, num_lines=-1):
+        """
+        Method to create IFMAP demand matrix, or the window of num_lines lines of it starting at
+        first_line.
+        """
+        assert self.params_set_flag, 'Parameters are not set'
+
+        # Account for the cycles for partial sum generation and accumulation
+        inter_fold_gap_suffix = self.arr_row + self.arr_col + self.T - 2
+
+        # Skew is not needed in IFMAP for IS
+        fold_lines = self.arr_row + inter_fold_gap_suffix
+        first_fold, end_fold, num_lines = get_fold_window(self.col_fold * self.row_fold,
+                                                          fold_lines, first_line, num_lines)
+        self.ifmap_demand_matrix = get_null_demand_matrix(num_lines, self.arr_col,
+                                                          self.address_dtype)
+
+        for fold_id in range(first_fold, end_fold):
+            fc, fr = divmod(fold_id, self.row_fold)
+            row_start_id, row_end_idx, row_delta = get_fold_bounds(fr, self.arr_row, self.Sr)
+            col_start_id, col_end_idx, _ = get_fold_bounds(fc, self.arr_col, self.Sc)
+
+            # Indexing the cols with row start and row end idx are correct
+            # See the comment on ifmap_prefetch generation
+            this_fold_demand = \
+                self.ifmap_op_mat_trans[row_start_id:row_end_idx, col_start_id: col_end_idx]
+
+            # The IFMAP elems are needed to be filled in reverse order to ensure that
+            # top element is pushed in last to maintain alignment with the input elements
+            # The rows with no mapping end up on top of the reflected fold, with null requests
+            this_fold_demand = np.flip(this_fold_demand, 0)
+
+            # The folds which started in a previous window are already counted
+            if fold_id * fold_lines >= first_line:
+                self.ifmap_reads += this_fold_demand.shape[0] * this_fold_demand.shape[1]
 
                 # Calculate the mapping efficiency
                 row_used = min(self.arr_row, row_end_idx - row_start_id)
@@ -263,7 +282,7 @@ class systolic_compute_is:
                 mac_used = row_used * col_used
                 mapping_eff_this_fold = mac_used / (self.arr_row * self.arr_col)
 
-                cycles_this_fold = this_fold_demand.shape[0] + this_fold_demand.shape[1] - 1
+                cycles_this_fold = fold_lines + self.arr_col - 1
                 compute_cycles_this_fold = mac_used * self.T
                 compute_util_this_fold = \
                     compute_cycles_this_fold / (self.arr_row * self.arr_col * cycles_this_fold)
@@ -271,102 +290,81 @@ class systolic_compute_is:
                 self.mapping_efficiency_per_fold.append(mapping_eff_this_fold)
                 self.compute_utility_per_fold.append(compute_util_this_fold)
 
-                if fr == 0 and fc == 0:
-                    self.ifmap_demand_matrix = this_fold_demand
-                else:
-                    self.ifmap_demand_matrix = \
-                        np.concatenate((self.ifmap_demand_matrix, this_fold_demand), axis=0)
-
-        # Skew is not needed in IFMAP for IS
+            write_fold(self.ifmap_demand_matrix, this_fold_demand,
+                       fold_id * fold_lines + row_delta, first_line=first_line)
 
     #
-    def create_filter_demand_mat(self):
+    def create_filter_demand_mat(self, first_line=0, num_lines=-1):
         """
-        Method to create filter demand matrix.
+        Method to create filter demand matrix, or the window of num_lines lines of it starting at
+        first_line.
         """
         assert self.params_set_flag, 'Parameters are not set'
 
+        # Account for the cycles for weights to load
         inter_fold_gap_prefix = self.arr_row
-        inter_fold_gap_prefix_mat = np.ones((inter_fold_gap_prefix, self.arr_row)) * -1
 
+        # Account for the cycles for final output to drain out
         inter_fold_gap_suffix = self.arr_col - 1
-        inter_fold_gap_suffix_mat = np.ones((inter_fold_gap_suffix, self.arr_row)) * -1
-
-        for fc in range(self.col_fold):
-            for fr in range(self.row_fold):
-                row_start_id = fr * self.arr_row
-                row_end_idx = min(row_start_id + self.arr_row, self.Sr)
-                delta = self.arr_row - (row_end_idx - row_start_id)
-
-                # Indexing the cols with row start and row end idx are correct
-                # See the comment on ifmap_prefetch generation
-                this_fold_demand = self.filter_op_mat[row_start_id: row_end_idx, :]
-                this_fold_demand = np.transpose(this_fold_demand)
-                self.filter_reads += this_fold_demand.shape[0] * this_fold_demand.shape[1]
 
-                # Take into account under utilization
-                if delta > 0:
-                    null_req_mat = np.ones((self.T, delta)) * -1
-                    this_fold_demand = np.concatenate((this_fold_demand, null_req_mat), axis=1)
+        # Every fold is skewed over the rows of the array to reflect systolic pipeline fill
+        fold_lines = inter_fold_gap_prefix + self.T + inter_fold_gap_suffix + self.arr_row - 1
+        first_fold, end_fold, num_lines = get_fold_window(self.col_fold * self.row_fold,
+                                                          fold_lines, first_line, num_lines)
+        self.filter_demand_matrix = get_null_demand_matrix(num_lines, self.arr_row,
+                                                           self.address_dtype)
 
-                # Account for the cycles for weights to load
-                this_fold_demand = np.concatenate((inter_fold_gap_prefix_mat, this_fold_demand),
-                                                  axis=0)
+        for fold_id in range(first_fold, end_fold):
+            fc, fr = divmod(fold_id, self.row_fold)
+            row_start_id, row_end_idx, _ = get_fold_bounds(fr, self.arr_row, self.Sr)
 
-                # Account for the cycles for final output to drain out
-                this_fold_demand = np.concatenate((this_fold_demand, inter_fold_gap_suffix_mat),
-                                                  axis=0)
+            # Indexing the cols with row start and row end idx are correct
+            # See the comment on ifmap_prefetch generation
+            this_fold_demand = self.filter_op_mat[row_start_id: row_end_idx, :]
+            this_fold_demand = np.transpose(this_fold_demand)
 
-                # Add skew to the IFMAP demand matrix to reflect systolic pipeline fill
-                this_fold_demand = skew_matrix(this_fold_demand)
+            # The folds which started in a previous window are already counted
+            if fold_id * fold_lines >= first_line:
+                self.filter_reads += this_fold_demand.shape[0] * this_fold_demand.shape[1]
 
-                if fr == 0 and fc == 0:
-                    self.filter_demand_matrix = this_fold_demand
-                else:
-                    self.filter_demand_matrix = \
-                        np.concatenate((self.filter_demand_matrix, this_fold_demand), axis=0)
+            write_fold(self.filter_demand_matrix, this_fold_demand,
+                       fold_id * fold_lines + inter_fold_gap_prefix, skew=True,
+                       first_line=first_line)
     # END of filter demand generation
 
     #
-    def create_ofmap_demand_mat(self):
+    def create_ofmap_demand_mat(self, first_line=0, num_lines=-1):
         """
-        Method to create OFMAP demand matrix.
+        Method to create OFMAP demand matrix, or the window of num_lines lines of it starting at
+        first_line.
         """
         assert self.params_set_flag, 'Parameters are not set'
 
+        # These are the null demands to account for when the operands are streamed in and the
+        # OFMAPS are not ready
         inter_fold_gap_prefix = 2 * self.arr_row - 1
-        inter_fold_gap_prefix_mat = np.ones((inter_fold_gap_prefix, self.arr_col)) * -1
 
-        for fc in range(self.col_fold):
-            for fr in range(self.row_fold):
-                col_start_id = fc * self.arr_col
-                col_end_idx = min(col_start_id + self.arr_col, self.Sc)
-                col_delta = self.arr_col - (col_end_idx - col_start_id)
+        # Every fold is skewed over the cols of the array to reflect systolic pipeline fill
+        fold_lines = inter_fold_gap_prefix + self.T + self.arr_col - 1
+        first_fold, end_fold, num_lines = get_fold_window(self.col_fold * self.row_fold,
+                                                          fold_lines, first_line, num_lines)
+        self.ofmap_demand_matrix = get_null_demand_matrix(num_lines, self.arr_col,
+                                                          self.address_dtype)
+
+        for fold_id in range(first_fold, end_fold):
+            fc, fr = divmod(fold_id, self.row_fold)
+            col_start_id, col_end_idx, _ = get_fold_bounds(fc, self.arr_col, self.Sc)
 
-                this_fold_demand = self.ofmap_op_mat[col_start_id: col_end_idx, :]
-                this_fold_demand = np.transpose(this_fold_demand)
+            this_fold_demand = self.ofmap_op_mat[col_start_id: col_end_idx, :]
+            this_fold_demand = np.transpose(this_fold_demand)
+
+            # The folds which started in a previous window are already counted
+            if fold_id * fold_lines >= first_line:
                 self.ofmap_writes += this_fold_demand.shape[0] * this_fold_demand.shape[1]
 
-                # Adding null requests when there is under utilization ie. no mapping along a few
-                # rows or cols
-                if col_delta > 0:
-                    null_req_mat = np.ones((self.T, col_delta)) * -1
-                    this_fold_demand = np.concatenate((this_fold_demand, null_req_mat), axis=1)
-
-                # Now add the prefix matrix
-                # These are the null demands to account for when the operands are streamed in
-                # and the OFMAPS are not ready
-                this_fold_demand = np.concatenate((inter_fold_gap_prefix_mat, this_fold_demand),
-                                                  axis=0)
-
-                # Add skew to the OFMAP demand matrix to reflect systolic pipeline fill
-                this_fold_demand = skew_matrix(this_fold_demand)
-
-                if fr == 0 and fc == 0:
-                    self.ofmap_demand_matrix = this_fold_demand
-                else:
-                    self.ofmap_demand_matrix = \
-                        np.concatenate((self.ofmap_demand_matrix, this_fold_demand), axis=0)
+            write_fold(self.ofmap_demand_matrix, this_fold_demand,
+                       fold_id * fold_lines + inter_fold_gap_prefix, skew=True,
+                       first_line=first_line)
     # END of OFMAP demand generation
 
     #
@@ -444,7 +442,7 @@ class systolic_compute_is:
         """
         Method to get average mapping efficincy on the systolic array.
         """
-        assert self.demand_mat_ready_flag, 'Computes not ready yet'
+        assert self.demand_metrics_ready_flag, 'Computes not ready yet'
 
         agg = sum(self.mapping_efficiency_per_fold)
         num = len(self.mapping_efficiency_per_fold)
@@ -458,7 +456,7 @@ class systolic_compute_is:
         """
         Method to get average compute utilization on the systolic array.
         """
-        assert self.demand_mat_ready_flag, 'Computes not ready yet'
+        assert self.demand_metrics_ready_flag, 'Computes not ready yet'
 
         agg = sum(self.compute_utility_per_fold)
         num = len(self.compute_utility_per_fold)
@@ -472,7 +470,7 @@ class systolic_compute_is:
         """
         Method to get IFMAP read requests.
         """
-        assert self.demand_mat_ready_flag, 'Computes not ready yet'
+        assert self.demand_metrics_ready_flag, 'Computes not ready yet'
         return self.ifmap_reads
 
     #
@@ -480,7 +478,7 @@ class systolic_compute_is:
         """
         Method to get filter read requests.
         """
-        assert self.demand_mat_ready_flag, 'Computes not ready yet'
+        assert self.demand_metrics_ready_flag, 'Computes not ready yet'
         return self.filter_reads
 
     #
@@ -488,28 +486,6 @@ class systolic_compute_is:
         """
         Method to get OFMAP write requests.
         """
-        assert self.demand_mat_ready_flag, 'Computes not ready yet'
+        assert self.demand_metrics_ready_flag, 'Computes not ready yet'
         return self.ofmap_writes
 
-
-#
-def skew_matrix(input_matrix_np):
-    """
-    Method to add skew to the input matix to maintain systolic array flow.
-    Example:
-        Input matrix:
-        1 1 1 1 1 1 1 1 1
-
-        Output matrix:
-            1 1 1
-          1 1 1
-        1 1 1
-    """
-    rows, cols = input_matrix_np.shape
-
-    out_matrix_np = np.full((rows + cols - 1, cols), -1, dtype=input_matrix_np.dtype)
-
-    for c in range(cols):
-        out_matrix_np[c:c + rows, c] = input_matrix_np[:, c]
-
-    return out_matrix_np
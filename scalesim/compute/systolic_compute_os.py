@@ -7,8 +7,9 @@ for IFMAP, Filter, and OFMAP operations.
 
 import math
 import numpy as np
-from tqdm import tqdm
 from scalesim.scale_config import scale_config as cfg
+from scalesim.compute.systolic_kernels import get_fold_bounds, pad_fold, stack_folds, \
+    diagonal_rollout, get_null_demand_matrix, get_fold_window, write_fold
 
 
 class systolic_compute_os:
@@ -35,6 +36,9 @@ class systolic_compute_os:
         self.arr_row = 0
         self.arr_col = 0
 
+        # Integer type of the addresses in the prefetch and demand matrices
+        self.address_dtype = np.int32
+
         self.row_fold = 1
         self.col_fold = 1
 
@@ -59,6 +63,7 @@ class systolic_compute_os:
         self.params_set_flag = False
         self.prefetch_mat_ready_flag = False
         self.demand_mat_ready_flag = False
+        self.demand_metrics_ready_flag = False
 
     #
     def set_params(self,
@@ -76,6 +81,10 @@ class systolic_compute_os:
         self.filter_op_mat = filter_op_mat
         self.ofmap_op_mat = ofmap_op_mat
 
+        # The prefetch and demand matrices keep the address dtype of the operand matrices
+        self.address_dtype = np.result_type(self.ifmap_op_mat.dtype, self.filter_op_mat.dtype,
+                                            self.ofmap_op_mat.dtype)
+
         ifmap_col = self.ifmap_op_mat.shape[1]
         filter_row= self.filter_op_mat.shape[0]
 
@@ -113,11 +122,9 @@ class systolic_compute_os:
         """
         assert self.params_set_flag, 'Parameters are not set'
 
+        fold_prefetch_list = []
         for fr in range(self.row_fold):
-            start_row_idx = fr * self.arr_row
-            end_row_idx = min(start_row_idx + self.arr_row, self.Sr)
-
-            delta = self.arr_row - (end_row_idx - start_row_idx)
+            start_row_idx, end_row_idx, _ = get_fold_bounds(fr, self.arr_row, self.Sr)
 
             # The usage of row idx in cols is correct as this is the transposed matrix
             # Thus, Sr is along the cols and T is along the rows of this matrix
@@ -125,50 +132,14 @@ class systolic_compute_os:
             this_fold_prefetch = self.ifmap_op_mat_trans[:,start_row_idx: end_row_idx]
 
             #If there is under utilization, fill them with null requests
-            if delta > 0:
-                null_req_mat = np.ones((self.T, delta)) * -1
-                this_fold_prefetch = np.concatenate((this_fold_prefetch, null_req_mat), axis=1)
+            fold_prefetch_list.append(pad_fold(this_fold_prefetch, self.arr_row))
 
-            if fr == 0:
-                self.ifmap_prefetch_matrix = this_fold_prefetch
-            else:
-                self.ifmap_prefetch_matrix = \
-                    np.concatenate((self.ifmap_prefetch_matrix, this_fold_prefetch), axis=0)
+        self.ifmap_prefetch_matrix = stack_folds(fold_prefetch_list)
 
         # Fixing ISSUE #15, #16
         # Roll out the matrices along the diagonal to account for temporal locality when there is a
         # skew in demand
-        #print('DEBUG: create_ifmap_prefetch_mat()')
-        #start_time = time.time()
-
-        M, N = self.ifmap_prefetch_matrix.shape
-        num_elems = M * N
-        num_diags = M + N
-        prefetches = np.zeros((1,num_elems))
-        idx = 0
-
-        pbar = tqdm(total=M*N, disable=True)
-        #print('DEBUG: Total = ' + str(num_elems) + ' Diags = ' + str(num_diags))
-
-        for diag_id in range(num_diags):
-            max_row_id = min(diag_id, M - 1)
-            min_row_id = max(0, diag_id - N + 1)
-            valid_rows = max_row_id - min_row_id + 1
-
-            for offset in range(valid_rows):
-                row_id = max_row_id - offset
-                col_id = diag_id - row_id
-
-                elem = self.ifmap_prefetch_matrix[row_id][col_id]
-                prefetches[0, idx] = elem
-                idx += 1
-                pbar.update(1)
-
-        pbar.close()
-        self.ifmap_prefetch_matrix = prefetches
-
-        #t = time.time() - start_time
-        #print('DEBUG: create_ifmap_prefetch_mat =' + str(t))
+        self.ifmap_prefetch_matrix = diagonal_rollout(self.ifmap_prefetch_matrix)
 
     #
     def create_filter_prefetch_mat(self):
@@ -177,58 +148,19 @@ class systolic_compute_os:
         """
         assert self.params_set_flag, 'Parameters are not set'
 
+        fold_prefetch_list = []
         for fc in range(self.col_fold):
-            col_start_id = fc * self.arr_col
-            col_end_id = min(col_start_id + self.arr_col, self.Sc)
-
-            delta = self.arr_col - (col_end_id - col_start_id)
+            col_start_id, col_end_id, _ = get_fold_bounds(fc, self.arr_col, self.Sc)
 
             this_fold_prefetch = self.filter_op_mat[:,col_start_id:col_end_id]
+            fold_prefetch_list.append(pad_fold(this_fold_prefetch, self.arr_col))
 
-            if delta > 0:
-                null_req_mat = np.ones((self.T, delta)) * -1
-                this_fold_prefetch = np.concatenate((this_fold_prefetch, null_req_mat), axis=1)
-
-            if fc == 0:
-                self.filter_prefetch_matrix = this_fold_prefetch
-            else:
-                self.filter_prefetch_matrix = \
-                    np.concatenate((self.filter_prefetch_matrix, this_fold_prefetch), axis=0)
+        self.filter_prefetch_matrix = stack_folds(fold_prefetch_list)
 
         # Fixing ISSUE #15, #16
         # Roll out the matrices along the diagonal to account for temporal locality when there is a
         # skew in demand
-        #print('DEBUG: create_filter_prefetch_mat()')
-        #start_time = time.time()
-
-        M, N = self.filter_prefetch_matrix.shape
-        num_elems = M * N
-        num_diags = M + N
-        prefetches = np.zeros((1, num_elems))
-        idx = 0
-
-        pbar = tqdm(total=M * N, disable=True)
-        # print('DEBUG: Total = ' + str(num_elems) + ' Diags = ' + str(num_diags))
-
-        for diag_id in range(num_diags):
-            max_row_id = min(diag_id, M - 1)
-            min_row_id = max(0, diag_id - N + 1)
-            valid_rows = max_row_id - min_row_id + 1
-
-            for offset in range(valid_rows):
-                row_id = max_row_id - offset
-                col_id = diag_id - row_id
-
-                elem = self.filter_prefetch_matrix[row_id][col_id]
-                prefetches[0, idx] = elem
-                idx += 1
-                pbar.update(1)
-
-        pbar.close()
-        self.filter_prefetch_matrix = prefetches
-
-        #t = time.time() - start_time
-        #print('DEBUG: create_filter_prefetch_mat =' + str(t))
+        self.filter_prefetch_matrix = diagonal_rollout(self.filter_prefetch_matrix)
 
     #
     def create_demand_matrices(self):
@@ -239,6 +171,7 @@ class systolic_compute_os:
         """
         assert self.params_set_flag, 'Parameters are not set'
 
+        self.reset_demand_metrics()
         self.create_ifmap_demand_mat()
         self.create_filter_demand_mat()
         self.create_ofmap_demand_mat()
@@ -252,161 +185,171 @@ class systolic_compute_os:
         assert self.ofmap_demand_matrix.shape[1] == self.arr_col, 'OFMAP demands exceed the cols'
 
         self.demand_mat_ready_flag = True
+        self.demand_metrics_ready_flag = True
 
     #
-    def create_ifmap_demand_mat(self):
+    def reset_demand_metrics(self):
         """
-        Method to create ifmap demand matrix.
+        Method to reset the requests and the per fold metrics gathered while creating the demands.
         """
-        assert self.params_set_flag, 'Parameters are not set'
+        self.ifmap_reads = 0
+        self.filter_reads = 0
+        self.ofmap_writes = 0
 
-        # Anand: Concatenation issue fix
-        inter_fold_gap_suffix = self.arr_col - 1
-        inter_fold_gap_suffix_mat = np.ones((inter_fold_gap_suffix, self.arr_row)) * -1
+        self.mapping_efficiency_per_fold = []
+        self.compute_utility_per_fold = []
 
-        # DEBUG section
-        #print('DEBUG: create_ifmap_demand_mat()')
-        pbar = tqdm(total=self.col_fold * self.row_fold, disable=True)
+    #
+    def get_demand_fold_lines(self):
+        """
+        Method to get the number of folds of the demand matrices and the number of lines of every
+        fold, which are the same for the ifmap, filter and ofmap demands.
+        """
+        assert self.params_set_flag, 'Parameters are not set'
 
-        for fc in range(self.col_fold):
-            for fr in range(self.row_fold):
-                row_start_id = fr * self.arr_row
-                row_end_idx = min(row_start_id + self.arr_row, self.Sr)
-                delta = self.arr_row - (row_end_idx - row_start_id)
-
-                # Indexing the cols with row start and row end idx are correct
-                # See the comment on ifmap_prefetch generation
-                this_fold_demand = self.ifmap_op_mat_trans[:,row_start_id: row_end_idx]
-                self.ifmap_reads += this_fold_demand.shape[0] * this_fold_demand.shape[1]
+        fold_lines = self.T + self.arr_row + self.arr_col - 2
+        return self.row_fold * self.col_fold, fold_lines
 
-                # Take into account under utilization
-                if delta > 0:
-                    null_req_mat = np.ones((self.T, delta)) * -1
-                    this_fold_demand = np.concatenate((this_fold_demand, null_req_mat), axis=1)
+    #
+    def get_demand_fold_period(self):
+        """
+        Method to get the number of folds of the inner loop over the folds, after which the demands
+        come back to the same rows of the operand matrices with the next column fold.
+        """
+        assert self.params_set_flag, 'Parameters are not set'
 
-                # In this computation scheme we are allowing the generated outputs to drain out
-                # before starting the next fold
-                # This portion accounts for that extra time by adding null requests
-                this_fold_demand = np.concatenate((this_fold_demand, inter_fold_gap_suffix_mat),
-                                                  axis=0)
+        return self.row_fold
 
-                # Add skew to the IFMAP demand matrix to reflect systolic pipeline fill
-                this_fold_demand = skew_matrix(this_fold_demand)
+    #
+    def get_demand_blocks(self, block_lines=0):
+        """
+        Generator of the ifmap, filter and ofmap demand matrices as consecutive blocks of lines,
+        one fold per block or block_lines lines per block if set. Only one block of each matrix is
+        alive at a time. The requests and metrics are ready once all the blocks are consumed.
+        """
+        assert self.params_set_flag, 'Parameters are not set'
 
-                if fr == 0 and fc == 0:
-                    self.ifmap_demand_matrix = this_fold_demand
-                else:
-                    self.ifmap_demand_matrix = \
-                        np.concatenate((self.ifmap_demand_matrix, this_fold_demand), axis=0)
+        self.reset_demand_metrics()
+        num_folds, fold_lines = self.get_demand_fold_lines()
+        if block_lines <= 0:
+            block_lines = fold_lines
 
-                pbar.update(1)
+        for first_line in range(0, num_folds * fold_lines, block_lines):
+            self.create_ifmap_demand_mat(first_line, block_lines)
+            self.create_filter_demand_mat(first_line, block_lines)
+            self.create_ofmap_demand_mat(first_line, block_lines)
 
-        pbar.close()
-        # TODO: cleanup
-        # Add skew to the IFMAP demand matrix to reflect systolic pipeline fill
-        #self.ifmap_demand_matrix = skew_matrix(self.ifmap_demand_matrix)
+            yield self.ifmap_demand_matrix, self.filter_demand_matrix, self.ofmap_demand_matrix
+
+        self.demand_metrics_ready_flag = True
 
     #
-    def create_filter_demand_mat(self):
+    def create_ifmap_demand_mat(self, first_line=0, num_lines=-1):
         """
-        Method to create filter demand matrix.
+        Method to create ifmap demand matrix, or the window of num_lines lines of it starting at
+        first_line.
         """
         assert self.params_set_flag, 'Parameters are not set'
 
-        inter_fold_gap_suffix = self.arr_row - 1
-        inter_fold_gap_suffix_mat = np.ones((inter_fold_gap_suffix, self.arr_col)) * -1
+        # Anand: Concatenation issue fix
+        # In this computation scheme we are allowing the generated outputs to drain out before
+        # starting the next fold. The suffix gap of null requests accounts for that extra time
+        inter_fold_gap_suffix = self.arr_col - 1
 
-        # Debug messages
-        #print('DEBUG: create_filter_demand_mat()')
-        pbar = tqdm(total=self.col_fold * self.row_fold, disable=True)
+        # Every fold is skewed over the rows of the array to reflect systolic pipeline fill
+        fold_lines = self.T + inter_fold_gap_suffix + self.arr_row - 1
+        first_fold, end_fold, num_lines = get_fold_window(self.col_fold * self.row_fold,
+                                                          fold_lines, first_line, num_lines)
+        self.ifmap_demand_matrix = get_null_demand_matrix(num_lines, self.arr_row,
+                                                          self.address_dtype)
 
-        for fc in range(self.col_fold):
-            for fr in range(self.row_fold):
-                col_start_id = fc * self.arr_col
-                col_end_idx = min(col_start_id + self.arr_col, self.Sc)
-                delta = self.arr_col - (col_end_idx - col_start_id)
+        for fold_id in range(first_fold, end_fold):
+            fc, fr = divmod(fold_id, self.row_fold)
+            row_start_id, row_end_idx, _ = get_fold_bounds(fr, self.arr_row, self.Sr)
 
-                this_fold_demand = self.filter_op_mat[:, col_start_id: col_end_idx]
-                self.filter_reads += this_fold_demand.shape[0] * this_fold_demand.shape[1]
+            # Indexing the cols with row start and row end idx are correct
+            # See the comment on ifmap_prefetch generation
+            # The under utilized cols are left with null requests
+            this_fold_demand = self.ifmap_op_mat_trans[:,row_start_id: row_end_idx]
 
-                # Take into account under utilization
-                if delta > 0:
-                    null_req_mat = np.ones((self.T, delta)) * -1
-                    this_fold_demand = np.concatenate((this_fold_demand, null_req_mat), axis=1)
+            # The folds which started in a previous window are already counted
+            if fold_id * fold_lines >= first_line:
+                self.ifmap_reads += this_fold_demand.shape[0] * this_fold_demand.shape[1]
 
-                # In this computation scheme we are allowing the generated outputs to drain out
-                # before starting the next fold
-                # This portion accounts for that extra time by adding null requests
-                this_fold_demand = np.concatenate((this_fold_demand, inter_fold_gap_suffix_mat),
-                                                  axis=0)
+            write_fold(self.ifmap_demand_matrix, this_fold_demand, fold_id * fold_lines,
+                       skew=True, first_line=first_line)
 
-                # Add skew to the Filter demand matrix to reflect systolic pipeline fill
-                this_fold_demand = skew_matrix(this_fold_demand)
+    #
+    def create_filter_demand_mat(self, first_line=0, num_lines=-1):
+        """
+        Method to create filter demand matrix, or the window of num_lines lines of it starting at
+        first_line.
+        """
+        assert self.params_set_flag, 'Parameters are not set'
+
+        # In this computation scheme we are allowing the generated outputs to drain out before
+        # starting the next fold. The suffix gap of null requests accounts for that extra time
+        inter_fold_gap_suffix = self.arr_row - 1
 
-                if fr == 0 and fc == 0:
-                    self.filter_demand_matrix = this_fold_demand
-                else:
-                    self.filter_demand_matrix = \
-                        np.concatenate((self.filter_demand_matrix, this_fold_demand), axis=0)
+        # Every fold is skewed over the cols of the array to reflect systolic pipeline fill
+        fold_lines = self.T + inter_fold_gap_suffix + self.arr_col - 1
+        first_fold, end_fold, num_lines = get_fold_window(self.col_fold * self.row_fold,
+                                                          fold_lines, first_line, num_lines)
+        self.filter_demand_matrix = get_null_demand_matrix(num_lines, self.arr_col,
+                                                           self.address_dtype)
 
-                pbar.update(1)
+        for fold_id in range(first_fold, end_fold):
+            fc, fr = divmod(fold_id, self.row_fold)
+            col_start_id, col_end_idx, _ = get_fold_bounds(fc, self.arr_col, self.Sc)
 
-        pbar.close()
-        # TODO: Cleanup
-        # Add skew to the Filter demand matrix to reflect systolic pipeline fill
-        #self.filter_demand_matrix = skew_matrix(self.filter_demand_matrix)
+            this_fold_demand = self.filter_op_mat[:, col_start_id: col_end_idx]
+
+            # The folds which started in a previous window are already counted
+            if fold_id * fold_lines >= first_line:
+                self.filter_reads += this_fold_demand.shape[0] * this_fold_demand.shape[1]
+
+            write_fold(self.filter_demand_matrix, this_fold_demand, fold_id * fold_lines,
+                       skew=True, first_line=first_line)
 
     #
-    def create_ofmap_demand_mat(self):
+    def create_ofmap_demand_mat(self, first_line=0, num_lines=-1):
         """
-        Method to create ofmap demand matrix.
+        Method to create ofmap demand matrix, or the window of num_lines lines of it starting at
+        first_line.
         """
         assert self.params_set_flag, 'Parameters are not set'
 
+        # These are the null demands to account for when the operands are streamed in and the
+        # OFMAPS are not ready
         inter_fold_gap_prefix = self.T  - 1
-        inter_fold_gap_prefix_mat = np.ones((inter_fold_gap_prefix, self.arr_col)) * -1
 
-        # Debug messages
-        #print('DEBUG: create_ifmap_demand_mat()')
-        pbar = tqdm(total=self.col_fold * self.row_fold, disable=True)
-
-        for fc in range(self.col_fold):
-            for fr in range(self.row_fold):
-                row_start_id = fr * self.arr_row
-                row_end_idx = min(row_start_id + self.arr_row, self.Sr)
-                row_delta = self.arr_row - (row_end_idx - row_start_id)
-
-                col_start_id = fc * self.arr_col
-                col_end_idx = min(col_start_id + self.arr_col, self.Sc)
-                col_delta = self.arr_col - (col_end_idx - col_start_id)
-
-                this_fold_demand = \
-                    self.ofmap_op_mat[row_start_id: row_end_idx, col_start_id: col_end_idx]
+        # Every fold is skewed over the cols of the array to reflect systolic pipeline fill
+        fold_lines = inter_fold_gap_prefix + self.arr_row + self.arr_col - 1
+        first_fold, end_fold, num_lines = get_fold_window(self.col_fold * self.row_fold,
+                                                          fold_lines, first_line, num_lines)
+        self.ofmap_demand_matrix = get_null_demand_matrix(num_lines, self.arr_col,
+                                                          self.address_dtype)
+
+        for fold_id in range(first_fold, end_fold):
+            fc, fr = divmod(fold_id, self.row_fold)
+            row_start_id, row_end_idx, row_delta = get_fold_bounds(fr, self.arr_row, self.Sr)
+            col_start_id, col_end_idx, _ = get_fold_bounds(fc, self.arr_col, self.Sc)
+
+            this_fold_demand = \
+                self.ofmap_op_mat[row_start_id: row_end_idx, col_start_id: col_end_idx]
+
+            # Reflect along the rows
+            # This is a characteristic of the fact that the outputs are streamed out from the
+            # bottom edge.
+            # If the outputs are streamed out from the top edge instead, then this step is not
+            # needed.
+            # The rows with no mapping end up on top of the reflected fold, with null requests
+            this_fold_demand = np.flip(this_fold_demand, 0)
+
+            # The folds which started in a previous window are already counted
+            if fold_id * fold_lines >= first_line:
                 self.ofmap_writes += this_fold_demand.shape[0] * this_fold_demand.shape[1]
-
-                # Adding null requests when there is under utilization ie. no mapping along a few
-                # rows or cols
-                if col_delta > 0:
-                    null_req_mat = np.ones((this_fold_demand.shape[0], col_delta)) * -1
-                    this_fold_demand = np.concatenate((this_fold_demand, null_req_mat), axis=1)
-
-                if row_delta > 0:
-                    null_req_mat = np.ones((row_delta, self.arr_col)) * -1
-                    this_fold_demand = np.concatenate((this_fold_demand, null_req_mat), axis=0)
-
-                # Reflect along the rows
-                # This is a characteristic of the fact that the outputs are streamed out from the
-                # bottom edge.
-                # If the outputs are streamed out from the top edge instead, then this step is not
-                # needed.
-                this_fold_demand = np.flip(this_fold_demand, 0)
-                self.ofmap_writes += this_fold_demand.shape[0] + this_fold_demand.shape[1]
-
-                # Now add the prefix matrix
-                # These are the null demands to account for when the operands are streamed in
-                # and the OFMAPS are not ready
-                this_fold_demand = np.concatenate((inter_fold_gap_prefix_mat, this_fold_demand),
-                                                  axis=0)
+                self.ofmap_writes += self.arr_row + self.arr_col
 
                 # Calculate the mapping efficiency
                 row_used = min(self.arr_row, row_end_idx - row_start_id)
@@ -414,7 +357,7 @@ class systolic_compute_os:
                 mac_used = row_used * col_used
                 mapping_eff_this_fold = mac_used / (self.arr_row * self.arr_col)
 
-                cycles_this_fold = this_fold_demand.shape[0] + this_fold_demand.shape[1] - 1
+                cycles_this_fold = fold_lines
                 compute_cycles_this_fold = mac_used * self.T
                 compute_util_this_fold = \
                     compute_cycles_this_fold / (self.arr_row * self.arr_col * cycles_this_fold)
@@ -422,21 +365,9 @@ class systolic_compute_os:
                 self.mapping_efficiency_per_fold.append(mapping_eff_this_fold)
                 self.compute_utility_per_fold.append(compute_util_this_fold)
 
-                # Add skew to the OFMAP demand matrix to reflect systolic pipeline fill
-                this_fold_demand = skew_matrix(this_fold_demand)
-
-                if fr == 0 and fc == 0:
-                    self.ofmap_demand_matrix = this_fold_demand
-                else:
-                    self.ofmap_demand_matrix = \
-                        np.concatenate((self.ofmap_demand_matrix, this_fold_demand), axis=0)
-
-                pbar.update(1)
-
-        pbar.close()
-        # TODO: cleanup
-        # Add skew to the OFMAP demand matrix to reflect systolic pipeline fill
-        #self.ofmap_demand_matrix = skew_matrix(self.ofmap_demand_matrix)
+            write_fold(self.ofmap_demand_matrix, this_fold_demand,
+                       fold_id * fold_lines + inter_fold_gap_prefix + row_delta, skew=True,
+                       first_line=first_line)
 
     #
     def get_ifmap_prefetch_mat(self):
@@ -513,7 +444,7 @@ class systolic_compute_os:
         """
         Method to get average mapping efficincy on the systolic array.
         """
-        assert self.demand_mat_ready_flag, 'Computes not ready yet'
+        assert self.demand_metrics_ready_flag, 'Computes not ready yet'
 
         agg = sum(self.mapping_efficiency_per_fold)
         num = len(self.mapping_efficiency_per_fold)
@@ -527,7 +458,7 @@ class systolic_compute_os:
         """
         Method to get average compute utilization on the systolic array.
         """
-        assert self.demand_mat_ready_flag, 'Computes not ready yet'
+        assert self.demand_metrics_ready_flag, 'Computes not ready yet'
 
         agg = sum(self.compute_utility_per_fold)
         num = len(self.compute_utility_per_fold)
@@ -541,7 +472,7 @@ class systolic_compute_os:
         """
         Method to get ifmap read requests.
         """
-        assert self.demand_mat_ready_flag, 'Computes not ready yet'
+        assert self.demand_metrics_ready_flag, 'Computes not ready yet'
         return self.ifmap_reads
 
     #
@@ -549,7 +480,7 @@ class systolic_compute_os:
         """
         Method to get filter read requests.
         """
-        assert self.demand_mat_ready_flag, 'Computes not ready yet'
+        assert self.demand_metrics_ready_flag, 'Computes not ready yet'
         return self.filter_reads
 
     #
@@ -557,27 +488,5 @@ class systolic_compute_os:
         """
         Method to get ofmap write requests.
         """
-        assert self.demand_mat_ready_flag, 'Computes not ready yet'
+        assert self.demand_metrics_ready_flag, 'Computes not ready yet'
         return self.ofmap_writes
-
-#
-def skew_matrix(input_matrix_np):
-    """
-    Method to add skew to the input matix to maintain systolic array flow.
-    Example:
-        Input matrix:
-        1 1 1 1 1 1 1 1 1
-
-        Output matrix:
-            1 1 1
-          1 1 1
-        1 1 1
-    """
-    rows, cols = input_matrix_np.shape
-
-    out_matrix_np = np.full((rows + cols - 1, cols), -1, dtype=input_matrix_np.dtype)
-
-    for c in range(cols):
-        out_matrix_np[c:c + rows, c] = input_matrix_np[:, c]
-
-    return out_matrix_np
@@ -7,8 +7,10 @@ for IFMAP, Filter, and OFMAP operations.
 
 import math
 import numpy as np
-from tqdm import tqdm
 from scalesim.scale_config import scale_config as cfg
+from scalesim.compute.systolic_kernels import get_fold_bounds, pad_fold, stack_folds, \
+    skew_matrix, diagonal_rollout, get_null_demand_matrix, get_fold_window, write_fold
+from scalesim.compute.sparsity_kernels import skew_matrix_row_sparsity
 from scalesim.compute.compression import compression as cp
 
 class systolic_compute_ws:
@@ -37,6 +39,9 @@ class systolic_compute_ws:
         self.arr_row = 0
         self.arr_col = 0
 
+        # Integer type of the addresses in the prefetch and demand matrices
+        self.address_dtype = np.int32
+
         self.row_fold = 1
         self.col_fold = 1
 
@@ -64,6 +69,7 @@ class systolic_compute_ws:
         self.params_set_flag = False
         self.prefetch_mat_ready_flag = False
         self.demand_mat_ready_flag = False
+        self.demand_metrics_ready_flag = False
 
         # Compression
         self.compression = cp()
@@ -87,6 +93,10 @@ class systolic_compute_ws:
         self.ifmap_op_mat = ifmap_op_mat
         self.filter_op_mat = filter_op_mat
         self.ofmap_op_mat = ofmap_op_mat
+
+        # The prefetch and demand matrices keep the address dtype of the operand matrices
+        self.address_dtype = np.result_type(self.ifmap_op_mat.dtype, self.filter_op_mat.dtype,
+                                            self.ofmap_op_mat.dtype)
         self.sparsity_ratio_N = sparsity_ratio_N
         self.sparsity_ratio_M = sparsity_ratio_M
 
@@ -131,54 +141,21 @@ class systolic_compute_ws:
         """
         assert self.params_set_flag, 'Parameters are not set'
 
+        fold_prefetch_list = []
         for fr in range(self.row_fold):
-            start_col_idx = fr * self.arr_row
-            end_col_idx = min(start_col_idx + self.arr_row, self.Sr)
-
-            delta = self.arr_row - (end_col_idx - start_col_idx)
+            start_col_idx, end_col_idx, _ = get_fold_bounds(fr, self.arr_row, self.Sr)
 
             this_fold_prefetch = self.ifmap_op_mat[:,start_col_idx: end_col_idx]
 
             #If there is under utilization, fill them with null requests
-            if delta > 0:
-                null_req_mat = np.ones((self.T, delta)) * -1
-                this_fold_prefetch = np.concatenate((this_fold_prefetch, null_req_mat), axis=1)
+            fold_prefetch_list.append(pad_fold(this_fold_prefetch, self.arr_row))
 
-            if fr == 0:
-                self.ifmap_prefetch_matrix = this_fold_prefetch
-            else:
-                self.ifmap_prefetch_matrix = \
-                    np.concatenate((self.ifmap_prefetch_matrix, this_fold_prefetch), axis=0)
+        self.ifmap_prefetch_matrix = stack_folds(fold_prefetch_list)
 
         # Fixing ISSUE #15, #16
         # Roll out the matrices along the diagonal to account for temporal locality when there is a
         # skew in demand
-
-        M, N = self.ifmap_prefetch_matrix.shape
-        num_elems = M * N
-        num_diags = M + N
-        prefetches = np.zeros((1, num_elems))
-        idx = 0
-
-        pbar = tqdm(total=M * N, disable=True)
-        # print('DEBUG: Total = ' + str(num_elems) + ' Diags = ' + str(num_diags))
-
-        for diag_id in range(num_diags):
-            max_row_id = min(diag_id, M - 1)
-            min_row_id = max(0, diag_id - N + 1)
-            valid_rows = max_row_id - min_row_id + 1
-
-            for offset in range(valid_rows):
-                row_id = max_row_id - offset
-                col_id = diag_id - row_id
-
-                elem = self.ifmap_prefetch_matrix[row_id][col_id]
-                prefetches[0, idx] = elem
-                idx += 1
-                pbar.update(1)
-
-        pbar.close()
-        self.ifmap_prefetch_matrix = prefetches
+        self.ifmap_prefetch_matrix = diagonal_rollout(self.ifmap_prefetch_matrix)
 
     #
     def create_filter_prefetch_mat(self):
@@ -187,23 +164,14 @@ class systolic_compute_ws:
         """
         assert self.params_set_flag, 'Parameters are not set'
 
+        fold_prefetch_list = []
         for fc in range(self.col_fold):
-            col_start_id = fc * self.arr_col
-            col_end_id = min(col_start_id + self.arr_col, self.Sc)
-
-            delta = self.arr_col - (col_end_id - col_start_id)
+            col_start_id, col_end_id, _ = get_fold_bounds(fc, self.arr_col, self.Sc)
 
             this_fold_prefetch = self.filter_op_mat[:,col_start_id:col_end_id]
+            fold_prefetch_list.append(pad_fold(this_fold_prefetch, self.arr_col))
 
-            if delta > 0:
-                null_req_mat = np.ones((self.filter_op_mat.shape[0], delta)) * -1 # self.Sr
-                this_fold_prefetch = np.concatenate((this_fold_prefetch, null_req_mat), axis=1)
-
-            if fc == 0:
-                self.filter_prefetch_matrix = this_fold_prefetch
-            else:
-                self.filter_prefetch_matrix = \
-                    np.concatenate((self.filter_prefetch_matrix, this_fold_prefetch), axis=0)
+        self.filter_prefetch_matrix = stack_folds(fold_prefetch_list)
 
         # Note: ISSUE #15: no skewing happens in the Filter for WS so this issue does not apply.
 
@@ -217,6 +185,7 @@ class systolic_compute_ws:
         # NCBS: check this once, create new assert for row_stationary, if...else
         assert self.params_set_flag, 'Parameters are not set'
 
+        self.reset_demand_metrics()
         self.create_ifmap_demand_mat()
         self.create_filter_demand_mat()
         self.create_ofmap_demand_mat()   
@@ -231,11 +200,130 @@ class systolic_compute_ws:
         assert self.ofmap_demand_matrix.shape[1] == self.arr_col, 'OFMAP demands exceed the cols'
 
         self.demand_mat_ready_flag = True
+        self.demand_metrics_ready_flag = True
+
+    #
+    def reset_demand_metrics(self):
+        """
+        Method to reset the requests and the per fold metrics gathered while creating the demands.
+        """
+        self.ifmap_reads = 0
+        self.filter_reads = 0
+        self.ofmap_writes = 0
+
+        self.mapping_efficiency_per_fold = []
+        self.compute_utility_per_fold = []
+
+    #
+    def get_demand_fold_lines(self):
+        """
+        Method to get the number of folds of the demand matrices and the number of lines of every
+        fold, which are the same for the ifmap, filter and ofmap demands.
+        """
+        assert self.params_set_flag, 'Parameters are not set'
+
+        fold_lines = 2 * self.arr_row + self.arr_col + self.T - 2
+        return self.row_fold_demand_matrices * self.col_fold, fold_lines
+
+    #
+    def get_demand_fold_period(self):
+        """
+        Method to get the number of folds of the inner loop over the folds, after which the demands
+        come back to the same rows of the operand matrices with the next column fold.
+        """
+        assert self.params_set_flag, 'Parameters are not set'
+
+        return self.row_fold_demand_matrices
+
+    #
+    def get_demand_blocks(self, block_lines=0):
+        """
+        Generator of the ifmap, filter and ofmap demand matrices as consecutive blocks of lines,
+        one fold per block or block_lines lines per block if set. Only one block of each matrix is
+        alive at a time. The requests and metrics are ready once all the blocks are consumed.
+        """
+        assert self.params_set_flag, 'Parameters are not set'
+
+        num_folds, fold_lines = self.get_demand_fold_lines()
+        if block_lines <= 0:
+            block_lines = fold_lines
+
+        # The folds of the optimized row-wise sparsity mapping do not line up with the other
+        # demands, the whole matrices are created and handed out in blocks
+        if self.config.sparsity_optimized_mapping:
+            self.create_demand_matrices()
+            num_lines = self.ofmap_demand_matrix.shape[0]
+            for first_line in range(0, num_lines, block_lines):
+                end_line = first_line + block_lines
+                yield self.ifmap_demand_matrix[first_line:end_line, :], \
+                      self.filter_demand_matrix[first_line:end_line, :], \
+                      self.ofmap_demand_matrix[first_line:end_line, :]
+            return
+
+        self.reset_demand_metrics()
+        for first_line in range(0, num_folds * fold_lines, block_lines):
+            self.create_ifmap_demand_mat(first_line, block_lines)
+            self.create_filter_demand_mat(first_line, block_lines)
+            self.create_ofmap_demand_mat(first_line, block_lines)
+
+            yield self.ifmap_demand_matrix, self.filter_demand_matrix, self.ofmap_demand_matrix
+
+        self.demand_metrics_ready_flag = True
+
+    #
+    def create_ifmap_demand_mat(self, first_line=0, num_lines=-1):
+        """
+        Method to create ifmap demand matrix, or the window of num_lines lines of it starting at
+        first_line.
+        """
+        assert self.params_set_flag, 'Parameters are not set'
+
+        if self.config.sparsity_optimized_mapping:
+            self.create_ifmap_demand_mat_optimized_mapping()
+            return
+
+        # Account for the cycles for weights to load
+        inter_fold_gap_prefix = self.arr_row
+
+        # Account for the cycles for final output to drain out
+        inter_fold_gap_suffix = self.arr_col - 1
+
+        # Every fold is skewed over the rows of the array to reflect systolic pipeline fill
+        fold_lines = inter_fold_gap_prefix + self.T + inter_fold_gap_suffix + self.arr_row - 1
+        first_fold, end_fold, num_lines = \
+            get_fold_window(self.col_fold * self.row_fold_demand_matrices, fold_lines,
+                            first_line, num_lines)
+        self.ifmap_demand_matrix = get_null_demand_matrix(num_lines, self.arr_row,
+                                                          self.address_dtype)
+
+        for fold_id in range(first_fold, end_fold):
+            fc, fr = divmod(fold_id, self.row_fold_demand_matrices)
+            col_start_id, col_end_idx, _ = get_fold_bounds(fr, self.arr_row, self.Sr)
+
+            # Indexing the cols with row start and row end idx are correct
+            # See the comment on ifmap_prefetch generation
+            # The under utilized cols are left with null requests
+            this_fold_demand = self.ifmap_op_mat[:,col_start_id: col_end_idx]
+
+            # The folds which started in a previous window are already counted
+            if fold_id * fold_lines >= first_line:
+                if self.config.sparsity_support:
+                    # A single block of input is shared among M/N rows, hence a row needs to be
+                    # read M/N times (assume absence of any broadcast)
+                    self.ifmap_reads += this_fold_demand.shape[0] * this_fold_demand.shape[1] * \
+                                        (self.sparsity_ratio_M / self.sparsity_ratio_N)
+                else:
+                    self.ifmap_reads += this_fold_demand.shape[0] * this_fold_demand.shape[1]
+
+            write_fold(self.ifmap_demand_matrix, this_fold_demand,
+                       fold_id * fold_lines + inter_fold_gap_prefix, skew=True,
+                       first_line=first_line)
 
     #
-    def create_ifmap_demand_mat(self):
+    def create_ifmap_demand_mat_optimized_mapping(self):
         """
-        Method to create ifmap demand matrix.
+        Method to create ifmap demand matrix with the optimized mapping of the row-wise sparsity,
+        where every fold spans two tiles and gets the custom skew of skew_matrix_row_sparsity().
         """
         assert self.params_set_flag, 'Parameters are not set'
 
@@ -326,7 +414,8 @@ class systolic_compute_ws:
 
                 ifmap_demand_matrix_list.append(this_fold_demand)
 
-        self.ifmap_demand_matrix = np.concatenate(ifmap_demand_matrix_list)
+        self.ifmap_demand_matrix = \
+            np.concatenate(ifmap_demand_matrix_list).astype(self.address_dtype)
 
         if False:
             if self.config.sparsity_support is True:
@@ -336,154 +425,102 @@ class systolic_compute_ws:
     # END of IFMAP demand generation
 
     #
-    def create_filter_demand_mat(self):
+    def create_filter_demand_mat(self, first_line=0, num_lines=-1):
         """
-        Method to create filter demand matrix.
+        Method to create filter demand matrix, or the window of num_lines lines of it starting at
+        first_line.
         """
         assert self.params_set_flag, 'Parameters are not set'
 
+        # Time for inputs to stream and the partial sums to drain out
         inter_fold_gap_suffix = self.arr_row + self.arr_col + self.T - 2
-        inter_fold_gap_suffix_mat = np.ones((inter_fold_gap_suffix, self.arr_col)) * -1
-
-        metadata_conversion_mat = [ [ ] ]
-        if False:
-            if self.config.sparsity_support is True:
-                if self.config.sparsity_representation == 'csr':
-                    metadata_conversion_mat = np.ones((1, self.arr_col)) * -1
-                elif self.config.sparsity_representation == 'csc':
-                    metadata_conversion_mat = np.ones((1, self.arr_col)) * -1
-                elif self.config.sparsity_representation == 'ellpack_block':
-                    metadata_conversion_mat = np.ones((0, self.arr_col)) * -1
-
-        filter_demand_matrix_list = []
-        for fc in range(self.col_fold):
-            # for fr in range(self.row_fold):
-            for fr in range(self.row_fold_demand_matrices):
-                row_start_id = fr * self.arr_row
-                # row_end_idx = min(row_start_id + self.arr_row, self.Sr)
-                row_end_idx = min(row_start_id + self.arr_row, self.filter_op_mat.shape[0])
-                row_delta = self.arr_row - (row_end_idx - row_start_id)
-
-                col_start_id = fc * self.arr_col
-                col_end_idx = min(col_start_id + self.arr_col, self.Sc)
-                col_delta = self.arr_col - (col_end_idx - col_start_id)
-
-                this_fold_demand = \
-                    self.filter_op_mat[row_start_id:row_end_idx, col_start_id: col_end_idx]
-                self.filter_reads += this_fold_demand.shape[0] * this_fold_demand.shape[1]
-
-                # Take into account under utilization
-                if col_delta > 0:
-                    null_req_mat = np.ones((this_fold_demand.shape[0], col_delta)) * -1
-                    this_fold_demand = np.concatenate((this_fold_demand, null_req_mat), axis=1)
-
-                if row_delta > 0:
-                    null_req_mat = np.ones((row_delta, self.arr_col)) * -1
-                    this_fold_demand = np.concatenate((this_fold_demand, null_req_mat), axis=0)
-
-                # The filters are needed to be filled in reverse order to ensure that
-                # top element is pushed in last to maintain alignment with the input elements
-                this_fold_demand = np.flip(this_fold_demand, 0)
-
-                sum_sparse = sum(list(row).count(-1) for row in this_fold_demand)
-
-                # Time for inputs to stream and the partial sums to drain out
-                this_fold_demand = np.concatenate((this_fold_demand, inter_fold_gap_suffix_mat),
-                                                  axis=0)
-
-                # Calculate the mapping efficiency
-                row_used = min(self.arr_row, row_end_idx - row_start_id)
-                col_used = min(self.arr_col, col_end_idx - col_start_id)
-                mac_used = row_used * col_used
-
-                # mapping_eff_this_fold = mac_used / (self.arr_row * self.arr_col)
-                mapping_eff_this_fold = \
-                    ((self.arr_row * self.arr_col) - sum_sparse) / (self.arr_row * self.arr_col)
-
-                cycles_this_fold = this_fold_demand.shape[0] + this_fold_demand.shape[1] - 1
-                compute_cycles_this_fold = mac_used * self.T
-                compute_util_this_fold = \
-                    compute_cycles_this_fold / (self.arr_row * self.arr_col * cycles_this_fold)
-
-                self.mapping_efficiency_per_fold.append(mapping_eff_this_fold)
-                self.compute_utility_per_fold.append(compute_util_this_fold)
-
-                filter_demand_matrix_list.append(this_fold_demand)
-                #if fr == 0 and fc == 0:
-                #    self.filter_demand_matrix = this_fold_demand
-                #else:
-                #    self.filter_demand_matrix = \
-                #       np.concatenate((self.filter_demand_matrix, this_fold_demand), axis=0)
-        
-        self.filter_demand_matrix = np.concatenate(filter_demand_matrix_list)
-
-        if False:
-            if self.config.sparsity_support is True:
-                self.filter_demand_matrix = \
-                    np.concatenate((metadata_conversion_mat, self.filter_demand_matrix), axis=0)
 
         # No skew needed in filters for weight stationary
+        fold_lines = self.arr_row + inter_fold_gap_suffix
+        first_fold, end_fold, num_lines = \
+            get_fold_window(self.col_fold * self.row_fold_demand_matrices, fold_lines,
+                            first_line, num_lines)
+        self.filter_demand_matrix = get_null_demand_matrix(num_lines, self.arr_col,
+                                                           self.address_dtype)
+
+        for fold_id in range(first_fold, end_fold):
+            fc, fr = divmod(fold_id, self.row_fold_demand_matrices)
+            # row_end_idx = min(row_start_id + self.arr_row, self.Sr)
+            row_start_id, row_end_idx, row_delta = \
+                get_fold_bounds(fr, self.arr_row, self.filter_op_mat.shape[0])
+            col_start_id, col_end_idx, _ = get_fold_bounds(fc, self.arr_col, self.Sc)
+
+            this_fold_demand = \
+                self.filter_op_mat[row_start_id:row_end_idx, col_start_id: col_end_idx]
+
+            # The filters are needed to be filled in reverse order to ensure that
+            # top element is pushed in last to maintain alignment with the input elements
+            # The rows with no mapping end up on top of the reflected fold, with null requests
+            this_fold_demand = np.flip(this_fold_demand, 0)
+            fold_start = fold_id * fold_lines
+            write_fold(self.filter_demand_matrix, this_fold_demand, fold_start + row_delta,
+                       first_line=first_line)
+
+            # The folds which started in a previous window are already counted
+            if fold_start < first_line:
+                continue
+            self.filter_reads += this_fold_demand.shape[0] * this_fold_demand.shape[1]
+
+            # Null requests in the first arr_row lines of the fold: the unmapped ports and rows,
+            # and the pruned elements of the filter
+            sum_sparse = self.arr_row * self.arr_col - this_fold_demand.size \
+                         + np.count_nonzero(this_fold_demand == -1)
+
+            # Calculate the mapping efficiency
+            row_used = min(self.arr_row, row_end_idx - row_start_id)
+            col_used = min(self.arr_col, col_end_idx - col_start_id)
+            mac_used = row_used * col_used
+
+            # mapping_eff_this_fold = mac_used / (self.arr_row * self.arr_col)
+            mapping_eff_this_fold = \
+                ((self.arr_row * self.arr_col) - sum_sparse) / (self.arr_row * self.arr_col)
+
+            cycles_this_fold = fold_lines + self.arr_col - 1
+            compute_cycles_this_fold = mac_used * self.T
+            compute_util_this_fold = \
+                compute_cycles_this_fold / (self.arr_row * self.arr_col * cycles_this_fold)
+
+            self.mapping_efficiency_per_fold.append(mapping_eff_this_fold)
+            self.compute_utility_per_fold.append(compute_util_this_fold)
 
     #
-    def create_ofmap_demand_mat(self):
+    def create_ofmap_demand_mat(self, first_line=0, num_lines=-1):
         """
-        Method to create ofmap demand matrix.
+        Method to create ofmap demand matrix, or the window of num_lines lines of it starting at
+        first_line.
         """
         assert self.params_set_flag, 'Parameters are not set'
 
+        # These are the null demands to account for when the operands are streamed in and the
+        # OFMAPS are not ready
         inter_fold_gap_prefix = 2 * self.arr_row - 1
-        inter_fold_gap_prefix_mat = np.ones((inter_fold_gap_prefix, self.arr_col)) * -1
 
-        metadata_conversion_mat = [ [ ] ]
-        if False:
-            if self.config.sparsity_support is True:
-                if self.config.sparsity_representation == 'csr':
-                    metadata_conversion_mat = np.ones((1, self.arr_col)) * -1
-                elif self.config.sparsity_representation == 'csc':
-                    metadata_conversion_mat = np.ones((1, self.arr_col)) * -1
-                elif self.config.sparsity_representation == 'ellpack_block':
-                    metadata_conversion_mat = np.ones((0, self.arr_col)) * -1
+        # Every fold is skewed over the cols of the array to reflect systolic pipeline fill
+        fold_lines = inter_fold_gap_prefix + self.T + self.arr_col - 1
+        first_fold, end_fold, num_lines = \
+            get_fold_window(self.col_fold * self.row_fold_demand_matrices, fold_lines,
+                            first_line, num_lines)
+        self.ofmap_demand_matrix = get_null_demand_matrix(num_lines, self.arr_col,
+                                                          self.address_dtype)
 
-        ofmap_demand_matrix_list = []
+        for fold_id in range(first_fold, end_fold):
+            fc, fr = divmod(fold_id, self.row_fold_demand_matrices)
+            col_start_id, col_end_idx, _ = get_fold_bounds(fc, self.arr_col, self.Sc)
 
-        for fc in range(self.col_fold):
-            # for fr in range(self.row_fold):
-            for fr in range(self.row_fold_demand_matrices):
-                col_start_id = fc * self.arr_col
-                col_end_idx = min(col_start_id + self.arr_col, self.Sc) # self.Sc
-                col_delta = self.arr_col - (col_end_idx - col_start_id)
+            this_fold_demand = self.ofmap_op_mat[:, col_start_id: col_end_idx]
 
-                this_fold_demand = self.ofmap_op_mat[:, col_start_id: col_end_idx]
+            # The folds which started in a previous window are already counted
+            if fold_id * fold_lines >= first_line:
                 self.ofmap_writes += this_fold_demand.shape[0] * this_fold_demand.shape[1]
 
-                # Adding null requests when there is under utilization ie. no mapping along a few
-                # rows or cols
-                if col_delta > 0:
-                    null_req_mat = np.ones((this_fold_demand.shape[0], col_delta)) * -1
-                    this_fold_demand = np.concatenate((this_fold_demand, null_req_mat), axis=1)
-
-                # Now add the prefix matrix
-                # These are the null demands to account for when the operands are streamed in
-                # and the OFMAPS are not ready
-                this_fold_demand = np.concatenate((inter_fold_gap_prefix_mat, this_fold_demand),
-                                                  axis=0)
-
-                # Add skew to the OFMAP demand matrix to reflect systolic pipeline fill
-                this_fold_demand = skew_matrix(this_fold_demand)
-
-                ofmap_demand_matrix_list.append(this_fold_demand)
-                #if fr == 0 and fc == 0:
-                #    self.ofmap_demand_matrix = this_fold_demand
-                #else:
-                #    self.ofmap_demand_matrix = \
-                #       np.concatenate((self.ofmap_demand_matrix, this_fold_demand), axis=0)
-
-        self.ofmap_demand_matrix = np.concatenate(ofmap_demand_matrix_list)
-
-        if False:
-            if self.config.sparsity_support is True:
-                self.ofmap_demand_matrix = \
-                    np.concatenate((metadata_conversion_mat, self.ofmap_demand_matrix), axis=0)
+            write_fold(self.ofmap_demand_matrix, this_fold_demand,
+                       fold_id * fold_lines + inter_fold_gap_prefix, skew=True,
+                       first_line=first_line)
 
     # END of OFMAP demand generation
 
@@ -562,7 +599,7 @@ class systolic_compute_ws:
         """
         Method to get average mapping efficincy on the systolic array.
         """
-        assert self.demand_mat_ready_flag, 'Computes not ready yet'
+        assert self.demand_metrics_ready_flag, 'Computes not ready yet'
 
         agg = sum(self.mapping_efficiency_per_fold)
         num = len(self.mapping_efficiency_per_fold)
@@ -576,7 +613,7 @@ class systolic_compute_ws:
         """
         Method to get average compute utilization on the systolic array.
         """
-        assert self.demand_mat_ready_flag, 'Computes not ready yet'
+        assert self.demand_metrics_ready_flag, 'Computes not ready yet'
 
         agg = sum(self.compute_utility_per_fold)
         num = len(self.compute_utility_per_fold)
@@ -590,7 +627,7 @@ class systolic_compute_ws:
         """
         Method to get the number of ifmap read requests.
         """
-        assert self.demand_mat_ready_flag, 'Computes not ready yet'
+        assert self.demand_metrics_ready_flag, 'Computes not ready yet'
         return self.ifmap_reads
 
     #
@@ -598,7 +635,7 @@ class systolic_compute_ws:
         """
         Method to get the number of filter read requests.
         """
-        assert self.demand_mat_ready_flag, 'Computes not ready yet'
+        assert self.demand_metrics_ready_flag, 'Computes not ready yet'
         return self.filter_reads
 
     #
@@ -606,69 +643,5 @@ class systolic_compute_ws:
         """
         Method to get the number of ofmap read requests.
         """
-        assert self.demand_mat_ready_flag, 'Computes not ready yet'
+        assert self.demand_metrics_ready_flag, 'Computes not ready yet'
         return self.ofmap_writes
-
-
-#
-def skew_matrix(input_matrix_np):
-    """
-    Method to add skew to the input matix to maintain systolic array flow.
-    Example:
-        Input matrix:
-        1 1 1 1 1 1 1 1 1
-
-        Output matrix:
-            1 1 1
-          1 1 1
-        1 1 1
-    """
-    rows, cols = input_matrix_np.shape
-
-    out_matrix_np = np.full((rows + cols - 1, cols), -1, dtype=input_matrix_np.dtype)
-
-    for c in range(cols):
-        out_matrix_np[c:c + rows, c] = input_matrix_np[:, c]
-
-    return out_matrix_np
-
-#
-def skew_matrix_row_sparsity(input_matrix, arr_row, block_size):
-    # Step 1: Ensure the number of columns is arr_row * 2 as we are combining 2 tiles
-    num_tiles = 2
-    num_cols = input_matrix.shape[1]
-    if num_cols < arr_row * num_tiles:
-        padding = arr_row * num_tiles - num_cols
-        input_matrix = np.pad(input_matrix, ((0, 0), (0, padding)), constant_values=-1)
-    
-    # Step 2: Split into blocks
-    blocks = []
-    for row in input_matrix:
-        row_blocks = [row[i:i+block_size] for i in range(0, len(row), block_size)]
-        blocks.append(row_blocks)
-
-    # Step 3: Add extra copies to match block_size / 2 copies per column
-    repeated_blocks = []
-    for block_row in blocks:
-        new_row = []
-        for block in block_row:
-            new_row.extend([block] * (block_size // num_tiles))
-        repeated_blocks.append(new_row)
-
-    # Step 4: Apply skew to the repeated blocks
-    output_matrix = []
-    num_block_rows = len(repeated_blocks)
-    num_block_cols = (len(repeated_blocks[0][0]) * block_size) // num_tiles
-
-    for i in range(num_block_rows + arr_row - 1):
-        row = []
-        for j in range(len(repeated_blocks[0])):
-            block_row_idx = i - j
-            if 0 <= block_row_idx < num_block_rows:
-                row.append(repeated_blocks[block_row_idx][j])
-            else:
-                row.append([-1] * block_size)
-        row = np.concatenate(row)
-        output_matrix.append(row)
-    
-    return np.array(output_matrix, dtype=input_matrix.dtype)
@@ -0,0 +1,212 @@
+"""
+This module contains the array kernels shared by the 'systolic_compute_os', 'systolic_compute_ws'
+and 'systolic_compute_is' classes: the fold bounds, the null padding of under utilized folds, the
+stacking of the folds, the skew of the demands and the diagonal roll out of the prefetches. The
+demand matrices are allocated once, filled with null requests, and every fold is written in place
+at its final (skewed) position. A window of lines of the demand matrices can also be generated on
+its own, with the folds clipped to it, to stream the demands block by block. The kernels work on
+whole arrays with index arithmetic and strided views instead of element loops. All the matrices
+keep the integer address dtype of the operand matrices (see scale_config.get_address_dtype()), with
+-1 as the null request.
+"""
+
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+
+#
+def get_fold_bounds(fold_id, fold_size, dim_size):
+    """
+    Function to get the first and (excluded) last index of a fold, along a dimension of dim_size
+    elements mapped fold_size elements at a time, and the number of positions of the fold which
+    are not used.
+    """
+    start_id = fold_id * fold_size
+    end_id = min(start_id + fold_size, dim_size)
+    delta = fold_size - (end_id - start_id)
+
+    return start_id, end_id, delta
+
+
+#
+def pad_fold(fold_np, size, axis=1):
+    """
+    Function to fill the unused positions of a fold with null (-1) requests, up to size elements
+    along the given axis. Folds which need no padding are returned as they are.
+    """
+    delta = size - fold_np.shape[axis]
+    if delta <= 0:
+        return fold_np
+
+    out_shape = list(fold_np.shape)
+    out_shape[axis] = size
+    out_np = np.full(out_shape, -1, dtype=fold_np.dtype)
+    if axis == 0:
+        out_np[:fold_np.shape[0], :] = fold_np
+    else:
+        out_np[:, :fold_np.shape[1]] = fold_np
+
+    return out_np
+
+
+#
+def stack_folds(fold_list):
+    """
+    Function to stack a list of folds along the rows with a single copy. A single fold is returned
+    as it is.
+    """
+    if len(fold_list) == 1:
+        return fold_list[0]
+
+    return np.concatenate(fold_list, axis=0)
+
+
+#
+def skew_matrix(input_matrix_np):
+    """
+    Function to add skew to the input matix to maintain systolic array flow.
+    Example:
+        Input matrix:
+        1 1 1 1 1 1 1 1 1
+
+        Output matrix:
+            1 1 1
+          1 1 1
+        1 1 1
+    """
+    rows, cols = input_matrix_np.shape
+
+    out_matrix_np = np.full((rows + cols - 1, cols), -1, dtype=input_matrix_np.dtype)
+
+    # Element [r, c] of this view is element [r + c, c] of the output
+    row_stride, col_stride = out_matrix_np.strides
+    skewed_view = as_strided(out_matrix_np, shape=(rows, cols),
+                             strides=(row_stride, row_stride + col_stride), writeable=True)
+    skewed_view[:, :] = input_matrix_np
+
+    return out_matrix_np
+
+
+#
+def diagonal_rollout(input_matrix_np):
+    """
+    Function to roll out a prefetch matrix along its anti-diagonals into a single row, to account
+    for the temporal locality of the skewed demands (ISSUE #15, #16). The anti-diagonals are taken
+    in order and each one from its bottom-left to its top-right element. The output is a
+    (1, M * N) matrix of the same dtype.
+    """
+    rows, cols = input_matrix_np.shape
+    out_matrix_np = np.zeros((1, rows * cols), dtype=input_matrix_np.dtype)
+    if rows * cols == 0:
+        return out_matrix_np
+
+    # Number of elements of every anti-diagonal and position of its first element in the output
+    diag_ids = np.arange(rows + cols - 1)
+    diag_max_row = np.minimum(diag_ids, rows - 1)
+    diag_len = diag_max_row - np.maximum(0, diag_ids - cols + 1) + 1
+    diag_start = np.cumsum(diag_len) - diag_len
+
+    # Position of element [r, c] in the output, going down the rows within a diagonal
+    row_ids = np.arange(rows).reshape((rows, 1))
+    col_ids = np.arange(cols).reshape((1, cols))
+    elem_diag = row_ids + col_ids
+    elem_pos = diag_start[elem_diag] + diag_max_row[elem_diag] - row_ids
+
+    out_matrix_np[0, elem_pos.reshape(-1)] = input_matrix_np.reshape(-1)
+
+    return out_matrix_np
+
+
+#
+def get_null_demand_matrix(num_lines, cols, dtype):
+    """
+    Function to allocate a demand matrix, or a window of one, of num_lines lines with cols ports,
+    filled with null (-1) requests. The folds are then written in place with write_fold(), so that
+    the prefix and suffix gaps and the under utilized ports are already in place.
+    """
+    return np.full((num_lines, cols), -1, dtype=dtype)
+
+
+#
+def get_fold_window(num_folds, fold_lines, first_line=0, num_lines=-1):
+    """
+    Function to get the folds which overlap the window of num_lines lines starting at first_line,
+    in a demand matrix of num_folds folds of fold_lines lines each. A negative num_lines selects
+    all the lines from first_line on. Returns the first and (excluded) last fold id and the number
+    of lines of the window, clipped to the end of the matrix.
+    """
+    total_lines = num_folds * fold_lines
+    if num_lines < 0 or first_line + num_lines > total_lines:
+        num_lines = max(total_lines - first_line, 0)
+    if num_lines == 0:
+        return 0, 0, 0
+
+    first_fold = first_line // fold_lines
+    end_fold = min(int(math.ceil((first_line + num_lines) / fold_lines)), num_folds)
+
+    return first_fold, end_fold, num_lines
+
+
+#
+def write_fold(demand_np, fold_np, row_offset, skew=False, first_line=None):
+    """
+    Function to write the requests of a fold into a demand matrix, starting at line row_offset and
+    port 0. With skew, element [r, c] of the fold is written at line row_offset + r + c, which is
+    what skew_matrix() does to a whole fold. With first_line, demand_np is the window of the
+    demand matrix starting at that line, row_offset is still a line of the whole matrix, and the
+    requests which fall out of the window are dropped.
+    """
+    rows, cols = fold_np.shape
+    if rows == 0 or cols == 0:
+        return
+
+    if first_line is not None:
+        row_offset -= first_line
+
+    last_row = row_offset + rows - 1
+    if skew:
+        last_row += cols - 1
+    assert cols <= demand_np.shape[1], 'Fold does not fit in the demand matrix'
+
+    if row_offset < 0 or last_row >= demand_np.shape[0]:
+        assert first_line is not None, 'Fold does not fit in the demand matrix'
+        write_clipped_fold(demand_np, fold_np, row_offset, skew)
+        return
+
+    if skew:
+        row_stride, col_stride = demand_np.strides
+        fold_view = as_strided(demand_np[row_offset:], shape=(rows, cols),
+                               strides=(row_stride, row_stride + col_stride), writeable=True)
+    else:
+        fold_view = demand_np[row_offset:row_offset + rows, :cols]
+    fold_view[:, :] = fold_np
+
+
+#
+def write_clipped_fold(demand_np, fold_np, row_offset, skew=False):
+    """
+    Function to write the part of a fold which falls within a window of the demand matrix, for the
+    folds which overlap the start or the end of the window. row_offset is relative to the window
+    and may be negative.
+    """
+    rows, cols = fold_np.shape
+    num_lines = demand_np.shape[0]
+
+    if not skew:
+        first_row = max(-row_offset, 0)
+        end_row = min(num_lines - row_offset, rows)
+        if first_row < end_row:
+            demand_np[row_offset + first_row:row_offset + end_row, :cols] = \
+                fold_np[first_row:end_row, :]
+        return
+
+    # Every column of a skewed fold is shifted down by one more line
+    for col in range(cols):
+        col_offset = row_offset + col
+        first_row = max(-col_offset, 0)
+        end_row = min(num_lines - col_offset, rows)
+        if first_row < end_row:
+            demand_np[col_offset + first_row:col_offset + end_row, col] = \
+                fold_np[first_row:end_row, col]
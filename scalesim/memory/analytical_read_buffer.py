@@ -0,0 +1,475 @@
+"""
+The `analytical_read_buffer` class follows the IFMAP or filter read buffer of the analytical mode
+along the fetch stream of its operand, without the addresses.
+"""
+import math
+import numpy as np
+
+
+#
+def get_ramp_sum(num, limit):
+    """
+    Function to get the sum of min(u, limit) for u from 0 to num, 0 for a negative num. Works on
+    numbers and on numpy arrays.
+    """
+    num = np.maximum(num, 0)
+    low = np.minimum(num, limit)
+    return low * (low + 1) // 2 + (num - low) * limit
+
+
+#
+def get_clamped_sum(x, first, last, limit):
+    """
+    Function to get the sum of min(max(x - c, 0), limit) for c from first to last (excluded).
+    """
+    return get_ramp_sum(x - first, limit) - get_ramp_sum(x - last, limit)
+
+
+class analytical_read_buffer:
+    """
+    Class which follows a read buffer as read_buffer models it in the user bandwidth mode. The
+    fetch stream of the operand, ie. its prefetch matrix in row major order, is split into lines of
+    the buffer and the active buffer is a window of these lines, which every prefetch moves along
+    the stream, wrapping around at its end. The stream is made of the blocks of the prefetch matrix
+    (one per fold of the array along a dimension), rolled out along the anti-diagonals or not, so
+    the position of an element in the stream is known in closed form. The folds read the blocks in
+    the order of the dataflow, and the prefetches are recorded with the demand line which made
+    them, for the stalls. With overlapping convolution windows an ifmap element is in the stream
+    once per window, and a demand hits if the active buffer holds any of these copies.
+    """
+    #
+    def __init__(self):
+        """
+        __init__ method
+        """
+        # Buffer properties
+        self.total_size_elems = 1
+        self.active_buf_size = 1
+        self.prefetch_buf_size = 0
+        self.bandwidth = 1
+        self.elems_per_line = 1
+
+        # Fetch stream: blocks of block_rows x block_cols elements, the last one has
+        # last_block_cols valid cols
+        self.num_blocks = 1
+        self.block_rows = 1
+        self.block_cols = 1
+        self.last_block_cols = 1
+        self.rollout = False
+        self.num_stream_elems = 1
+
+        # Convolution windows of an ifmap stream, which read every ifmap element once per window
+        # holding it. The windows of the last ofmap rows and cols may go past the ifmap, their
+        # elements are null requests.
+        self.conv_windows_flag = False
+        self.overlapping_windows = False
+        self.pixels_along_rows = True
+        self.ifmap_dims = (1, 1)
+        self.ofmap_dims = (1, 1)
+        self.filter_dims = (1, 1)
+        self.num_channels = 1
+        self.strides = (1, 1)
+        self.invalid_positions = np.zeros(0, dtype=np.int64)
+
+        # Lines of the buffer over the stream
+        self.num_lines = 1
+        self.num_active_lines = 1
+        self.num_prefetch_lines = 0
+        self.start_line = 0
+
+        # Prefetches
+        self.num_access = 0
+        self.initial_fetch_cycles = 0
+        self.prefetch_words = 0
+        self.prefetch_cycles = 0
+        self.last_prefetch_cycle = -1
+        self.prefetch_demand_lines = []
+
+        self.params_set_flag = False
+
+    #
+    def set_params(self, total_size_elems=1, active_buf_frac=0.5, bandwidth=1,
+                   backing_buf_latency=1,
+                   num_blocks=1, block_rows=1, block_cols=1, last_block_cols=1, rollout=False):
+        """
+        Method to set the buffer and fetch stream parameters, as read_buffer gets them from the
+        config and the prefetch matrix.
+        """
+        self.total_size_elems = total_size_elems
+        self.active_buf_size = int(math.ceil(total_size_elems * active_buf_frac))
+        self.prefetch_buf_size = total_size_elems - self.active_buf_size
+        self.bandwidth = bandwidth
+
+        self.elems_per_line = math.ceil(total_size_elems / 100)
+
+        self.num_blocks = num_blocks
+        self.block_rows = block_rows
+        self.block_cols = block_cols
+        self.last_block_cols = last_block_cols
+        self.rollout = rollout
+
+        # The null requests padding the last block are not part of the stream
+        num_pad_elems = block_rows * (block_cols - last_block_cols)
+        self.num_stream_elems = num_blocks * block_rows * block_cols - num_pad_elems
+        self.conv_windows_flag = False
+        self.overlapping_windows = False
+        self.invalid_positions = np.zeros(0, dtype=np.int64)
+        self.set_num_lines()
+
+        # The active buffer is filled before the first demand, the fetch matrix has lines of
+        # bandwidth elements including the padding
+        num_fetch_rows = math.ceil(num_blocks * block_rows * block_cols / bandwidth)
+        self.num_access = min(math.ceil(self.active_buf_size / bandwidth), num_fetch_rows) \
+                          * bandwidth
+        self.initial_fetch_cycles = min(math.ceil(self.active_buf_size / bandwidth),
+                                        num_fetch_rows)
+        self.last_prefetch_cycle = -1
+
+        num_prefetch_rows = math.ceil(self.prefetch_buf_size / bandwidth)
+        self.prefetch_words = num_prefetch_rows * bandwidth
+        self.prefetch_cycles = num_prefetch_rows + backing_buf_latency
+        self.prefetch_demand_lines = []
+
+        self.params_set_flag = True
+
+    #
+    def set_num_lines(self):
+        """
+        Method to split the fetch stream into lines of the buffer, the active buffer starts at the
+        first one.
+        """
+        self.num_lines = self.num_stream_elems // self.elems_per_line + 1
+        self.num_active_lines = min(math.ceil(self.active_buf_size / self.elems_per_line),
+                                    self.num_lines)
+        self.num_prefetch_lines = min(math.ceil(self.prefetch_buf_size / self.elems_per_line),
+                                      self.num_lines - self.num_active_lines)
+        self.start_line = 0
+
+    #
+    def set_conv_windows(self, ifmap_dims=(1, 1), ofmap_dims=(1, 1), filter_dims=(1, 1),
+                         num_channels=1, strides=(1, 1), pixels_along_rows=True):
+        """
+        Method to set the convolution windows of an ifmap stream, whose elements are the pixels of
+        the ofmap times the elements of the window, along the rows or the cols of the operand
+        matrix. The elements of the windows which go past the ifmap are null requests, and
+        overlapping windows read the same ifmap element several times, read_buffer finds it in
+        any of its copies.
+        """
+        assert self.params_set_flag, 'Parameters are not set'
+
+        self.ifmap_dims = ifmap_dims
+        self.ofmap_dims = ofmap_dims
+        self.filter_dims = filter_dims
+        self.num_channels = num_channels
+        self.strides = strides
+        self.pixels_along_rows = pixels_along_rows
+        self.overlapping_windows = (filter_dims[0] > strides[0] and ofmap_dims[0] > 1) \
+                                   or (filter_dims[1] > strides[1] and ofmap_dims[1] > 1)
+
+        # The null requests are only in the windows of the last ofmap rows and cols
+        window_row_size = filter_dims[1] * num_channels
+        window_elems = np.arange(filter_dims[0] * window_row_size)
+        filter_rows, window_cols = np.divmod(window_elems, window_row_size)
+        invalid_positions = []
+        for ofmap_row in range(ofmap_dims[0]):
+            num_valid_rows = min(ifmap_dims[0] - ofmap_row * strides[0], filter_dims[0])
+            for ofmap_col in range(ofmap_dims[1]):
+                num_valid_cols = min(ifmap_dims[1] - ofmap_col * strides[1], filter_dims[1])
+                if num_valid_rows == filter_dims[0] and num_valid_cols == filter_dims[1]:
+                    continue
+
+                invalid = np.logical_or(filter_rows >= num_valid_rows,
+                                        window_cols // num_channels >= num_valid_cols)
+                pixel = ofmap_row * ofmap_dims[1] + ofmap_col
+                rows, cols = self.get_stacked_elems(pixel, window_elems[invalid])
+                invalid_positions.append(self.get_full_positions(rows, cols))
+
+        self.invalid_positions = np.zeros(0, dtype=np.int64)
+        if invalid_positions:
+            self.invalid_positions = np.sort(np.concatenate(invalid_positions))
+        self.num_stream_elems -= self.invalid_positions.shape[0]
+        self.set_num_lines()
+
+        self.conv_windows_flag = True
+
+    #
+    def get_stacked_elems(self, pixels, window_elems):
+        """
+        Method to get the rows and cols in the stacked blocks of the elements of the windows.
+        """
+        rows, cols = (pixels, window_elems) if self.pixels_along_rows else (window_elems, pixels)
+        block_ids, cols = np.divmod(cols, self.block_cols)
+        return rows + block_ids * self.block_rows, cols
+
+    #
+    def get_ifmap_elems(self, rows, cols):
+        """
+        Method to get the ifmap rows, cols and channels read by the elements [rows, cols] of the
+        stacked blocks.
+        """
+        block_ids, elem_rows = np.divmod(rows, self.block_rows)
+        elem_cols = block_ids * self.block_cols + cols
+        pixels, window_elems = (elem_rows, elem_cols) if self.pixels_along_rows \
+            else (elem_cols, elem_rows)
+
+        ofmap_rows, ofmap_cols = np.divmod(pixels, self.ofmap_dims[1])
+        filter_rows, window_cols = np.divmod(window_elems, self.filter_dims[1] * self.num_channels)
+        filter_cols, channels = np.divmod(window_cols, self.num_channels)
+        return ofmap_rows * self.strides[0] + filter_rows, \
+               ofmap_cols * self.strides[1] + filter_cols, channels
+
+    #
+    def get_position(self, row, col):
+        """
+        Method to get the position of element [row, col] of the stacked blocks in the fetch
+        stream, not counting the null requests before it. Works on numbers and on numpy arrays.
+        """
+        position = self.get_full_positions(row, col)
+        if self.invalid_positions.shape[0] > 0:
+            position = position - np.searchsorted(self.invalid_positions, position)
+        return position
+
+    #
+    def get_full_positions(self, rows, cols):
+        """
+        Method to get the positions of the elements [rows, cols] of the stacked blocks in the fetch
+        stream, not counting the null requests of the padding of the last block before them.
+        """
+        first_pad_row = (self.num_blocks - 1) * self.block_rows
+        num_pad_cols = self.block_cols - self.last_block_cols
+
+        if not self.rollout:
+            return rows * self.block_cols + cols \
+                   - np.maximum(rows - first_pad_row, 0) * num_pad_cols
+
+        # The anti-diagonals are rolled out in order, each from its bottom-left element
+        num_rows = self.num_blocks * self.block_rows
+        diags = rows + cols
+        diag_max_rows = np.minimum(diags, num_rows - 1)
+        positions = get_clamped_sum(diags, 0, self.block_cols, num_rows) + diag_max_rows - rows
+        if num_pad_cols > 0:
+            positions = positions - get_clamped_sum(diags - first_pad_row, self.last_block_cols,
+                                                    self.block_cols, self.block_rows)
+            # Null requests of the diagonals below the elements
+            first_rows = np.maximum(np.maximum(rows + 1, first_pad_row),
+                                    diags - self.block_cols + 1)
+            last_rows = np.minimum(diag_max_rows, diags - self.last_block_cols)
+            positions = positions - np.maximum(last_rows - first_rows + 1, 0)
+
+        return positions
+
+    #
+    def get_nearest_line_ids(self, rows, cols):
+        """
+        Method to get, for the elements [rows, cols] of the stacked blocks, the line holding the
+        element or the copy of it which is the nearest one after the start of the active buffer,
+        and the distance of this line from the start. The null requests are at distance 0. The
+        copies are the elements of the other windows which read the same ifmap element.
+        """
+        line_ids = self.get_position(rows, cols) // self.elems_per_line
+        distances = (line_ids - self.start_line) % self.num_lines
+        if not self.conv_windows_flag:
+            return line_ids, distances
+
+        ifmap_rows, ifmap_cols, channels = self.get_ifmap_elems(rows, cols)
+        valid = np.logical_and(ifmap_rows < self.ifmap_dims[0], ifmap_cols < self.ifmap_dims[1])
+        distances[np.logical_not(valid)] = 0
+        if not self.overlapping_windows:
+            return line_ids, distances
+
+        # The copies are in the windows of the ofmap rows and cols up to the last one holding the
+        # ifmap element, with the same channel
+        filter_rows, filter_cols = self.filter_dims
+        row_stride, col_stride = self.strides
+        last_ofmap_rows = np.minimum(ifmap_rows // row_stride, self.ofmap_dims[0] - 1)
+        last_ofmap_cols = np.minimum(ifmap_cols // col_stride, self.ofmap_dims[1] - 1)
+        first_ofmap_rows = np.maximum(-((filter_rows - 1 - ifmap_rows) // row_stride), 0)
+        first_ofmap_cols = np.maximum(-((filter_cols - 1 - ifmap_cols) // col_stride), 0)
+
+        copy_ofmap_rows = last_ofmap_rows[:, None, None] \
+                          - np.arange(-(-filter_rows // row_stride))[None, :, None]
+        copy_ofmap_cols = last_ofmap_cols[:, None, None] \
+                          - np.arange(-(-filter_cols // col_stride))[None, None, :]
+        copies = np.logical_and(copy_ofmap_rows >= first_ofmap_rows[:, None, None],
+                                copy_ofmap_cols >= first_ofmap_cols[:, None, None])
+        copies = np.logical_and(copies, valid[:, None, None])
+
+        copy_filter_rows = ifmap_rows[:, None, None] - copy_ofmap_rows * row_stride
+        copy_filter_cols = ifmap_cols[:, None, None] - copy_ofmap_cols * col_stride
+        copy_rows, copy_cols = self.get_stacked_elems(
+            copy_ofmap_rows * self.ofmap_dims[1] + copy_ofmap_cols,
+            (copy_filter_rows * filter_cols + copy_filter_cols) * self.num_channels
+            + channels[:, None, None])
+        copy_rows = np.where(copies, copy_rows, 0)
+        copy_cols = np.where(copies, copy_cols, 0)
+
+        copy_line_ids = self.get_position(copy_rows, copy_cols) // self.elems_per_line
+        copy_distances = np.where(copies, (copy_line_ids - self.start_line) % self.num_lines,
+                                  self.num_lines)
+        copy_line_ids = copy_line_ids.reshape((rows.shape[0], -1))
+        copy_distances = copy_distances.reshape((rows.shape[0], -1))
+
+        elems = np.arange(rows.shape[0])
+        nearest = np.argmin(copy_distances, axis=1)
+        line_ids = np.where(valid, copy_line_ids[elems, nearest], line_ids)
+        distances = np.where(valid, copy_distances[elems, nearest], 0)
+        return line_ids, distances
+
+    #
+    def read_line(self, line_id, demand_line):
+        """
+        Method to read a line of the stream in the given demand line. The active buffer is moved
+        by as many prefetches as needed to hold it.
+        """
+        line_id = line_id % self.num_lines
+        distance = (line_id - self.start_line) % self.num_lines
+        if distance < self.num_active_lines:
+            return
+
+        num_prefetches = math.ceil((distance - self.num_active_lines + 1)
+                                   / self.num_prefetch_lines)
+        self.start_line = (self.start_line + num_prefetches * self.num_prefetch_lines) \
+                          % self.num_lines
+        self.num_access += num_prefetches * self.prefetch_words
+        self.prefetch_demand_lines += [demand_line] * num_prefetches
+
+    #
+    def read_elems(self, rows, cols, demand_lines, chunk_size=512):
+        """
+        Method to read the elements [rows, cols] of the stacked blocks in order, in the given
+        demand lines. The elements are checked against the active buffer by chunks, till the first
+        miss, which moves the active buffer, and the ones after it are checked again.
+        """
+        first = 0
+        while first < rows.shape[0]:
+            last = min(first + chunk_size, rows.shape[0])
+            line_ids, distances = self.get_nearest_line_ids(rows[first:last], cols[first:last])
+            misses = np.flatnonzero(distances >= self.num_active_lines)
+            if misses.shape[0] == 0:
+                first = last
+                continue
+
+            miss = int(misses[0])
+            self.read_line(int(line_ids[miss]), int(demand_lines[first + miss]))
+            first += miss + 1
+
+    #
+    def holds_lines(self, first_line_id, last_line_id):
+        """
+        Method to check if the active buffer holds the lines from first_line_id to last_line_id.
+        """
+        first_distance = (first_line_id - self.start_line) % self.num_lines
+        last_distance = (last_line_id - self.start_line) % self.num_lines
+        return first_distance <= last_distance < self.num_active_lines
+
+    #
+    def read_skewed_block(self, block_id, first_demand_line, num_used_cols, chunk_size=256):
+        """
+        Method to read a block of the rolled out stream as skewed demands: element [t, c] of the
+        block is read in demand line first_demand_line + t + c, so the demands go along the
+        stream. The demand lines which stay in the active buffer are skipped, the next one leaving
+        it is found by a binary search, and the elements from there are read by chunks of demand
+        lines till the active buffer holds them again.
+        """
+        first_row = block_id * self.block_rows
+        last_offset = self.block_rows + num_used_cols - 2
+        chunk_lines = max(chunk_size // num_used_cols, 1)
+
+        def get_last_position(offset):
+            # The top-right element read in the demand line, the last one in the stream
+            row = max(first_row, first_row + offset - num_used_cols + 1)
+            return self.get_position(row, first_row + offset - row)
+
+        self.read_elems(np.array([first_row]), np.array([0]), np.array([first_demand_line]))
+        if self.num_prefetch_lines == 0:
+            return
+
+        offset = 1
+        line_id = self.get_position(first_row, 0) // self.elems_per_line
+        while offset <= last_offset:
+            distance = (line_id - self.start_line) % self.num_lines
+            if distance < self.num_active_lines:
+                next_line_id = line_id - distance + self.num_active_lines
+                low, high = offset, last_offset + 1
+                while low < high:
+                    mid = (low + high) // 2
+                    if get_last_position(mid) >= next_line_id * self.elems_per_line:
+                        high = mid
+                    else:
+                        low = mid + 1
+                offset = low
+                if offset > last_offset:
+                    return
+
+            # Elements of the chunk of demand lines, each from its bottom-left element
+            end_offset = min(offset + chunk_lines, last_offset + 1)
+            offsets, cols = np.meshgrid(np.arange(offset, end_offset), np.arange(num_used_cols),
+                                        indexing='ij')
+            rows = offsets - cols
+            valid = np.logical_and(rows >= 0, rows < self.block_rows)
+            offsets, rows, cols = offsets[valid], rows[valid] + first_row, cols[valid]
+            self.read_elems(rows, cols, offsets + first_demand_line)
+
+            offset = end_offset
+            line_id = int(self.get_position(rows[-1], cols[-1])) // self.elems_per_line
+
+    #
+    def read_block_rows(self, block_id, first_row, end_row, first_demand_line, num_used_cols):
+        """
+        Method to read the rows first_row to end_row (excluded) of a block of the row major stream,
+        one row per demand line from the last one, as the flipped folds read them.
+        """
+        block_first_row = block_id * self.block_rows
+        first_line_id = self.get_position(block_first_row + first_row, 0) // self.elems_per_line
+        last_line_id = self.get_position(block_first_row + end_row - 1, num_used_cols - 1) \
+                       // self.elems_per_line
+        if self.holds_lines(first_line_id, last_line_id):
+            return
+
+        line_offsets, cols = np.meshgrid(np.arange(end_row - first_row), np.arange(num_used_cols),
+                                         indexing='ij')
+        line_offsets, cols = line_offsets.reshape(-1), cols.reshape(-1)
+        rows = block_first_row + end_row - 1 - line_offsets
+        self.read_elems(rows, cols, line_offsets + first_demand_line)
+
+    #
+    def get_prefetch_demand_lines(self):
+        """
+        Method to get the demand lines which made the prefetches so far, and clear them.
+        """
+        demand_lines = self.prefetch_demand_lines
+        self.prefetch_demand_lines = []
+        return demand_lines
+
+    #
+    def get_prefetch_stall(self, cycle, num_prefetches, hit_latency=1):
+        """
+        Method to get the stall of a demand line serviced in cycle, which made num_prefetches
+        prefetches, as read_buffer.service_reads() counts it. The prefetches are requested back to
+        back, after the previous one.
+        """
+        offset = hit_latency
+        for _ in range(num_prefetches):
+            self.last_prefetch_cycle += self.prefetch_cycles
+            potential_stall_cycles = self.last_prefetch_cycle - (cycle + offset)
+            offset += potential_stall_cycles
+            if potential_stall_cycles > 0:
+                offset += potential_stall_cycles
+
+        return offset - hit_latency
+
+    #
+    def get_num_accesses(self):
+        """
+        Method to get the number of DRAM reads.
+        """
+        assert self.params_set_flag, 'Parameters are not set'
+        return self.num_access
+
+    #
+    def get_external_access_start_stop_cycles(self):
+        """
+        Method to get the cycles of the first DRAM read and of the end of the last prefetch.
+        """
+        assert self.params_set_flag, 'Parameters are not set'
+        return -1 * self.initial_fetch_cycles, self.last_prefetch_cycle
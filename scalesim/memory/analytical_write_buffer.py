@@ -0,0 +1,235 @@
+"""
+The `analytical_write_buffer` class follows the OFMAP write buffer of the analytical mode as a
+fill level, without the addresses.
+"""
+import math
+
+from scalesim.memory.analytical_read_buffer import get_ramp_sum
+
+
+class analytical_write_buffer:
+    """
+    Class which follows the write buffer as write_buffer models it: the writes fill the buffer,
+    which drains the lines of the drain buffer to the DRAM once the active buffer is full, and the
+    array stalls till the end of the drain if the buffer gets full meanwhile. The writes of a fold
+    go along the diagonals of its ofmap block, so the number of writes per demand line is known in
+    closed form and the buffer is only looked at in the demand lines where it drains or stalls.
+    """
+    #
+    def __init__(self):
+        """
+        __init__ method
+        """
+        self.total_size_elems = 1
+        self.active_buf_size = 1
+        self.bandwidth = 1
+        self.num_drain_lines = 1
+        self.backing_buf_latency = 0
+
+        self.free_space = 1
+        self.drain_end_cycle = 0
+
+        # Lines of bandwidth elements written so far and not drained yet, as groups of lines
+        # [number of lines, elements in the last line], and elements of the line being written
+        self.trace_line_groups = []
+        self.num_open_elems = 0
+
+        # Writes of the current fold
+        self.fold_first_line = 0
+        self.fold_rows = 0
+        self.fold_cols = 0
+        self.next_write = 0
+
+        self.num_access = 0
+        self.first_drain_cycle = -1
+        self.last_drain_cycle = -1
+
+        self.params_set_flag = False
+
+    #
+    def set_params(self, total_size_elems=1, active_buf_frac=0.5, bandwidth=1,
+                   backing_buf_latency=0):
+        """
+        Method to set the buffer parameters, as write_buffer gets them from the config.
+        """
+        self.total_size_elems = total_size_elems
+        self.active_buf_size = int(math.ceil(total_size_elems * active_buf_frac))
+        self.bandwidth = bandwidth
+        drain_buf_size = total_size_elems - self.active_buf_size
+        self.num_drain_lines = int(math.ceil(drain_buf_size / bandwidth))
+        self.backing_buf_latency = backing_buf_latency
+
+        self.free_space = total_size_elems
+        self.drain_end_cycle = 0
+        self.trace_line_groups = []
+        self.num_open_elems = 0
+        self.fold_rows = 0
+        self.fold_cols = 0
+        self.next_write = 0
+
+        self.num_access = 0
+        self.first_drain_cycle = -1
+        self.last_drain_cycle = -1
+
+        self.params_set_flag = True
+
+    #
+    def set_fold_writes(self, first_line, num_rows, num_cols):
+        """
+        Method to set the writes of a fold: the num_rows x num_cols block of the ofmap written
+        along its diagonals, from demand line first_line.
+        """
+        assert self.next_write == self.get_num_writes(self.fold_rows + self.fold_cols), \
+            'Writes of the previous fold are not done'
+        self.fold_first_line = first_line
+        self.fold_rows = num_rows
+        self.fold_cols = num_cols
+        self.next_write = 0
+
+    #
+    def get_num_writes(self, num_lines):
+        """
+        Method to get the number of writes of the fold in its first num_lines demand lines.
+        """
+        num_lines = min(max(num_lines, 0), self.fold_rows + self.fold_cols - 1)
+        short_side = min(self.fold_rows, self.fold_cols)
+        long_side = max(self.fold_rows, self.fold_cols)
+        num_ramp_down = max(num_lines - long_side, 0)
+        return get_ramp_sum(num_lines, short_side) - num_ramp_down * (num_ramp_down + 1) // 2
+
+    #
+    def get_write_line(self, write_id):
+        """
+        Method to get the demand line of the fold, from its first one, of write write_id.
+        """
+        low, high = 0, self.fold_rows + self.fold_cols - 2
+        while low < high:
+            mid = (low + high) // 2
+            if self.get_num_writes(mid + 1) > write_id:
+                high = mid
+            else:
+                low = mid + 1
+        return low
+
+    #
+    def write_lines(self, end_line, stall_cycles):
+        """
+        Method to service the writes of the fold in the demand lines before end_line, demand line
+        l being serviced in cycle l + stall_cycles. Returns the stall cycles, with the ones of
+        these writes added.
+        """
+        assert self.params_set_flag, 'Parameters are not set'
+
+        end_write = int(self.get_num_writes(end_line - self.fold_first_line))
+        while self.next_write < end_write:
+            write_id = self.next_write
+            cycle = self.fold_first_line + self.get_write_line(write_id) + stall_cycles
+
+            if cycle < self.drain_end_cycle:
+                # The array stalls on the write which fills the buffer during the drain, unless
+                # the demand lines get past the drain first
+                stall_write_id = write_id + max(self.free_space, 1) - 1
+                drain_end_line = self.drain_end_cycle - stall_cycles - self.fold_first_line
+                drain_end_write = int(self.get_num_writes(drain_end_line))
+                if stall_write_id < min(drain_end_write, end_write):
+                    self.store(stall_write_id + 1 - write_id)
+                    stall_cycle = self.fold_first_line + self.get_write_line(stall_write_id) \
+                                  + stall_cycles
+                    stall_cycles += self.drain_end_cycle - stall_cycle
+                else:
+                    self.store(min(drain_end_write, end_write) - write_id)
+
+            else:
+                # The drain starts on the write which fills the active buffer
+                drain_write_id = write_id + max(self.free_space - self.active_buf_size + 1, 1) - 1
+                if drain_write_id < end_write:
+                    self.store(drain_write_id + 1 - write_id)
+                    drain_cycle = self.fold_first_line + self.get_write_line(drain_write_id) \
+                                  + stall_cycles
+                    self.close_open_line()
+                    self.drain_end_cycle = self.empty_drain_buf(drain_cycle)
+                else:
+                    self.store(end_write - write_id)
+
+        return stall_cycles
+
+    #
+    def store(self, num_writes):
+        """
+        Method to add num_writes writes to the buffer.
+        """
+        self.free_space -= num_writes
+        self.num_open_elems += num_writes
+        self.next_write += num_writes
+
+    #
+    def close_open_line(self):
+        """
+        Method to close the line being written, as write_buffer does before a drain, the next
+        writes go to a new line.
+        """
+        if self.num_open_elems == 0:
+            return
+
+        num_lines = int(math.ceil(self.num_open_elems / self.bandwidth))
+        last_line_elems = self.num_open_elems - (num_lines - 1) * self.bandwidth
+        self.trace_line_groups.append([num_lines, last_line_elems])
+        self.num_open_elems = 0
+
+    #
+    def empty_drain_buf(self, cycle):
+        """
+        Method to drain the lines of the drain buffer from cycle, one line per cycle. As in
+        write_buffer, the lines are counted full but for the last one. Returns the cycle of the end
+        of the drain.
+        """
+        num_lines = 0
+        last_line_elems = self.bandwidth
+        while num_lines < self.num_drain_lines and len(self.trace_line_groups) > 0:
+            group = self.trace_line_groups[0]
+            num_group_lines = min(self.num_drain_lines - num_lines, group[0])
+            num_lines += num_group_lines
+            if num_group_lines == group[0]:
+                last_line_elems = group[1]
+                self.trace_line_groups.pop(0)
+            else:
+                last_line_elems = self.bandwidth
+                group[0] -= num_group_lines
+
+        if num_lines == 0:
+            return self.drain_end_cycle
+
+        drained_elems = num_lines * self.bandwidth - (self.bandwidth - last_line_elems)
+        self.num_access += drained_elems
+        self.free_space += drained_elems
+
+        if self.first_drain_cycle < 0:
+            self.first_drain_cycle = cycle + self.backing_buf_latency
+        self.last_drain_cycle = cycle + num_lines - 1 + self.backing_buf_latency
+        return self.last_drain_cycle
+
+    #
+    def empty_all_buffers(self, cycle):
+        """
+        Method to drain all of the buffer from cycle, after the last demand line.
+        """
+        self.close_open_line()
+        while len(self.trace_line_groups) > 0:
+            self.drain_end_cycle = self.empty_drain_buf(cycle)
+            cycle = self.drain_end_cycle + 1
+
+    #
+    def get_num_accesses(self):
+        """
+        Method to get the number of DRAM writes.
+        """
+        assert self.params_set_flag, 'Parameters are not set'
+        return self.num_access
+
+    #
+    def get_external_access_start_stop_cycles(self):
+        """
+        Method to get the cycles of the first and of the last DRAM write.
+        """
+        assert self.params_set_flag, 'Parameters are not set'
+        return self.first_drain_cycle, self.last_drain_cycle
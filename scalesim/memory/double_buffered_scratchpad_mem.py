@@ -15,6 +15,179 @@ from scalesim.memory.read_buffer_estimate_bw import ReadBufferEstimateBw as rdbu
 from scalesim.memory.read_port import read_port as rdport
 from scalesim.memory.write_buffer import write_buffer as wrbuf
 from scalesim.memory.write_port import write_port as wrport
+from scalesim.memory.memory_kernels import numba_memory_backend, get_memory_kernels, \
+    print_warning_once
+
+
+#
+def stack_trace_blocks(trace_blocks):
+    """
+    Function to stack the trace matrices of consecutive blocks of lines with a single copy. A
+    single block is returned as it is.
+    """
+    if len(trace_blocks) == 1:
+        return trace_blocks[0]
+
+    return np.concatenate(trace_blocks, axis=0)
+
+
+#
+def get_state_drifts(this_state, prev_state, tolerance=0.0, period_cycles=0, num_periods=0):
+    """
+    Function to get the number of elements by which the demands drift along the fetch streams
+    within the active buffers between two fold states, as returned by get_fold_state() of the
+    buffers, period_cycles apart:
+    - the exact parts of the states have to be the same,
+    - the approximate ones, eg. the free space of the ofmap buffer, have to be the same within the
+      relative tolerance of the count they go with over the period, eg. the ofmap writes,
+    - the gaps to the end of the last prefetches or drains have to be the same within the
+      relative tolerance of the period cycles, or too long to matter over the next num_periods
+      periods if they keep changing as much,
+    - the positions of the demands from the start of the active buffer of a read buffer can only
+      differ by an address offset, the drift, the same for all of them.
+    Returns None if the states do not match so.
+    """
+    this_rings, this_exact, this_approx, this_gaps = this_state
+    prev_rings, prev_exact, prev_approx, prev_gaps = prev_state
+    if not this_exact == prev_exact:
+        return None
+
+    for (value, count), (prev_value, prev_count) in zip(this_approx, prev_approx):
+        if abs(value - prev_value) > tolerance * abs(count - prev_count):
+            return None
+
+    for (gap, max_gap), (prev_gap, _) in zip(this_gaps, prev_gaps):
+        if abs(gap - prev_gap) <= tolerance * period_cycles:
+            continue
+        if prev_gap > -max_gap or gap + num_periods * max(gap - prev_gap, 0) > -max_gap:
+            return None
+
+    drifts = []
+    for ring, prev_ring in zip(this_rings, prev_rings):
+        num_elems = ring[0] * ring[1]
+        ring_drifts = set()
+        for position, prev_position in zip(ring[-1], prev_ring[-1]):
+            if position == -1 or prev_position == -1:
+                if not position == prev_position:
+                    return None
+                continue
+
+            # The shortest way around the fetch stream
+            drift = (position - prev_position) % num_elems
+            if drift > num_elems // 2:
+                drift -= num_elems
+            ring_drifts.add(drift)
+
+        if len(ring_drifts) > 1:
+            return None
+        drifts.append(ring_drifts.pop() if len(ring_drifts) == 1 else 0)
+
+    return drifts
+
+
+#
+def get_steady_state_period(fold_deltas, fold_states, window, tolerance=0.0, base_period=1,
+                            max_multiple=64, num_folds_left=0):
+    """
+    Function to find the shortest period of the folds over which they are in a steady state: the
+    deltas (cycles, stalls and the ifmap, filter and ofmap DRAM accesses) summed over each of the
+    last window periods repeat within a relative tolerance, and the states of the buffers at the
+    ends of the folds of these periods repeat, the demands drifting by the same address offset
+    along the fetch streams in every period (see get_state_drifts()). The periods tried are the
+    multiples of base_period, the folds of the inner loop of the compute, up to max_multiple
+    times, for the num_folds_left folds after these. Returns the period, the deltas of the last
+    period and the drifts per period, or 0, None and None if there is no such period yet.
+    """
+    num_folds = len(fold_deltas)
+    for period in range(base_period, base_period * max_multiple + 1, base_period):
+        if (window + 1) * period > num_folds:
+            break
+
+        # Deltas of the last window + 1 periods, the last one first
+        period_deltas = []
+        for i in range(window + 1):
+            first_fold = num_folds - (i + 1) * period
+            period_deltas.append([sum(deltas) for deltas
+                                  in zip(*fold_deltas[first_fold:first_fold + period])])
+
+        steady = True
+        for this_deltas, prev_deltas in zip(period_deltas[:-1], period_deltas[1:]):
+            for this_delta, prev_delta in zip(this_deltas, prev_deltas):
+                if abs(this_delta - prev_delta) > tolerance * max(this_delta, prev_delta):
+                    steady = False
+        if not steady:
+            continue
+
+        num_periods = num_folds_left // period
+        drifts = None
+        for i in range(1, window + 1):
+            state_drifts = get_state_drifts(fold_states[-1 - (i - 1) * period],
+                                            fold_states[-1 - i * period], tolerance,
+                                            period_deltas[i - 1][0], num_periods)
+            if state_drifts is None or not (drifts is None or state_drifts == drifts):
+                drifts = None
+                break
+            drifts = state_drifts
+        if drifts is None:
+            continue
+
+        # The folds within the periods have to drift the same way
+        for i in range(1, window * period + 1):
+            if not i % period == 1 \
+                    and not get_state_drifts(fold_states[-i], fold_states[-i - period], tolerance,
+                                             period_deltas[0][0], num_periods) == drifts:
+                drifts = None
+                break
+        if drifts is not None:
+            return period, period_deltas[0], drifts
+
+    return 0, None, None
+
+
+#
+def get_num_drift_periods(ring, drift, num_periods):
+    """
+    Function to get the number of periods, up to num_periods, over which the demands of a read
+    buffer, as returned by get_fold_state(), can drift by drift elements per period without any
+    of their positions reaching a whole prefetch from the start of the active buffer, its end or
+    the end of the fetch stream, up to the period after them. The buffer takes the same prefetches
+    every period till then, after that they change.
+    """
+    num_lines, num_line_elems, num_active_lines, num_prefetch_lines, _, positions = ring
+    if drift == 0:
+        return num_periods
+
+    prefetch_elems = num_prefetch_lines * num_line_elems
+    active_elems = num_active_lines * num_line_elems
+    for position in positions:
+        if position == -1:
+            continue
+        if drift > 0:
+            bound = min((position // prefetch_elems + 1) * prefetch_elems,
+                        num_lines * num_line_elems)
+            if position < active_elems:
+                bound = min(bound, active_elems)
+            num_periods = min(num_periods, (bound - 1 - position) // drift - 1)
+        else:
+            bound = (position // prefetch_elems) * prefetch_elems
+            if position >= active_elems:
+                bound = max(bound, active_elems)
+            num_periods = min(num_periods, (position - bound - 1) // -drift - 1)
+
+    return max(num_periods, 0)
+
+
+#
+def get_end_addresses(demand_mat):
+    """
+    Function to get the first and last addresses requested in a demand matrix, -1 if there is
+    none.
+    """
+    addrs = demand_mat[demand_mat != -1]
+    if addrs.shape[0] == 0:
+        return [-1, -1]
+    return [int(addrs[0]), int(addrs[-1])]
+
 
 class double_buffered_scratchpad:
     """
@@ -39,6 +212,14 @@ class double_buffered_scratchpad:
         self.topo = topo()
 
         self.verbose = True
+        # Called with (lines serviced, total lines) while servicing the demand matrices
+        self.progress_callback = None
+        # Bounds of the runs of demand lines checked at once for lines serviced together
+        self.min_run_lines = 16
+        self.max_run_lines = 4096
+        # Backend of the memory simulation: the buffer classes (python) or the compiled kernels
+        # (numba)
+        self.memory_backend = 'python'
 
         self.ifmap_trace_matrix = np.zeros((1,1), dtype=int)
         self.filter_trace_matrix = np.zeros((1,1), dtype=int)
@@ -72,6 +253,16 @@ class double_buffered_scratchpad:
 
         self.estimate_bandwidth_mode = False
         self.traces_valid = False
+        # The SRAM trace matrices can be dropped while servicing the demands block by block
+        self.sram_traces_kept = True
+
+        # Fast forward over the steady state folds: the folds simulated and in total, and the
+        # cycles and the ifmap, filter and ofmap DRAM accesses extrapolated for the others
+        self.num_folds_simulated = 0
+        self.num_folds = 0
+        self.extrapolated_cycles = 0
+        self.extrapolated_dram_accesses = [0, 0, 0]
+
         self.params_valid_flag = True
         self.use_ramulator_trace = self.config.get_ramulator_trace()
 
@@ -99,6 +290,7 @@ class double_buffered_scratchpad:
         self.topo = topo
         self.config = config
         self.use_ramulator_trace = config.get_ramulator_trace()
+        self.memory_backend = config.get_memory_backend()
 
         self.estimate_bandwidth_mode = estimate_bandwidth_mode
 
@@ -183,6 +375,14 @@ class double_buffered_scratchpad:
         self.ifmap_buf.set_fetch_matrix(ifmap_prefetch_mat)
         self.filter_buf.set_fetch_matrix(filter_prefetch_mat)
 
+    #
+    def set_progress_callback(self, progress_callback=None):
+        """
+        Method to set the function called with the number of demand lines serviced so far and the
+        total number of lines, about every 1% of the lines, by service_memory_requests().
+        """
+        self.progress_callback = progress_callback
+
     #
     def reset_buffer_states(self):
         """
@@ -230,54 +430,321 @@ class double_buffered_scratchpad:
 
         return out_cycles_arr_np
 
+    #
+    def get_numba_backend(self):
+        """
+        Method to get the numba backend of the memory simulation, set to service the demands of
+        the buffers, if it is selected and models the features used. Returns None otherwise, the
+        buffers then service the demands themselves.
+        """
+        if not self.memory_backend == 'numba':
+            return None
+
+        if get_memory_kernels() is None:
+            print_warning_once('WARNING: numba is not installed, using the python memory backend')
+            return None
+
+        if self.estimate_bandwidth_mode or self.use_ramulator_trace \
+                or self.using_ifmap_custom_layout or self.using_filter_custom_layout:
+            print_warning_once('WARNING: The numba memory backend does not model the estimate '
+                               'bandwidth mode, the custom layouts and the Ramulator traces, '
+                               'using the python memory backend')
+            return None
+
+        numba_backend = numba_memory_backend()
+        numba_backend.set_params(self.ifmap_buf, self.filter_buf, self.ofmap_buf)
+        return numba_backend
+
+    #
+    def get_fold_state(self, cycle, ifmap_demand_mat, filter_demand_mat, numba_backend=None):
+        """
+        Method to get the state of the buffers at the end of a fold, in cycle, for the steady state
+        checks of the fast forward mode, see get_state_drifts(). The positions of the first and
+        last ifmap and filter addresses of the fold from the start of the active buffers tell how
+        the demands move along the fetch streams.
+        """
+        if numba_backend is not None:
+            numba_backend.sync_fold_states()
+
+        ifmap_rings, ifmap_exact, ifmap_gap = \
+            self.ifmap_buf.get_fold_state(cycle, get_end_addresses(ifmap_demand_mat))
+        filter_rings, filter_exact, filter_gap = \
+            self.filter_buf.get_fold_state(cycle, get_end_addresses(filter_demand_mat))
+        ofmap_approx, ofmap_gap = self.ofmap_buf.get_fold_state(cycle)
+
+        return [ifmap_rings, filter_rings], (ifmap_exact, filter_exact), ofmap_approx, \
+            [ifmap_gap, filter_gap, ofmap_gap]
+
+    #
+    def get_num_quiet_lines(self, ifmap_demand_lines, filter_demand_lines, ofmap_demand_lines,
+                            cycles_arr):
+        """
+        Method to get the number of leading demand lines, requested in the given cycles, which are
+        serviced by all the buffers without a stall or a prefetch: hits of the ifmap and filter
+        buffers, and ofmap writes which neither stall nor drain the ofmap buffer. These lines
+        leave the stall cycles as they are, and are serviced together.
+        """
+        num_lines = self.ifmap_buf.get_num_hit_lines(ifmap_demand_lines)
+        if num_lines > 0:
+            num_lines = self.filter_buf.get_num_hit_lines(filter_demand_lines[:num_lines, :])
+        if num_lines > 0:
+            num_lines = self.ofmap_buf.get_num_quiet_lines(ofmap_demand_lines[:num_lines, :],
+                                                           cycles_arr[:num_lines])
+
+        return num_lines
+
     #
     def service_memory_requests(self, ifmap_demand_mat, filter_demand_mat, ofmap_demand_mat):
         """
         Method to run the memory simulation of ifmap, filter and ofmap SRAMs together and generate
         the traces.
         """
-        assert self.params_valid_flag, 'Memories not initialized yet'
+        demand_blocks = [(ifmap_demand_mat, filter_demand_mat, ofmap_demand_mat)]
+        self.service_memory_request_blocks(demand_blocks, ofmap_demand_mat.shape[0])
 
-        ofmap_lines = ofmap_demand_mat.shape[0]
+    #
+    def service_memory_request_blocks(self, demand_blocks, num_lines=0, keep_sram_traces=True,
+                                      fast_forward_window=0, fast_forward_tolerance=0.0,
+                                      fast_forward_period=1, num_folds=0):
+        """
+        Method to run the memory simulation of ifmap, filter and ofmap SRAMs on demand matrices
+        handed out as blocks of consecutive lines, eg. by get_demand_blocks() of the compute
+        system, one (ifmap, filter, ofmap) block at a time. num_lines is the total number of lines,
+        for the progress. Without keep_sram_traces, only the start and stop cycles of the SRAM
+        traces are kept, so that the memory held does not grow with the demands.
+        With fast_forward_window, every block is one of the num_folds folds. Once the folds are in
+        a steady state over fast_forward_window periods (see get_steady_state_period()), with the
+        deltas of the periods repeating within the relative fast_forward_tolerance, whole periods
+        of the following folds are not simulated: their cycles and accesses are those of the last
+        period, and the read buffers are moved along their fetch streams by its prefetches, as
+        long as the drift of the demands leaves them as they are (see get_num_drift_periods()).
+        The steady state is then looked for again. The last period and the folds after the whole
+        periods are simulated, so that the end of the layer is not extrapolated. The periods are
+        multiples of fast_forward_period folds, the inner loop of the compute. The traces then
+        only cover the simulated folds.
+        """
+        assert self.params_valid_flag, 'Memories not initialized yet'
+        assert not (fast_forward_window > 0 and keep_sram_traces), \
+            'SRAM traces are not available in the fast forward mode'
+        assert not (fast_forward_window > 0 and num_folds < 1), \
+            'The number of folds is needed in the fast forward mode'
+        assert not (fast_forward_window > 0 and (self.estimate_bandwidth_mode
+                                                 or self.use_ramulator_trace)), \
+            'The fast forward mode needs the user bandwidth mode without Ramulator traces'
 
         self.total_cycles = 0
         self.stall_cycles = 0
+        self.sram_traces_kept = keep_sram_traces
+
+        self.num_folds_simulated = 0
+        self.num_folds = 0
+        self.extrapolated_cycles = 0
+        self.extrapolated_dram_accesses = [0, 0, 0]
+        fold_deltas = []
+        fold_states = []
+        steady_state_period = 0
+        num_skipped_folds = 0
+        extrapolated_deltas = [0, 0, 0, 0, 0]
 
         ifmap_hit_latency = self.ifmap_buf.get_hit_latency()
         filter_hit_latency = self.filter_buf.get_hit_latency()
+        numba_backend = self.get_numba_backend()
+
+        ifmap_trace_blocks = []
+        filter_trace_blocks = []
+        ofmap_trace_blocks = []
+        sram_cycles_found = [False, False, False]
+        max_ofmap_serviced_cycle = None
+        last_ofmap_serviced_cycle = None
 
-        ifmap_serviced_cycles = []
-        filter_serviced_cycles = []
-        ofmap_serviced_cycles = []
+        progress_step = max(1, num_lines // 100)
+        line_id = 0
 
         pbar_disable = not self.verbose
-        for i in tqdm(range(ofmap_lines), disable=pbar_disable):
-
-            cycle_arr = np.zeros((1,1)) + i + self.stall_cycles
-
-            ifmap_demand_line = ifmap_demand_mat[i, :].reshape((1,ifmap_demand_mat.shape[1]))
-            ifmap_cycle_out = \
-                self.ifmap_buf.service_reads(incoming_requests_arr_np=ifmap_demand_line,
-                                             incoming_cycles_arr=cycle_arr)
-            ifmap_serviced_cycles += [ifmap_cycle_out[0]]
-            ifmap_stalls = ifmap_cycle_out[0] - cycle_arr[0] - ifmap_hit_latency
-
-            filter_demand_line = filter_demand_mat[i, :].reshape((1, filter_demand_mat.shape[1]))
-            filter_cycle_out = \
-                self.filter_buf.service_reads(incoming_requests_arr_np=filter_demand_line,
-                                              incoming_cycles_arr=cycle_arr)
-            filter_serviced_cycles += [filter_cycle_out[0]]
-            filter_stalls = filter_cycle_out[0] - cycle_arr[0] - filter_hit_latency
-
-            ofmap_demand_line = ofmap_demand_mat[i, :].reshape((1, ofmap_demand_mat.shape[1]))
-            ofmap_cycle_out = \
-                self.ofmap_buf.service_writes(incoming_requests_arr_np=ofmap_demand_line,
-                                              incoming_cycles_arr_np=cycle_arr)
-            ofmap_serviced_cycles += [ofmap_cycle_out[0]]
-            ofmap_stalls = ofmap_cycle_out[0] - cycle_arr[0]
-
-            self.stall_cycles += int(max(ifmap_stalls[0], filter_stalls[0], ofmap_stalls[0]))
-            #self.stall_cycles += ifmap_stalls[0] + filter_stalls[0] + ofmap_stalls[0]
+        pbar = tqdm(total=num_lines, disable=pbar_disable)
+        for ifmap_demand_mat, filter_demand_mat, ofmap_demand_mat in demand_blocks:
+            block_lines = ofmap_demand_mat.shape[0]
+            if block_lines == 0:
+                continue
+            self.num_folds += 1
+
+            # The folds of the whole periods skipped are accounted for in extrapolated_deltas
+            if self.num_folds <= self.num_folds_simulated + num_skipped_folds:
+                pbar.update(block_lines)
+                continue
+
+            fold_start = [line_id + self.stall_cycles, self.stall_cycles,
+                          self.ifmap_buf.num_access, self.filter_buf.num_access,
+                          self.ofmap_buf.num_access]
+
+            ifmap_serviced_cycles = []
+            filter_serviced_cycles = []
+            ofmap_serviced_cycles = []
+
+            # With the numba backend, the lines are serviced by the compiled kernels, up to the
+            # next progress update at a time
+            i = 0
+            while numba_backend is not None and i < block_lines:
+                run_end = block_lines
+                if self.progress_callback is not None:
+                    if line_id % progress_step == 0:
+                        self.progress_callback(line_id, num_lines)
+                    run_end = min(i + progress_step - line_id % progress_step, block_lines)
+
+                ifmap_cycles, filter_cycles, ofmap_cycles, self.stall_cycles = \
+                    numba_backend.service_lines(ifmap_demand_mat[i:run_end, :],
+                                                filter_demand_mat[i:run_end, :],
+                                                ofmap_demand_mat[i:run_end, :],
+                                                line_id, self.stall_cycles)
+                ifmap_serviced_cycles.append(ifmap_cycles)
+                filter_serviced_cycles.append(filter_cycles)
+                ofmap_serviced_cycles.append(ofmap_cycles)
+
+                line_id += run_end - i
+                pbar.update(run_end - i)
+                i = run_end
+
+            # The lines serviced without a stall or a prefetch are serviced together, in runs of
+            # up to run_lines lines. The others are serviced one at a time.
+            run_lines = self.min_run_lines
+            while i < block_lines:
+                run_end = min(i + run_lines, block_lines)
+                run_cycles = np.arange(run_end - i, dtype=np.float64).reshape((-1, 1)) \
+                             + (line_id + self.stall_cycles)
+                num_quiet_lines = self.get_num_quiet_lines(ifmap_demand_mat[i:run_end, :],
+                                                           filter_demand_mat[i:run_end, :],
+                                                           ofmap_demand_mat[i:run_end, :],
+                                                           run_cycles)
+                if num_quiet_lines > 0:
+                    run_end = i + num_quiet_lines
+                    run_cycles = run_cycles[:num_quiet_lines]
+                    if self.progress_callback is not None:
+                        first_line = -(-line_id // progress_step) * progress_step
+                        for progress_line in range(first_line, line_id + num_quiet_lines,
+                                                   progress_step):
+                            self.progress_callback(progress_line, num_lines)
+
+                    ifmap_serviced_cycles.append(
+                        self.ifmap_buf.service_hit_reads(ifmap_demand_mat[i:run_end, :],
+                                                         run_cycles))
+                    filter_serviced_cycles.append(
+                        self.filter_buf.service_hit_reads(filter_demand_mat[i:run_end, :],
+                                                          run_cycles))
+                    ofmap_serviced_cycles.append(
+                        self.ofmap_buf.service_quiet_writes(ofmap_demand_mat[i:run_end, :],
+                                                            run_cycles))
+
+                    if num_quiet_lines == run_lines:
+                        run_lines = min(2 * run_lines, self.max_run_lines)
+                    else:
+                        run_lines = self.min_run_lines
+
+                    i = run_end
+                    line_id += num_quiet_lines
+                    pbar.update(num_quiet_lines)
+                    continue
+
+                if self.progress_callback is not None and line_id % progress_step == 0:
+                    self.progress_callback(line_id, num_lines)
+
+                cycle_arr = np.zeros((1,1)) + line_id + self.stall_cycles
+
+                ifmap_demand_line = ifmap_demand_mat[i, :].reshape((1,ifmap_demand_mat.shape[1]))
+                ifmap_cycle_out = \
+                    self.ifmap_buf.service_reads(incoming_requests_arr_np=ifmap_demand_line,
+                                                 incoming_cycles_arr=cycle_arr)
+                ifmap_serviced_cycles.append(ifmap_cycle_out)
+                ifmap_stalls = ifmap_cycle_out[0] - cycle_arr[0] - ifmap_hit_latency
+
+                filter_demand_line = \
+                    filter_demand_mat[i, :].reshape((1, filter_demand_mat.shape[1]))
+                filter_cycle_out = \
+                    self.filter_buf.service_reads(incoming_requests_arr_np=filter_demand_line,
+                                                  incoming_cycles_arr=cycle_arr)
+                filter_serviced_cycles.append(filter_cycle_out)
+                filter_stalls = filter_cycle_out[0] - cycle_arr[0] - filter_hit_latency
+
+                ofmap_demand_line = ofmap_demand_mat[i, :].reshape((1, ofmap_demand_mat.shape[1]))
+                ofmap_cycle_out = \
+                    self.ofmap_buf.service_writes(incoming_requests_arr_np=ofmap_demand_line,
+                                                  incoming_cycles_arr_np=cycle_arr)
+                ofmap_serviced_cycles.append(ofmap_cycle_out)
+                ofmap_stalls = ofmap_cycle_out[0] - cycle_arr[0]
+
+                self.stall_cycles += int(max(ifmap_stalls[0], filter_stalls[0], ofmap_stalls[0]))
+                #self.stall_cycles += ifmap_stalls[0] + filter_stalls[0] + ofmap_stalls[0]
+
+                run_lines = self.min_run_lines
+                i += 1
+                line_id += 1
+                pbar.update(1)
+
+            ifmap_serviced_cycles = np.concatenate(ifmap_serviced_cycles, axis=0)
+            filter_serviced_cycles = np.concatenate(filter_serviced_cycles, axis=0)
+            ofmap_serviced_cycles = np.concatenate(ofmap_serviced_cycles, axis=0)
+
+            block_max_cycle = np.amax(ofmap_serviced_cycles, axis=0)
+            if max_ofmap_serviced_cycle is None or block_max_cycle > max_ofmap_serviced_cycle:
+                max_ofmap_serviced_cycle = block_max_cycle
+            last_ofmap_serviced_cycle = ofmap_serviced_cycles[-1]
+
+            # Prepare the traces of the block
+            block_traces = []
+            for serviced_cycles_np, demand_mat in [(ifmap_serviced_cycles, ifmap_demand_mat),
+                                                   (filter_serviced_cycles, filter_demand_mat),
+                                                   (ofmap_serviced_cycles, ofmap_demand_mat)]:
+                block_traces.append([serviced_cycles_np, demand_mat])
+
+            self.update_sram_start_stop_cycles(block_traces, sram_cycles_found)
+            self.num_folds_simulated += 1
+
+            if fast_forward_window > 0:
+                fold_end = [line_id + self.stall_cycles, self.stall_cycles,
+                            self.ifmap_buf.num_access, self.filter_buf.num_access,
+                            self.ofmap_buf.num_access]
+                fold_deltas.append(tuple([end - start for start, end
+                                          in zip(fold_start, fold_end)]))
+                fold_states.append(self.get_fold_state(line_id + self.stall_cycles,
+                                                       ifmap_demand_mat, filter_demand_mat,
+                                                       numba_backend))
+
+                # The steady state is checked at the ends of the inner loop of the compute. Whole
+                # periods are skipped, leaving at least one to simulate before the end, as long as
+                # the drift of the demands leaves the prefetches of the read buffers as they are.
+                period = 0
+                if self.num_folds % fast_forward_period == 0:
+                    period, period_deltas, drifts = get_steady_state_period(
+                        fold_deltas, fold_states, fast_forward_window, fast_forward_tolerance,
+                        fast_forward_period, num_folds_left=num_folds - self.num_folds)
+                num_periods = 0
+                if period > 0:
+                    num_periods = (num_folds - self.num_folds) // period - 1
+                    for fold_state in fold_states[-period:]:
+                        for ring, drift in zip(fold_state[0], drifts):
+                            num_periods = get_num_drift_periods(ring, drift, num_periods)
+                if num_periods > 0:
+                    steady_state_period = period
+                    num_skipped_folds += num_periods * period
+                    for delta_id, delta in enumerate(period_deltas):
+                        extrapolated_deltas[delta_id] += num_periods * delta
+
+                    moved_lines = [num_periods * (period_deltas[2 + buf_id] // ring[4]) * ring[3]
+                                   for buf_id, ring in enumerate(fold_states[-1][0])]
+                    if numba_backend is not None:
+                        numba_backend.move_active_lines(moved_lines[0], moved_lines[1])
+                    else:
+                        self.ifmap_buf.move_active_lines(moved_lines[0])
+                        self.filter_buf.move_active_lines(moved_lines[1])
+
+                    # The steady state after the skipped periods is found anew
+                    fold_deltas = []
+                    fold_states = []
+
+            if keep_sram_traces:
+                ifmap_trace_blocks.append(np.concatenate(block_traces[0], axis=1))
+                filter_trace_blocks.append(np.concatenate(block_traces[1], axis=1))
+                ofmap_trace_blocks.append(np.concatenate(block_traces[2], axis=1))
+        pbar.close()
 
         if self.estimate_bandwidth_mode:
             # IDE shows warning as complete_all_prefetches is not implemented in read_buffer class
@@ -285,30 +752,68 @@ class double_buffered_scratchpad:
             self.ifmap_buf.complete_all_prefetches()
             self.filter_buf.complete_all_prefetches()
 
-        self.ofmap_buf.empty_all_buffers(ofmap_serviced_cycles[-1])
+        if numba_backend is not None:
+            numba_backend.write_back()
 
-        # Prepare the traces
-        ifmap_services_cycles_np = \
-            np.asarray(ifmap_serviced_cycles).reshape((len(ifmap_serviced_cycles), 1))
-        self.ifmap_trace_matrix = np.concatenate((ifmap_services_cycles_np, ifmap_demand_mat),
-                                                 axis=1)
+        self.ofmap_buf.empty_all_buffers(last_ofmap_serviced_cycle)
 
-        filter_services_cycles_np = \
-            np.asarray(filter_serviced_cycles).reshape((len(filter_serviced_cycles), 1))
-        self.filter_trace_matrix = np.concatenate((filter_services_cycles_np, filter_demand_mat),
-                                                  axis=1)
+        if keep_sram_traces:
+            self.ifmap_trace_matrix = stack_trace_blocks(ifmap_trace_blocks)
+            self.filter_trace_matrix = stack_trace_blocks(filter_trace_blocks)
+            self.ofmap_trace_matrix = stack_trace_blocks(ofmap_trace_blocks)
+        else:
+            self.ifmap_trace_matrix = np.zeros((1,1), dtype=int)
+            self.filter_trace_matrix = np.zeros((1,1), dtype=int)
+            self.ofmap_trace_matrix = np.zeros((1,1), dtype=int)
+
+        # Cycles and accesses of the folds which were not simulated
+        self.extrapolated_cycles = extrapolated_deltas[0]
+        self.stall_cycles += extrapolated_deltas[1]
+        self.extrapolated_dram_accesses = extrapolated_deltas[2:]
+        if self.num_folds_simulated < self.num_folds:
+            self.ifmap_sram_stop_cycle += self.extrapolated_cycles
+            self.filter_sram_stop_cycle += self.extrapolated_cycles
+            self.ofmap_sram_stop_cycle += self.extrapolated_cycles
+            if self.verbose:
+                print('Fast forward: simulated ' + str(self.num_folds_simulated) + ' of '
+                      + str(self.num_folds) + ' folds, steady state period of '
+                      + str(steady_state_period) + ' folds')
 
-        ofmap_services_cycles_np = \
-            np.asarray(ofmap_serviced_cycles).reshape((len(ofmap_serviced_cycles), 1))
-        self.ofmap_trace_matrix = np.concatenate((ofmap_services_cycles_np, ofmap_demand_mat),
-                                                 axis=1)
         #self.total_cycles = int(ofmap_serviced_cycles[-1][0])
         ## Probable fault in sanity check
-        self.total_cycles = int(max(ofmap_serviced_cycles))
+        self.total_cycles = int(max_ofmap_serviced_cycle + self.extrapolated_cycles)
 
         # END of serving demands from memory
         self.traces_valid = True
 
+    #
+    def update_sram_start_stop_cycles(self, block_traces, sram_cycles_found):
+        """
+        Method to update the SRAM start and stop cycles, ie. the cycles of the first and last
+        lines with a request, with the [cycles, demand] traces of the next block of ifmap, filter
+        and ofmap lines.
+        """
+        for operand_id, (cycles_np, demand_mat) in enumerate(block_traces):
+            request_lines = np.flatnonzero(np.any(demand_mat != -1, axis=1))
+            if request_lines.shape[0] == 0:
+                continue
+
+            start_cycle = cycles_np[request_lines[0]][0]
+            stop_cycle = cycles_np[request_lines[-1]][0]
+            if operand_id == 0:
+                if not sram_cycles_found[0]:
+                    self.ifmap_sram_start_cycle = start_cycle
+                self.ifmap_sram_stop_cycle = stop_cycle
+            elif operand_id == 1:
+                if not sram_cycles_found[1]:
+                    self.filter_sram_start_cycle = start_cycle
+                self.filter_sram_stop_cycle = stop_cycle
+            else:
+                if not sram_cycles_found[2]:
+                    self.ofmap_sram_start_cycle = start_cycle
+                self.ofmap_sram_stop_cycle = stop_cycle
+            sram_cycles_found[operand_id] = True
+
     # This is the trace computation logic of this memory system
     # Anand: This is too complex, perform the serve cycle by cycle for the requests
     def service_memory_requests_old(self, ifmap_demand_mat, filter_demand_mat, ofmap_demand_mat):
@@ -346,7 +851,7 @@ class double_buffered_scratchpad:
             # Find the number of lines till the ofmap_free_space is filled up
             count = 0
             while not count > ofmap_free_space:
-                this_line = ofmap_demand_mat[end_line_idx]
+                this_line = ofmap_demand_mat[end_line_idx].tolist()
                 for elem in this_line:
                     if not elem == -1:
                         count += 1
@@ -483,6 +988,15 @@ class double_buffered_scratchpad:
         assert self.traces_valid, 'Traces not generated yet'
         return int(self.stall_cycles)
 
+    #
+    def get_num_simulated_folds(self):
+        """
+        Method to get the number of folds simulated and the total number of folds, which differ
+        when the steady state folds were fast forwarded.
+        """
+        assert self.traces_valid, 'Traces not generated yet'
+        return self.num_folds_simulated, self.num_folds
+
     #
     def get_ifmap_sram_start_stop_cycles(self):
         """
@@ -491,6 +1005,10 @@ class double_buffered_scratchpad:
         """
         assert self.traces_valid, 'Traces not generated yet'
 
+        # These were tracked while servicing the demands
+        if not self.sram_traces_kept:
+            return self.ifmap_sram_start_cycle, self.ifmap_sram_stop_cycle
+
         done = False
         for ridx in range(self.ifmap_trace_matrix.shape[0]):
             if done:
@@ -524,6 +1042,10 @@ class double_buffered_scratchpad:
         """
         assert self.traces_valid, 'Traces not generated yet'
 
+        # These were tracked while servicing the demands
+        if not self.sram_traces_kept:
+            return self.filter_sram_start_cycle, self.filter_sram_stop_cycle
+
         done = False
         for ridx in range(self.filter_trace_matrix.shape[0]):
 
@@ -559,6 +1081,10 @@ class double_buffered_scratchpad:
         """
         assert self.traces_valid, 'Traces not generated yet'
 
+        # These were tracked while servicing the demands
+        if not self.sram_traces_kept:
+            return self.ofmap_sram_start_cycle, self.ofmap_sram_stop_cycle
+
         done = False
         for ridx in range(self.ofmap_trace_matrix.shape[0]):
             if done:
@@ -596,6 +1122,11 @@ class double_buffered_scratchpad:
         self.ifmap_dram_start_cycle, self.ifmap_dram_stop_cycle \
             = self.ifmap_buf.get_external_access_start_stop_cycles()
 
+        # Add the folds skipped by the fast forward
+        if self.num_folds_simulated < self.num_folds:
+            self.ifmap_dram_reads += self.extrapolated_dram_accesses[0]
+            self.ifmap_dram_stop_cycle += self.extrapolated_cycles
+
         return self.ifmap_dram_start_cycle, self.ifmap_dram_stop_cycle, self.ifmap_dram_reads
 
     #
@@ -610,6 +1141,11 @@ class double_buffered_scratchpad:
         self.filter_dram_start_cycle, self.filter_dram_stop_cycle \
             = self.filter_buf.get_external_access_start_stop_cycles()
 
+        # Add the folds skipped by the fast forward
+        if self.num_folds_simulated < self.num_folds:
+            self.filter_dram_reads += self.extrapolated_dram_accesses[1]
+            self.filter_dram_stop_cycle += self.extrapolated_cycles
+
         return self.filter_dram_start_cycle, self.filter_dram_stop_cycle, self.filter_dram_reads
 
     #
@@ -624,6 +1160,11 @@ class double_buffered_scratchpad:
         self.ofmap_dram_start_cycle, self.ofmap_dram_stop_cycle \
             = self.ofmap_buf.get_external_access_start_stop_cycles()
 
+        # Add the folds skipped by the fast forward
+        if self.num_folds_simulated < self.num_folds:
+            self.ofmap_dram_writes += self.extrapolated_dram_accesses[2]
+            self.ofmap_dram_stop_cycle += self.extrapolated_cycles
+
         return self.ofmap_dram_start_cycle, self.ofmap_dram_stop_cycle, self.ofmap_dram_writes
 
     #
@@ -702,6 +1243,7 @@ class double_buffered_scratchpad:
         Method to write the ifmap SRAM trace matrix to a file if trace_valid flag is set.
         """
         assert self.traces_valid, 'Traces not generated yet'
+        assert self.sram_traces_kept, 'SRAM traces were not kept'
         os.makedirs(os.path.dirname(filename), exist_ok=True)
         np.savetxt(filename, self.ifmap_trace_matrix, fmt='%i', delimiter=",")
 
@@ -711,6 +1253,7 @@ class double_buffered_scratchpad:
         Method to write the filter SRAM trace matrix to a file if trace_valid flag is set.
         """
         assert self.traces_valid, 'Traces not generated yet'
+        assert self.sram_traces_kept, 'SRAM traces were not kept'
         np.savetxt(filename, self.filter_trace_matrix, fmt='%i', delimiter=",")
 
     #
@@ -719,6 +1262,7 @@ class double_buffered_scratchpad:
         Method to write the Ofmap SRAM trace matrix to a file if trace_valid flag is set.
         """
         assert self.traces_valid, 'Traces not generated yet'
+        assert self.sram_traces_kept, 'SRAM traces were not kept'
         np.savetxt(filename, self.ofmap_trace_matrix, fmt='%i', delimiter=",")
 
     #
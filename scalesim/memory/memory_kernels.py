@@ -0,0 +1,358 @@
+"""
+This file contains the 'numba_memory_backend' class, which runs the memory simulation of the
+double buffered scratchpad with the numba compiled kernels of 'memory_kernels_numba'. It ports the
+state machine of the read buffers, the write buffer and the stall accounting to flat arrays, which
+are packed from the buffer objects before servicing the demands and written back to them after.
+The buffer classes remain the reference implementation, and the one used when numba is not
+installed or for the features the kernels do not model: the estimate bandwidth mode, the custom
+layouts and the Ramulator traces.
+"""
+
+import math
+
+import numpy as np
+
+
+# Read buffer parameters (int64 array)
+RD_LINE_INDEX_BASE = 0
+RD_NUM_LINES = 1
+RD_NUM_ACTIVE_BUF_LINES = 2
+RD_NUM_PREFETCH_BUF_LINES = 3
+RD_PREFETCH_REQ_LINES = 4
+RD_ACTIVE_BUF_SIZE = 5
+RD_REQ_GEN_BW = 6
+RD_HIT_LATENCY = 7
+RD_PORT_LATENCY = 8
+RD_NUM_PARAMS = 9
+
+# Read buffer state (int64 and float64 arrays)
+RD_ACTIVE_START = 0
+RD_ACTIVE_END = 1
+RD_PREFETCH_START = 2
+RD_PREFETCH_END = 3
+RD_NEXT_LINE = 4
+RD_NEXT_COL = 5
+RD_NUM_ACCESS = 6
+RD_NUM_TRACE_LINES = 7
+RD_NUM_STATES = 8
+RD_LAST_PREFETCH_CYCLE = 0
+
+# Write buffer parameters (int64 array)
+WR_REQ_GEN_BW = 0
+WR_ACTIVE_BUF_SIZE = 1
+WR_DRAIN_REQ_LINES = 2
+WR_PORT_LATENCY = 3
+WR_NUM_PARAMS = 4
+
+# Write buffer state (int64 and float64 arrays)
+WR_FREE_SPACE = 0
+WR_LINE_IDX = 1
+WR_NUM_TRACE_LINES = 2
+WR_DRAIN_START_LINE = 3
+WR_NUM_ACCESS = 4
+WR_NUM_CYCLES = 5
+WR_NUM_STATES = 6
+WR_DRAIN_END_CYCLE = 0
+
+# Warnings already printed by this process
+PRINTED_WARNINGS = set()
+
+
+#
+def get_memory_kernels():
+    """
+    Function to get the module of the numba compiled memory kernels. It is imported on first use,
+    so that numba is only loaded by the runs which use it. Returns None if numba is not installed.
+    """
+    try:
+        from scalesim.memory import memory_kernels_numba
+    except ImportError:
+        return None
+
+    return memory_kernels_numba
+
+
+#
+def print_warning_once(message):
+    """
+    Function to print a warning the first time it is seen by this process.
+    """
+    if message in PRINTED_WARNINGS:
+        return
+    PRINTED_WARNINGS.add(message)
+    print(message)
+
+
+class numba_memory_backend:
+    """
+    Class which services the demand lines of the ifmap, filter and ofmap buffers of a double
+    buffered scratchpad with the numba compiled memory kernels.
+    """
+    #
+    def __init__(self):
+        """
+        __init__ method
+        """
+        self.kernels = None
+        self.ifmap_buf = None
+        self.filter_buf = None
+        self.ofmap_buf = None
+
+        # Packed state of the buffers: (arrays, trace buffer) per read buffer, and
+        # (arrays, trace lines buffer, drain cycles buffer) for the write buffer
+        self.ifmap_state = None
+        self.filter_state = None
+        self.ofmap_state = None
+
+        self.params_set_flag = False
+
+    #
+    def set_params(self, ifmap_buf, filter_buf, ofmap_buf):
+        """
+        Method to set the buffers whose demands are serviced, and pack the state of the write
+        buffer. The read buffers are packed once their active buffers are filled, at the first
+        demand line.
+        """
+        self.kernels = get_memory_kernels()
+        assert self.kernels is not None, 'numba is not installed'
+
+        self.ifmap_buf = ifmap_buf
+        self.filter_buf = filter_buf
+        self.ofmap_buf = ofmap_buf
+
+        self.ifmap_state = None
+        self.filter_state = None
+        self.ofmap_state = self.pack_write_buffer(ofmap_buf)
+
+        self.params_set_flag = True
+
+    #
+    @staticmethod
+    def pack_read_buffer(read_buf):
+        """
+        Method to pack the parameters and the state of a read buffer, with a filled active
+        buffer, into flat arrays. The fetch matrix is copied if it is a view of the prefetch
+        matrix, since the kernels drop addresses from it.
+        """
+        read_buf.own_fetch_matrix()
+
+        params = np.zeros((RD_NUM_PARAMS,), dtype=np.int64)
+        params[RD_LINE_INDEX_BASE] = read_buf.line_index_base
+        params[RD_NUM_LINES] = read_buf.num_lines
+        params[RD_NUM_ACTIVE_BUF_LINES] = read_buf.num_active_buf_lines
+        params[RD_NUM_PREFETCH_BUF_LINES] = read_buf.num_prefetch_buf_lines
+        params[RD_PREFETCH_REQ_LINES] = \
+            math.ceil(read_buf.prefetch_buf_size / read_buf.req_gen_bandwidth)
+        params[RD_ACTIVE_BUF_SIZE] = read_buf.active_buf_size
+        params[RD_REQ_GEN_BW] = read_buf.req_gen_bandwidth
+        params[RD_HIT_LATENCY] = read_buf.hit_latency
+        params[RD_PORT_LATENCY] = read_buf.backing_buffer.get_latency()
+
+        state = np.zeros((RD_NUM_STATES,), dtype=np.int64)
+        state[RD_ACTIVE_START:RD_ACTIVE_END + 1] = read_buf.active_buffer_set_limits
+        state[RD_PREFETCH_START:RD_PREFETCH_END + 1] = read_buf.prefetch_buffer_set_limits
+        state[RD_NEXT_LINE] = read_buf.next_line_prefetch_idx
+        state[RD_NEXT_COL] = read_buf.next_col_prefetch_idx
+        state[RD_NUM_ACCESS] = read_buf.num_access
+        state[RD_NUM_TRACE_LINES] = read_buf.trace_matrix.shape[0]
+
+        fstate = np.zeros((1,), dtype=np.float64)
+        fstate[RD_LAST_PREFETCH_CYCLE] = read_buf.last_prefetch_cycle
+
+        trace_np = np.zeros((max(2 * read_buf.trace_matrix.shape[0], 16),
+                             read_buf.trace_matrix.shape[1]), dtype=np.float64)
+        trace_np[:read_buf.trace_matrix.shape[0]] = read_buf.trace_matrix
+
+        arrays = (read_buf.fetch_matrix, read_buf.line_index, read_buf.multi_line_ptr,
+                  read_buf.multi_line_lines, params, state, fstate)
+        return [arrays, trace_np]
+
+    #
+    @staticmethod
+    def unpack_read_buffer(read_buf, read_state):
+        """
+        Method to write the state of a read buffer back to it.
+        """
+        arrays, trace_np = read_state
+        state = arrays[5]
+        fstate = arrays[6]
+
+        read_buf.active_buffer_set_limits = [int(state[RD_ACTIVE_START]),
+                                             int(state[RD_ACTIVE_END])]
+        read_buf.prefetch_buffer_set_limits = [int(state[RD_PREFETCH_START]),
+                                               int(state[RD_PREFETCH_END])]
+        read_buf.next_line_prefetch_idx = int(state[RD_NEXT_LINE])
+        read_buf.next_col_prefetch_idx = int(state[RD_NEXT_COL])
+        read_buf.num_access = int(state[RD_NUM_ACCESS])
+        read_buf.last_prefetch_cycle = fstate[RD_LAST_PREFETCH_CYCLE]
+        read_buf.trace_matrix = np.copy(trace_np[:state[RD_NUM_TRACE_LINES]])
+
+    #
+    @staticmethod
+    def pack_write_buffer(write_buf):
+        """
+        Method to pack the parameters and the state of a write buffer into flat arrays. The lines
+        and the drain cycles are the buffers of the write buffer, the current line is a copy.
+        """
+        bandwidth = write_buf.req_gen_bandwidth
+
+        params = np.zeros((WR_NUM_PARAMS,), dtype=np.int64)
+        params[WR_REQ_GEN_BW] = bandwidth
+        params[WR_ACTIVE_BUF_SIZE] = write_buf.total_size_elems - write_buf.drain_buf_size
+        params[WR_DRAIN_REQ_LINES] = math.ceil(write_buf.drain_buf_size / bandwidth)
+        params[WR_PORT_LATENCY] = write_buf.backing_buffer.latency
+
+        # The buffers of the trace lines and of the drain cycles are handed over as they are
+        num_trace_lines = write_buf.num_trace_lines
+        lines_np = write_buf.trace_lines_np
+        num_cycles = write_buf.num_cycles
+        cycles_np = write_buf.cycles_np
+
+        current_line = np.ones((bandwidth,), dtype=np.float64) * -1
+        if write_buf.line_idx > 0:
+            current_line[:] = lines_np[num_trace_lines, :]
+
+        state = np.zeros((WR_NUM_STATES,), dtype=np.int64)
+        state[WR_FREE_SPACE] = write_buf.free_space
+        state[WR_LINE_IDX] = write_buf.line_idx
+        state[WR_NUM_TRACE_LINES] = num_trace_lines
+        state[WR_DRAIN_START_LINE] = write_buf.drain_buf_start_line_id
+        state[WR_NUM_ACCESS] = write_buf.num_access
+        state[WR_NUM_CYCLES] = num_cycles
+
+        fstate = np.zeros((1,), dtype=np.float64)
+        fstate[WR_DRAIN_END_CYCLE] = write_buf.drain_end_cycle
+
+        arrays = (params, state, fstate, current_line)
+        return [arrays, lines_np, cycles_np]
+
+    #
+    @staticmethod
+    def unpack_write_buffer(write_buf, write_state):
+        """
+        Method to write the state of a write buffer back to it, with the current line back in its
+        trace lines.
+        """
+        arrays, lines_np, cycles_np = write_state
+        state = arrays[1]
+        fstate = arrays[2]
+        current_line = arrays[3]
+
+        write_buf.trace_lines_np = lines_np
+        write_buf.num_trace_lines = int(state[WR_NUM_TRACE_LINES])
+        write_buf.line_idx = int(state[WR_LINE_IDX])
+        if write_buf.line_idx > 0:
+            write_buf.reserve_trace_lines(1)
+            write_buf.trace_lines_np[write_buf.num_trace_lines, :] = current_line
+
+        write_buf.cycles_np = cycles_np
+        write_buf.num_cycles = int(state[WR_NUM_CYCLES])
+        if write_buf.num_cycles > 0:
+            write_buf.trace_valid = True
+
+        write_buf.free_space = int(state[WR_FREE_SPACE])
+        write_buf.drain_buf_start_line_id = int(state[WR_DRAIN_START_LINE])
+        write_buf.num_access = int(state[WR_NUM_ACCESS])
+        write_buf.drain_end_cycle = fstate[WR_DRAIN_END_CYCLE]
+
+    #
+    def service_lines(self, ifmap_demand_mat, filter_demand_mat, ofmap_demand_mat, line_id,
+                      stall_cycles):
+        """
+        Method to service consecutive lines of demands, the first one being line line_id, with
+        stall_cycles stall cycles so far. Returns the cycles at which the ifmap, filter and ofmap
+        buffers service the lines, as column vectors, and the stall cycles after them. The access
+        counts of the buffers are kept up to date.
+        """
+        assert self.params_set_flag, 'Parameters are not set yet'
+
+        # The active buffers are filled at the first line, as by read_buffer.service_reads()
+        if self.ifmap_state is None:
+            if not self.ifmap_buf.active_buf_full_flag:
+                self.ifmap_buf.prefetch_active_buffer(start_cycle=float(line_id + stall_cycles))
+            self.ifmap_state = self.pack_read_buffer(self.ifmap_buf)
+        if self.filter_state is None:
+            if not self.filter_buf.active_buf_full_flag:
+                self.filter_buf.prefetch_active_buffer(start_cycle=float(line_id + stall_cycles))
+            self.filter_state = self.pack_read_buffer(self.filter_buf)
+
+        num_lines = ofmap_demand_mat.shape[0]
+        serviced_cycles_np = np.zeros((num_lines, 3), dtype=np.float64)
+        stall_cycles, self.ifmap_state[1], self.filter_state[1], self.ofmap_state[1], \
+            self.ofmap_state[2] = \
+            self.kernels.service_demand_lines(np.ascontiguousarray(ifmap_demand_mat),
+                                              np.ascontiguousarray(filter_demand_mat),
+                                              np.ascontiguousarray(ofmap_demand_mat),
+                                              line_id, stall_cycles,
+                                              self.ifmap_state[0], self.ifmap_state[1],
+                                              self.filter_state[0], self.filter_state[1],
+                                              self.ofmap_state[0], self.ofmap_state[1],
+                                              self.ofmap_state[2], serviced_cycles_np)
+
+        self.ifmap_buf.num_access = int(self.ifmap_state[0][5][RD_NUM_ACCESS])
+        self.filter_buf.num_access = int(self.filter_state[0][5][RD_NUM_ACCESS])
+        self.ofmap_buf.num_access = int(self.ofmap_state[0][1][WR_NUM_ACCESS])
+
+        return serviced_cycles_np[:, 0:1], serviced_cycles_np[:, 1:2], \
+            serviced_cycles_np[:, 2:3], int(stall_cycles)
+
+    #
+    def sync_fold_states(self):
+        """
+        Method to write the state of the buffers, but not their traces, back to them, so that the
+        fast forward mode can check it at the end of a fold. The kernels keep servicing the
+        demands from the packed state.
+        """
+        assert self.params_set_flag, 'Parameters are not set yet'
+
+        for read_buf, read_state in [(self.ifmap_buf, self.ifmap_state),
+                                     (self.filter_buf, self.filter_state)]:
+            if read_state is None:
+                continue
+            state = read_state[0][5]
+            read_buf.active_buffer_set_limits = [int(state[RD_ACTIVE_START]),
+                                                 int(state[RD_ACTIVE_END])]
+            read_buf.prefetch_buffer_set_limits = [int(state[RD_PREFETCH_START]),
+                                                   int(state[RD_PREFETCH_END])]
+            read_buf.next_line_prefetch_idx = int(state[RD_NEXT_LINE])
+            read_buf.next_col_prefetch_idx = int(state[RD_NEXT_COL])
+            read_buf.last_prefetch_cycle = read_state[0][6][RD_LAST_PREFETCH_CYCLE]
+
+        state = self.ofmap_state[0][1]
+        self.ofmap_buf.free_space = int(state[WR_FREE_SPACE])
+        self.ofmap_buf.line_idx = int(state[WR_LINE_IDX])
+        self.ofmap_buf.num_trace_lines = int(state[WR_NUM_TRACE_LINES])
+        self.ofmap_buf.drain_buf_start_line_id = int(state[WR_DRAIN_START_LINE])
+        self.ofmap_buf.drain_end_cycle = self.ofmap_state[0][2][WR_DRAIN_END_CYCLE]
+
+    #
+    def move_active_lines(self, ifmap_lines, filter_lines):
+        """
+        Method to move the active and prefetch buffers of the ifmap and filter buffers along their
+        fetch streams, as read_buffer.move_active_lines() does, in the packed state.
+        """
+        assert self.params_set_flag, 'Parameters are not set yet'
+
+        for read_buf, read_state, num_lines in [(self.ifmap_buf, self.ifmap_state, ifmap_lines),
+                                                (self.filter_buf, self.filter_state,
+                                                 filter_lines)]:
+            if read_state is None:
+                continue
+            read_buf.move_active_lines(num_lines)
+            state = read_state[0][5]
+            state[RD_ACTIVE_START:RD_ACTIVE_END + 1] = read_buf.active_buffer_set_limits
+            state[RD_PREFETCH_START:RD_PREFETCH_END + 1] = read_buf.prefetch_buffer_set_limits
+
+    #
+    def write_back(self):
+        """
+        Method to write the state of the buffers back to them, once the demands are serviced.
+        """
+        assert self.params_set_flag, 'Parameters are not set yet'
+
+        if self.ifmap_state is not None:
+            self.unpack_read_buffer(self.ifmap_buf, self.ifmap_state)
+        if self.filter_state is not None:
+            self.unpack_read_buffer(self.filter_buf, self.filter_state)
+        self.unpack_write_buffer(self.ofmap_buf, self.ofmap_state)
+        self.params_set_flag = False
@@ -0,0 +1,312 @@
+"""
+This module contains the numba compiled memory system of 'memory_kernels', which imports it on
+first use: the read buffers with their prefetches, the write buffer with its drains and the stall
+accounting of double_buffered_scratchpad, line by line of the demand matrices, over flat arrays.
+The compiled code is cached on disk, next to the module, so that it is only compiled by the first
+run. The state arrays are indexed with the constants of 'memory_kernels'.
+"""
+
+import numpy as np
+from numba import njit
+
+from scalesim.memory.memory_kernels import RD_LINE_INDEX_BASE, RD_NUM_LINES, \
+    RD_NUM_ACTIVE_BUF_LINES, RD_NUM_PREFETCH_BUF_LINES, RD_PREFETCH_REQ_LINES, \
+    RD_ACTIVE_BUF_SIZE, RD_REQ_GEN_BW, RD_HIT_LATENCY, RD_PORT_LATENCY, RD_ACTIVE_START, \
+    RD_ACTIVE_END, RD_PREFETCH_START, RD_PREFETCH_END, RD_NEXT_LINE, RD_NEXT_COL, \
+    RD_NUM_ACCESS, RD_NUM_TRACE_LINES, RD_LAST_PREFETCH_CYCLE, WR_REQ_GEN_BW, \
+    WR_ACTIVE_BUF_SIZE, WR_DRAIN_REQ_LINES, WR_PORT_LATENCY, WR_FREE_SPACE, WR_LINE_IDX, \
+    WR_NUM_TRACE_LINES, WR_DRAIN_START_LINE, WR_NUM_ACCESS, WR_NUM_CYCLES, WR_DRAIN_END_CYCLE
+
+
+#
+@njit(cache=True)
+def reserve_lines(lines_np, num_used, num_new):
+    """
+    Function to get a buffer of lines with room for num_new more lines after the num_used first
+    ones, the given one or a copy of it twice as large.
+    """
+    if num_used + num_new <= lines_np.shape[0]:
+        return lines_np
+
+    new_lines_np = np.empty((max(2 * lines_np.shape[0], num_used + num_new), lines_np.shape[1]),
+                            dtype=lines_np.dtype)
+    new_lines_np[:num_used] = lines_np[:num_used]
+    return new_lines_np
+
+
+#
+@njit(cache=True)
+def reserve_elems(elems_np, num_used, num_new):
+    """
+    Function to get a buffer of elements with room for num_new more elements after the num_used
+    first ones, the given one or a copy of it twice as large.
+    """
+    if num_used + num_new <= elems_np.shape[0]:
+        return elems_np
+
+    new_elems_np = np.empty((max(2 * elems_np.shape[0], num_used + num_new),),
+                            dtype=elems_np.dtype)
+    new_elems_np[:num_used] = elems_np[:num_used]
+    return new_elems_np
+
+
+#
+@njit(cache=True)
+def line_is_active(line_id, start_id, end_id):
+    """
+    Function to check if a line of the fetch stream is in the active buffer.
+    """
+    if start_id < end_id:
+        return start_id <= line_id < end_id
+    return line_id >= start_id or line_id < end_id
+
+
+#
+@njit(cache=True)
+def active_buffer_hit(rd_buf, addr):
+    """
+    Numba version of read_buffer.active_buffer_hit().
+    """
+    _, line_index, multi_line_ptr, multi_line_lines, params, state, _ = rd_buf
+
+    index_id = addr - params[RD_LINE_INDEX_BASE]
+    if index_id < 0 or index_id >= line_index.shape[0]:
+        return False
+
+    line_id = line_index[index_id]
+    if line_id == -1:
+        return False
+
+    start_id = state[RD_ACTIVE_START]
+    end_id = state[RD_ACTIVE_END]
+    if line_id < -1:
+        slot = -2 - line_id
+        for entry in range(multi_line_ptr[slot], multi_line_ptr[slot + 1]):
+            if line_is_active(multi_line_lines[entry], start_id, end_id):
+                return True
+        return False
+
+    return line_is_active(line_id, start_id, end_id)
+
+
+#
+@njit(cache=True)
+def new_prefetch(rd_buf, trace_np):
+    """
+    Numba version of read_buffer.new_prefetch(). The prefetched lines are added to the trace
+    buffer, which is returned.
+    """
+    fetch_matrix, _, _, _, params, state, fstate = rd_buf
+
+    # 1. Rewrite the active buffer
+    num_lines = params[RD_NUM_LINES]
+    active_start = (state[RD_ACTIVE_START] + params[RD_NUM_PREFETCH_BUF_LINES]) % num_lines
+    active_end = (active_start + params[RD_NUM_ACTIVE_BUF_LINES]) % num_lines
+    state[RD_ACTIVE_START] = active_start
+    state[RD_ACTIVE_END] = active_end
+    state[RD_PREFETCH_START] = active_end
+    state[RD_PREFETCH_END] = (active_end + params[RD_NUM_PREFETCH_BUF_LINES]) % num_lines
+
+    # 2. Create the request
+    start_idx = state[RD_NEXT_LINE]
+    req_lines = params[RD_PREFETCH_REQ_LINES]
+    end_idx = start_idx + req_lines
+    bandwidth = params[RD_REQ_GEN_BW]
+    requested_data_size = req_lines * bandwidth
+    state[RD_NUM_ACCESS] += requested_data_size
+
+    # Circling back, the requests are a copy of the lines, otherwise the lines themselves
+    fetch_lines = fetch_matrix.shape[0]
+    circle_back = end_idx > fetch_lines
+    num_req_lines = req_lines
+    if circle_back:
+        num_req_lines = fetch_lines - start_idx + min(end_idx - fetch_lines, start_idx)
+    if num_req_lines != req_lines or req_lines == 0:
+        raise ValueError('The prefetch requests and cycles do not match')
+
+    # 3. and 4. Request cycles and responses, added to the trace
+    first_line = state[RD_NUM_TRACE_LINES]
+    trace_np = reserve_lines(trace_np, first_line, req_lines)
+    last_prefetch_cycle = fstate[RD_LAST_PREFETCH_CYCLE]
+    for i in range(req_lines):
+        src_line = start_idx + i
+        if src_line >= fetch_lines:
+            src_line -= fetch_lines
+        trace_np[first_line + i, 0] = last_prefetch_cycle + i + 1 + params[RD_PORT_LATENCY]
+        for col in range(bandwidth):
+            trace_np[first_line + i, col + 1] = fetch_matrix[src_line, col]
+
+    # Drop the addresses of the first line included in previous fetches, and the excess ones of
+    # the last line
+    next_col = state[RD_NEXT_COL]
+    if next_col > 0:
+        trace_np[first_line, 1:next_col + 1] = -1
+        if not circle_back:
+            fetch_matrix[start_idx, :next_col] = -1
+
+    if requested_data_size > params[RD_ACTIVE_BUF_SIZE]:
+        valid_cols = params[RD_ACTIVE_BUF_SIZE] % bandwidth
+        trace_np[first_line + req_lines - 1, valid_cols + 1:] = -1
+        if not circle_back:
+            fetch_matrix[end_idx - 1, valid_cols:] = -1
+
+    # 5. Update the variables
+    fstate[RD_LAST_PREFETCH_CYCLE] = last_prefetch_cycle + req_lines + params[RD_PORT_LATENCY]
+    state[RD_NUM_TRACE_LINES] = first_line + req_lines
+
+    if requested_data_size > params[RD_ACTIVE_BUF_SIZE]:
+        state[RD_NEXT_LINE] = req_lines % fetch_lines
+    else:
+        state[RD_NEXT_LINE] = (req_lines + 1) % fetch_lines
+
+    return trace_np
+
+
+#
+@njit(cache=True)
+def service_read_line(rd_buf, trace_np, demand_mat, row, cycle):
+    """
+    Numba version of read_buffer.service_reads() for one line of requests. Returns the cycle at
+    which the line is serviced and the trace buffer.
+    """
+    _, _, _, _, params, _, fstate = rd_buf
+
+    offset = float(params[RD_HIT_LATENCY])
+    for col in range(demand_mat.shape[1]):
+        addr = demand_mat[row, col]
+        if addr == -1:
+            continue
+
+        while not active_buffer_hit(rd_buf, addr):
+            trace_np = new_prefetch(rd_buf, trace_np)
+            potential_stall_cycles = fstate[RD_LAST_PREFETCH_CYCLE] - (cycle + offset)
+            offset += potential_stall_cycles
+            if potential_stall_cycles > 0:
+                offset += potential_stall_cycles
+
+    return cycle + offset, trace_np
+
+
+#
+@njit(cache=True)
+def store_current_line(wr_buf, lines_np):
+    """
+    Function to add the current line of the write buffer to its trace lines and start a new one.
+    Returns the trace lines buffer.
+    """
+    _, state, _, current_line = wr_buf
+
+    num_trace_lines = state[WR_NUM_TRACE_LINES]
+    lines_np = reserve_lines(lines_np, num_trace_lines, 1)
+    lines_np[num_trace_lines, :] = current_line
+    state[WR_NUM_TRACE_LINES] = num_trace_lines + 1
+
+    current_line[:] = -1
+    state[WR_LINE_IDX] = 0
+    return lines_np
+
+
+#
+@njit(cache=True)
+def empty_drain_buf(wr_buf, lines_np, cycles_np, empty_start_cycle):
+    """
+    Numba version of write_buffer.empty_drain_buf(). Returns the cycle at which the drain ends and
+    the buffer of the drain cycles.
+    """
+    params, state, _, _ = wr_buf
+
+    drain_start_line = state[WR_DRAIN_START_LINE]
+    drain_end_line = min(drain_start_line + params[WR_DRAIN_REQ_LINES],
+                         state[WR_NUM_TRACE_LINES])
+    num_lines = drain_end_line - drain_start_line
+    if num_lines <= 0:
+        raise ValueError('There are no lines to drain')
+
+    data_sz_to_drain = num_lines * params[WR_REQ_GEN_BW]
+    for col in range(params[WR_REQ_GEN_BW]):
+        if lines_np[drain_end_line - 1, col] == -1:
+            data_sz_to_drain -= 1
+    state[WR_NUM_ACCESS] += data_sz_to_drain
+
+    num_cycles = state[WR_NUM_CYCLES]
+    cycles_np = reserve_elems(cycles_np, num_cycles, num_lines)
+    for x in range(num_lines):
+        cycles_np[num_cycles + x] = x + empty_start_cycle + params[WR_PORT_LATENCY]
+    state[WR_NUM_CYCLES] = num_cycles + num_lines
+
+    state[WR_FREE_SPACE] += data_sz_to_drain
+    state[WR_DRAIN_START_LINE] = drain_end_line
+
+    return cycles_np[num_cycles + num_lines - 1], cycles_np
+
+
+#
+@njit(cache=True)
+def service_write_line(wr_buf, lines_np, cycles_np, demand_mat, row, cycle):
+    """
+    Numba version of write_buffer.service_writes() for one line of requests. Returns the cycle at
+    which the line is serviced, the trace lines buffer and the buffer of the drain cycles.
+    """
+    params, state, fstate, current_line = wr_buf
+
+    current_cycle = cycle
+    for col in range(demand_mat.shape[1]):
+        elem = demand_mat[row, col]
+        if elem == -1:
+            continue
+
+        current_line[state[WR_LINE_IDX]] = elem
+        state[WR_LINE_IDX] += 1
+        state[WR_FREE_SPACE] -= 1
+        if not state[WR_LINE_IDX] < params[WR_REQ_GEN_BW]:
+            lines_np = store_current_line(wr_buf, lines_np)
+
+        if current_cycle < fstate[WR_DRAIN_END_CYCLE]:
+            if not state[WR_FREE_SPACE] > 0:
+                current_cycle = fstate[WR_DRAIN_END_CYCLE]
+
+        elif state[WR_FREE_SPACE] < params[WR_ACTIVE_BUF_SIZE]:
+            if not state[WR_LINE_IDX] == 0:
+                lines_np = store_current_line(wr_buf, lines_np)
+            drain_end_cycle, cycles_np = empty_drain_buf(wr_buf, lines_np, cycles_np,
+                                                         current_cycle)
+            fstate[WR_DRAIN_END_CYCLE] = drain_end_cycle
+
+    return current_cycle, lines_np, cycles_np
+
+
+#
+@njit(cache=True)
+def service_demand_lines(ifmap_demand_mat, filter_demand_mat, ofmap_demand_mat, first_line_id,
+                         stall_cycles, ifmap_buf, ifmap_trace_np, filter_buf, filter_trace_np,
+                         ofmap_buf, ofmap_lines_np, ofmap_cycles_np, serviced_cycles_np):
+    """
+    Numba version of the loop of double_buffered_scratchpad.service_memory_request_blocks() over
+    the lines of a block of demands. The cycles at which every line is serviced by the ifmap,
+    filter and ofmap buffers are written to the rows of serviced_cycles_np. Returns the stall
+    cycles and the trace buffers.
+    """
+    ifmap_hit_latency = ifmap_buf[4][RD_HIT_LATENCY]
+    filter_hit_latency = filter_buf[4][RD_HIT_LATENCY]
+
+    for row in range(ofmap_demand_mat.shape[0]):
+        cycle = float(first_line_id + row + stall_cycles)
+
+        ifmap_cycle, ifmap_trace_np = service_read_line(ifmap_buf, ifmap_trace_np,
+                                                        ifmap_demand_mat, row, cycle)
+        filter_cycle, filter_trace_np = service_read_line(filter_buf, filter_trace_np,
+                                                          filter_demand_mat, row, cycle)
+        ofmap_cycle, ofmap_lines_np, ofmap_cycles_np = \
+            service_write_line(ofmap_buf, ofmap_lines_np, ofmap_cycles_np, ofmap_demand_mat, row,
+                               cycle)
+
+        serviced_cycles_np[row, 0] = ifmap_cycle
+        serviced_cycles_np[row, 1] = filter_cycle
+        serviced_cycles_np[row, 2] = ofmap_cycle
+
+        ifmap_stalls = ifmap_cycle - cycle - ifmap_hit_latency
+        filter_stalls = filter_cycle - cycle - filter_hit_latency
+        ofmap_stalls = ofmap_cycle - cycle
+        stall_cycles += int(max(ifmap_stalls, filter_stalls, ofmap_stalls))
+
+    return stall_cycles, ifmap_trace_np, filter_trace_np, ofmap_lines_np, ofmap_cycles_np
@@ -36,8 +36,25 @@ class read_buffer:
         self.req_gen_bandwidth = 100            # words per cycle
 
         # Status of the buffer
-        self.hashed_buffer = {}
+        # Index of the line of the fetch stream holding each address: the entry of addr is at
+        # addr - line_index_base, -1 if the address is not fetched and -2 - k if it is held by
+        # several lines, which are then the k-th list of multi_line_lines
+        self.line_index_base = 0
+        self.line_index = np.full((1,), -1, dtype=np.int32)
+        self.line_index_view = memoryview(self.line_index)
+        # Position of each address in its line for the bank model of the layout evaluation
+        self.col_index = np.full((1,), -1, dtype=np.int32)
+        self.col_index_view = memoryview(self.col_index)
+        # Lines, in increasing order, and positions of the addresses held by several lines: the
+        # k-th list is at multi_line_ptr[k]:multi_line_ptr[k + 1]
+        self.multi_line_ptr = np.zeros((1,), dtype=np.int64)
+        self.multi_line_lines = np.zeros((0,), dtype=np.int64)
+        self.multi_line_cols = np.zeros((0,), dtype=np.int64)
+        self.multi_line_ptr_view = memoryview(self.multi_line_ptr)
+        self.multi_line_lines_view = memoryview(self.multi_line_lines)
+        self.multi_line_cols_view = memoryview(self.multi_line_cols)
         self.num_lines = 0
+        self.num_line_elems = 1
         self.num_active_buf_lines = 1
         self.num_prefetch_buf_lines = 1
         self.active_buffer_set_limits = []
@@ -45,6 +62,9 @@ class read_buffer:
 
         # Variables to enable prefetching
         self.fetch_matrix = np.ones((1, 1))
+        # The fetch matrix is a view of the prefetch matrix till the first addresses are dropped
+        # from it
+        self.fetch_matrix_is_view = False
         self.last_prefetch_cycle = -1
         self.next_line_prefetch_idx = 0
         self.next_col_prefetch_idx = 0
@@ -119,12 +139,23 @@ class read_buffer:
         self.req_gen_bandwidth = 100  # words per cycle
 
         # Status of the buffer
-        self.hashed_buffer = {}
+        self.line_index_base = 0
+        self.line_index = np.full((1,), -1, dtype=np.int32)
+        self.line_index_view = memoryview(self.line_index)
+        self.col_index = np.full((1,), -1, dtype=np.int32)
+        self.col_index_view = memoryview(self.col_index)
+        self.multi_line_ptr = np.zeros((1,), dtype=np.int64)
+        self.multi_line_lines = np.zeros((0,), dtype=np.int64)
+        self.multi_line_cols = np.zeros((0,), dtype=np.int64)
+        self.multi_line_ptr_view = memoryview(self.multi_line_ptr)
+        self.multi_line_lines_view = memoryview(self.multi_line_lines)
+        self.multi_line_cols_view = memoryview(self.multi_line_cols)
         self.active_buffer_set_limits = []
         self.prefetch_buffer_set_limits = []
 
         # Variables to enable prefetching
         self.fetch_matrix = np.ones((1, 1))
+        self.fetch_matrix_is_view = False
         self.last_prefetch_cycle = -1
         self.next_line_prefetch_idx = 0
         self.next_col_prefetch_idx = 0
@@ -149,62 +180,65 @@ class read_buffer:
         # The operand matrix determines what to pre-fetch into both active and prefetch buffers
         # In 'user' mode, this will be set in the set_params
 
+        # The prefetch matrix is split in row major order into lines of req_gen_bandwidth
+        # elements, the last line is padded with null requests. When it fills whole lines, the
+        # fetch matrix is a view of it.
         num_elems = fetch_matrix_np.shape[0] * fetch_matrix_np.shape[1]
         num_lines = int(math.ceil(num_elems / self.req_gen_bandwidth))
-        self.fetch_matrix = np.ones((num_lines, self.req_gen_bandwidth)) * -1
+        fetch_elems = fetch_matrix_np.reshape(-1)
 
-        # Put stuff into the fetch matrix
-        # This is done to ensure that there is no shape mismatch
-        # Not sure if this is the optimal way to do it or not
-        for i in range(num_elems):
-            src_row = math.floor(i / fetch_matrix_np.shape[1])
-            src_col = math.floor(i % fetch_matrix_np.shape[1])
-
-            dest_row = math.floor(i / self.req_gen_bandwidth)
-            dest_col = math.floor(i % self.req_gen_bandwidth)
-
-            self.fetch_matrix[dest_row][dest_col] = fetch_matrix_np[src_row][src_col]
+        if num_lines * self.req_gen_bandwidth == num_elems:
+            self.fetch_matrix = fetch_elems.reshape((num_lines, self.req_gen_bandwidth))
+            self.fetch_matrix_is_view = np.may_share_memory(self.fetch_matrix, fetch_matrix_np)
+        else:
+            self.fetch_matrix = np.full((num_lines, self.req_gen_bandwidth), -1,
+                                        dtype=fetch_matrix_np.dtype)
+            self.fetch_matrix.reshape(-1)[:num_elems] = fetch_elems
+            self.fetch_matrix_is_view = False
 
         # Once the fetch matrices are set, populate the data structure for faster lookups and
         # servicing
         self.prepare_hashed_buffer()
 
+    #
+    def own_fetch_matrix(self):
+        """
+        Method to copy the fetch matrix if it is a view of the prefetch matrix, before addresses
+        are dropped from it, so that the prefetch matrix is left as it is.
+        """
+        if self.fetch_matrix_is_view:
+            self.fetch_matrix = self.fetch_matrix.copy()
+            self.fetch_matrix_is_view = False
+
     #
     def prepare_hashed_buffer(self):
-        # layout modeling: hashed_buffer is being modified to serve as on-chip buffer.
+        # layout modeling: the lines are being modified to serve as on-chip buffer.
         """
-        Method to convert the fetch matrix into a hashed buffer for fast lookups.
+        Method to split the fetch matrix into lines of the buffer and index the line of every
+        address for fast lookups. The addresses of an operand sit in a dense range, the index is an
+        array over that range.
         """
         elems_per_set = math.ceil(self.total_size_elems / 100)
         if self.enable_layout_evaluation:
             elems_per_set = self.req_gen_bandwidth
-        
-        prefetch_rows = self.fetch_matrix.shape[0]
-        prefetch_cols = self.fetch_matrix.shape[1]
-
-        line_id = 0
-        elem_ctr = 0
-        current_line = set()
-
-        for r in range(prefetch_rows):
-            for c in range(prefetch_cols):
-                elem = self.fetch_matrix[r][c]
 
-                if not elem == -1:
-                    current_line.add(elem)
-                    elem_ctr += 1
+        # Every line holds elems_per_set valid addresses of the fetch stream, in row major order.
+        # The last line holds the remaining ones and may be empty.
+        fetch_addrs = self.fetch_matrix.ravel()
+        fetch_addrs = fetch_addrs[fetch_addrs != -1].astype(np.int64)
+        fetch_lines = np.arange(fetch_addrs.shape[0], dtype=np.int64) // elems_per_set
+        num_lines = fetch_addrs.shape[0] // elems_per_set + 1
 
-                if not elem_ctr < elems_per_set:    # ie > or =
-                    self.hashed_buffer[line_id] = current_line
-                    line_id += 1
-                    elem_ctr = 0
-                    current_line = set()        # new set
+        # The position of an address in its line is the one in the fetch stream, or the one seen by
+        # the bank model with the layout evaluation
+        fetch_cols = np.arange(fetch_addrs.shape[0], dtype=np.int64) % elems_per_set
+        if self.enable_layout_evaluation:
+            fetch_cols = self.get_line_positions(fetch_addrs, elems_per_set)
 
-        self.hashed_buffer[line_id] = current_line
+        self.build_line_index(fetch_addrs, fetch_lines, fetch_cols)
 
         max_num_active_buf_lines = int(math.ceil(self.active_buf_size / elems_per_set))
         max_num_prefetch_buf_lines = int(math.ceil(self.prefetch_buf_size / elems_per_set))
-        num_lines = line_id + 1
 
         if num_lines > max_num_active_buf_lines:
             self.num_active_buf_lines = max_num_active_buf_lines
@@ -219,8 +253,163 @@ class read_buffer:
             self.num_prefetch_buf_lines = remaining_lines
 
         self.num_lines = num_lines
+        self.num_line_elems = elems_per_set
         self.hashed_buffer_valid = True
 
+    #
+    @staticmethod
+    def get_line_positions(fetch_addrs, elems_per_set):
+        """
+        Method to get the position of every address within its line, as seen by the bank model of
+        the layout evaluation: the lines are sets of addresses and the position is the one of the
+        address when iterating over the set.
+        """
+        fetch_cols = np.zeros(fetch_addrs.shape, dtype=np.int64)
+        fetch_list = fetch_addrs.tolist()
+        for line_start in range(0, len(fetch_list), elems_per_set):
+            line_addrs = fetch_list[line_start:line_start + elems_per_set]
+            positions = {addr: pos for pos, addr in enumerate(set(line_addrs))}
+            fetch_cols[line_start:line_start + len(line_addrs)] = \
+                [positions[addr] for addr in line_addrs]
+
+        return fetch_cols
+
+    #
+    def build_line_index(self, fetch_addrs, fetch_lines, fetch_cols):
+        """
+        Method to build the array mapping every address to its line and its position in the line.
+        The addresses found in more than one line are kept aside with all their lines.
+        """
+        if fetch_addrs.shape[0] == 0:
+            self.line_index_base = 0
+            self.line_index = np.full((1,), -1, dtype=np.int32)
+            self.col_index = np.full((1,), -1, dtype=np.int32)
+            self.set_multi_line_lists(np.zeros((1,), dtype=np.int64),
+                                      np.zeros((0,), dtype=np.int64),
+                                      np.zeros((0,), dtype=np.int64))
+            self.line_index_view = memoryview(self.line_index)
+            self.col_index_view = memoryview(self.col_index)
+            return
+
+        self.line_index_base = int(np.amin(fetch_addrs))
+        span = int(np.amax(fetch_addrs)) - self.line_index_base + 1
+        self.line_index = np.full((span,), -1, dtype=np.int32)
+        self.col_index = np.full((span,), -1, dtype=np.int32)
+
+        # The stable sort keeps the lines of an address in increasing order, and the first
+        # position of the address in each line first
+        order = np.argsort(fetch_addrs, kind='stable')
+        sorted_addrs = fetch_addrs[order]
+        sorted_lines = fetch_lines[order]
+        sorted_cols = fetch_cols[order]
+        first = np.ones(sorted_addrs.shape, dtype=bool)
+        first[1:] = sorted_addrs[1:] != sorted_addrs[:-1]
+        new_line = np.ones(sorted_addrs.shape, dtype=bool)
+        new_line[1:] = np.logical_or(first[1:], sorted_lines[1:] != sorted_lines[:-1])
+
+        # One entry per line of every address
+        entry_lines = sorted_lines[new_line]
+        entry_cols = sorted_cols[new_line]
+        addr_starts = np.flatnonzero(first[new_line])
+        num_entries = np.diff(np.append(addr_starts, entry_lines.shape[0]))
+
+        index_ids = sorted_addrs[first] - self.line_index_base
+        self.line_index[index_ids] = entry_lines[addr_starts]
+        self.col_index[index_ids] = entry_cols[addr_starts]
+
+        # Addresses repeated in a later line
+        multi = num_entries > 1
+        num_multi = int(np.count_nonzero(multi))
+        self.line_index[index_ids[multi]] = -2 - np.arange(num_multi)
+
+        multi_entries = np.repeat(multi, num_entries)
+        multi_line_ptr = np.zeros((num_multi + 1,), dtype=np.int64)
+        multi_line_ptr[1:] = np.cumsum(num_entries[multi])
+        self.set_multi_line_lists(multi_line_ptr, entry_lines[multi_entries].astype(np.int64),
+                                  entry_cols[multi_entries].astype(np.int64))
+
+        self.line_index_view = memoryview(self.line_index)
+        self.col_index_view = memoryview(self.col_index)
+
+    #
+    def set_multi_line_lists(self, multi_line_ptr, multi_line_lines, multi_line_cols):
+        """
+        Method to set the lists of lines and positions of the addresses held by several lines.
+        """
+        self.multi_line_ptr = multi_line_ptr
+        self.multi_line_lines = multi_line_lines
+        self.multi_line_cols = multi_line_cols
+        self.multi_line_ptr_view = memoryview(self.multi_line_ptr)
+        self.multi_line_lines_view = memoryview(self.multi_line_lines)
+        self.multi_line_cols_view = memoryview(self.multi_line_cols)
+
+    #
+    def get_active_line(self, addr):
+        """
+        Method to get the line holding the address in the active buffer and the position of the
+        address in it, or -1, -1 if it is not in the active buffer. When several lines hold it,
+        the first one from the start of the active buffer is returned.
+        """
+        index_id = addr - self.line_index_base
+        if index_id < 0 or index_id >= len(self.line_index_view):
+            return -1, -1
+
+        line_id = self.line_index_view[index_id]
+        if line_id == -1:
+            return -1, -1
+
+        start_id, end_id = self.active_buffer_set_limits
+        if line_id < -1:
+            # Lines past the start first, then the ones before the end when the buffer wraps around
+            first_entry = self.multi_line_ptr_view[-2 - line_id]
+            last_entry = self.multi_line_ptr_view[-1 - line_id]
+            lines = self.multi_line_lines_view[first_entry:last_entry]
+            cols = self.multi_line_cols_view[first_entry:last_entry]
+            for line_id, col_id in zip(lines, cols):
+                if start_id <= line_id and (line_id < end_id or not start_id < end_id):
+                    return line_id, col_id
+            if not start_id < end_id:
+                for line_id, col_id in zip(lines, cols):
+                    if line_id < end_id:
+                        return line_id, col_id
+            return -1, -1
+
+        if start_id < end_id:
+            if start_id <= line_id < end_id:
+                return line_id, self.col_index_view[index_id]
+        elif line_id >= start_id or line_id < end_id:
+            return line_id, self.col_index_view[index_id]
+
+        return -1, -1
+
+    #
+    def get_stream_position(self, addr):
+        """
+        Method to get the position of the address in elements of the fetch stream from the start
+        of the active buffer, whether it is in the active buffer or not, or -1 if it is not
+        fetched. When several lines hold it, the first one from the start of the active buffer is
+        taken.
+        """
+        index_id = addr - self.line_index_base
+        if addr == -1 or index_id < 0 or index_id >= len(self.line_index_view):
+            return -1
+
+        line_id = self.line_index_view[index_id]
+        if line_id == -1:
+            return -1
+
+        lines = [line_id]
+        cols = [self.col_index_view[index_id]]
+        if line_id < -1:
+            first_entry = self.multi_line_ptr_view[-2 - line_id]
+            last_entry = self.multi_line_ptr_view[-1 - line_id]
+            lines = self.multi_line_lines_view[first_entry:last_entry]
+            cols = self.multi_line_cols_view[first_entry:last_entry]
+
+        start_id = self.active_buffer_set_limits[0]
+        return min([int((line_id - start_id) % self.num_lines) * self.num_line_elems + int(col_id)
+                    for line_id, col_id in zip(lines, cols)])
+
     #
     def active_buffer_hit(self, addr):
         """
@@ -228,47 +417,89 @@ class read_buffer:
         """
         assert self.active_buf_full_flag, 'Active buffer is not ready yet'
 
-        start_id, end_id = self.active_buffer_set_limits
         if self.enable_layout_evaluation:
-          if start_id < end_id:
-              for line_id in range(start_id, end_id):
-                  this_set = self.hashed_buffer[line_id]      # O(1) --> accessing hash
-                  if addr in this_set:                        # Checking in a set(), O(1) lookup
-                      return line_id, list(this_set).index(addr)
-
-          else:
-              for line_id in range(start_id, self.num_lines):
-                  this_set = self.hashed_buffer[line_id]  # O(1) --> accessing hash
-                  if addr in this_set:  # Checking in a set(), O(1) lookup
-                      return line_id, list(this_set).index(addr)
-
-              for line_id in range(end_id):
-                  this_set = self.hashed_buffer[line_id]  # O(1) --> accessing hash
-                  if addr in this_set:  # Checking in a set(), O(1) lookup
-                      return line_id, list(this_set).index(addr)
-          # Fixing for ISSUE #14
-          # return True
-          return -1, -1
-        else:
-          if start_id < end_id:
-              for line_id in range(start_id, end_id):
-                  this_set = self.hashed_buffer[line_id]      # O(1) --> accessing hash
-                  if addr in this_set:                        # Checking in a set(), O(1) lookup
-                      return True
-
-          else:
-              for line_id in range(start_id, self.num_lines):
-                  this_set = self.hashed_buffer[line_id]  # O(1) --> accessing hash
-                  if addr in this_set:  # Checking in a set(), O(1) lookup
-                      return True
-
-              for line_id in range(end_id):
-                  this_set = self.hashed_buffer[line_id]  # O(1) --> accessing hash
-                  if addr in this_set:  # Checking in a set(), O(1) lookup
-                      return True
-          # Fixing for ISSUE #14
-          # return True
-          return False
+            return self.get_active_line(addr)
+
+        index_id = addr - self.line_index_base
+        if index_id < 0 or index_id >= len(self.line_index_view):
+            return False
+
+        line_id = self.line_index_view[index_id]
+        if line_id == -1:
+            return False
+        if line_id < -1:
+            return not self.get_active_line(addr)[0] == -1
+
+        start_id, end_id = self.active_buffer_set_limits
+        if start_id < end_id:
+            return start_id <= line_id < end_id
+        return line_id >= start_id or line_id < end_id
+
+    #
+    def lines_in_active_buffer(self, line_ids):
+        """
+        Method to check, for an array of lines of the fetch stream, which ones are in the active
+        buffer.
+        """
+        start_id, end_id = self.active_buffer_set_limits
+        if start_id < end_id:
+            return np.logical_and(line_ids >= start_id, line_ids < end_id)
+
+        return np.logical_and(line_ids >= 0,
+                              np.logical_or(line_ids >= start_id, line_ids < end_id))
+
+    #
+    def get_num_hit_lines(self, incoming_requests_arr_np):
+        """
+        Method to get the number of leading lines of requests whose addresses are all hits in the
+        active buffer, ie. which are serviced with the hit latency and leave the buffer as it is.
+        The line of every address is looked up in the line index at once, the addresses held by
+        several lines are hits if any of their lines is active. Such lines of requests can be
+        serviced together with service_hit_reads(). The layout evaluation models the bank
+        conflicts of every line of requests, none are serviced together.
+        """
+        if not self.active_buf_full_flag or self.enable_layout_evaluation:
+            return 0
+
+        num_lines = incoming_requests_arr_np.shape[0]
+        index_ids = incoming_requests_arr_np.astype(np.int64) - self.line_index_base
+        valid = incoming_requests_arr_np != -1
+        indexed = np.logical_and(valid, np.logical_and(index_ids >= 0,
+                                                       index_ids < self.line_index.shape[0]))
+
+        # The addresses which are not fetched are misses
+        line_ids = np.full(index_ids.shape, -1, dtype=np.int64)
+        line_ids[indexed] = self.line_index[index_ids[indexed]]
+        hits = self.lines_in_active_buffer(line_ids)
+
+        multi = line_ids < -1
+        if np.any(multi):
+            slots = -2 - line_ids[multi]
+            first_entries = self.multi_line_ptr[slots]
+            num_entries = self.multi_line_ptr[slots + 1] - first_entries
+            list_starts = np.cumsum(num_entries) - num_entries
+            entry_ids = np.repeat(first_entries - list_starts, num_entries) \
+                        + np.arange(int(np.sum(num_entries)))
+            entry_hits = self.lines_in_active_buffer(self.multi_line_lines[entry_ids])
+            hits[multi] = np.logical_or.reduceat(entry_hits, list_starts)
+
+        line_hits = np.all(np.logical_or(hits, np.logical_not(valid)), axis=1)
+        miss_lines = np.flatnonzero(np.logical_not(line_hits))
+        if miss_lines.shape[0] == 0:
+            return num_lines
+
+        return int(miss_lines[0])
+
+    #
+    def service_hit_reads(self, incoming_requests_arr_np, incoming_cycles_arr):
+        """
+        Method to service lines of read requests which are all hits in the active buffer, as found
+        by get_num_hit_lines(). They are serviced with the hit latency, as by service_reads().
+        """
+        assert incoming_cycles_arr.shape[0] == incoming_requests_arr_np.shape[0], \
+               'Incoming cycles and requests dont match'
+
+        return incoming_cycles_arr + self.hit_latency
 
     #
     def service_reads(self,
@@ -299,7 +530,7 @@ class read_buffer:
               cycle = incoming_cycles_arr[i]
               # Fixing for ISSUE #14
               # request_line = set(incoming_requests_arr_np[i]) #shaves off a few seconds
-              request_line = incoming_requests_arr_np[i]
+              request_line = incoming_requests_arr_np[i].tolist()
 
               concurrent_line_addr = [[] for _ in range(self.num_bank)] # bank conflict modeling
               for addr in request_line:
@@ -347,7 +578,7 @@ class read_buffer:
               cycle = incoming_cycles_arr[i]
               # Fixing for ISSUE #14
               # request_line = set(incoming_requests_arr_np[i]) #shaves off a few seconds
-              request_line = incoming_requests_arr_np[i]
+              request_line = incoming_requests_arr_np[i].tolist()
 
               for addr in request_line:
                   if addr == -1:
@@ -392,6 +623,8 @@ class read_buffer:
         start_idx = 0
         end_idx = num_lines
 
+        if requested_data_size > self.active_buf_size:
+            self.own_fetch_matrix()
         prefetch_requests = self.fetch_matrix[start_idx:end_idx, :]
 
         # 1.1 See if extra requests are made, if so nullify them
@@ -400,8 +633,7 @@ class read_buffer:
             valid_cols = int(self.active_buf_size % self.req_gen_bandwidth)
             row = end_idx - 1
             self.next_col_prefetch_idx = valid_cols
-            for col in range(valid_cols, self.req_gen_bandwidth):
-                prefetch_requests[row][col] = -1
+            prefetch_requests[row, valid_cols:] = -1
 
         # TODO: Tally and check if this agrees with the contents of the hashed buffer
 
@@ -478,6 +710,9 @@ class read_buffer:
         requested_data_size = num_lines * self.req_gen_bandwidth
         self.num_access += requested_data_size
 
+        if self.next_col_prefetch_idx > 0 or requested_data_size > self.active_buf_size:
+            self.own_fetch_matrix()
+
         # In case we need to circle back
         if end_idx > self.fetch_matrix.shape[0]:
             last_idx = self.fetch_matrix.shape[0]
@@ -491,15 +726,14 @@ class read_buffer:
 
         # Modify the prefetch request to drop unwanted addresses
         # a. Chomp the elements in the first line included in previous fetches
-        for i in range(0, self.next_col_prefetch_idx):
-            prefetch_requests[0][i] = -1
+        if self.next_col_prefetch_idx > 0:
+            prefetch_requests[0, :self.next_col_prefetch_idx] = -1
 
         # b. Chomp the excess elements in the last line
         if requested_data_size > self.active_buf_size:
             valid_cols = int(self.active_buf_size % self.req_gen_bandwidth)
             row = prefetch_requests.shape[0] - 1
-            for col in range(valid_cols, self.req_gen_bandwidth):
-                prefetch_requests[row][col] = -1
+            prefetch_requests[row, valid_cols:] = -1
 
         # 3. Create the request cycles
         cycles_arr = np.zeros((num_lines, 1))
@@ -529,6 +763,56 @@ class read_buffer:
 
         # This does not need to return anything
 
+    #
+    def get_fold_state(self, cycle, end_addrs):
+        """
+        Method to get the state of the buffer at the end of a fold, for the steady state checks of
+        the fast forward mode: the lines of the fetch stream, the elements per line, the active
+        lines, the lines and accesses of a prefetch and the positions of end_addrs, the first and
+        last addresses read in the fold, in elements of the fetch stream from the start of the
+        active buffer, then the indices of the next prefetch and the cycles from cycle to the end
+        of the last prefetch, with the number of cycles beyond which that gap does not matter. The
+        positions are -1 when the active buffer holds the whole fetch stream, as there are no more
+        prefetches then.
+        """
+        assert self.active_buf_full_flag, 'Active buffer is not ready yet'
+
+        # The active buffer moves by whole prefetches, the demands by any number of elements
+        start_id, end_id = self.active_buffer_set_limits
+        positions = [-1 for _ in end_addrs]
+        if self.num_prefetch_buf_lines > 0:
+            positions = [self.get_stream_position(addr) for addr in end_addrs]
+
+        # Once the last prefetch ended long ago, the next ones end before the demands, whatever
+        # the gap. They can be chained over a whole turn of the buffer around the fetch stream.
+        prefetch_lines = math.ceil(self.prefetch_buf_size / self.req_gen_bandwidth)
+        num_turn_prefetches = self.num_lines // max(self.num_prefetch_buf_lines, 1) + 2
+        max_gap = num_turn_prefetches * (prefetch_lines + self.backing_buffer.get_latency() + 1)
+
+        ring = [self.num_lines, self.num_line_elems, self.num_active_buf_lines,
+                self.num_prefetch_buf_lines, prefetch_lines * self.req_gen_bandwidth, positions]
+        exact_state = (int((end_id - start_id) % max(self.num_lines, 1)),
+                       int(self.next_line_prefetch_idx), int(self.next_col_prefetch_idx))
+        prefetch_gap = float(self.last_prefetch_cycle - cycle)
+        if self.num_prefetch_buf_lines == 0:
+            prefetch_gap = 0.0
+
+        return ring, exact_state, [prefetch_gap, max_gap]
+
+    #
+    def move_active_lines(self, num_lines):
+        """
+        Method to move the active and prefetch buffers num_lines lines further along the fetch
+        stream, as the fast forward mode does over the folds it does not simulate.
+        """
+        if self.num_lines == 0 or num_lines % self.num_lines == 0:
+            return
+
+        self.active_buffer_set_limits = [int((x + num_lines) % self.num_lines)
+                                         for x in self.active_buffer_set_limits]
+        self.prefetch_buffer_set_limits = [int((x + num_lines) % self.num_lines)
+                                           for x in self.prefetch_buffer_set_limits]
+
     #
     def get_trace_matrix(self):
         """
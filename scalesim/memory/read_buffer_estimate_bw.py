@@ -124,7 +124,7 @@ class ReadBufferEstimateBw:
         for i in range(incoming_requests_arr_np.shape[0]):
             cycle = int(incoming_cycles_arr[i][0])
 
-            requests_this_cycle = incoming_requests_arr_np[i]
+            requests_this_cycle = incoming_requests_arr_np[i].tolist()
             if not self.first_request_seen:
                 if max(requests_this_cycle) > -1:
                     self.first_request_rcvd_cycle = cycle
@@ -136,6 +136,22 @@ class ReadBufferEstimateBw:
 
         return outcycles
 
+    #
+    def get_num_hit_lines(self, incoming_requests_arr_np):
+        """
+        Method to get the number of leading lines of requests which are serviced with the hit
+        latency. In estimate bandwidth mode, all of them are.
+        """
+        return incoming_requests_arr_np.shape[0]
+
+    #
+    def service_hit_reads(self, incoming_requests_arr_np, incoming_cycles_arr):
+        """
+        Method to service lines of read requests found by get_num_hit_lines(). In estimate
+        bandwidth mode, these are serviced as any others.
+        """
+        return self.service_reads(incoming_requests_arr_np, incoming_cycles_arr)
+
     #
     def manage_prefetches(self, cycle, addr):
         """
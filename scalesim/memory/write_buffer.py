@@ -39,18 +39,19 @@ class write_buffer:
         self.drain_buf_start_line_id = 0
         self.drain_buf_end_line_id = 0
 
-        # Helper data structures for faster execution
+        # Trace lines, in a buffer of preallocated lines grown by doubling. The line at
+        # num_trace_lines is the current line, filled up to line_idx, the rest being -1
         self.line_idx = 0
-        self.current_line = np.ones((1, 1)) * -1
-        self.max_cache_lines = 2 ** 10  # TODO: This is arbitrary, check if this can be tuned
-        self.trace_matrix_cache = np.zeros((1, 1))
+        self.min_trace_lines = 16
+        self.trace_lines_np = np.ones((self.min_trace_lines, self.req_gen_bandwidth)) * -1
+        self.num_trace_lines = 0
 
         # Access counts
         self.num_access = 0
 
-        # Trace matrix
-        self.trace_matrix = np.zeros((1, 1))
-        self.cycles_vec = np.zeros((1, 1))
+        # Cycles at which the drained lines are written, in a buffer grown by doubling
+        self.cycles_np = np.zeros(self.min_trace_lines)
+        self.num_cycles = 0
 
         # Flags
         # This variable determines where the new requests should be buffered
@@ -60,9 +61,6 @@ class write_buffer:
         self.drain_end_cycle = 0
 
         self.trace_valid = False
-        # Fixing ISSUE #10
-        self.trace_matrix_cache_empty = True
-        self.trace_matrix_empty = True
 
     #
     def set_params(self, backing_buf_obj,
@@ -86,6 +84,8 @@ class write_buffer:
         self.drain_buf_size = self.total_size_elems - self.active_buf_size
         self.free_space = self.total_size_elems
 
+        self.clear_trace()
+
     #
     def reset(self):
         """
@@ -101,89 +101,112 @@ class write_buffer:
         self.free_space = self.total_size_elems
         self.drain_end_cycle = 0
 
-        self.trace_matrix = np.zeros((1, 1))
-
         self.num_access = 0
         self.state = 0
 
+        self.clear_trace()
+
+    #
+    def clear_trace(self):
+        """
+        Method to empty the trace lines and the cycles of the drained lines.
+        """
+        self.line_idx = 0
+        self.trace_lines_np = np.ones((self.min_trace_lines, self.req_gen_bandwidth)) * -1
+        self.num_trace_lines = 0
+        self.drain_buf_start_line_id = 0
+
+        self.cycles_np = np.zeros(self.min_trace_lines)
+        self.num_cycles = 0
         self.trace_valid = False
-        # Fixing ISSUE #10
-        self.trace_matrix_cache_empty = True
-        self.trace_matrix_empty = True
+
+    #
+    def reserve_trace_lines(self, num_lines):
+        """
+        Method to make room for num_lines lines after the stored ones in the trace lines buffer,
+        doubling its size as needed.
+        """
+        num_needed = self.num_trace_lines + num_lines
+        if num_needed <= self.trace_lines_np.shape[0]:
+            return
+
+        new_size = max(2 * self.trace_lines_np.shape[0], num_needed)
+        trace_lines_np = np.empty((new_size, self.req_gen_bandwidth))
+        num_copy = min(self.num_trace_lines + 1, self.trace_lines_np.shape[0])
+        trace_lines_np[:num_copy] = self.trace_lines_np[:num_copy]
+        self.trace_lines_np = trace_lines_np
+
+    #
+    def store_cycles(self, cycles_arr_np):
+        """
+        Method to add the cycles of drained lines to the cycles buffer, doubling its size as
+        needed.
+        """
+        cycles_np = cycles_arr_np.reshape(-1)
+        num_needed = self.num_cycles + cycles_np.shape[0]
+        if num_needed > self.cycles_np.shape[0]:
+            new_cycles_np = np.zeros(max(2 * self.cycles_np.shape[0], num_needed))
+            new_cycles_np[:self.num_cycles] = self.cycles_np[:self.num_cycles]
+            self.cycles_np = new_cycles_np
+
+        self.cycles_np[self.num_cycles:num_needed] = cycles_np
+        self.num_cycles = num_needed
+        self.trace_valid = True
 
     #
     def store_to_trace_mat_cache(self, elem):
         """
-        Method to add the incoming element to the trace matrix cache.
+        Method to add the incoming element to the current line of the trace lines.
         """
         if elem == -1:
             return
 
-        if self.current_line.shape == (1,1):    # This line is empty
-            self.current_line = np.ones((1, self.req_gen_bandwidth)) * -1
+        if self.line_idx == 0:    # This line is empty
+            self.reserve_trace_lines(1)
+            self.trace_lines_np[self.num_trace_lines, :] = -1
 
-        self.current_line[0, self.line_idx] = elem
+        self.trace_lines_np[self.num_trace_lines, self.line_idx] = elem
         self.line_idx += 1
         self.free_space -= 1
 
         if not self.line_idx < self.req_gen_bandwidth:
-            # Store to the cache matrix
-            # Fixing ISSUE #10
-            # if self.trace_matrix_cache.shape == (1,1):
-            if self.trace_matrix_cache_empty:
-                self.trace_matrix_cache = self.current_line
-                self.trace_matrix_cache_empty = False
-            else:
-                self.trace_matrix_cache = np.concatenate((
-                                                          self.trace_matrix_cache,
-                                                          self.current_line
-                                                         ),
-                                                         axis=0)
-
-            self.current_line = np.ones((1,1)) * -1
+            self.num_trace_lines += 1
             self.line_idx = 0
 
-            if not self.trace_matrix_cache.shape[0] < self.max_cache_lines:
-                self.append_to_trace_mat()
-
     #
-    def append_to_trace_mat(self, force=False):
+    def store_elems_to_trace_mat_cache(self, elems_np):
         """
-        Method to append to the trace matrix cache.
-        """
-        if force:
-            # This forces the contents for self.current_line and self.trace_matrix
-            # cache to be dumped
-            if not self.line_idx == 0:
-                #if self.trace_matrix_cache.shape == (1,1):
-                if self.trace_matrix_cache_empty:
-                    self.trace_matrix_cache = self.current_line
-                    self.trace_matrix_cache_empty = False
-                else:
-                    self.trace_matrix_cache = np.concatenate((
-                                                              self.trace_matrix_cache,
-                                                              self.current_line
-                                                             ),
-                                                             axis=0)
-
-                self.current_line = np.ones((1,1)) * -1
-                self.line_idx = 0
-        # Fixing ISSUE #10
-        # if self.trace_matrix_cache.shape == (1,1):
-        if self.trace_matrix_cache_empty:
+        Method to add several incoming elements, in order, to the trace lines, as
+        store_to_trace_mat_cache() would one at a time.
+        """
+        num_elems = elems_np.shape[0]
+        if num_elems == 0:
             return
 
-        #if self.trace_matrix.shape == (1,1):
-        if self.trace_matrix_empty:
-            self.trace_matrix = self.trace_matrix_cache
-            self.drain_buf_start_line_id = 0
-            self.trace_matrix_empty = False
-        else:
-            self.trace_matrix = np.concatenate((self.trace_matrix, self.trace_matrix_cache), axis=0)
+        start_elem = self.num_trace_lines * self.req_gen_bandwidth + self.line_idx
+        end_elem = start_elem + num_elems
+        num_lines = int(math.ceil(end_elem / self.req_gen_bandwidth)) - self.num_trace_lines
+        self.reserve_trace_lines(num_lines)
+
+        # The lines of the buffer are contiguous, the elements are stored as one run
+        trace_elems_np = self.trace_lines_np.reshape(-1)
+        trace_elems_np[start_elem:end_elem] = elems_np
+        self.free_space -= num_elems
+
+        self.num_trace_lines = end_elem // self.req_gen_bandwidth
+        self.line_idx = end_elem % self.req_gen_bandwidth
+        if self.line_idx > 0:
+            self.trace_lines_np[self.num_trace_lines, self.line_idx:] = -1
 
-        self.trace_matrix_cache = np.zeros((1,1))
-        # Fixing ISSUE #10
-        self.trace_matrix_cache_empty = True
+    #
+    def append_to_trace_mat(self, force=False):
+        """
+        Method to close the current line of the trace lines. The lines filled are stored as they
+        are completed, the current line is only stored partly filled when forced to.
+        """
+        if force and not self.line_idx == 0:
+            self.num_trace_lines += 1
+            self.line_idx = 0
 
     #
     def service_writes(self, incoming_requests_arr_np, incoming_cycles_arr_np):
@@ -200,7 +223,7 @@ class write_buffer:
         # DEBUG_append_to_trace_times = []
 
         for i in tqdm(range(incoming_requests_arr_np.shape[0]), disable=True):
-            row = incoming_requests_arr_np[i]
+            row = incoming_requests_arr_np[i].tolist()
             cycle = incoming_cycles_arr_np[i]
             current_cycle = cycle[0] + offset
 
@@ -234,6 +257,40 @@ class write_buffer:
 
         return out_cycles_arr_np
 
+    #
+    def get_num_quiet_lines(self, incoming_requests_arr_np, incoming_cycles_arr_np):
+        """
+        Method to get the number of leading lines of write requests which are added to the buffer
+        without a stall or a drain: while the drain buffer is flushed, the buffer is not full
+        after them, otherwise the active buffer is not full after them. Such lines of requests
+        can be serviced together with service_quiet_writes().
+        """
+        num_writes = np.count_nonzero(incoming_requests_arr_np != -1, axis=1)
+        free_space = self.free_space - np.cumsum(num_writes)
+        draining = incoming_cycles_arr_np[:, 0] < self.drain_end_cycle
+
+        quiet = np.where(draining, free_space > 0,
+                         free_space >= (self.total_size_elems - self.drain_buf_size))
+        quiet = np.logical_or(quiet, num_writes == 0)
+        stall_lines = np.flatnonzero(np.logical_not(quiet))
+        if stall_lines.shape[0] == 0:
+            return incoming_requests_arr_np.shape[0]
+
+        return int(stall_lines[0])
+
+    #
+    def service_quiet_writes(self, incoming_requests_arr_np, incoming_cycles_arr_np):
+        """
+        Method to service lines of write requests found by get_num_quiet_lines(). The requests are
+        added to the buffer and serviced in the cycles they come in, as by service_writes().
+        """
+        assert incoming_cycles_arr_np.shape[0] == incoming_requests_arr_np.shape[0], \
+                                                  'Cycles and requests do not match'
+        elems_np = incoming_requests_arr_np[incoming_requests_arr_np != -1]
+        self.store_elems_to_trace_mat_cache(elems_np)
+
+        return np.copy(incoming_cycles_arr_np)
+
     #
     def empty_drain_buf(self, empty_start_cycle=0):
         """
@@ -242,29 +299,22 @@ class write_buffer:
 
         lines_to_fill_dbuf = int(math.ceil(self.drain_buf_size / self.req_gen_bandwidth))
         self.drain_buf_end_line_id = self.drain_buf_start_line_id + lines_to_fill_dbuf
-        self.drain_buf_end_line_id = min(self.drain_buf_end_line_id, self.trace_matrix.shape[0])
+        self.drain_buf_end_line_id = min(self.drain_buf_end_line_id, self.num_trace_lines)
 
         requests_arr_np = \
-                    self.trace_matrix[self.drain_buf_start_line_id: self.drain_buf_end_line_id, :]
+                    self.trace_lines_np[self.drain_buf_start_line_id: self.drain_buf_end_line_id, :]
         num_lines = requests_arr_np.shape[0]
 
         data_sz_to_drain = num_lines * requests_arr_np.shape[1]
         # Adjust for -1
-        for elem in requests_arr_np[-1,:]:
-            if elem == -1:
-                data_sz_to_drain -= 1
+        data_sz_to_drain -= int(np.count_nonzero(requests_arr_np[-1,:] == -1))
         self.num_access += data_sz_to_drain
 
-        cycles_arr = [x+empty_start_cycle for x in range(num_lines)]
-        cycles_arr_np = np.asarray(cycles_arr).reshape((num_lines, 1))
+        cycles_arr_np = (np.arange(num_lines) + empty_start_cycle).reshape((num_lines, 1))
         serviced_cycles_arr = self.backing_buffer.service_writes(requests_arr_np, cycles_arr_np)
 
-        # Assign the cycles vector which will be used to generate the complete trace
-        if not self.trace_valid:
-            self.cycles_vec = serviced_cycles_arr
-            self.trace_valid = True
-        else:
-            self.cycles_vec = np.concatenate((self.cycles_vec, serviced_cycles_arr), axis=0)
+        # Store the cycles which will be used to generate the complete trace
+        self.store_cycles(serviced_cycles_arr)
 
         service_end_cycle = np.amax(serviced_cycles_arr)
         self.free_space += data_sz_to_drain
@@ -279,13 +329,21 @@ class write_buffer:
         """
         self.append_to_trace_mat(force=True)
 
-        if self.trace_matrix_empty:
-            return
-
-        while self.drain_buf_start_line_id < self.trace_matrix.shape[0]:
+        while self.drain_buf_start_line_id < self.num_trace_lines:
             self.drain_end_cycle = self.empty_drain_buf(empty_start_cycle=cycle)
             cycle = self.drain_end_cycle + 1
 
+    #
+    def get_fold_state(self, cycle):
+        """
+        Method to get the state of the buffer at the end of a fold, for the steady state checks of
+        the fast forward mode: the free space, with the number of elements written so far, and the
+        cycles from cycle to the end of the ongoing drain, which do not matter once it ended.
+        """
+        num_writes = self.num_trace_lines * self.req_gen_bandwidth + self.line_idx
+        return [[int(self.free_space), int(num_writes)]], \
+            [float(max(self.drain_end_cycle - cycle, 0)), 0]
+
     #
     def get_trace_matrix(self):
         """
@@ -296,7 +354,8 @@ class write_buffer:
             print('No trace has been generated yet')
             return
 
-        trace_matrix = np.column_stack((self.cycles_vec, self.trace_matrix))
+        trace_matrix = np.column_stack((self.cycles_np[:self.num_cycles],
+                                        self.trace_lines_np[:self.num_trace_lines]))
 
         return trace_matrix
 
@@ -321,8 +380,8 @@ class write_buffer:
         Method to get start and stop cycles of the write buffer if trace_valid flag is set.
         """
         assert self.trace_valid, 'Traces not ready yet'
-        start_cycle = np.amin(self.cycles_vec)
-        end_cycle = np.amax(self.cycles_vec)
+        start_cycle = np.amin(self.cycles_np[:self.num_cycles])
+        end_cycle = np.amax(self.cycles_np[:self.num_cycles])
         return start_cycle, end_cycle
 
     #
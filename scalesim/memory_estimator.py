@@ -0,0 +1,241 @@
+"""
+This file contains the memory estimator of the simulator. From the topology and the config alone,
+it predicts the shapes and sizes of the operand, prefetch, demand and trace matrices that
+single_layer_sim allocates for each layer, and the number of iterations of the memory service loop.
+The simulator uses the estimates to keep a run within a memory limit. It can also be run as a
+script to print the estimates of a topology before launching a run.
+
+Usage:
+    python3 -m scalesim.memory_estimator -c <config> -t <topology> [-i gemm] [--mem-limit <MB>]
+"""
+
+import argparse
+import math
+
+import numpy as np
+
+from scalesim.scale_config import scale_config
+from scalesim.topology_utils import topologies
+from scalesim.analytical_layer_sim import analytical_layer_sim
+
+
+# The operand, prefetch and demand matrices hold addresses of the configured address dtype, the
+# trace matrices are float64 arrays as they also hold the cycles
+TRACE_ELEMENT_BYTES = 8
+
+# Name and group of the estimated matrices, in the order of the simulation stages
+MATRICES = [
+    ['ifmap_operand', 'operand'],
+    ['filter_operand', 'operand'],
+    ['ofmap_operand', 'operand'],
+    ['ifmap_prefetch', 'prefetch'],
+    ['filter_prefetch', 'prefetch'],
+    ['ifmap_demand', 'demand'],
+    ['filter_demand', 'demand'],
+    ['ofmap_demand', 'demand'],
+    ['ifmap_sram_trace', 'trace'],
+    ['filter_sram_trace', 'trace'],
+    ['ofmap_sram_trace', 'trace'],
+    ['ifmap_dram_trace', 'trace'],
+    ['filter_dram_trace', 'trace'],
+    ['ofmap_dram_trace', 'trace'],
+]
+GROUPS = ['operand', 'prefetch', 'demand', 'trace']
+
+
+#
+def get_layer_estimate(layer_id, config_obj, topo_obj):
+    """
+    Function to estimate the matrices of a layer. Returns a dictionary with the [rows, cols] shape
+    of every matrix in MATRICES, the bytes per element of each group and the number of iterations
+    of the memory service loop (one per demand line). When the demands are streamed, the demand
+    shapes are the ones of a single block. The operand, prefetch, demand and SRAM trace shapes are the ones of a dense layer
+    with the default layout. The DRAM trace shapes are approximate, they are derived from the DRAM
+    accesses estimated by analytical_layer_sim.
+    """
+    arr_row, arr_col = config_obj.get_array_dims()
+    dataflow = config_obj.get_dataflow()
+
+    # The window size also makes the hyper-parameters available to calc_spatio_temporal_params()
+    window_size = topo_obj.get_layer_window_size(layer_id)
+    num_filters = topo_obj.get_layer_num_filters(layer_id)
+    ofmap_h, ofmap_w = topo_obj.get_layer_ofmap_dims(layer_id)
+    num_ofmap_px = ofmap_h * ofmap_w
+    s_row, s_col, t_time = topo_obj.calc_spatio_temporal_params(df=dataflow, layer_id=layer_id)
+
+    row_fold = math.ceil(s_row / arr_row)
+    col_fold = math.ceil(s_col / arr_col)
+
+    shapes = {
+        'ifmap_operand': [num_ofmap_px, window_size],
+        'filter_operand': [window_size, num_filters],
+        'ofmap_operand': [num_ofmap_px, num_filters],
+    }
+
+    # The prefetch matrices of the streaming operands are rolled out along the diagonal into a
+    # single row, the ones of the stationary operands keep one row per element of the fold
+    if dataflow == 'os':
+        shapes['ifmap_prefetch'] = [1, row_fold * t_time * arr_row]
+        shapes['filter_prefetch'] = [1, col_fold * t_time * arr_col]
+    elif dataflow == 'ws':
+        shapes['ifmap_prefetch'] = [1, row_fold * t_time * arr_row]
+        shapes['filter_prefetch'] = [col_fold * s_row, arr_col]
+    else:
+        shapes['ifmap_prefetch'] = [col_fold * s_row, arr_col]
+        shapes['filter_prefetch'] = [1, row_fold * t_time * arr_row]
+
+    # Every fold fills the array, streams T lines and drains, as in the systolic_compute_* classes
+    if dataflow == 'os':
+        lines_per_fold = t_time + arr_row + arr_col - 2
+    else:
+        lines_per_fold = 2 * arr_row + arr_col + t_time - 2
+    num_demand_lines = row_fold * col_fold * lines_per_fold
+
+    # When the demands are streamed, only one block of lines of each demand matrix is alive. The
+    # fast forward streams them one fold at a time
+    demand_lines = num_demand_lines
+    stream_demands, demand_block_lines = config_obj.get_demand_streaming()
+    if config_obj.get_fast_forward()[0]:
+        stream_demands, demand_block_lines = True, 0
+    if stream_demands:
+        if demand_block_lines == 0:
+            demand_block_lines = lines_per_fold
+        demand_lines = min(demand_block_lines, num_demand_lines)
+
+    if dataflow == 'is':
+        ifmap_ports, filter_ports = arr_col, arr_row
+    else:
+        ifmap_ports, filter_ports = arr_row, arr_col
+    shapes['ifmap_demand'] = [demand_lines, ifmap_ports]
+    shapes['filter_demand'] = [demand_lines, filter_ports]
+    shapes['ofmap_demand'] = [demand_lines, arr_col]
+
+    # The SRAM traces are the demand matrices with the cycle of each line as the first column
+    for operand, ports in [['ifmap', ifmap_ports], ['filter', filter_ports], ['ofmap', arr_col]]:
+        shapes[operand + '_sram_trace'] = [num_demand_lines, ports + 1]
+
+    # The DRAM traces hold one line per cycle the interface is busy, each with up to bandwidth
+    # addresses and the cycle
+    if config_obj.use_user_dram_bandwidth():
+        ifmap_bw = config_obj.ifmap_sram_bank_bandwidth
+        filter_bw = config_obj.filter_sram_bank_bandwidth
+        ofmap_bw = config_obj.get_bandwidths_as_list()[0]
+    else:
+        ifmap_bw = 10
+        filter_bw = 10
+        ofmap_bw = arr_col
+
+    dram_sim = analytical_layer_sim()
+    dram_sim.set_params(layer_id=layer_id, config_obj=config_obj, topology_obj=topo_obj,
+                        verbose=False)
+    dram_sim.run()
+    dram_accesses = [['ifmap', dram_sim.ifmap_dram_reads, ifmap_bw],
+                     ['filter', dram_sim.filter_dram_reads, filter_bw],
+                     ['ofmap', dram_sim.ofmap_dram_writes, ofmap_bw]]
+    for operand, num_accesses, bandwidth in dram_accesses:
+        shapes[operand + '_dram_trace'] = [int(math.ceil(num_accesses / bandwidth)),
+                                           int(bandwidth) + 1]
+
+    address_bytes = np.dtype(config_obj.get_address_dtype()).itemsize
+    element_bytes = {
+        'operand': address_bytes,
+        'prefetch': address_bytes,
+        'demand': address_bytes,
+        'trace': TRACE_ELEMENT_BYTES
+    }
+
+    estimate = {
+        'shapes': shapes,
+        'element_bytes': element_bytes,
+        'service_iterations': num_demand_lines
+    }
+
+    return estimate
+
+
+#
+def get_estimate_bytes(estimate, group=''):
+    """
+    Function to get the size in bytes of the matrices of a layer estimate, either of all of them or
+    of the ones of a group (operand, prefetch, demand or trace).
+    """
+    num_bytes = 0
+    for name, matrix_group in MATRICES:
+        if not group == '' and not group == matrix_group:
+            continue
+        rows, cols = estimate['shapes'][name]
+        num_bytes += rows * cols * estimate['element_bytes'][matrix_group]
+
+    return num_bytes
+
+
+#
+def get_layer_peak_bytes(layer_id, config_obj, topo_obj):
+    """
+    Function to estimate the memory held by the simulation of a layer once it is done, when all of
+    its matrices are alive.
+    """
+    return get_estimate_bytes(get_layer_estimate(layer_id, config_obj, topo_obj))
+
+
+#
+def print_estimates(config_obj, topo_obj, mem_limit_mb=0):
+    """
+    Function to print the estimates of all the layers of a topology: the shapes of the operand,
+    prefetch, demand and trace matrices, the service loop iterations and the size of each group of
+    matrices in MB. Layers larger than mem_limit_mb, if set, are flagged.
+    """
+    header = ['LayerID', 'Layer'] + [name + ' shape' for name, _ in MATRICES]
+    header += ['Service iterations']
+    header += [group.capitalize() + ' (MB)' for group in GROUPS] + ['Total (MB)']
+    print(', '.join(header))
+
+    total_mb = 0
+    for layer_id in range(topo_obj.get_num_layers()):
+        estimate = get_layer_estimate(layer_id, config_obj, topo_obj)
+        log = [str(layer_id), str(topo_obj.get_layer_name(layer_id))]
+        for name, _ in MATRICES:
+            rows, cols = estimate['shapes'][name]
+            log.append(str(rows) + 'x' + str(cols))
+        log.append(str(estimate['service_iterations']))
+        for group in GROUPS:
+            log.append("{:.1f}".format(get_estimate_bytes(estimate, group) / (1024 * 1024)))
+        layer_mb = get_estimate_bytes(estimate) / (1024 * 1024)
+        log.append("{:.1f}".format(layer_mb))
+        if 0 < mem_limit_mb < layer_mb:
+            log.append('exceeds the memory limit')
+        print(', '.join(log))
+
+        total_mb += layer_mb
+
+    print('Total over all the layers: ' + "{:.1f}".format(total_mb) + ' MB')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-c', metavar='Config file', type=str,
+                        default="./configs/scale.cfg",
+                        help="Path to the config file"
+                        )
+    parser.add_argument('-t', metavar='Topology file', type=str,
+                        default="./topologies/conv_nets/test.csv",
+                        help="Path to the topology file"
+                        )
+    parser.add_argument('-i', metavar='input type', type=str,
+                        default="conv",
+                        help="Type of input topology, gemm: MNK, conv: conv"
+                        )
+    parser.add_argument('--mem-limit', metavar='memory limit', type=float,
+                        default=0,
+                        help="Flag the layers estimated to need more memory (MB) than this"
+                        )
+
+    args = parser.parse_args()
+
+    config = scale_config()
+    config.read_conf_file(args.c)
+
+    topo = topologies()
+    topo.load_arrays(topofile=args.t, mnk_inputs=args.i == 'gemm')
+
+    print_estimates(config, topo, mem_limit_mb=args.mem_limit)
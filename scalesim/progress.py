@@ -0,0 +1,203 @@
+"""
+This file contains the 'progress_log' class which reports the progress of a run as JSON lines, one
+event per line, to a file or to an open file descriptor, so that the runs can be tracked by other
+programs. The events are:
+    run_start       the layers of the run and the total number of demand lines to simulate
+    layer_start     a layer starts
+    layer_progress  demand lines of a layer serviced so far, at most once per interval
+    layer_done      a layer is done, simulated or reused (identical, cached or resumed)
+    run_done        all the layers are done
+The network wide progress is counted in demand lines, i.e. iterations of the memory service loop,
+and the ETA assumes that the remaining lines are serviced at the average rate so far.
+"""
+
+import json
+import os
+import threading
+import time
+
+
+class progress_log:
+    """
+    Class which writes the progress events of a run and tracks the network wide progress.
+    """
+    #
+    def __init__(self):
+        """
+        __init__ method
+        """
+        self.out_file = None
+        self.run_name = ''
+        self.min_interval = 1.0
+        self.lock = threading.Lock()
+
+        self.run_start_time = 0
+        self.num_layers = 0
+        # Demand lines of the layers to simulate, indexed by layer id
+        self.layer_lines = {}
+        self.total_lines = 0
+        self.done_lines = 0
+        # Demand lines serviced so far in the layers which are running
+        self.running_lines = {}
+        self.last_update_time = {}
+
+        self.enabled = False
+
+    #
+    def set_params(self, output='', run_name='', min_interval=1.0):
+        """
+        Method to set the destination of the events: the path of a file, which the events are
+        appended to, or 'fd:<n>' for an open file descriptor. Nothing is written if output is
+        empty. The progress of a layer is reported at most once every min_interval seconds.
+        """
+        self.run_name = run_name
+        self.min_interval = min_interval
+        self.enabled = not output == ''
+        if not self.enabled:
+            return
+
+        if output.startswith('fd:'):
+            self.out_file = os.fdopen(int(output[3:]), 'a', buffering=1, closefd=False)
+        else:
+            self.out_file = open(output, 'a', buffering=1)
+
+    #
+    def write_event(self, event, items):
+        """
+        Method to write one event, with the time and the run name, as a JSON line.
+        """
+        line = {'event': event, 'time': round(time.time(), 3), 'run': self.run_name}
+        line.update(items)
+
+        with self.lock:
+            self.out_file.write(json.dumps(line) + '\n')
+
+    #
+    def get_network_items(self):
+        """
+        Method to get the network wide progress: the demand lines serviced so far, the total and
+        the estimated time (s) to go, which is None until some lines are done.
+        """
+        lines_done = self.done_lines + sum(self.running_lines.values())
+        elapsed = time.time() - self.run_start_time
+
+        eta = None
+        if lines_done > 0:
+            eta = round(elapsed * (self.total_lines - lines_done) / lines_done, 1)
+
+        items = {
+            'network_lines_done': lines_done,
+            'network_lines_total': self.total_lines,
+            'elapsed': round(elapsed, 1),
+            'eta': eta
+        }
+
+        return items
+
+    #
+    def start_run(self, num_layers, layer_lines):
+        """
+        Method to report the start of a run of num_layers layers. layer_lines holds the number of
+        demand lines of each layer to simulate, indexed by layer id.
+        """
+        self.run_start_time = time.time()
+        self.num_layers = num_layers
+        self.layer_lines = dict(layer_lines)
+        self.total_lines = sum(self.layer_lines.values())
+        self.done_lines = 0
+        self.running_lines = {}
+
+        if not self.enabled:
+            return
+
+        self.write_event('run_start', {'layers': num_layers,
+                                       'layers_to_simulate': len(self.layer_lines),
+                                       'network_lines_total': self.total_lines})
+
+    #
+    def start_layer(self, layer_id):
+        """
+        Method to report the start of the simulation of a layer.
+        """
+        if not self.enabled:
+            return
+
+        self.last_update_time[layer_id] = time.time()
+        items = {'layer': layer_id}
+        if layer_id in self.layer_lines:
+            items['lines_total'] = self.layer_lines[layer_id]
+        self.write_event('layer_start', items)
+
+    #
+    def update_layer(self, layer_id, lines_done, lines_total):
+        """
+        Method to report the demand lines of a layer serviced so far. It is called from within the
+        memory service loop, therefore the events are throttled to one per min_interval.
+        """
+        if not self.enabled:
+            return
+
+        now = time.time()
+        if now - self.last_update_time.get(layer_id, 0) < self.min_interval:
+            return
+        self.last_update_time[layer_id] = now
+
+        items = {'layer': layer_id, 'lines_done': lines_done, 'lines_total': lines_total}
+        if self.total_lines > 0:
+            self.running_lines[layer_id] = lines_done
+            items.update(self.get_network_items())
+        self.write_event('layer_progress', items)
+
+    #
+    def get_layer_callback(self, layer_id):
+        """
+        Method to get the callback which reports the progress of a layer, to be installed in the
+        memory system. It is None when the progress is not reported.
+        """
+        if not self.enabled:
+            return None
+
+        def layer_callback(lines_done, lines_total):
+            self.update_layer(layer_id, lines_done, lines_total)
+
+        return layer_callback
+
+    #
+    def finish_layer(self, layer_id, status='simulated'):
+        """
+        Method to report that a layer is done. The status tells whether the layer was simulated or
+        reused from an identical layer, the result cache or a previous run.
+        """
+        if status == 'simulated':
+            self.done_lines += self.layer_lines.get(layer_id, 0)
+        self.running_lines.pop(layer_id, None)
+
+        if not self.enabled:
+            return
+
+        items = {'layer': layer_id, 'status': status}
+        items.update(self.get_network_items())
+        self.write_event('layer_done', items)
+
+    #
+    def finish_run(self, total_cycles=0):
+        """
+        Method to report the end of the run and close the output.
+        """
+        if not self.enabled:
+            return
+
+        items = {'layers': self.num_layers, 'total_cycles': total_cycles}
+        items.update(self.get_network_items())
+        self.write_event('run_done', items)
+        self.close()
+
+    #
+    def close(self):
+        """
+        Method to close the output, events are not reported anymore.
+        """
+        if self.out_file is not None:
+            self.out_file.close()
+        self.out_file = None
+        self.enabled = False
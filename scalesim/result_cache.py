@@ -0,0 +1,230 @@
+"""
+This file contains the 'result_cache' class, a persistent on-disk cache of the per-layer simulation
+results. Every entry is addressed by the hash of the layer signature (layer shape, layout row and
+the configuration parameters which affect the results) and holds the report items of the layer and,
+optionally, its traces. It can also be run as a script to inspect or purge a cache directory.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+
+
+# Bump this whenever a change in the simulator changes the results of a layer,
+# so that the entries written by older versions are not reused.
+CACHE_FORMAT_VERSION = '1'
+
+REPORT_ITEMS_FILENAME = 'report_items.json'
+TRACES_DIRNAME = 'traces'
+
+
+#
+def copy_trace_files(source_dir, dest_dir):
+    """
+    Function to copy all the trace files of a layer from one directory to another.
+    """
+    if not os.path.isdir(dest_dir):
+        os.makedirs(dest_dir)
+
+    for filename in sorted(os.listdir(source_dir)):
+        shutil.copyfile(os.path.join(source_dir, filename), os.path.join(dest_dir, filename))
+
+
+#
+def get_serializable_report_items(report_items):
+    """
+    Function to convert the report items of a layer, which may hold numpy scalars, to plain python
+    values which can be written as json.
+    """
+    serializable_items = {}
+    for key, items in report_items.items():
+        serializable_items[key] = [x.item() if hasattr(x, 'item') else x for x in items]
+
+    return serializable_items
+
+
+class result_cache:
+    """
+    Class which stores and retrieves per-layer report items and traces in a cache directory. The
+    total size of the cache is capped, the least recently used entries are evicted first.
+    """
+    #
+    def __init__(self, cache_dir='', max_size_mb=1024):
+        """
+        __init__ method
+        """
+        self.cache_dir = cache_dir
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+
+        self.num_hits = 0
+        self.num_misses = 0
+
+        if not self.cache_dir == '' and not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+    #
+    @staticmethod
+    def get_key(signature):
+        """
+        Method to get the cache key (content hash) for a layer signature.
+        """
+        key_string = CACHE_FORMAT_VERSION + '|' + '|'.join([str(x) for x in signature])
+        return hashlib.sha256(key_string.encode('utf-8')).hexdigest()
+
+    #
+    def get_entry_dir(self, key):
+        """
+        Method to get the directory of a cache entry.
+        """
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    #
+    def lookup(self, signature, need_traces=False):
+        """
+        Method to get the report items stored for the given signature. Returns None on a miss. When
+        need_traces is set, an entry stored without traces counts as a miss.
+        """
+        entry_dir = self.get_entry_dir(self.get_key(signature))
+        report_filename = os.path.join(entry_dir, REPORT_ITEMS_FILENAME)
+
+        if not os.path.isfile(report_filename) or \
+                (need_traces and not os.path.isdir(os.path.join(entry_dir, TRACES_DIRNAME))):
+            self.num_misses += 1
+            return None
+
+        with open(report_filename, 'r') as report_file:
+            report_items = json.load(report_file)
+
+        # Mark the entry as recently used
+        os.utime(report_filename, None)
+        self.num_hits += 1
+
+        return report_items
+
+    #
+    def restore_traces(self, signature, dest_dir):
+        """
+        Method to copy the traces stored for the given signature into a layer directory.
+        """
+        entry_dir = self.get_entry_dir(self.get_key(signature))
+        copy_trace_files(os.path.join(entry_dir, TRACES_DIRNAME), dest_dir)
+
+    #
+    def store(self, signature, report_items, trace_dir=''):
+        """
+        Method to add the results of a layer to the cache. The traces are stored as well if the
+        directory containing them is provided.
+        """
+        entry_dir = self.get_entry_dir(self.get_key(signature))
+        if not os.path.isdir(entry_dir):
+            os.makedirs(entry_dir)
+
+        if not trace_dir == '':
+            copy_trace_files(trace_dir, os.path.join(entry_dir, TRACES_DIRNAME))
+
+        serializable_items = get_serializable_report_items(report_items)
+
+        # Write the report items last, an entry is only valid once this file exists
+        tmp_filename = os.path.join(entry_dir, REPORT_ITEMS_FILENAME + '.tmp')
+        with open(tmp_filename, 'w') as report_file:
+            json.dump(serializable_items, report_file)
+        os.replace(tmp_filename, os.path.join(entry_dir, REPORT_ITEMS_FILENAME))
+
+        self.evict()
+
+    #
+    def get_entries(self):
+        """
+        Method to list the cache entries as [key, size in bytes, last use time, has traces],
+        least recently used first.
+        """
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+
+        for prefix in os.listdir(self.cache_dir):
+            prefix_dir = os.path.join(self.cache_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for key in os.listdir(prefix_dir):
+                entry_dir = os.path.join(prefix_dir, key)
+                report_filename = os.path.join(entry_dir, REPORT_ITEMS_FILENAME)
+                if not os.path.isfile(report_filename):
+                    continue
+
+                size = 0
+                for root, _, filenames in os.walk(entry_dir):
+                    for filename in filenames:
+                        size += os.path.getsize(os.path.join(root, filename))
+
+                last_used = os.path.getmtime(report_filename)
+                has_traces = os.path.isdir(os.path.join(entry_dir, TRACES_DIRNAME))
+                entries.append([key, size, last_used, has_traces])
+
+        entries.sort(key=lambda entry: entry[2])
+        return entries
+
+    #
+    def evict(self):
+        """
+        Method to remove the least recently used entries until the cache fits in its size cap.
+        """
+        entries = self.get_entries()
+        total_size = sum([entry[1] for entry in entries])
+
+        for key, size, _, _ in entries:
+            if total_size <= self.max_size_bytes:
+                break
+            shutil.rmtree(self.get_entry_dir(key))
+            total_size -= size
+
+    #
+    def purge(self):
+        """
+        Method to remove all the entries of the cache.
+        """
+        for key, _, _, _ in self.get_entries():
+            shutil.rmtree(self.get_entry_dir(key))
+
+    #
+    def print_info(self):
+        """
+        Method to print a summary of the cache contents.
+        """
+        entries = self.get_entries()
+        total_size = sum([entry[1] for entry in entries])
+        num_with_traces = len([entry for entry in entries if entry[3]])
+
+        print("Cache directory: \t" + self.cache_dir)
+        print("Entries: \t" + str(len(entries)) + " (" + str(num_with_traces) + " with traces)")
+        print("Size (MB): \t" + "{:.2f}".format(total_size / (1024 * 1024)) + " / "
+              + "{:.2f}".format(self.max_size_bytes / (1024 * 1024)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Inspect or purge a SCALE-Sim result cache")
+    parser.add_argument('-d', metavar='Cache dir', type=str,
+                        required=True,
+                        help="Path to the cache directory"
+                        )
+    parser.add_argument('--size', metavar='Cache size', type=float,
+                        default=1024,
+                        help="Size cap of the cache in MB, used by --evict"
+                        )
+    parser.add_argument('--purge', action='store_true',
+                        help="Remove all the entries"
+                        )
+    parser.add_argument('--evict', action='store_true',
+                        help="Remove least recently used entries until the cache fits in --size"
+                        )
+
+    args = parser.parse_args()
+
+    cache = result_cache(cache_dir=args.d, max_size_mb=args.size)
+    if args.purge:
+        cache.purge()
+    elif args.evict:
+        cache.evict()
+    cache.print_info()
@@ -33,6 +33,58 @@ if __name__ == '__main__':
                         default="Y",
                         help="Save Trace: (Y/N)"
                         )
+    parser.add_argument('-j', '--jobs', metavar='num jobs', type=int,
+                        default=1,
+                        help="Number of layers to simulate in parallel processes"
+                        )
+    parser.add_argument('-m', '--mode', metavar='simulation mode', type=str,
+                        default="",
+                        help="Simulation mode, full: cycle accurate, analytical: closed form "
+                             "estimates (overrides the config file)"
+                        )
+    parser.add_argument('--stream', action='store_true',
+                        help="Release every layer once it is done and write the reports "
+                             "incrementally, to bound the memory use on large topologies"
+                        )
+    parser.add_argument('--resume', action='store_true',
+                        help="Skip the layers completed by a previous run in the same log dir"
+                        )
+    parser.add_argument('--mem-limit', metavar='memory limit', type=float,
+                        default=0,
+                        help="Memory limit in MB, the streaming mode and the number of processes "
+                             "are chosen from the estimated memory of the layers to stay within it"
+                        )
+    parser.add_argument('--progress', metavar='progress output', type=str,
+                        default="",
+                        help="File, or fd:<n> for an open file descriptor, to write the progress "
+                             "of the run and its ETA to as JSON lines"
+                        )
+    parser.add_argument('--profile', action='store_true',
+                        help="Record the time, elements and bytes of every stage of the layer "
+                             "simulations in PERF_REPORT.csv"
+                        )
+    parser.add_argument('--demand-blocks', metavar='block lines', type=int,
+                        default=-1,
+                        help="Stream the demand matrices to the memory system in blocks of this "
+                             "many lines, 0 for one fold per block, instead of creating them whole"
+                        )
+    parser.add_argument('--fast-forward', action='store_true',
+                        help="Extrapolate the remaining folds of a layer once the memory system "
+                             "is in a steady state (approximate, traces are not saved)"
+                        )
+    parser.add_argument('--memory-backend', metavar='memory backend', type=str,
+                        default="",
+                        help="Backend of the memory simulation, python: buffer classes, numba: "
+                             "compiled kernels (overrides the config file)"
+                        )
+    parser.add_argument('--cache-dir', metavar='cache dir', type=str,
+                        default="",
+                        help="Path to a result cache directory, reused across runs (off by default)"
+                        )
+    parser.add_argument('--cache-size', metavar='cache size', type=float,
+                        default=1024,
+                        help="Size cap of the result cache in MB"
+                        )
 
     args = parser.parse_args()
     topology = args.t
@@ -41,6 +93,18 @@ if __name__ == '__main__':
     logpath = args.p
     inp_type = args.i
     save_trace = args.s
+    num_jobs = args.jobs
+    cache_dir = args.cache_dir
+    cache_size_mb = args.cache_size
+    sim_mode = args.mode
+    streaming = args.stream
+    resume = args.resume
+    profiling = args.profile
+    memory_limit_mb = args.mem_limit
+    progress_output = args.progress
+    demand_block_lines = args.demand_blocks
+    fast_forward = args.fast_forward
+    memory_backend = args.memory_backend
 
     GEMM_INPUT = False
     if inp_type == 'gemm':
@@ -59,4 +123,18 @@ if __name__ == '__main__':
                  layout=layout,
                  input_type_gemm=GEMM_INPUT
                  )
-    s.run_scale(top_path=logpath)
+    if not sim_mode == '':
+        s.config.set_sim_mode(sim_mode)
+    if profiling:
+        s.config.set_profiling(True)
+    if demand_block_lines >= 0:
+        s.config.set_demand_streaming(True, demand_block_lines)
+    if fast_forward:
+        _, fast_forward_window, fast_forward_tolerance = s.config.get_fast_forward()
+        s.config.set_fast_forward(True, fast_forward_window, fast_forward_tolerance)
+    if not memory_backend == '':
+        s.config.set_memory_backend(memory_backend)
+    s.run_scale(top_path=logpath, num_jobs=num_jobs,
+                cache_dir=cache_dir, cache_size_mb=cache_size_mb,
+                streaming=streaming, resume=resume, memory_limit_mb=memory_limit_mb,
+                progress_output=progress_output)
@@ -59,6 +59,42 @@ class scale_config:
     
     # Sarbartha: Added ramulator based DRAM trace support
         self.use_ramulator_trace = False
+
+        # Simulation mode: full (cycle accurate) or analytical (closed form estimates)
+        self.sim_mode = 'full'
+        self.valid_sim_mode_list = ['full', 'analytical']
+
+        # Per stage profiling of the layer simulations, written to PERF_REPORT.csv
+        self.enable_profiling = False
+
+        # Integer type of the addresses in the operand, prefetch and demand matrices, -1 is the
+        # null request
+        self.address_dtype = 'int32'
+        self.valid_address_dtype_list = ['int32', 'int64']
+
+        # Stream the demand matrices to the memory system in blocks of lines, one fold per block
+        # if the number of lines is 0, instead of creating them whole
+        self.stream_demands = False
+        self.demand_block_lines = 0
+
+        # Fast forward over the folds once the memory system is in a steady state, ie. once the
+        # cycles, stalls and DRAM accesses of the periods and the buffer states, up to an address
+        # offset, repeat over fast_forward_window periods, within a relative tolerance
+        self.fast_forward = False
+        self.fast_forward_window = 3
+        self.fast_forward_tolerance = 0.01
+
+        # Cache of the operand matrices of the layers, reused by the runs in the same process, of
+        # at most operand_cache_size_mb MB (0 for off), and optionally shared through .npy files
+        # in operand_cache_dir, of at most operand_cache_disk_size_mb MB
+        self.operand_cache_size_mb = 0
+        self.operand_cache_dir = ''
+        self.operand_cache_disk_size_mb = 4096
+
+        # Backend of the memory simulation: the buffer classes (python) or the numba compiled
+        # kernels (numba)
+        self.memory_backend = 'python'
+        self.valid_memory_backend_list = ['python', 'numba']
     #
     def read_conf_file(self, conf_file_in):
         """
@@ -90,6 +126,63 @@ class scale_config:
             self.use_ramulator_trace = True
         else:
             self.use_ramulator_trace = False
+
+        if config.has_option(section, 'SimulationMode'):
+            self.sim_mode = config.get(section, 'SimulationMode').strip().lower()
+            if self.sim_mode not in self.valid_sim_mode_list:
+                print("WARNING: Invalid simulation mode, using full simulation")
+                self.sim_mode = 'full'
+
+        if config.has_option(section, 'EnableProfiling'):
+            self.enable_profiling = config.get(section, 'EnableProfiling').strip() == 'True'
+
+        if config.has_option(section, 'AddressDtype'):
+            self.address_dtype = config.get(section, 'AddressDtype').strip().lower()
+            if self.address_dtype not in self.valid_address_dtype_list:
+                print("WARNING: Invalid address dtype, using int32")
+                self.address_dtype = 'int32'
+
+        if config.has_option(section, 'StreamDemands'):
+            self.stream_demands = config.get(section, 'StreamDemands').strip() == 'True'
+
+        if config.has_option(section, 'DemandBlockLines'):
+            self.demand_block_lines = int(config.get(section, 'DemandBlockLines'))
+            if self.demand_block_lines < 0:
+                print("WARNING: Invalid demand block lines, using one fold per block")
+                self.demand_block_lines = 0
+
+        if config.has_option(section, 'FastForward'):
+            self.fast_forward = config.get(section, 'FastForward').strip() == 'True'
+
+        if config.has_option(section, 'FastForwardWindow'):
+            self.fast_forward_window = int(config.get(section, 'FastForwardWindow'))
+            if self.fast_forward_window < 1:
+                print("WARNING: Invalid fast forward window, using 3")
+                self.fast_forward_window = 3
+
+        if config.has_option(section, 'FastForwardTolerance'):
+            self.fast_forward_tolerance = float(config.get(section, 'FastForwardTolerance'))
+            if self.fast_forward_tolerance < 0:
+                print("WARNING: Invalid fast forward tolerance, using 0.01")
+                self.fast_forward_tolerance = 0.01
+
+        if config.has_option(section, 'OperandCacheSize'):
+            self.operand_cache_size_mb = float(config.get(section, 'OperandCacheSize'))
+            if self.operand_cache_size_mb < 0:
+                print("WARNING: Invalid operand cache size, turning the operand cache off")
+                self.operand_cache_size_mb = 0
+
+        if config.has_option(section, 'OperandCacheDir'):
+            self.operand_cache_dir = config.get(section, 'OperandCacheDir').strip()
+
+        if config.has_option(section, 'OperandCacheDiskSize'):
+            self.operand_cache_disk_size_mb = float(config.get(section, 'OperandCacheDiskSize'))
+
+        if config.has_option(section, 'MemoryBackend'):
+            self.memory_backend = config.get(section, 'MemoryBackend').strip().lower()
+            if self.memory_backend not in self.valid_memory_backend_list:
+                print("WARNING: Invalid memory backend, using python")
+                self.memory_backend = 'python'
         
         # TODO Sarbartha: Should be bw
         div_factor = 1
@@ -332,6 +425,39 @@ class scale_config:
 
         return out_list
 
+    #
+    def get_sim_params_as_list(self):
+        """
+        Method to extract, as a list of strings, all the configuration parameters which affect the
+        simulation results of a layer. Unlike get_conf_as_list(), the run name and the input file
+        paths are left out.
+        """
+        out_list = []
+
+        if not self.valid_conf_flag:
+            print("ERROR: scale_config.get_sim_params_as_list: Configuration is not valid")
+            return
+
+        out_list += [self.array_rows, self.array_cols]
+        out_list += [self.ifmap_sz_kb, self.filter_sz_kb, self.ofmap_sz_kb]
+        out_list += [self.ifmap_offset, self.filter_offset, self.ofmap_offset]
+        out_list += [self.df, self.req_buf_sz_rd, self.req_buf_sz_wr]
+        out_list += [self.use_user_bandwidth, self.get_bandwidths_as_string()]
+
+        out_list += [self.using_ifmap_custom_layout, self.ifmap_sram_bank_bandwidth,
+                     self.ifmap_sram_bank_num, self.ifmap_sram_bank_port]
+        out_list += [self.using_filter_custom_layout, self.filter_sram_bank_bandwidth,
+                     self.filter_sram_bank_num, self.filter_sram_bank_port]
+
+        out_list += [self.sparsity_support, self.sparsity_representation,
+                     self.sparsity_optimized_mapping, self.sparsity_block_size,
+                     self.sparsity_rand_seed]
+        out_list += [self.use_ramulator_trace, self.sim_mode]
+        if self.fast_forward:
+            out_list += ['fast_forward', self.fast_forward_window, self.fast_forward_tolerance]
+
+        return [str(x) for x in out_list]
+
     #
     def get_run_name(self):
         """
@@ -410,6 +536,132 @@ class scale_config:
         if self.valid_conf_flag:
             return self.ifmap_offset, self.filter_offset, self.ofmap_offset
     
+    #
+    def set_sim_mode(self, sim_mode='full'):
+        """
+        Method to set the simulation mode, 'full' for the cycle accurate simulation or 'analytical'
+        for the closed form estimates.
+        """
+        assert sim_mode in self.valid_sim_mode_list, 'Invalid simulation mode'
+        self.sim_mode = sim_mode
+
+    #
+    def get_sim_mode(self):
+        """
+        Method to get the simulation mode.
+        """
+        if self.valid_conf_flag:
+            return self.sim_mode
+
+    #
+    def set_profiling(self, enable_profiling=False):
+        """
+        Method to enable or disable the per stage profiling of the layer simulations.
+        """
+        self.enable_profiling = enable_profiling
+
+    #
+    def get_profiling(self):
+        """
+        Method to check if the per stage profiling of the layer simulations is enabled.
+        """
+        return self.enable_profiling
+
+    #
+    def set_address_dtype(self, address_dtype='int32'):
+        """
+        Method to set the integer type of the addresses, 'int32' or 'int64' for large offsets.
+        """
+        assert address_dtype in self.valid_address_dtype_list, 'Invalid address dtype'
+        self.address_dtype = address_dtype
+
+    #
+    def get_address_dtype(self):
+        """
+        Method to get the integer type of the addresses, as a numpy dtype name.
+        """
+        return self.address_dtype
+
+    #
+    def set_demand_streaming(self, stream_demands=False, demand_block_lines=0):
+        """
+        Method to stream the demand matrices to the memory system in blocks of demand_block_lines
+        lines, or of one fold if 0, instead of creating them whole.
+        """
+        assert demand_block_lines >= 0, 'Invalid demand block lines'
+        self.stream_demands = stream_demands
+        self.demand_block_lines = demand_block_lines
+
+    #
+    def get_demand_streaming(self):
+        """
+        Method to check if the demand matrices are streamed, and get the lines per block (0 for one
+        fold per block).
+        """
+        return self.stream_demands, self.demand_block_lines
+
+    #
+    def set_fast_forward(self, fast_forward=False, fast_forward_window=3,
+                         fast_forward_tolerance=0.01):
+        """
+        Method to fast forward the memory simulation over the folds once the cycles, stalls and
+        DRAM accesses of the periods and the buffer states, up to an address offset, repeat over
+        fast_forward_window periods, within the relative fast_forward_tolerance. The periods in the
+        middle of the layer are skipped and the last ones simulated, the results are therefore
+        approximate. Only used in the USER bandwidth mode.
+        """
+        assert fast_forward_window >= 1, 'Invalid fast forward window'
+        assert fast_forward_tolerance >= 0, 'Invalid fast forward tolerance'
+        self.fast_forward = fast_forward
+        self.fast_forward_window = fast_forward_window
+        self.fast_forward_tolerance = fast_forward_tolerance
+
+    #
+    def get_fast_forward(self):
+        """
+        Method to check if the memory simulation is fast forwarded, and get the number of periods
+        which have to repeat before it is and the relative tolerance of the repeats.
+        """
+        return self.fast_forward, self.fast_forward_window, self.fast_forward_tolerance
+
+    #
+    def set_operand_cache(self, operand_cache_size_mb=0, operand_cache_dir='',
+                          operand_cache_disk_size_mb=4096):
+        """
+        Method to reuse the operand matrices of the layers with the same shape, offsets and
+        sparsity settings, from a cache of operand_cache_size_mb MB in each process (0 for off) and
+        from .npy files in operand_cache_dir, if provided, of at most operand_cache_disk_size_mb MB.
+        """
+        assert operand_cache_size_mb >= 0, 'Invalid operand cache size'
+        assert operand_cache_disk_size_mb >= 0, 'Invalid operand cache disk size'
+        self.operand_cache_size_mb = operand_cache_size_mb
+        self.operand_cache_dir = operand_cache_dir
+        self.operand_cache_disk_size_mb = operand_cache_disk_size_mb
+
+    #
+    def get_operand_cache(self):
+        """
+        Method to get the size cap (MB) of the operand cache of each process, its directory and the
+        size cap (MB) of the directory.
+        """
+        return self.operand_cache_size_mb, self.operand_cache_dir, self.operand_cache_disk_size_mb
+
+    #
+    def set_memory_backend(self, memory_backend='python'):
+        """
+        Method to set the backend of the memory simulation, 'python' for the buffer classes or
+        'numba' for the compiled kernels, which give the same results.
+        """
+        assert memory_backend in self.valid_memory_backend_list, 'Invalid memory backend'
+        self.memory_backend = memory_backend
+
+    #
+    def get_memory_backend(self):
+        """
+        Method to get the backend of the memory simulation.
+        """
+        return self.memory_backend
+
     def get_ramulator_trace(self):
         """
         Method to check if the run considers ramulator trace numpy files
@@ -0,0 +1,218 @@
+"""
+This file contains the 'scale_results' class which holds the results of a scalesim run in memory,
+as numpy structured arrays with one record per layer, along with the totals over the network. It is
+returned by scalesim.run_scale() so that the results can be used without reading the reports back.
+"""
+
+import numpy as np
+
+
+# Field names of the report items, in the order of the report columns
+COMPUTE_FIELDS = ['overall_cycles', 'total_cycles', 'stall_cycles',
+                  'overall_util', 'mapping_eff', 'compute_util']
+BANDWIDTH_FIELDS = ['avg_ifmap_sram_bw', 'avg_filter_sram_bw', 'avg_ofmap_sram_bw',
+                    'avg_ifmap_dram_bw', 'avg_filter_dram_bw', 'avg_ofmap_dram_bw']
+SPARSE_BANDWIDTH_FIELDS = ['avg_ifmap_sram_bw', 'avg_filter_sram_bw',
+                           'avg_filter_metadata_sram_bw', 'avg_ofmap_sram_bw',
+                           'avg_ifmap_dram_bw', 'avg_filter_dram_bw', 'avg_ofmap_dram_bw']
+DETAIL_FIELDS = []
+for detail_prefix in ['ifmap_sram', 'filter_sram', 'ofmap_sram',
+                      'ifmap_dram', 'filter_dram', 'ofmap_dram']:
+    access_name = 'writes' if detail_prefix.startswith('ofmap') else 'reads'
+    DETAIL_FIELDS += [detail_prefix + '_start_cycle', detail_prefix + '_stop_cycle',
+                      detail_prefix + '_' + access_name]
+SPARSE_FIELDS = ['original_filter_storage', 'new_filter_storage', 'filter_metadata_storage',
+                 'avg_filter_metadata_sram_bw']
+
+# Fields which are summed up over the layers in the network totals
+TOTAL_FIELDS = ['overall_cycles', 'total_cycles', 'stall_cycles',
+                'ifmap_sram_reads', 'filter_sram_reads', 'ofmap_sram_writes',
+                'ifmap_dram_reads', 'filter_dram_reads', 'ofmap_dram_writes']
+
+
+class scale_results:
+    """
+    Class which holds the per layer compute, bandwidth, detailed access and sparse results of a
+    run, and the totals over all the layers.
+    """
+    #
+    def __init__(self):
+        """
+        __init__ method
+        """
+        self.run_name = ''
+        self.topo_name = ''
+        self.report_path = ''
+        self.sparsity_support = False
+        self.sparsity_representation = ''
+
+        self.compute = np.zeros(0)
+        self.bandwidth = np.zeros(0)
+        self.detail = np.zeros(0)
+        self.sparse = np.zeros(0)
+
+        self.num_layers = 0
+        self.results_ready_flag = False
+
+    #
+    def set_params(self,
+                   layer_report_items_list=None,
+                   layer_names=None,
+                   run_name='',
+                   topo_name='',
+                   report_path='',
+                   sparsity_support=False,
+                   sparsity_representation=''):
+        """
+        Method to build the result arrays from the report items of the layers, as collected by the
+        simulator, and the names of the layers.
+        """
+        if layer_report_items_list is None:
+            layer_report_items_list = []
+        if layer_names is None:
+            layer_names = []
+
+        self.run_name = run_name
+        self.topo_name = topo_name
+        self.report_path = report_path
+        self.sparsity_support = sparsity_support
+        self.sparsity_representation = sparsity_representation
+
+        self.num_layers = len(layer_report_items_list)
+        assert len(layer_names) == self.num_layers, 'Number of layer names does not match'
+
+        bandwidth_fields = BANDWIDTH_FIELDS
+        if self.sparsity_support:
+            bandwidth_fields = SPARSE_BANDWIDTH_FIELDS
+
+        self.compute = self.get_report_array(layer_report_items_list, layer_names,
+                                             'compute', COMPUTE_FIELDS)
+        self.bandwidth = self.get_report_array(layer_report_items_list, layer_names,
+                                               'bandwidth', bandwidth_fields)
+        self.detail = self.get_report_array(layer_report_items_list, layer_names,
+                                            'detail', DETAIL_FIELDS)
+        sparse_fields = []
+        if self.sparsity_support:
+            sparse_fields = SPARSE_FIELDS
+        self.sparse = self.get_report_array(layer_report_items_list, layer_names,
+                                            'sparse', sparse_fields)
+
+        self.results_ready_flag = True
+
+    #
+    @staticmethod
+    def get_report_array(layer_report_items_list, layer_names, report, fields):
+        """
+        Method to create the structured array, one record per layer, of one of the reports. The
+        records hold the layer id and name followed by the report items as float64.
+        """
+        name_len = max([1] + [len(str(x)) for x in layer_names])
+        dtype = [('layer_id', np.int64), ('layer_name', 'U' + str(name_len))]
+        dtype += [(field, np.float64) for field in fields]
+
+        report_array = np.zeros(len(layer_report_items_list), dtype=dtype)
+        for lid, report_items in enumerate(layer_report_items_list):
+            items = report_items[report]
+            assert len(items) == len(fields), 'Unexpected number of ' + report + ' report items'
+            report_array[lid] = tuple([lid, str(layer_names[lid])] + [float(x) for x in items])
+
+        return report_array
+
+    #
+    def get_compute_report(self):
+        """
+        Method to get the compute report as a structured array.
+        """
+        assert self.results_ready_flag, 'Results are not available'
+        return self.compute
+
+    #
+    def get_bandwidth_report(self):
+        """
+        Method to get the bandwidth report as a structured array.
+        """
+        assert self.results_ready_flag, 'Results are not available'
+        return self.bandwidth
+
+    #
+    def get_detail_report(self):
+        """
+        Method to get the detailed access report as a structured array.
+        """
+        assert self.results_ready_flag, 'Results are not available'
+        return self.detail
+
+    #
+    def get_sparse_report(self):
+        """
+        Method to get the sparse report as a structured array. It has no records when sparsity is
+        not enabled.
+        """
+        assert self.results_ready_flag, 'Results are not available'
+        return self.sparse
+
+    #
+    def get_layer_table(self):
+        """
+        Method to get all the per layer results, i.e. the columns of all the reports, as a single
+        structured array.
+        """
+        assert self.results_ready_flag, 'Results are not available'
+
+        reports = [self.compute, self.bandwidth, self.detail]
+        if self.sparsity_support:
+            reports.append(self.sparse)
+
+        dtype = self.compute.dtype.descr[:2]
+        for report in reports:
+            for name, field_dtype in report.dtype.descr[2:]:
+                if name not in [x[0] for x in dtype]:
+                    dtype.append((name, field_dtype))
+
+        table = np.zeros(self.num_layers, dtype=dtype)
+        for report in reports:
+            for name in report.dtype.names:
+                table[name] = report[name]
+
+        return table
+
+    #
+    def get_totals(self):
+        """
+        Method to get the totals over all the layers of the network, as a dictionary. The cycles
+        and the numbers of accesses are summed up, the compute utilization is weighted by the
+        compute cycles of the layers.
+        """
+        assert self.results_ready_flag, 'Results are not available'
+
+        table = self.get_layer_table()
+        totals = {'num_layers': self.num_layers}
+        for field in TOTAL_FIELDS:
+            totals[field] = int(np.sum(table[field]))
+
+        total_cycles = np.sum(table['total_cycles'])
+        if total_cycles > 0:
+            compute_util = np.sum(table['compute_util'] * table['total_cycles']) / total_cycles
+            totals['compute_util'] = float(compute_util)
+        else:
+            totals['compute_util'] = 0.0
+
+        return totals
+
+    #
+    def get_total_cycles(self):
+        """
+        Method to get the total cycles (including the prefetch, compute and stall cycles) of the
+        network.
+        """
+        assert self.results_ready_flag, 'Results are not available'
+        return int(np.sum(self.compute['overall_cycles']))
+
+    #
+    def to_dataframe(self):
+        """
+        Method to get all the per layer results as a pandas DataFrame, one row per layer.
+        """
+        import pandas as pd
+
+        return pd.DataFrame(self.get_layer_table())
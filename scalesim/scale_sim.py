@@ -47,6 +47,9 @@ class scalesim:
         self.run_done_flag = False
         self.logs_generated_flag = False
 
+        # Results of the last run
+        self.results = None
+
         self.set_params(config_filename=config, topology_filename=topology, layout_filename=layout)
 
     #
@@ -108,9 +111,21 @@ class scalesim:
         #self.config.scale_memory_maps(num_layers=num_layers)
 
     #
-    def run_scale(self, top_path='.'):
+    def run_scale(self, top_path='.', num_jobs=1, cache_dir='', cache_size_mb=1024,
+                  streaming=False, resume=False, write_reports=True, memory_limit_mb=0,
+                  progress_output=''):
         """
-        Method to initialize the internal simulation objects and run scalesim once.
+        Method to initialize the internal simulation objects and run scalesim once. The layers are
+        simulated in num_jobs parallel processes when num_jobs > 1. If cache_dir is provided, the
+        results of previously simulated layers are reused from the result cache in that directory.
+        With streaming set, each layer is released once it is done and the reports are written
+        incrementally, which bounds the memory use on large topologies. With resume set, the layers
+        completed by a previous, interrupted, run in the same directory are not simulated again.
+        Returns a scale_results object with the per layer results and the network totals. The
+        report files are not written when write_reports is not set. With memory_limit_mb set, the
+        streaming mode and the number of processes are chosen from the estimated memory of the
+        layers to stay within the limit. If progress_output (a file path or 'fd:<n>') is set, the
+        progress of the run and its ETA are written to it as JSON lines.
         """
 
         self.top_path = top_path
@@ -121,10 +136,20 @@ class scalesim:
             layout_obj=self.layout,
             top_path=self.top_path,
             verbosity=self.verbose_flag,
-            save_trace=save_trace
+            save_trace=save_trace,
+            num_jobs=num_jobs,
+            cache_dir=cache_dir,
+            cache_size_mb=cache_size_mb,
+            streaming=streaming,
+            resume=resume,
+            write_reports=write_reports,
+            memory_limit_mb=memory_limit_mb,
+            progress_output=progress_output
         )
         self.run_once()
 
+        return self.results
+
     #
     def run_once(self):
         """
@@ -148,6 +173,7 @@ class scalesim:
         #)
         self.runner.run()
         self.run_done_flag = True
+        self.results = self.runner.get_results()
 
         #self.runner.generate_all_logs()
         self.logs_generated_flag = True
@@ -205,3 +231,17 @@ class scalesim:
             return
 
         return self.runner.get_total_cycles()
+
+    #
+    def get_results(self):
+        """
+        Method to get the results (scale_results object) of the simulation once it is completed.
+        """
+        me = 'scale.' + 'get_results()'
+        if not self.run_done_flag:
+            message = 'ERROR: ' + me
+            message += ' : Results not available. Run the simulation first'
+            print(message)
+            return
+
+        return self.results
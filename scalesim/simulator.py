@@ -3,12 +3,119 @@ This file contains the 'simulator' class that simulates the entire model using t
 'single_layer_sim' and generates the reports (.csv files).
 """
 
+import json
 import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
 from scalesim.scale_config import scale_config as cfg
 from scalesim.topology_utils import topologies as topo
 from scalesim.layout_utils import layouts as layout
 from scalesim.single_layer_sim import single_layer_sim as layer_sim
+from scalesim.analytical_layer_sim import analytical_layer_sim
+from scalesim.result_cache import result_cache, copy_trace_files, get_serializable_report_items
+from scalesim.scale_results import scale_results
+from scalesim.memory_estimator import get_layer_estimate, get_layer_peak_bytes
+from scalesim.progress import progress_log
+
+
+# Directory, within the run directory, holding the report items of the completed layers
+CHECKPOINT_DIRNAME = 'checkpoint'
+
+
+#
+def run_single_layer(layer_id, config_obj, topo_obj, layout_obj, top_path, save_trace,
+                     progress_output=''):
+    """
+    Function to run the simulation of one layer in a worker process. The traces are written from
+    within the worker and only the report items are sent back, so that the (large) operand, demand
+    and trace matrices never cross the process boundary. The start and the progress of the layer
+    are reported to progress_output, if set, by the worker itself.
+    """
+    if config_obj.get_sim_mode() == 'analytical' and not config_obj.sparsity_support:
+        this_layer_sim = analytical_layer_sim()
+    else:
+        this_layer_sim = layer_sim()
+    this_layer_sim.set_params(layer_id=layer_id,
+                              config_obj=config_obj,
+                              topology_obj=topo_obj,
+                              layout_obj=layout_obj,
+                              verbose=False)
+    this_layer_sim.set_keep_sram_traces(save_trace)
+
+    progress = progress_log()
+    progress.set_params(output=progress_output, run_name=config_obj.get_run_name())
+    progress.start_layer(layer_id)
+    this_layer_sim.set_progress_callback(progress.get_layer_callback(layer_id))
+    this_layer_sim.run()
+    progress.close()
+
+    if save_trace:
+        this_layer_sim.save_traces(top_path)
+
+    report_items = get_layer_report_items(this_layer_sim, config_obj)
+    if config_obj.get_profiling():
+        report_items['perf'] = this_layer_sim.get_perf_items()
+
+    return report_items
+
+
+#
+def get_layer_report_items(single_layer_obj, config_obj):
+    """
+    Function to collect the report items of a single_layer_sim object which has finished its run.
+    """
+    report_items = {
+        'compute': single_layer_obj.get_compute_report_items(),
+        'bandwidth': single_layer_obj.get_bandwidth_report_items(),
+        'detail': single_layer_obj.get_detail_report_items(),
+        'sparse': []
+    }
+    if config_obj.sparsity_support is True:
+        report_items['sparse'] = single_layer_obj.get_sparse_report_items()
+
+    return report_items
+
+
+#
+def split_perf_items(report_items):
+    """
+    Function to separate the profile of a layer, added to the report items by the worker processes
+    when profiling, from the report items. Returns the report items without the profile and the
+    profile, which is empty if there is none.
+    """
+    if 'perf' not in report_items:
+        return report_items, []
+
+    items = {}
+    for key, value in report_items.items():
+        if not key == 'perf':
+            items[key] = value
+
+    return items, report_items['perf']
+
+
+#
+def get_layer_signature(layer_id, config_obj, topo_obj, layout_obj):
+    """
+    Function to get the signature of a layer, which is a tuple of all the inputs that decide the
+    simulation results of the layer: the layer shape, the layout row (when custom layouts are
+    used) and the configuration parameters. Layers with the same signature produce identical
+    report items and traces.
+    """
+    signature = [str(x) for x in topo_obj.get_layer_params(layer_id)[1:]]
+
+    if config_obj.using_ifmap_custom_layout or config_obj.using_filter_custom_layout:
+        signature += [str(x) for x in layout_obj.get_layer_params(layer_id)[1:]]
+
+    # The ramulator latency files are looked up by the layer id
+    if config_obj.get_ramulator_trace():
+        signature += ['layer' + str(layer_id)]
+
+    signature += config_obj.get_sim_params_as_list()
+
+    return tuple(signature)
 
 
 class simulator:
@@ -27,10 +134,29 @@ class simulator:
         self.top_path = "./"
         self.verbose = True
         self.save_trace = True
+        self.write_reports = True
+        self.num_jobs = 1
+        self.reuse_identical_layers = True
+        self.cache = None
+        self.streaming = False
+        self.resume = False
+        self.memory_limit_mb = 0
+        self.progress_output = ''
+        self.progress = progress_log()
+        self.analytical_mode = False
+        self.profiling = False
 
         self.num_layers = 0
+        self.layer_source_list = []
+        self.cached_report_items = {}
+        self.completed_report_items = {}
 
         self.single_layer_sim_object_list = []
+        self.layer_report_items_list = []
+        # Per layer [stage, time (s), elements, bytes] entries, empty for the layers which are not
+        # simulated in this run
+        self.layer_perf_items_list = []
+        self.report_files = {}
 
         self.params_set_flag = False
         self.all_layer_run_done = False
@@ -42,10 +168,27 @@ class simulator:
                    layout_obj=layout(),
                    top_path="./",
                    verbosity=True,
-                   save_trace=True
+                   save_trace=True,
+                   num_jobs=1,
+                   reuse_identical_layers=True,
+                   cache_dir='',
+                   cache_size_mb=1024,
+                   streaming=False,
+                   resume=False,
+                   write_reports=True,
+                   memory_limit_mb=0,
+                   progress_output=''
                    ):
         """
         Method to set the run parameters including inputs and parameters for housekeeping.
+        num_jobs: number of worker processes simulating the layers
+        reuse_identical_layers: simulate the layers with the same signature only once
+        cache_dir, cache_size_mb: location and size of the persistent result cache
+        streaming: release every layer once it is done and append its rows to the reports
+        resume: do not simulate again the layers completed by a previous run
+        write_reports: write the reports, otherwise the results are only in get_results()
+        memory_limit_mb: limit on the estimated memory of the run
+        progress_output: file path or 'fd:<n>' to write the progress to as JSON lines
         """
         self.conf = config_obj
         self.topo = topo_obj
@@ -54,12 +197,199 @@ class simulator:
         self.top_path = top_path
         self.verbose = verbosity
         self.save_trace = save_trace
+        self.num_jobs = max(1, int(num_jobs))
+        self.reuse_identical_layers = reuse_identical_layers
+        self.streaming = streaming
+        self.resume = resume
+        self.write_reports = write_reports
+        self.memory_limit_mb = memory_limit_mb
+        self.progress_output = progress_output
+
+        self.cache = None
+        if not cache_dir == '':
+            self.cache = result_cache(cache_dir=cache_dir, max_size_mb=cache_size_mb)
 
         # Calculate inferrable parameters here
         self.num_layers = self.topo.get_num_layers()
 
         self.params_set_flag = True
 
+    #
+    def get_layer_signature(self, layer_id=0):
+        """
+        Method to get the signature of a layer of the current topology.
+        """
+        return get_layer_signature(layer_id, self.conf, self.topo, self.layout)
+
+    #
+    def find_layer_sources(self):
+        """
+        Method to find, for each layer, the id of the first layer with the same signature. The
+        layers which are their own source are the only ones that need to be simulated.
+        """
+        self.layer_source_list = list(range(self.num_layers))
+        if not self.reuse_identical_layers:
+            return
+
+        first_layer_with_signature = {}
+        for layer_id in range(self.num_layers):
+            signature = self.get_layer_signature(layer_id)
+            if signature in first_layer_with_signature:
+                self.layer_source_list[layer_id] = first_layer_with_signature[signature]
+            else:
+                first_layer_with_signature[signature] = layer_id
+
+    #
+    def reuse_layer_results(self, layer_id, source_layer_id):
+        """
+        Method to reuse the results of an already simulated identical layer. The report items are
+        copied and the traces, if requested, are copied over from the directory of the source layer.
+        """
+        source_items = self.layer_report_items_list[source_layer_id]
+        report_items = {}
+        for key, items in source_items.items():
+            report_items[key] = list(items)
+
+        if self.save_trace:
+            source_dir = self.top_path + '/layer' + str(source_layer_id)
+            dest_dir = self.top_path + '/layer' + str(layer_id)
+            copy_trace_files(source_dir, dest_dir)
+
+        return report_items
+
+    #
+    def load_cached_results(self):
+        """
+        Method to look up the layers which need to be simulated in the result cache. The report
+        items of the hits are kept in cached_report_items, indexed by layer id.
+        """
+        self.cached_report_items = {}
+        if self.cache is None:
+            return
+
+        for layer_id in range(self.num_layers):
+            if not self.layer_source_list[layer_id] == layer_id:
+                continue
+            if layer_id in self.completed_report_items:
+                continue
+
+            signature = self.get_layer_signature(layer_id)
+            report_items = self.cache.lookup(signature, need_traces=self.save_trace)
+            if report_items is not None:
+                self.cached_report_items[layer_id] = report_items
+
+        if self.verbose:
+            print('Result cache: ' + str(len(self.cached_report_items)) + ' layers found in '
+                  + self.cache.cache_dir)
+
+    #
+    def get_checkpoint_filename(self, layer_id):
+        """
+        Method to get the path of the checkpoint file of a layer.
+        """
+        return os.path.join(self.top_path, CHECKPOINT_DIRNAME, 'layer' + str(layer_id) + '.json')
+
+    #
+    def load_checkpoints(self):
+        """
+        Method to find the layers completed by a previous run when resuming. A layer is complete if
+        its checkpoint file exists, was written for the same layer signature and, when the traces
+        are saved, its trace directory exists. Without resume, the checkpoints of a previous run
+        are removed.
+        """
+        self.completed_report_items = {}
+
+        checkpoint_dir = os.path.join(self.top_path, CHECKPOINT_DIRNAME)
+        if not self.resume:
+            if self.write_reports and os.path.isdir(checkpoint_dir):
+                shutil.rmtree(checkpoint_dir)
+            return
+
+        for layer_id in range(self.num_layers):
+            checkpoint_filename = self.get_checkpoint_filename(layer_id)
+            if not os.path.isfile(checkpoint_filename):
+                continue
+            if self.save_trace and not os.path.isdir(self.top_path + '/layer' + str(layer_id)):
+                continue
+
+            with open(checkpoint_filename, 'r') as checkpoint_file:
+                checkpoint = json.load(checkpoint_file)
+
+            if not tuple(checkpoint['signature']) == self.get_layer_signature(layer_id):
+                if self.verbose:
+                    print('WARNING: Checkpoint of layer ' + str(layer_id)
+                          + ' does not match the current inputs, simulating it again')
+                continue
+
+            self.completed_report_items[layer_id] = checkpoint['report_items']
+
+        if self.verbose:
+            print('Resuming: ' + str(len(self.completed_report_items)) + ' of '
+                  + str(self.num_layers) + ' layers already done')
+
+    #
+    def save_checkpoint(self, layer_id, report_items):
+        """
+        Method to checkpoint the report items of a layer. It is called once the layer, including
+        its traces, is done: the checkpoint file is the completion marker of the layer and it is
+        written atomically. Nothing is written when the reports are not.
+        """
+        if not self.write_reports:
+            return
+
+        checkpoint_filename = self.get_checkpoint_filename(layer_id)
+        checkpoint_dir = os.path.dirname(checkpoint_filename)
+        if not os.path.isdir(checkpoint_dir):
+            os.makedirs(checkpoint_dir, exist_ok=True)
+
+        report_items, _ = split_perf_items(report_items)
+        checkpoint = {
+            'signature': list(self.get_layer_signature(layer_id)),
+            'report_items': get_serializable_report_items(report_items)
+        }
+
+        tmp_filename = checkpoint_filename + '.tmp'
+        with open(tmp_filename, 'w') as checkpoint_file:
+            json.dump(checkpoint, checkpoint_file)
+        os.replace(tmp_filename, checkpoint_filename)
+
+    #
+    def save_checkpoint_when_done(self, layer_id, future):
+        """
+        Method called when the run of a layer in a worker process completes, to checkpoint the
+        layer without waiting for the layers before it.
+        """
+        if future.cancelled() or future.exception() is not None:
+            return
+        self.save_checkpoint(layer_id, future.result())
+        self.progress.finish_layer(layer_id, 'simulated')
+
+    #
+    def use_cached_results(self, layer_id):
+        """
+        Method to get the report items of a layer found in the result cache, restoring its traces
+        into the layer directory if they are requested.
+        """
+        if self.save_trace:
+            dest_dir = self.top_path + '/layer' + str(layer_id)
+            self.cache.restore_traces(self.get_layer_signature(layer_id), dest_dir)
+
+        return self.cached_report_items[layer_id]
+
+    #
+    def add_to_cache(self, layer_id, report_items):
+        """
+        Method to add the results of a simulated layer to the result cache, if one is used.
+        """
+        if self.cache is None:
+            return
+
+        trace_dir = ''
+        if self.save_trace:
+            trace_dir = self.top_path + '/layer' + str(layer_id)
+
+        self.cache.store(self.get_layer_signature(layer_id), report_items, trace_dir=trace_dir)
+
     #
     def run(self):
         """
@@ -71,82 +401,246 @@ class simulator:
         """
         assert self.params_set_flag, 'Simulator parameters are not set'
 
-        # 1. Create the layer runners for each layer
-        for i in range(self.num_layers):
-            this_layer_sim = layer_sim()
-            this_layer_sim.set_params(layer_id=i,
-                                 config_obj=self.conf,
-                                 topology_obj=self.topo,
-                                 layout_obj=self.layout,
-                                 verbose=self.verbose)
+        self.prepare_run()
+
+        if self.num_jobs > 1:
+            self.run_parallel()
+        else:
+            self.run_serial()
+
+        self.finish_run()
 
-            self.single_layer_sim_object_list.append(this_layer_sim)
+    #
+    def prepare_run(self):
+        """
+        Method to set up a run before simulating the layers: creates the run directory, finds the
+        layers which do not need to be simulated (identical, checkpointed or cached layers), fits
+        the run mode to the memory limit and creates the layer runners.
+        """
+        assert self.params_set_flag, 'Simulator parameters are not set'
 
-        if not os.path.isdir(self.top_path):
-            os.mkdir(self.top_path)
+        self.analytical_mode = self.conf.get_sim_mode() == 'analytical'
+        self.profiling = self.conf.get_profiling()
+        if self.analytical_mode:
+            if self.conf.sparsity_support is True:
+                print('WARNING: Sparsity is not supported in the analytical mode, '
+                      'running the full simulation')
+                self.analytical_mode = False
+            else:
+                if not self.conf.use_user_dram_bandwidth():
+                    print('WARNING: The DRAM reads of the analytical mode are estimates in the '
+                          'CALC bandwidth mode, use the USER mode for the ones of the full '
+                          'simulation')
+                # The closed form estimates are cheap, there is nothing to gain from the pool
+                # and there are no traces to save
+                self.num_jobs = 1
+                self.save_trace = False
+
+        if self.conf.get_fast_forward()[0] and self.save_trace:
+            # Only the folds before the steady state are simulated, the traces would be partial
+            print('WARNING: Traces are not saved in the fast forward mode')
+            self.save_trace = False
 
         report_path = self.top_path + '/' + self.conf.get_run_name()
 
-        if not os.path.isdir(report_path):
-            os.mkdir(report_path)
+        if self.write_reports or self.save_trace:
+            if not os.path.isdir(self.top_path):
+                os.mkdir(self.top_path)
+
+            if not os.path.isdir(report_path):
+                os.mkdir(report_path)
 
         self.top_path = report_path
 
-        # 2. Run each layer
-        # TODO: This is parallelizable
-        for single_layer_obj in self.single_layer_sim_object_list:
+        # 1. Find the layers to run
+        self.find_layer_sources()
+        self.load_checkpoints()
+        self.load_cached_results()
+        self.apply_memory_limit()
+
+        # 2. Create the layer runners for each layer
+        # In the streaming mode they are created one at a time by run_serial()
+        if self.num_jobs == 1 and not self.streaming:
+            for i in range(self.num_layers):
+                this_layer_sim = self.create_layer_sim(i)
+                self.single_layer_sim_object_list.append(this_layer_sim)
+
+        self.layer_report_items_list = []
+        self.layer_perf_items_list = []
+        if self.streaming and self.write_reports:
+            self.open_reports()
+
+        self.start_progress()
+
+    #
+    def start_progress(self):
+        """
+        Method to start reporting the progress of the run. The network wide progress is weighted
+        by the estimated number of demand lines of each layer to simulate.
+        """
+        self.progress = progress_log()
+        self.progress.set_params(output=self.progress_output, run_name=self.conf.get_run_name())
+        if not self.progress.enabled:
+            return
 
+        layer_lines = {}
+        for layer_id in self.get_layers_to_simulate():
+            estimate = get_layer_estimate(layer_id, self.conf, self.topo)
+            layer_lines[layer_id] = estimate['service_iterations']
+        self.progress.start_run(self.num_layers, layer_lines)
+
+    #
+    def apply_memory_limit(self):
+        """
+        Method to fit the run mode to the memory limit, using the estimated memory of the layers to
+        simulate. A serial run keeps every layer in memory till the end, it is switched to the
+        streaming mode if all the layers together do not fit. A parallel run holds one layer per
+        worker process, the number of processes is reduced until the largest layers fit.
+        """
+        if self.memory_limit_mb <= 0 or self.analytical_mode:
+            return
+
+        limit_bytes = self.memory_limit_mb * 1024 * 1024
+        layer_bytes = []
+        for layer_id in self.get_layers_to_simulate():
+            this_layer_bytes = get_layer_peak_bytes(layer_id, self.conf, self.topo)
+            if this_layer_bytes > limit_bytes:
+                print('WARNING: Layer ' + str(layer_id) + ' is estimated to need '
+                      + str(int(this_layer_bytes / (1024 * 1024))) + ' MB, more than the '
+                      + 'memory limit')
+            layer_bytes.append(this_layer_bytes)
+        layer_bytes.sort(reverse=True)
+
+        num_jobs = self.num_jobs
+        while num_jobs > 1 and sum(layer_bytes[:num_jobs]) > limit_bytes:
+            num_jobs -= 1
+        if num_jobs < self.num_jobs:
+            if self.verbose:
+                print('Memory limit: running ' + str(num_jobs) + ' processes instead of '
+                      + str(self.num_jobs))
+            self.num_jobs = num_jobs
+
+            # The layer runners of a serial run are created one at a time in the streaming mode
+            if self.num_jobs == 1:
+                self.streaming = True
+
+        if self.num_jobs == 1 and not self.streaming and sum(layer_bytes) > limit_bytes:
+            if self.verbose:
+                print('Memory limit: the layers need an estimated '
+                      + str(int(sum(layer_bytes) / (1024 * 1024)))
+                      + ' MB, switching to the streaming mode')
+            self.streaming = True
+
+    #
+    def finish_run(self):
+        """
+        Method to complete a run once all the layers are done, by writing the reports. The
+        checkpoints are only needed to resume an interrupted run and are removed then.
+        """
+        self.all_layer_run_done = True
+        self.progress.finish_run(self.get_total_cycles())
+
+        if self.write_reports:
+            if self.streaming:
+                self.close_reports()
+            else:
+                self.generate_reports()
+
+            checkpoint_dir = os.path.join(self.top_path, CHECKPOINT_DIRNAME)
+            if os.path.isdir(checkpoint_dir):
+                shutil.rmtree(checkpoint_dir)
+
+    #
+    def create_layer_sim(self, layer_id):
+        """
+        Method to create and set up the simulation object of a layer.
+        """
+        if self.analytical_mode:
+            this_layer_sim = analytical_layer_sim()
+        else:
+            this_layer_sim = layer_sim()
+        this_layer_sim.set_params(layer_id=layer_id,
+                                  config_obj=self.conf,
+                                  topology_obj=self.topo,
+                                  layout_obj=self.layout,
+                                  verbose=self.verbose)
+        this_layer_sim.set_keep_sram_traces(self.save_trace)
+
+        return this_layer_sim
+
+    #
+    def add_layer_report_items(self, report_items, perf_items=None):
+        """
+        Method to record the report items, and the profile if the layer was simulated, of the next
+        layer. In the streaming mode, its rows are written to the reports right away.
+        """
+        if perf_items is None:
+            perf_items = []
+
+        lid = len(self.layer_report_items_list)
+        self.layer_report_items_list.append(report_items)
+        self.layer_perf_items_list.append(perf_items)
+
+        if self.streaming and self.write_reports:
+            self.write_report_rows(lid, report_items, perf_items)
+            for report_file in self.report_files.values():
+                report_file.flush()
+
+    #
+    def run_serial(self):
+        """
+        Method to run the layers one after the other in the current process. In the streaming mode,
+        the simulation object of each layer is created here and released once the layer is done.
+        """
+        for layer_id in range(self.num_layers):
             if self.verbose:
-                layer_id = single_layer_obj.get_layer_id()
                 print('\nRunning Layer ' + str(layer_id))
 
+            if layer_id in self.completed_report_items:
+                if self.verbose:
+                    print('Completed by the previous run')
+                report_items = self.completed_report_items[layer_id]
+                self.add_layer_report_items(report_items)
+                self.progress.finish_layer(layer_id, 'resumed')
+                if self.verbose:
+                    self.print_layer_summary(report_items)
+                continue
+
+            source_layer_id = self.layer_source_list[layer_id]
+            if not source_layer_id == layer_id:
+                if self.verbose:
+                    print('Identical to layer ' + str(source_layer_id) + ', reusing its results')
+                report_items = self.reuse_layer_results(layer_id, source_layer_id)
+                self.add_layer_report_items(report_items)
+                self.save_checkpoint(layer_id, report_items)
+                self.progress.finish_layer(layer_id, 'identical')
+                if self.verbose:
+                    self.print_layer_summary(report_items)
+                continue
+
+            if layer_id in self.cached_report_items:
+                if self.verbose:
+                    print('Found in the result cache')
+                report_items = self.use_cached_results(layer_id)
+                self.add_layer_report_items(report_items)
+                self.save_checkpoint(layer_id, report_items)
+                self.progress.finish_layer(layer_id, 'cached')
+                if self.verbose:
+                    self.print_layer_summary(report_items)
+                continue
+
+            if self.streaming:
+                single_layer_obj = self.create_layer_sim(layer_id)
+            else:
+                single_layer_obj = self.single_layer_sim_object_list[layer_id]
+            self.progress.start_layer(layer_id)
+            single_layer_obj.set_progress_callback(self.progress.get_layer_callback(layer_id))
             single_layer_obj.run()
 
+            report_items = get_layer_report_items(single_layer_obj, self.conf)
+
             if self.verbose:
-                comp_items = single_layer_obj.get_compute_report_items()
-                total_cycles = comp_items[0]
-                comp_cycles = comp_items[1]
-                stall_cycles = comp_items[2]
-                util = comp_items[3]
-                mapping_eff = comp_items[4]
-                print('Total cycles: ' + str(total_cycles))
-                print('Compute cycles: ' + str(comp_cycles))
-                print('Stall cycles: ' + str(stall_cycles))
-                print('Overall utilization: ' + "{:.2f}".format(util) +'%')
-                print('Mapping efficiency: ' + "{:.2f}".format(mapping_eff) +'%')
-
-                avg_bw_items = single_layer_obj.get_bandwidth_report_items()
-                if self.conf.sparsity_support is True:
-                    avg_ifmap_sram_bw = avg_bw_items[0]
-                    avg_filter_sram_bw = avg_bw_items[1]
-                    avg_filter_metadata_sram_bw = avg_bw_items[2]
-                    avg_ofmap_sram_bw = avg_bw_items[3]
-                    avg_ifmap_dram_bw = avg_bw_items[4]
-                    avg_filter_dram_bw = avg_bw_items[5]
-                    avg_ofmap_dram_bw = avg_bw_items[6]
-                else:
-                    avg_ifmap_sram_bw = avg_bw_items[0]
-                    avg_filter_sram_bw = avg_bw_items[1]
-                    avg_ofmap_sram_bw = avg_bw_items[2]
-                    avg_ifmap_dram_bw = avg_bw_items[3]
-                    avg_filter_dram_bw = avg_bw_items[4]
-                    avg_ofmap_dram_bw = avg_bw_items[5]
-
-                print('Average IFMAP SRAM BW: ' + "{:.3f}".format(avg_ifmap_sram_bw) + \
-                      ' words/cycle')
-                print('Average Filter SRAM BW: ' + "{:.3f}".format(avg_filter_sram_bw) + \
-                      ' words/cycle')
-                if self.conf.sparsity_support is True:
-                    print('Average Filter Metadata SRAM BW: ' + \
-                          "{:.3f}".format(avg_filter_metadata_sram_bw) + ' words/cycle')
-                print('Average OFMAP SRAM BW: ' + "{:.3f}".format(avg_ofmap_sram_bw) + \
-                      ' words/cycle')
-                print('Average IFMAP DRAM BW: ' + "{:.3f}".format(avg_ifmap_dram_bw) + \
-                      ' words/cycle')
-                print('Average Filter DRAM BW: ' + "{:.3f}".format(avg_filter_dram_bw) + \
-                      ' words/cycle')
-                print('Average OFMAP DRAM BW: ' + "{:.3f}".format(avg_ofmap_dram_bw) + \
-                      ' words/cycle')
+                self.print_layer_summary(report_items)
 
             if self.save_trace:
                 if self.verbose:
@@ -155,25 +649,181 @@ class simulator:
                 if self.verbose:
                     print('Done!')
 
-        self.all_layer_run_done = True
+            perf_items = []
+            if self.profiling:
+                perf_items = single_layer_obj.get_perf_items()
+            self.add_layer_report_items(report_items, perf_items)
+
+            self.add_to_cache(layer_id, report_items)
+            self.save_checkpoint(layer_id, report_items)
+            self.progress.finish_layer(layer_id, 'simulated')
+
+            # In the streaming mode, this releases the operand, demand and trace matrices
+            single_layer_obj = None
+
+    #
+    def run_parallel(self):
+        """
+        Method to run the layers in a pool of worker processes. The layers are independent of each
+        other, therefore they are dispatched all at once and the results are collected in layer
+        order so that the reports are identical to the ones from a serial run. Each simulated layer
+        is checkpointed as soon as its worker is done.
+        """
+        if self.verbose:
+            print('\nRunning ' + str(self.num_layers) + ' layers on ' + str(self.num_jobs)
+                  + ' processes')
+
+        with ProcessPoolExecutor(max_workers=self.num_jobs) as executor:
+            futures = {}
+            for layer_id in self.get_layers_to_simulate():
+                futures[layer_id] = self.submit_layer(executor, layer_id)
 
-        self.generate_reports()
+            self.collect_layer_results(futures)
+
+    #
+    def get_layers_to_simulate(self):
+        """
+        Method to get the ids of the layers which need to be simulated, i.e. the ones which are not
+        identical to an earlier layer, checkpointed or cached.
+        """
+        layer_ids = []
+        for layer_id in range(self.num_layers):
+            if not self.layer_source_list[layer_id] == layer_id:
+                continue
+            if layer_id in self.cached_report_items or \
+                    layer_id in self.completed_report_items:
+                continue
+            layer_ids.append(layer_id)
+
+        return layer_ids
+
+    #
+    def submit_layer(self, executor, layer_id):
+        """
+        Method to submit the simulation of a layer to a pool of worker processes. Returns the
+        future of the report items of the layer.
+        """
+        future = executor.submit(run_single_layer, layer_id,
+                                 self.conf, self.topo, self.layout,
+                                 self.top_path, self.save_trace, self.progress_output)
+        future.add_done_callback(partial(self.save_checkpoint_when_done, layer_id))
+
+        return future
+
+    #
+    def collect_layer_results(self, futures):
+        """
+        Method to gather the report items of all the layers in layer order, waiting for the futures
+        of the submitted layers (indexed by layer id) and filling in the other ones.
+        """
+        for layer_id in range(self.num_layers):
+            source_layer_id = self.layer_source_list[layer_id]
+            perf_items = []
+            if layer_id in self.completed_report_items:
+                report_items = self.completed_report_items[layer_id]
+                self.progress.finish_layer(layer_id, 'resumed')
+            elif layer_id in self.cached_report_items:
+                report_items = self.use_cached_results(layer_id)
+                self.save_checkpoint(layer_id, report_items)
+                self.progress.finish_layer(layer_id, 'cached')
+            elif source_layer_id == layer_id:
+                # The progress of the simulated layers is reported as soon as they are done
+                report_items, perf_items = split_perf_items(futures[layer_id].result())
+                self.add_to_cache(layer_id, report_items)
+            else:
+                report_items = self.reuse_layer_results(layer_id, source_layer_id)
+                self.save_checkpoint(layer_id, report_items)
+                self.progress.finish_layer(layer_id, 'identical')
+            self.add_layer_report_items(report_items, perf_items)
+
+            if self.verbose:
+                print('\nLayer ' + str(layer_id) + ' done')
+                if layer_id in self.completed_report_items:
+                    print('Completed by the previous run')
+                elif not source_layer_id == layer_id:
+                    print('Identical to layer ' + str(source_layer_id)
+                          + ', reusing its results')
+                self.print_layer_summary(report_items)
+
+    #
+    def print_layer_summary(self, report_items):
+        """
+        Method to print the compute and bandwidth summary of a layer for verbose runs.
+        """
+        comp_items = report_items['compute']
+        total_cycles = comp_items[0]
+        comp_cycles = comp_items[1]
+        stall_cycles = comp_items[2]
+        util = comp_items[3]
+        mapping_eff = comp_items[4]
+        print('Total cycles: ' + str(total_cycles))
+        print('Compute cycles: ' + str(comp_cycles))
+        print('Stall cycles: ' + str(stall_cycles))
+        print('Overall utilization: ' + "{:.2f}".format(util) +'%')
+        print('Mapping efficiency: ' + "{:.2f}".format(mapping_eff) +'%')
+
+        avg_bw_items = report_items['bandwidth']
+        if self.conf.sparsity_support is True:
+            avg_ifmap_sram_bw = avg_bw_items[0]
+            avg_filter_sram_bw = avg_bw_items[1]
+            avg_filter_metadata_sram_bw = avg_bw_items[2]
+            avg_ofmap_sram_bw = avg_bw_items[3]
+            avg_ifmap_dram_bw = avg_bw_items[4]
+            avg_filter_dram_bw = avg_bw_items[5]
+            avg_ofmap_dram_bw = avg_bw_items[6]
+        else:
+            avg_ifmap_sram_bw = avg_bw_items[0]
+            avg_filter_sram_bw = avg_bw_items[1]
+            avg_ofmap_sram_bw = avg_bw_items[2]
+            avg_ifmap_dram_bw = avg_bw_items[3]
+            avg_filter_dram_bw = avg_bw_items[4]
+            avg_ofmap_dram_bw = avg_bw_items[5]
+
+        print('Average IFMAP SRAM BW: ' + "{:.3f}".format(avg_ifmap_sram_bw) + \
+              ' words/cycle')
+        print('Average Filter SRAM BW: ' + "{:.3f}".format(avg_filter_sram_bw) + \
+              ' words/cycle')
+        if self.conf.sparsity_support is True:
+            print('Average Filter Metadata SRAM BW: ' + \
+                  "{:.3f}".format(avg_filter_metadata_sram_bw) + ' words/cycle')
+        print('Average OFMAP SRAM BW: ' + "{:.3f}".format(avg_ofmap_sram_bw) + \
+              ' words/cycle')
+        print('Average IFMAP DRAM BW: ' + "{:.3f}".format(avg_ifmap_dram_bw) + \
+              ' words/cycle')
+        print('Average Filter DRAM BW: ' + "{:.3f}".format(avg_filter_dram_bw) + \
+              ' words/cycle')
+        print('Average OFMAP DRAM BW: ' + "{:.3f}".format(avg_ofmap_dram_bw) + \
+              ' words/cycle')
 
     #
     def generate_reports(self):
         """
         Method to generate the report files for scalesim run if the runs are already completed. For
-        each layer, this method collects the report data from single_layer_sim objects and then
+        each layer, this method takes the report data collected during the layer runs and then
         prints them out into COMPUTE_REPORT.csv, BANDWIDTH_REPORT.csv, DETAILED_ACCESS_REPORT.csv
-        and SPARSE_REPORT.csv files.
+        and SPARSE_REPORT.csv files, and PERF_REPORT.csv when profiling.
         """
         assert self.all_layer_run_done, 'Layer runs are not done yet'
 
+        self.open_reports()
+        for lid, report_items in enumerate(self.layer_report_items_list):
+            self.write_report_rows(lid, report_items, self.layer_perf_items_list[lid])
+        self.close_reports()
+
+    #
+    def open_reports(self):
+        """
+        Method to create the report files and write their headers. The rows are then added with
+        write_report_rows().
+        """
+        self.report_files = {}
+
         compute_report_name = self.top_path + '/COMPUTE_REPORT.csv'
         compute_report = open(compute_report_name, 'w')
         header = ('LayerID, Total Cycles (incl. prefetch), Total Cycles, Stall Cycles, Overall Util %, Mapping Efficiency %,'
                   ' Compute Util %,\n')
         compute_report.write(header)
+        self.report_files['compute'] = compute_report
 
         bandwidth_report_name = self.top_path + '/BANDWIDTH_REPORT.csv'
         bandwidth_report = open(bandwidth_report_name, 'w')
@@ -184,6 +834,7 @@ class simulator:
             header = 'LayerID, Avg IFMAP SRAM BW, Avg FILTER SRAM BW, Avg OFMAP SRAM BW, '
         header += 'Avg IFMAP DRAM BW, Avg FILTER DRAM BW, Avg OFMAP DRAM BW,\n'
         bandwidth_report.write(header)
+        self.report_files['bandwidth'] = bandwidth_report
 
         detail_report_name = self.top_path + '/DETAILED_ACCESS_REPORT.csv'
         detail_report = open(detail_report_name, 'w')
@@ -195,6 +846,7 @@ class simulator:
         header += 'DRAM Filter Start Cycle, DRAM Filter Stop Cycle, DRAM Filter Reads, '
         header += 'DRAM OFMAP Start Cycle, DRAM OFMAP Stop Cycle, DRAM OFMAP Writes,\n'
         detail_report.write(header)
+        self.report_files['detail'] = detail_report
 
         if self.conf.sparsity_support is True:
             sparse_report_name = self.top_path + '/SPARSE_REPORT.csv'
@@ -206,39 +858,63 @@ class simulator:
             header += 'Avg FILTER Metadata SRAM BW, '
             header += '\n'
             sparse_report.write(header)
+            self.report_files['sparse'] = sparse_report
 
-        for lid in range(len(self.single_layer_sim_object_list)):
-            single_layer_obj = self.single_layer_sim_object_list[lid]
-            compute_report_items_this_layer = single_layer_obj.get_compute_report_items()
-            log = str(lid) +', '
-            log += ', '.join([str(x) for x in compute_report_items_this_layer])
-            log += ',\n'
-            compute_report.write(log)
+        if self.profiling:
+            perf_report_name = self.top_path + '/PERF_REPORT.csv'
+            perf_report = open(perf_report_name, 'w')
+            header = 'LayerID, Stage, Time (s), Elements, Bytes,\n'
+            perf_report.write(header)
+            self.report_files['perf'] = perf_report
 
-            bandwidth_report_items_this_layer = single_layer_obj.get_bandwidth_report_items()
-            log = str(lid) + ', '
-            log += ', '.join([str(x) for x in bandwidth_report_items_this_layer])
-            log += ',\n'
-            bandwidth_report.write(log)
+    #
+    def write_report_rows(self, lid, report_items, perf_items=None):
+        """
+        Method to add the rows of one layer to the open report files. The profile of the layer has
+        one row per stage.
+        """
+        if perf_items is None:
+            perf_items = []
+
+        compute_report_items_this_layer = report_items['compute']
+        log = str(lid) +', '
+        log += ', '.join([str(x) for x in compute_report_items_this_layer])
+        log += ',\n'
+        self.report_files['compute'].write(log)
+
+        bandwidth_report_items_this_layer = report_items['bandwidth']
+        log = str(lid) + ', '
+        log += ', '.join([str(x) for x in bandwidth_report_items_this_layer])
+        log += ',\n'
+        self.report_files['bandwidth'].write(log)
+
+        detail_report_items_this_layer = report_items['detail']
+        log = str(lid) + ', '
+        log += ', '.join([str(x) for x in detail_report_items_this_layer])
+        log += ',\n'
+        self.report_files['detail'].write(log)
 
-            detail_report_items_this_layer = single_layer_obj.get_detail_report_items()
-            log = str(lid) + ', '
-            log += ', '.join([str(x) for x in detail_report_items_this_layer])
+        if self.conf.sparsity_support is True:
+            sparse_report_items_this_layer = report_items['sparse']
+            log = str(lid) + ', ' + self.conf.sparsity_representation + ', '
+            log += ', '.join([str(x) for x in sparse_report_items_this_layer])
             log += ',\n'
-            detail_report.write(log)
+            self.report_files['sparse'].write(log)
 
-            if self.conf.sparsity_support is True:
-                sparse_report_items_this_layer = single_layer_obj.get_sparse_report_items()
-                log = str(lid) + ', ' + self.conf.sparsity_representation + ', '
-                log += ', '.join([str(x) for x in sparse_report_items_this_layer])
-                log += ',\n'
-                sparse_report.write(log)
-
-        compute_report.close()
-        bandwidth_report.close()
-        detail_report.close()
-        if self.conf.sparsity_support is True:
-            sparse_report.close()
+        if self.profiling:
+            for stage, stage_time, num_elements, num_bytes in perf_items:
+                log = str(lid) + ', ' + stage + ', ' + "{:.6f}".format(stage_time) + ', '
+                log += str(num_elements) + ', ' + str(num_bytes) + ',\n'
+                self.report_files['perf'].write(log)
+
+    #
+    def close_reports(self):
+        """
+        Method to close the report files.
+        """
+        for report_file in self.report_files.values():
+            report_file.close()
+        self.report_files = {}
 
     #
     def get_total_cycles(self):
@@ -249,8 +925,28 @@ class simulator:
         assert self.all_layer_run_done, 'Layer runs are not done yet'
 
         total_cycles = 0
-        for layer_obj in self.single_layer_sim_object_list:
-            cycles_this_layer = int(layer_obj.get_compute_report_items[0])
+        for report_items in self.layer_report_items_list:
+            cycles_this_layer = int(report_items['compute'][0])
             total_cycles += cycles_this_layer
 
         return total_cycles
+
+    #
+    def get_results(self):
+        """
+        Method to get the results of all the layers as a scale_results object.
+        """
+        assert self.all_layer_run_done, 'Layer runs are not done yet'
+
+        layer_names = [self.topo.get_layer_name(layer_id) for layer_id in range(self.num_layers)]
+
+        results = scale_results()
+        results.set_params(layer_report_items_list=self.layer_report_items_list,
+                           layer_names=layer_names,
+                           run_name=self.conf.get_run_name(),
+                           topo_name=self.topo.get_current_topo_name(),
+                           report_path=self.top_path,
+                           sparsity_support=self.conf.sparsity_support is True,
+                           sparsity_representation=self.conf.sparsity_representation)
+
+        return results
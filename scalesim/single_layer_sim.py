@@ -4,6 +4,7 @@ the model and generates the data that goes inside the reports.
 """
 
 import os
+import time
 import numpy as np
 
 from scalesim.compute.compression import compression as cp
@@ -12,6 +13,7 @@ from scalesim.scale_config import scale_config as cfg
 from scalesim.topology_utils import topologies as topo
 from scalesim.layout_utils import layouts as layout
 from scalesim.compute.operand_matrix import operand_matrix as opmat
+from scalesim.compute.operand_cache import get_operand_cache
 from scalesim.compute.systolic_compute_os import systolic_compute_os
 from scalesim.compute.systolic_compute_ws import systolic_compute_ws
 from scalesim.compute.systolic_compute_is import systolic_compute_is
@@ -38,6 +40,17 @@ class single_layer_sim:
 
         self.verbose = True
 
+        # Wall clock time (s) spent in each stage of run() and save_traces()
+        self.stage_times = {}
+        # Number of elements and bytes of the matrices produced by each stage, when profiling
+        self.profiling = False
+        self.stage_counts = {}
+        # Progress callback of the memory service loop
+        self.progress_callback = None
+        # The SRAM trace matrices are needed by save_traces(), they can be dropped when the demands
+        # are streamed
+        self.keep_sram_traces = True
+
         self.sparsity_ratio_N = 1
         self.sparsity_ratio_M = 1
 
@@ -139,6 +152,7 @@ class single_layer_sim:
 
         self.num_mac_unit = arr_dims[0] * arr_dims[1]
         self.verbose=verbose
+        self.profiling = self.config.get_profiling()
 
         self.sparsity_ratio_N, self.sparsity_ratio_M = \
             self.topo.get_layer_sparsity_ratio(self.layer_id)
@@ -154,6 +168,23 @@ class single_layer_sim:
         self.memory_system = mem_sys_obj
         self.memory_system_ready_flag = True
 
+    #
+    def set_progress_callback(self, progress_callback=None):
+        """
+        Method to set the function called with the demand lines serviced so far and the total
+        number of lines during the memory simulation.
+        """
+        self.progress_callback = progress_callback
+
+    #
+    def set_keep_sram_traces(self, keep_sram_traces=True):
+        """
+        Method to choose whether the SRAM trace matrices are kept once the run is done. They are
+        needed by save_traces(). When the demands are streamed and the traces are not kept, the
+        memory held during the run is bound by the array size rather than by the layer size.
+        """
+        self.keep_sram_traces = keep_sram_traces
+
     #
     def calculate_filter_metadata_storage(self, filter_op_mat):
         """
@@ -182,6 +213,25 @@ class single_layer_sim:
             self.metadata_reads += metadata_storage
     # END of metadata calculation
 
+    #
+    def load_operand_matrices(self):
+        """
+        Method to get the operand matrices of the layer from the operand cache, if it is on. On a
+        miss, they are created and added to the cache.
+        """
+        cache = get_operand_cache(self.config)
+        if cache is None:
+            return
+
+        signature = self.op_mat_obj.get_operand_signature()
+        matrices = cache.lookup(signature)
+        if matrices is not None:
+            self.op_mat_obj.set_operand_matrices(matrices)
+            return
+
+        if self.op_mat_obj.create_operand_matrices() == 0:
+            cache.store(signature, self.op_mat_obj.get_operand_matrices())
+
     #
     def run(self):
         """
@@ -193,7 +243,9 @@ class single_layer_sim:
 
         # 1. Setup and the get the demand from compute system
 
-        # 1.1 Get the operand matrices
+        # 1.1 Get the operand matrices, from the operand cache if they were created before
+        stage_start = time.perf_counter()
+        self.load_operand_matrices()
         _, ifmap_op_mat = self.op_mat_obj.get_ifmap_matrix()
         _, filter_op_mat = self.op_mat_obj.get_filter_matrix()
         _, ofmap_op_mat = self.op_mat_obj.get_ofmap_matrix()
@@ -202,6 +254,8 @@ class single_layer_sim:
         self.calculate_filter_metadata_storage(filter_op_mat)
         self.num_compute = self.topo.get_layer_num_ofmap_px(self.layer_id) \
                            * self.topo.get_layer_window_size(self.layer_id)
+        stage_start = self.record_stage_time('operand_matrix', stage_start,
+                                             [ifmap_op_mat, filter_op_mat, ofmap_op_mat])
 
         # 1.3 Get the prefetch matrices for both operands
         if self.dataflow == 'ws':
@@ -227,8 +281,30 @@ class single_layer_sim:
             ifmap_prefetch_mat = self.op_mat_obj.get_ifmap_prefetch_matrix_custom_layout()
         if self.using_filter_custom_layout:
             filter_prefetch_mat = self.op_mat_obj.get_filter_prefetch_matrix_custom_layout()
-    
-        ifmap_demand_mat, filter_demand_mat, ofmap_demand_mat = self.compute_system.get_demand_matrices()
+        stage_start = self.record_stage_time('prefetch_matrices', stage_start,
+                                             [ifmap_prefetch_mat, filter_prefetch_mat])
+
+        # 1.5 Get the demand matrices, or in the streaming mode the generator of their blocks,
+        # which are created while the memory system services them
+        stream_demands, demand_block_lines = self.config.get_demand_streaming()
+        fast_forward, fast_forward_window, fast_forward_tolerance = \
+            self.config.get_fast_forward()
+        if fast_forward and (not self.config.use_user_dram_bandwidth()
+                             or self.config.use_ramulator_trace):
+            print('WARNING: The fast forward mode needs the USER bandwidth mode without '
+                  'Ramulator traces, simulating all the folds')
+            fast_forward = False
+        if fast_forward:
+            # The steady state is found fold by fold
+            stream_demands, demand_block_lines = True, 0
+        if stream_demands:
+            demand_blocks = self.compute_system.get_demand_blocks(demand_block_lines)
+        else:
+            ifmap_demand_mat, filter_demand_mat, ofmap_demand_mat = \
+                self.compute_system.get_demand_matrices()
+            stage_start = self.record_stage_time('demand_matrices', stage_start,
+                                                 [ifmap_demand_mat, filter_demand_mat,
+                                                  ofmap_demand_mat])
         #print('DEBUG: Compute operations done')
         # 2. Setup the memory system and run the demands through it to find any memory bottleneck and generate traces
 
@@ -290,18 +366,88 @@ class single_layer_sim:
                                                         ifmap_prefetch_mat=ifmap_prefetch_mat,
                                                         filter_prefetch_mat=filter_prefetch_mat
                                                              )
-        self.memory_system.service_memory_requests(ifmap_demand_mat,
-                                                    filter_demand_mat,
-                                                    ofmap_demand_mat)
+        self.memory_system.set_progress_callback(self.progress_callback)
+        if stream_demands:
+            num_folds, fold_lines = self.compute_system.get_demand_fold_lines()
+            keep_sram_traces = self.keep_sram_traces
+            fast_forward_period = 1
+            if fast_forward:
+                keep_sram_traces = False
+                fast_forward_period = self.compute_system.get_demand_fold_period()
+            else:
+                fast_forward_window = 0
+            self.memory_system.service_memory_request_blocks(
+                                                    demand_blocks,
+                                                    num_lines=num_folds * fold_lines,
+                                                    keep_sram_traces=keep_sram_traces,
+                                                    fast_forward_window=fast_forward_window,
+                                                    fast_forward_tolerance=fast_forward_tolerance,
+                                                    fast_forward_period=fast_forward_period,
+                                                    num_folds=num_folds)
+        else:
+            self.memory_system.service_memory_requests(ifmap_demand_mat,
+                                                        filter_demand_mat,
+                                                        ofmap_demand_mat)
+        stage_arrays = []
+        if self.profiling:
+            stage_arrays = list(self.memory_system.get_sram_trace_matrices())
+        self.record_stage_time('service_memory_requests', stage_start, stage_arrays)
 
         self.runs_ready = True
 
+    #
+    def record_stage_time(self, stage, stage_start, stage_arrays=()):
+        """
+        Method to record the time spent in a stage which started at stage_start. When profiling,
+        the total number of elements and bytes of the matrices produced by the stage (stage_arrays)
+        are recorded as well. Returns the end time of the stage, which is the start of the next one.
+        """
+        stage_end = time.perf_counter()
+        self.stage_times[stage] = stage_end - stage_start
+
+        if self.profiling:
+            stage_arrays = [x for x in stage_arrays if x is not None]
+            num_elements = sum([int(np.size(x)) for x in stage_arrays])
+            num_bytes = sum([int(np.asarray(x).nbytes) for x in stage_arrays])
+            self.stage_counts[stage] = [num_elements, num_bytes]
+
+        return stage_end
+
+    #
+    def get_stage_times(self):
+        """
+        Method to get the wall clock time (s) spent in each stage of the layer simulation:
+        operand_matrix, prefetch_matrices, demand_matrices, service_memory_requests and, once the
+        traces are saved, save_traces. When the demands are streamed, they are created within
+        service_memory_requests.
+        """
+        return dict(self.stage_times)
+
+    #
+    def get_perf_items(self):
+        """
+        Method to get the profile of the layer simulation, as one [stage, time (s), elements,
+        bytes] entry per stage run so far. The element and byte counts are only available when
+        profiling is enabled in the config.
+        """
+        perf_items = []
+        for stage, stage_time in self.stage_times.items():
+            num_elements, num_bytes = self.stage_counts.get(stage, [0, 0])
+            perf_items.append([stage, stage_time, num_elements, num_bytes])
+
+        return perf_items
+
     # This will write the traces
     def save_traces(self, top_path):
         """
         Method to save SRAM and DRAM traces for ifmap, filter and ofmap matrices.
         """
         assert self.params_set_flag, 'Parameters are not set'
+        stage_start = time.perf_counter()
+
+        if self.config.get_fast_forward()[0]:
+            print('WARNING: Traces are not saved in the fast forward mode')
+            return
 
         dir_name = top_path + '/layer' + str(self.layer_id)
         if not os.path.isdir(dir_name):
@@ -323,6 +469,12 @@ class single_layer_sim:
         self.memory_system.print_ofmap_sram_trace(ofmap_sram_filename)
         self.memory_system.print_ofmap_dram_trace(ofmap_dram_filename)
 
+        stage_arrays = []
+        if self.profiling:
+            stage_arrays = list(self.memory_system.get_sram_trace_matrices())
+            stage_arrays += list(self.memory_system.get_dram_trace_matrices())
+        self.record_stage_time('save_traces', stage_start, stage_arrays)
+
     #
     def calc_report_data(self):
         """
@@ -0,0 +1,517 @@
+"""
+This file contains the 'sweep' class which runs a design space exploration over configurations. A
+base configuration is combined with a grid or a list of parameter overrides, every layer of the
+given topologies is simulated for each of the resulting configurations in a pool of worker
+processes, and the results are gathered in a single table with one row per (config, layer).
+
+Usage:
+    python3 -m scalesim.sweep -c <config> -t <conv topo> -g <gemm topo> \\
+        --grid ArrayHeight=8,16,32 --grid Dataflow=os,ws
+"""
+
+import argparse
+import copy
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from scalesim.scale_config import scale_config
+from scalesim.topology_utils import topologies
+from scalesim.layout_utils import layouts
+from scalesim.result_cache import result_cache
+from scalesim.compute.operand_cache import get_operand_cache
+from scalesim.simulator import run_single_layer, get_layer_signature
+
+
+# Parameters which can be swept, named as in the config file and matched regardless of case. The
+# first ones are set through the configuration list of scale_config.update_from_list(), the value
+# is the index in that list.
+CONF_LIST_PARAMS = {
+    'ArrayHeight': 1,
+    'ArrayWidth': 2,
+    'IfmapSramSzkB': 3,
+    'FilterSramSzkB': 4,
+    'OfmapSramSzkB': 5,
+    'Dataflow': 9,
+}
+BANDWIDTH_PARAM = 'Bandwidth'
+# The bank parameters only matter with a custom layout of their operand, the value is the config
+# attribute and the attribute of the custom layout flag
+BANK_PARAMS = {
+    'IfmapSRAMBankNum': ['ifmap_sram_bank_num', 'using_ifmap_custom_layout'],
+    'FilterSRAMBankNum': ['filter_sram_bank_num', 'using_filter_custom_layout'],
+}
+SWEEP_PARAMS = list(CONF_LIST_PARAMS.keys()) + [BANDWIDTH_PARAM] + list(BANK_PARAMS.keys())
+
+COMPUTE_COLUMNS = ['Total Cycles (incl. prefetch)', 'Total Cycles', 'Stall Cycles',
+                   'Overall Util %', 'Mapping Efficiency %', 'Compute Util %']
+BANDWIDTH_COLUMNS = ['Avg IFMAP SRAM BW', 'Avg FILTER SRAM BW', 'Avg OFMAP SRAM BW',
+                     'Avg IFMAP DRAM BW', 'Avg FILTER DRAM BW', 'Avg OFMAP DRAM BW']
+SPARSE_BANDWIDTH_COLUMNS = ['Avg IFMAP SRAM BW', 'Avg FILTER SRAM BW',
+                            'Avg FILTER Metadata SRAM BW', 'Avg OFMAP SRAM BW',
+                            'Avg IFMAP DRAM BW', 'Avg FILTER DRAM BW', 'Avg OFMAP DRAM BW']
+DETAIL_COLUMNS = []
+for detail_name in ['SRAM IFMAP', 'SRAM Filter', 'SRAM OFMAP',
+                    'DRAM IFMAP', 'DRAM Filter', 'DRAM OFMAP']:
+    access_name = 'Writes' if detail_name.endswith('OFMAP') else 'Reads'
+    DETAIL_COLUMNS += [detail_name + ' Start Cycle', detail_name + ' Stop Cycle',
+                       detail_name + ' ' + access_name]
+
+# Topologies and layouts of the sweep, parsed once in the main process and handed to every worker
+# process when it starts, so that they are not sent again with each task.
+SWEEP_INPUTS = []
+
+
+#
+def init_sweep_worker(sweep_inputs):
+    """
+    Function to set the topologies and layouts shared by the tasks of a worker process.
+    """
+    global SWEEP_INPUTS
+    SWEEP_INPUTS = sweep_inputs
+
+
+#
+def run_sweep_layer(config_obj, input_id, layer_id):
+    """
+    Function to simulate one layer of one of the sweep topologies with the given configuration.
+    No traces are written, only the report items are returned.
+    """
+    _, topo_obj, layout_obj = SWEEP_INPUTS[input_id]
+    return run_single_layer(layer_id, config_obj, topo_obj, layout_obj, '', False)
+
+
+#
+def get_grid_points(grid):
+    """
+    Function to expand a grid, given as a dictionary of parameter name to list of values, into the
+    list of all the combinations of the values. Each point is a dictionary of overrides.
+    """
+    names = list(grid.keys())
+    points = []
+    for values in itertools.product(*[grid[name] for name in names]):
+        points.append(dict(zip(names, values)))
+
+    return points
+
+
+#
+def get_sweep_param_name(name):
+    """
+    Function to get the name of a sweep parameter, as in SWEEP_PARAMS, from its name in a grid or
+    a point, in any case.
+    """
+    for param_name in SWEEP_PARAMS:
+        if param_name.lower() == str(name).strip().lower():
+            return param_name
+
+    assert False, 'Invalid sweep parameter ' + str(name) + ', valid: ' + ', '.join(SWEEP_PARAMS)
+
+
+#
+def get_config_for_point(base_config, point, run_name):
+    """
+    Function to create the configuration of one sweep point by applying the overrides in point to a
+    copy of base_config. Setting the Bandwidth switches the configuration to the USER bandwidth
+    mode, in which the ifmap and filter DRAM bandwidths are the SRAM bank bandwidths of the layout
+    section: they are set to the first bandwidth as well. The bank numbers can only be swept for
+    the operands with a custom layout.
+    """
+    point = {get_sweep_param_name(name): value for name, value in point.items()}
+
+    conf_list = base_config.get_conf_as_list()[:10]
+    conf_list[0] = run_name
+    for name, idx in CONF_LIST_PARAMS.items():
+        if name in point:
+            conf_list[idx] = str(point[name]).strip()
+
+    bandwidths = base_config.get_bandwidths_as_list()
+    use_user_bandwidth = base_config.use_user_dram_bandwidth()
+    if BANDWIDTH_PARAM in point:
+        bandwidths = point[BANDWIDTH_PARAM]
+        if not isinstance(bandwidths, (list, tuple)):
+            bandwidths = [bandwidths]
+        bandwidths = [int(x) for x in bandwidths]
+        use_user_bandwidth = True
+
+    if use_user_bandwidth:
+        conf_list += ['USER', list(bandwidths)]
+    else:
+        conf_list += ['CALC', []]
+
+    config_obj = copy.deepcopy(base_config)
+    config_obj.update_from_list(conf_list)
+    assert config_obj.get_dataflow() in config_obj.valid_df_list, \
+        'Invalid dataflow ' + str(config_obj.get_dataflow())
+
+    if BANDWIDTH_PARAM in point:
+        config_obj.ifmap_sram_bank_bandwidth = bandwidths[0]
+        config_obj.filter_sram_bank_bandwidth = bandwidths[0]
+
+    for name, (attribute, layout_flag) in BANK_PARAMS.items():
+        if name in point:
+            assert getattr(config_obj, layout_flag), \
+                name + ' is only used with a custom layout, which is off in the config'
+            setattr(config_obj, attribute, int(point[name]))
+
+    for operand in ['ifmap', 'filter']:
+        bank_bandwidth = getattr(config_obj, operand + '_sram_bank_bandwidth')
+        bank_num = getattr(config_obj, operand + '_sram_bank_num')
+        assert bank_bandwidth % bank_num == 0, \
+            'The ' + operand + ' bandwidth ' + str(bank_bandwidth) + ' is not a multiple of the ' \
+            + str(bank_num) + ' ' + operand + ' SRAM banks'
+
+    return config_obj
+
+
+class sweep:
+    """
+    Class which runs the layers of a set of topologies for a set of configurations and collects
+    the results in one table.
+    """
+    #
+    def __init__(self):
+        """
+        __init__ method
+        """
+        self.base_config = scale_config()
+        self.points = []
+        self.config_list = []
+
+        # Entries are [topology name, topologies object, layouts object]
+        self.sweep_inputs = []
+
+        self.num_jobs = 1
+        self.verbose = True
+        self.cache = None
+
+        self.result_rows = []
+
+        self.params_set_flag = False
+        self.sweep_done_flag = False
+
+    #
+    def set_params(self,
+                   config_obj=None,
+                   conv_topofiles=None,
+                   gemm_topofiles=None,
+                   points=None,
+                   num_jobs=1,
+                   verbose=True,
+                   cache_dir='',
+                   cache_size_mb=1024
+                   ):
+        """
+        Method to set the base configuration, the topologies and the sweep points. Every point is
+        a dictionary of overrides of the base configuration (see SWEEP_PARAMS), an empty list of
+        points runs the base configuration alone. The topologies are parsed once here.
+        """
+        if config_obj is None:
+            config_obj = scale_config()
+        if conv_topofiles is None:
+            conv_topofiles = []
+        if gemm_topofiles is None:
+            gemm_topofiles = []
+        if points is None:
+            points = []
+
+        self.base_config = config_obj
+        self.points = list(points)
+        if len(self.points) == 0:
+            self.points = [{}]
+
+        self.num_jobs = max(1, int(num_jobs))
+        self.verbose = verbose
+
+        self.cache = None
+        if not cache_dir == '':
+            self.cache = result_cache(cache_dir=cache_dir, max_size_mb=cache_size_mb)
+
+        run_name = self.base_config.get_run_name()
+        self.config_list = []
+        for config_id, point in enumerate(self.points):
+            this_run_name = run_name + '_cfg' + str(config_id)
+            self.config_list.append(get_config_for_point(self.base_config, point, this_run_name))
+
+        self.sweep_inputs = []
+        topofiles = [(x, False) for x in conv_topofiles] + [(x, True) for x in gemm_topofiles]
+        for topofile, mnk_inputs in topofiles:
+            topo_obj = topologies()
+            topo_obj.load_arrays(topofile=topofile, mnk_inputs=mnk_inputs)
+
+            layout_obj = layouts()
+            if self.base_config.using_ifmap_custom_layout or \
+                    self.base_config.using_filter_custom_layout:
+                layout_obj.load_arrays(layoutfile=self.base_config.get_layout_path(),
+                                       mnk_inputs=mnk_inputs)
+
+            self.sweep_inputs.append([topo_obj.get_current_topo_name(), topo_obj, layout_obj])
+
+        self.params_set_flag = True
+
+    #
+    def run(self):
+        """
+        Method to run the sweep. Layers with the same signature, within a topology or across
+        configurations, are simulated once. The remaining ones are dispatched to a pool of
+        num_jobs worker processes, or run in this process when num_jobs is 1.
+        """
+        assert self.params_set_flag, 'Sweep parameters are not set'
+
+        # 1. Find the unique layers to simulate
+        # Entries are [config id, input id, layer id, signature]
+        sweep_layers = []
+        pending_signatures = {}
+        found_items = {}
+        for config_id, config_obj in enumerate(self.config_list):
+            for input_id, (_, topo_obj, layout_obj) in enumerate(self.sweep_inputs):
+                for layer_id in range(topo_obj.get_num_layers()):
+                    signature = get_layer_signature(layer_id, config_obj, topo_obj, layout_obj)
+                    sweep_layers.append([config_id, input_id, layer_id, signature])
+
+                    if signature in pending_signatures or signature in found_items:
+                        continue
+                    if self.cache is not None:
+                        report_items = self.cache.lookup(signature)
+                        if report_items is not None:
+                            found_items[signature] = report_items
+                            continue
+                    pending_signatures[signature] = [config_id, input_id, layer_id]
+
+        if self.verbose:
+            print('Sweep: ' + str(len(self.config_list)) + ' configs, '
+                  + str(len(sweep_layers)) + ' layers, '
+                  + str(len(pending_signatures)) + ' to simulate on '
+                  + str(self.num_jobs) + ' processes')
+
+        # 2. Simulate them
+        if self.num_jobs > 1:
+            with ProcessPoolExecutor(max_workers=self.num_jobs,
+                                     initializer=init_sweep_worker,
+                                     initargs=(self.sweep_inputs,)) as executor:
+                futures = {}
+                for signature, (config_id, input_id, layer_id) in pending_signatures.items():
+                    futures[signature] = executor.submit(run_sweep_layer,
+                                                         self.config_list[config_id],
+                                                         input_id, layer_id)
+                for signature, future in futures.items():
+                    found_items[signature] = future.result()
+                    self.add_to_cache(signature, found_items[signature])
+        else:
+            init_sweep_worker(self.sweep_inputs)
+            for signature, (config_id, input_id, layer_id) in pending_signatures.items():
+                found_items[signature] = run_sweep_layer(self.config_list[config_id],
+                                                         input_id, layer_id)
+                self.add_to_cache(signature, found_items[signature])
+
+            operand_cache = get_operand_cache(self.base_config)
+            if self.verbose and operand_cache is not None:
+                operand_cache.print_info()
+
+        # 3. Gather the results in sweep order
+        self.result_rows = []
+        for config_id, input_id, layer_id, signature in sweep_layers:
+            topo_name, topo_obj, _ = self.sweep_inputs[input_id]
+            report_items = found_items[signature]
+
+            row = [config_id] + self.get_config_values(config_id)
+            row += [topo_name, layer_id, topo_obj.get_layer_name(layer_id)]
+            row += list(report_items['compute'])
+            row += list(report_items['bandwidth'])
+            row += list(report_items['detail'])
+            self.result_rows.append(row)
+
+        self.sweep_done_flag = True
+
+    #
+    def add_to_cache(self, signature, report_items):
+        """
+        Method to add the results of a simulated layer to the result cache, if one is used.
+        """
+        if self.cache is None:
+            return
+
+        self.cache.store(signature, report_items)
+
+    #
+    def get_config_values(self, config_id):
+        """
+        Method to get the values of the sweep parameters for a configuration, in the order of
+        SWEEP_PARAMS.
+        """
+        config_obj = self.config_list[config_id]
+
+        values = []
+        for name, idx in CONF_LIST_PARAMS.items():
+            values.append(config_obj.get_conf_as_list()[idx])
+
+        if config_obj.use_user_dram_bandwidth():
+            values.append(' '.join([str(x) for x in config_obj.get_bandwidths_as_list()]))
+        else:
+            values.append('CALC')
+
+        for name, (attribute, _) in BANK_PARAMS.items():
+            values.append(str(getattr(config_obj, attribute)))
+
+        return values
+
+    #
+    def get_columns(self):
+        """
+        Method to get the names of the columns of the result table.
+        """
+        columns = ['ConfigID'] + SWEEP_PARAMS + ['Topology', 'LayerID', 'LayerName']
+        columns += COMPUTE_COLUMNS
+        if self.base_config.sparsity_support is True:
+            columns += SPARSE_BANDWIDTH_COLUMNS
+        else:
+            columns += BANDWIDTH_COLUMNS
+        columns += DETAIL_COLUMNS
+
+        return columns
+
+    #
+    def get_results(self):
+        """
+        Method to get the result table of the sweep as a list of rows, one per (config, layer), in
+        the order of get_columns().
+        """
+        assert self.sweep_done_flag, 'Sweep is not done yet'
+        return self.result_rows
+
+    #
+    def write_report(self, report_filename):
+        """
+        Method to write the result table to a csv file, in the format of the other reports.
+        """
+        assert self.sweep_done_flag, 'Sweep is not done yet'
+
+        report_dir = os.path.dirname(report_filename)
+        if not report_dir == '' and not os.path.isdir(report_dir):
+            os.makedirs(report_dir)
+
+        with open(report_filename, 'w') as report:
+            report.write(', '.join(self.get_columns()) + ',\n')
+            for row in self.result_rows:
+                report.write(', '.join([str(x) for x in row]) + ',\n')
+
+        if self.verbose:
+            print('Sweep report written to ' + report_filename)
+
+
+#
+def parse_grid_args(grid_args):
+    """
+    Function to parse the --grid arguments, of the form Param=value1,value2,..., into a grid.
+    """
+    grid = {}
+    for grid_arg in grid_args:
+        if '=' not in grid_arg:
+            print('ERROR: scalesim.sweep: Invalid grid argument ' + grid_arg)
+            print('Expected Param=value1,value2,...')
+            exit()
+        name, values = grid_arg.split('=', 1)
+        grid[get_sweep_param_name(name)] = [x.strip() for x in values.split(',')]
+
+    return grid
+
+
+#
+def load_points_file(points_filename):
+    """
+    Function to read the sweep points from a json file. The file holds either a list of points,
+    each a dictionary of overrides, or a dictionary with a "grid" and/or a "points" entry.
+    """
+    with open(points_filename, 'r') as points_file:
+        content = json.load(points_file)
+
+    if isinstance(content, list):
+        return content
+
+    points = []
+    if 'grid' in content:
+        points += get_grid_points(content['grid'])
+    if 'points' in content:
+        points += content['points']
+
+    return points
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-c', metavar='Config file', type=str,
+                        default="./configs/scale.cfg",
+                        help="Path to the base config file"
+                        )
+    parser.add_argument('-t', metavar='Topology file', type=str, nargs='*',
+                        default=[],
+                        help="Paths to the conv topology files"
+                        )
+    parser.add_argument('-g', metavar='GEMM topology file', type=str, nargs='*',
+                        default=[],
+                        help="Paths to the MNK topology files"
+                        )
+    parser.add_argument('--grid', metavar='Param=v1,v2', type=str, action='append',
+                        default=[],
+                        help="Values of a swept parameter, the sweep runs all the combinations. "
+                             "Parameters (any case): " + ', '.join(SWEEP_PARAMS)
+                        )
+    parser.add_argument('--points', metavar='Points file', type=str,
+                        default="",
+                        help="Path to a json file with a list of points and/or a grid"
+                        )
+    parser.add_argument('-o', metavar='Report file', type=str,
+                        default="./results/SWEEP_REPORT.csv",
+                        help="Path to the output report"
+                        )
+    parser.add_argument('-j', '--jobs', metavar='num jobs', type=int,
+                        default=os.cpu_count(),
+                        help="Number of worker processes"
+                        )
+    parser.add_argument('--cache-dir', metavar='cache dir', type=str,
+                        default="",
+                        help="Path to a result cache directory, reused across runs (off by default)"
+                        )
+    parser.add_argument('--cache-size', metavar='cache size', type=float,
+                        default=1024,
+                        help="Size cap of the result cache in MB"
+                        )
+    parser.add_argument('--operand-cache-size', metavar='operand cache size', type=float,
+                        default=512,
+                        help="Size cap in MB of the cache of the operand matrices in each process, "
+                             "reused across configurations (0 for off)"
+                        )
+    parser.add_argument('--operand-cache-dir', metavar='operand cache dir', type=str,
+                        default="",
+                        help="Path to a directory of operand matrices shared by the processes "
+                             "and the runs (off by default)"
+                        )
+
+    args = parser.parse_args()
+
+    config = scale_config()
+    config.read_conf_file(args.c)
+    config.set_operand_cache(args.operand_cache_size, args.operand_cache_dir,
+                             config.get_operand_cache()[2])
+
+    conv_topofiles = args.t
+    if len(args.t) == 0 and len(args.g) == 0:
+        conv_topofiles = [config.get_topology_path()]
+
+    sweep_points = []
+    if not args.points == '':
+        sweep_points += load_points_file(args.points)
+    if len(args.grid) > 0:
+        sweep_points += get_grid_points(parse_grid_args(args.grid))
+
+    s = sweep()
+    s.set_params(config_obj=config,
+                 conv_topofiles=conv_topofiles,
+                 gemm_topofiles=args.g,
+                 points=sweep_points,
+                 num_jobs=args.jobs,
+                 cache_dir=args.cache_dir,
+                 cache_size_mb=args.cache_size)
+    s.run()
+    s.write_report(args.o)
@@ -0,0 +1,185 @@
+"""
+This file contains the benchmark of the analytical mode. Each layer of the given topologies is run
+through both the full single_layer_sim path and analytical_layer_sim, and the relative error of the
+analytical estimates is reported along with the run times. Exits with 1 if the error of any metric
+of any layer exceeds the tolerance. In the estimate bandwidth (CALC) mode the DRAM reads are
+estimates and are reported but not checked.
+
+Usage:
+    python3 -m scalesim.utilities.analytical_benchmark -c <config> -t <conv topo> -g <gemm topo>
+"""
+
+import argparse
+import sys
+import time
+
+from scalesim.scale_config import scale_config
+from scalesim.topology_utils import topologies
+from scalesim.layout_utils import layouts
+from scalesim.single_layer_sim import single_layer_sim
+from scalesim.analytical_layer_sim import analytical_layer_sim
+
+
+# Name, report ('compute' or 'detail') and index of the compared report items
+METRICS = [
+    ['Total Cycles', 'compute', 1],
+    ['Stall Cycles', 'compute', 2],
+    ['Mapping Eff', 'compute', 4],
+    ['Compute Util', 'compute', 5],
+    ['SRAM IFMAP Reads', 'detail', 2],
+    ['SRAM Filter Reads', 'detail', 5],
+    ['SRAM OFMAP Writes', 'detail', 8],
+    ['DRAM IFMAP Reads', 'detail', 11],
+    ['DRAM Filter Reads', 'detail', 14],
+    ['DRAM OFMAP Writes', 'detail', 17],
+]
+
+# Metrics which are estimates, and not checked against the tolerance, in the CALC bandwidth mode
+CALC_ESTIMATE_METRICS = ['DRAM IFMAP Reads', 'DRAM Filter Reads']
+
+
+#
+def get_relative_error(estimate, reference):
+    """
+    Function to get the relative error (in %) of an estimate.
+    """
+    if reference == 0:
+        if estimate == 0:
+            return 0.0
+        return 100.0
+    return abs(estimate - reference) * 100 / abs(reference)
+
+
+#
+def run_layer(layer_sim_obj, layer_id, config, topo, layout):
+    """
+    Function to run a single layer with the given layer sim object and collect its report items.
+    """
+    start = time.perf_counter()
+    layer_sim_obj.set_params(layer_id=layer_id, config_obj=config, topology_obj=topo,
+                             layout_obj=layout, verbose=False)
+    layer_sim_obj.run()
+    items = {
+        'compute': layer_sim_obj.get_compute_report_items(),
+        'detail': layer_sim_obj.get_detail_report_items()
+    }
+    run_time = time.perf_counter() - start
+
+    return items, run_time
+
+
+#
+def benchmark_topology(config, topofile, gemm_input=False, max_layers=-1):
+    """
+    Function to compare the analytical and the full simulation for the layers of one topology.
+    Returns one row per layer: [topology, layer name, full time, analytical time, errors...]
+    """
+    topo = topologies()
+    topo.load_arrays(topofile=topofile, mnk_inputs=gemm_input)
+    layout = layouts()
+
+    num_layers = topo.get_num_layers()
+    if max_layers > 0:
+        num_layers = min(num_layers, max_layers)
+
+    rows = []
+    for layer_id in range(num_layers):
+        full_items, full_time = run_layer(single_layer_sim(), layer_id, config, topo, layout)
+        est_items, est_time = run_layer(analytical_layer_sim(), layer_id, config, topo, layout)
+
+        errors = []
+        for _, report, idx in METRICS:
+            errors.append(get_relative_error(est_items[report][idx], full_items[report][idx]))
+
+        rows.append([topo.get_current_topo_name(), topo.get_layer_name(layer_id),
+                     full_time, est_time] + errors)
+
+    return rows
+
+
+#
+def print_results(rows):
+    """
+    Function to print the per layer errors and the mean error of every metric.
+    """
+    header = ['Topology', 'Layer', 'Full (s)', 'Analytical (us)']
+    header += [metric[0] + ' err %' for metric in METRICS]
+    print(', '.join(header))
+
+    for row in rows:
+        log = [row[0], row[1], "{:.3f}".format(row[2]), "{:.1f}".format(row[3] * 1e6)]
+        log += ["{:.2f}".format(x) for x in row[4:]]
+        print(', '.join(log))
+
+    if len(rows) == 0:
+        return
+
+    print('')
+    print('Mean relative error over ' + str(len(rows)) + ' layers')
+    for metric_id, metric in enumerate(METRICS):
+        errors = [row[4 + metric_id] for row in rows]
+        print(metric[0] + ': \t' + "{:.2f}".format(sum(errors) / len(errors)) + '%'
+              + ' (max ' + "{:.2f}".format(max(errors)) + '%)')
+
+    full_time = sum([row[2] for row in rows])
+    est_time = sum([row[3] for row in rows])
+    print('Total time full: \t' + "{:.3f}".format(full_time) + ' s')
+    print('Total time analytical: \t' + "{:.6f}".format(est_time) + ' s')
+
+
+#
+def check_results(rows, tolerance, user_bandwidth=True):
+    """
+    Function to check the per layer errors against the tolerance. Returns the number of layers
+    with a metric beyond it, printing an error for each of them.
+    """
+    num_fail = 0
+    for row in rows:
+        failed_metrics = [metric[0] for metric_id, metric in enumerate(METRICS)
+                          if row[4 + metric_id] > tolerance * 100
+                          and (user_bandwidth or metric[0] not in CALC_ESTIMATE_METRICS)]
+        if len(failed_metrics) > 0:
+            print('ERROR: The analytical error of ' + row[0] + ', ' + row[1] + ' exceeds '
+                  + "{:.2f}".format(tolerance * 100) + '% for ' + ', '.join(failed_metrics))
+            num_fail += 1
+
+    return num_fail
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-c', metavar='Config file', type=str,
+                        default="./configs/scale.cfg",
+                        help="Path to the config file"
+                        )
+    parser.add_argument('-t', metavar='Topology file', type=str, nargs='*',
+                        default=["./topologies/conv_nets/alexnet_part.csv"],
+                        help="Paths to the conv topology files"
+                        )
+    parser.add_argument('-g', metavar='GEMM topology file', type=str, nargs='*',
+                        default=["./topologies/GEMM_mnk/test_mnk_input.csv"],
+                        help="Paths to the MNK topology files"
+                        )
+    parser.add_argument('-n', metavar='Max layers', type=int,
+                        default=-1,
+                        help="Number of layers to benchmark per topology (all by default)"
+                        )
+    parser.add_argument('-e', metavar='Tolerance', type=float,
+                        default=0.01,
+                        help="Relative tolerance of the analytical estimates"
+                        )
+
+    args = parser.parse_args()
+
+    config = scale_config()
+    config.read_conf_file(args.c)
+
+    results = []
+    for conv_topofile in args.t:
+        results += benchmark_topology(config, conv_topofile, gemm_input=False, max_layers=args.n)
+    for gemm_topofile in args.g:
+        results += benchmark_topology(config, gemm_topofile, gemm_input=True, max_layers=args.n)
+
+    print_results(results)
+    if check_results(results, args.e, config.use_user_dram_bandwidth()) > 0:
+        sys.exit(1)
@@ -0,0 +1,159 @@
+"""
+This file contains the validation of the fast forward mode. Each layer of the given topologies is
+run through the full memory simulation and through the fast forwarded one, which extrapolates the
+folds after the steady state, and the folds simulated, the speedup and the relative error of the
+extrapolated reports are reported. Exits with 1 if the error of any metric of any layer exceeds the
+tolerance of the fast forward mode.
+
+Usage:
+    python3 -m scalesim.utilities.fast_forward_benchmark -c <config> -t <conv topo> -g <gemm topo>
+"""
+
+import argparse
+import copy
+import sys
+
+from scalesim.scale_config import scale_config
+from scalesim.topology_utils import topologies
+from scalesim.layout_utils import layouts
+from scalesim.single_layer_sim import single_layer_sim
+from scalesim.utilities.analytical_benchmark import METRICS, get_relative_error, run_layer
+
+
+#
+def benchmark_topology(config, topofile, gemm_input=False, max_layers=-1, window=3,
+                       tolerance=0.01):
+    """
+    Function to compare the fast forwarded and the full simulation for the layers of one topology.
+    Returns one row per layer: [topology, layer name, full time, fast forward time, folds
+    simulated, folds, errors...]
+    """
+    topo = topologies()
+    topo.load_arrays(topofile=topofile, mnk_inputs=gemm_input)
+    layout = layouts()
+
+    full_config = copy.deepcopy(config)
+    full_config.set_fast_forward(False)
+    ff_config = copy.deepcopy(config)
+    ff_config.set_fast_forward(True, window, tolerance)
+
+    num_layers = topo.get_num_layers()
+    if max_layers > 0:
+        num_layers = min(num_layers, max_layers)
+
+    rows = []
+    for layer_id in range(num_layers):
+        full_items, full_time = run_layer(single_layer_sim(), layer_id, full_config, topo, layout)
+
+        ff_layer_sim = single_layer_sim()
+        ff_items, ff_time = run_layer(ff_layer_sim, layer_id, ff_config, topo, layout)
+        folds_simulated, num_folds = ff_layer_sim.memory_system.get_num_simulated_folds()
+
+        errors = []
+        for _, report, idx in METRICS:
+            errors.append(get_relative_error(ff_items[report][idx], full_items[report][idx]))
+
+        rows.append([topo.get_current_topo_name(), topo.get_layer_name(layer_id),
+                     full_time, ff_time, folds_simulated, num_folds] + errors)
+
+    return rows
+
+
+#
+def print_results(rows):
+    """
+    Function to print the per layer folds and errors, and the mean error of every metric.
+    """
+    header = ['Topology', 'Layer', 'Full (s)', 'Fast forward (s)', 'Folds simulated', 'Folds']
+    header += [metric[0] + ' err %' for metric in METRICS]
+    print(', '.join(header))
+
+    for row in rows:
+        log = [row[0], row[1], "{:.3f}".format(row[2]), "{:.3f}".format(row[3]),
+               str(row[4]), str(row[5])]
+        log += ["{:.2f}".format(x) for x in row[6:]]
+        print(', '.join(log))
+
+    if len(rows) == 0:
+        return
+
+    print('')
+    print('Mean relative error over ' + str(len(rows)) + ' layers')
+    for metric_id, metric in enumerate(METRICS):
+        errors = [row[6 + metric_id] for row in rows]
+        print(metric[0] + ': \t' + "{:.2f}".format(sum(errors) / len(errors)) + '%')
+
+    full_time = sum([row[2] for row in rows])
+    ff_time = sum([row[3] for row in rows])
+    print('Folds simulated: \t' + str(sum([row[4] for row in rows])) + ' of '
+          + str(sum([row[5] for row in rows])))
+    print('Total time full: \t' + "{:.3f}".format(full_time) + ' s')
+    print('Total time fast forward: \t' + "{:.3f}".format(ff_time) + ' s')
+    if ff_time > 0:
+        print('Speedup: \t' + "{:.2f}".format(full_time / ff_time) + 'x')
+
+
+#
+def check_results(rows, tolerance):
+    """
+    Function to check the per layer errors against the tolerance of the fast forward mode. Returns
+    the number of layers with a metric beyond it, printing an error for each of them.
+    """
+    num_fail = 0
+    for row in rows:
+        failed_metrics = [metric[0] for metric_id, metric in enumerate(METRICS)
+                          if row[6 + metric_id] > tolerance * 100]
+        if len(failed_metrics) > 0:
+            print('ERROR: The fast forward error of ' + row[0] + ', ' + row[1] + ' exceeds '
+                  + "{:.2f}".format(tolerance * 100) + '% for ' + ', '.join(failed_metrics))
+            num_fail += 1
+
+    return num_fail
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-c', metavar='Config file', type=str,
+                        default="./configs/scale.cfg",
+                        help="Path to the config file"
+                        )
+    parser.add_argument('-t', metavar='Topology file', type=str, nargs='*',
+                        default=["./topologies/conv_nets/alexnet_part.csv"],
+                        help="Paths to the conv topology files"
+                        )
+    parser.add_argument('-g', metavar='GEMM topology file', type=str, nargs='*',
+                        default=["./topologies/GEMM_mnk/test_mnk_input.csv"],
+                        help="Paths to the MNK topology files"
+                        )
+    parser.add_argument('-n', metavar='Max layers', type=int,
+                        default=-1,
+                        help="Number of layers to benchmark per topology (all by default)"
+                        )
+    parser.add_argument('-w', metavar='Window', type=int,
+                        default=3,
+                        help="Number of periods of the per fold deltas which have to repeat "
+                             "before the remaining folds are extrapolated"
+                        )
+    parser.add_argument('-e', metavar='Tolerance', type=float,
+                        default=0.01,
+                        help="Relative tolerance of the repeats of the per fold deltas"
+                        )
+
+    args = parser.parse_args()
+
+    config = scale_config()
+    config.read_conf_file(args.c)
+
+    results = []
+    for conv_topofile in args.t:
+        results += benchmark_topology(config, conv_topofile, gemm_input=False,
+                                      max_layers=args.n, window=args.w,
+                                      tolerance=args.e)
+    for gemm_topofile in args.g:
+        results += benchmark_topology(config, gemm_topofile, gemm_input=True,
+                                      max_layers=args.n, window=args.w,
+                                      tolerance=args.e)
+
+    print_results(results)
+    if check_results(results, args.e) > 0:
+        sys.exit(1)
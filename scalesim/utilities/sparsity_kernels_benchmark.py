@@ -0,0 +1,243 @@
+"""
+This file contains the benchmark of the row-wise sparsity kernels. For each layer of the given
+topologies, the filter compaction and the ifmap skew of the optimized mapping are run on the
+operand matrices of the layer with the loops the kernels replaced, and with the numba compiled and
+the NumPy kernels. The run times and the speedups over the loops are reported along with a check
+that all of them give the same matrices.
+
+Usage:
+    python3 -m scalesim.utilities.sparsity_kernels_benchmark -c <sparsity config> -t <conv topo>
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from scalesim.scale_config import scale_config
+from scalesim.topology_utils import topologies
+from scalesim.layout_utils import layouts
+from scalesim.compute.operand_matrix import operand_matrix
+from scalesim.compute.sparsity_kernels import get_numba_kernels, compact_nonzero_blocks, \
+    skew_matrix_row_sparsity
+
+
+#
+def get_layer_kernel_inputs(config, topo, layer_id):
+    """
+    Function to get the inputs of the sparsity kernels for a layer: the filter matrix with the
+    sparsity pattern applied, padded to whole blocks, the block rows and elements kept per block,
+    and the folds of the ifmap matrix, two tiles wide, which get the custom skew.
+    """
+    op_mat = operand_matrix()
+    op_mat.set_params(config_obj=config, topoutil_obj=topo, layoututil_obj=layouts(),
+                      layer_id=layer_id)
+    op_mat.get_ifmap_matrix()
+    op_mat.get_filter_matrix()
+
+    row_indices = np.expand_dims(np.arange(op_mat.conv_window_size), axis=1)
+    col_indices = np.arange(op_mat.num_filters)
+    filter_matrix = op_mat.calc_filter_elem_addr(row_indices, col_indices)
+    filter_matrix = np.multiply(filter_matrix, op_mat.sparse_filter_array)
+
+    if config.sparsity_optimized_mapping:
+        block_rows = config.sparsity_block_size
+        keep = config.sparsity_block_size // 2
+    else:
+        block_rows = op_mat.sparsity_ratio_M
+        keep = op_mat.sparsity_ratio_N
+    remainder = filter_matrix.shape[0] % block_rows
+    if remainder != 0:
+        padding = np.zeros((block_rows - remainder, filter_matrix.shape[1]),
+                           dtype=filter_matrix.dtype)
+        filter_matrix = np.vstack([filter_matrix, padding])
+
+    arr_row, _ = config.get_array_dims()
+    ifmap_matrix = op_mat.ifmap_addr_matrix_original
+    ifmap_folds = [ifmap_matrix[:, col:col + 2 * arr_row]
+                   for col in range(0, ifmap_matrix.shape[1], 2 * arr_row)]
+
+    return filter_matrix, block_rows, keep, ifmap_folds
+
+
+#
+def compact_nonzero_blocks_loops(matrix_np, block_rows, keep):
+    """
+    Function to compact the non zero elements of every block of rows with the per column and per
+    block loops of operand_matrix.create_filter_matrix, as before compact_nonzero_blocks().
+    """
+    compacted_cols = []
+    for col in range(matrix_np.shape[1]):
+        compacted_col = []
+        for start_row in range(0, matrix_np.shape[0], block_rows):
+            block = matrix_np[start_row:start_row + block_rows, col]
+            padded_block = np.zeros(keep, dtype=matrix_np.dtype)
+            nonzero_block = block[block != 0]
+            padded_block[:min(len(nonzero_block), keep)] = nonzero_block[:keep]
+            compacted_col.extend(padded_block)
+        compacted_cols.append(compacted_col)
+
+    return np.array(compacted_cols, dtype=matrix_np.dtype).T
+
+
+#
+def skew_matrix_row_sparsity_loops(input_matrix, arr_row, block_size):
+    """
+    Function to add the custom skew of the optimized mapping with the per row and per block loops
+    of systolic_compute_ws, as before skew_matrix_row_sparsity().
+    """
+    num_tiles = 2
+    num_cols = input_matrix.shape[1]
+    if num_cols < arr_row * num_tiles:
+        padding = arr_row * num_tiles - num_cols
+        input_matrix = np.pad(input_matrix, ((0, 0), (0, padding)), constant_values=-1)
+
+    blocks = []
+    for row in input_matrix:
+        row_blocks = [row[i:i+block_size] for i in range(0, len(row), block_size)]
+        blocks.append(row_blocks)
+
+    repeated_blocks = []
+    for block_row in blocks:
+        new_row = []
+        for block in block_row:
+            new_row.extend([block] * (block_size // num_tiles))
+        repeated_blocks.append(new_row)
+
+    output_matrix = []
+    num_block_rows = len(repeated_blocks)
+    for i in range(num_block_rows + arr_row - 1):
+        row = []
+        for j in range(len(repeated_blocks[0])):
+            block_row_idx = i - j
+            if 0 <= block_row_idx < num_block_rows:
+                row.append(repeated_blocks[block_row_idx][j])
+            else:
+                row.append([-1] * block_size)
+        row = np.concatenate(row)
+        output_matrix.append(row)
+
+    return np.array(output_matrix, dtype=input_matrix.dtype)
+
+
+#
+def run_kernels(config, filter_matrix, block_rows, keep, ifmap_folds, version):
+    """
+    Function to run the filter compaction and the skew of all the ifmap folds of a layer with one
+    of the versions: 'loops', 'numba' or 'numpy'. Returns the output matrices and the run times (s)
+    of both kernels.
+    """
+    arr_row, _ = config.get_array_dims()
+    block_size = config.sparsity_block_size
+    use_numba = version == 'numba'
+
+    start = time.perf_counter()
+    if version == 'loops':
+        compact_out = compact_nonzero_blocks_loops(filter_matrix, block_rows, keep)
+    else:
+        compact_out, _ = compact_nonzero_blocks(filter_matrix, block_rows, keep,
+                                                use_numba=use_numba)
+    compact_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if version == 'loops':
+        skew_out = [skew_matrix_row_sparsity_loops(fold, arr_row, block_size)
+                    for fold in ifmap_folds]
+    else:
+        skew_out = [skew_matrix_row_sparsity(fold, arr_row, block_size, use_numba=use_numba)
+                    for fold in ifmap_folds]
+    skew_time = time.perf_counter() - start
+
+    return [compact_out] + skew_out, compact_time, skew_time
+
+
+#
+def benchmark_topology(config, topofile):
+    """
+    Function to compare the loops, numba and NumPy sparsity kernels for the layers of one topology.
+    Returns one row per layer: [topology, layer name, compaction times, skew times, same output],
+    the times in the order loops, numba, NumPy.
+    """
+    topo = topologies()
+    topo.load_arrays(topofile=topofile)
+
+    rows = []
+    for layer_id in range(topo.get_num_layers()):
+        inputs = get_layer_kernel_inputs(config, topo, layer_id)
+
+        loops_out, loops_compact, loops_skew = run_kernels(config, *inputs, version='loops')
+        numba_out, numba_compact, numba_skew = run_kernels(config, *inputs, version='numba')
+        numpy_out, numpy_compact, numpy_skew = run_kernels(config, *inputs, version='numpy')
+        same = all([np.array_equal(x, y) and np.array_equal(x, z)
+                    for x, y, z in zip(loops_out, numba_out, numpy_out)])
+
+        rows.append([topo.get_current_topo_name(), topo.get_layer_name(layer_id),
+                     loops_compact, numba_compact, numpy_compact,
+                     loops_skew, numba_skew, numpy_skew, same])
+
+    return rows
+
+
+#
+def print_results(rows):
+    """
+    Function to print the per layer kernel times and the total speedups of the numba and NumPy
+    kernels over the loops.
+    """
+    header = ['Topology', 'Layer', 'Compaction loops (ms)', 'Compaction numba (ms)',
+              'Compaction NumPy (ms)', 'Skew loops (ms)', 'Skew numba (ms)', 'Skew NumPy (ms)',
+              'Same output']
+    print(', '.join(header))
+
+    for row in rows:
+        log = [row[0], row[1]] + ["{:.3f}".format(x * 1e3) for x in row[2:8]] + [str(row[8])]
+        print(', '.join(log))
+
+    if len(rows) == 0:
+        return
+
+    loops_time = sum([row[2] + row[5] for row in rows])
+    numba_time = sum([row[3] + row[6] for row in rows])
+    numpy_time = sum([row[4] + row[7] for row in rows])
+    print('')
+    print('Total time loops: \t' + "{:.3f}".format(loops_time) + ' s')
+    print('Total time numba: \t' + "{:.3f}".format(numba_time) + ' s')
+    print('Total time NumPy: \t' + "{:.3f}".format(numpy_time) + ' s')
+    if numba_time > 0:
+        print('Speedup numba over loops: \t' + "{:.2f}".format(loops_time / numba_time) + 'x')
+    if numpy_time > 0:
+        print('Speedup NumPy over loops: \t' + "{:.2f}".format(loops_time / numpy_time) + 'x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-c', metavar='Config file', type=str,
+                        default="./configs/sparsity.cfg",
+                        help="Path to the config file, with the sparsity support on"
+                        )
+    parser.add_argument('-t', metavar='Topology file', type=str, nargs='*',
+                        default=["./topologies/sparsity/alexnet_part.csv"],
+                        help="Paths to the conv topology files with the sparsity ratios"
+                        )
+
+    args = parser.parse_args()
+
+    config = scale_config()
+    config.read_conf_file(args.c)
+    assert config.sparsity_support, 'The sparsity support is off in the config file'
+
+    # Compile the numba kernels, or load them from the disk cache, before timing them
+    start = time.perf_counter()
+    if get_numba_kernels() is None:
+        print('WARNING: numba is not installed, both runs use the NumPy kernels')
+    else:
+        get_numba_kernels().compact_nonzero_blocks(np.zeros((2, 1), dtype=int), 2, 1)
+        get_numba_kernels().skew_matrix_row_sparsity(np.zeros((1, 2), dtype=int),
+                                                     np.zeros((1, 2), dtype=int), 2, 1)
+    print('Numba kernels loaded in ' + "{:.3f}".format(time.perf_counter() - start) + ' s')
+
+    results = []
+    for conv_topofile in args.t:
+        results += benchmark_topology(config, conv_topofile)
+
+    print_results(results)
@@ -0,0 +1,152 @@
+"""
+This file contains the benchmark of the OFMAP write buffer. Synthetic OFMAP demand matrices, one
+output per PE column in every cycle, of increasing lengths are written through the write buffer of
+the given config, one line at a time and in runs of lines which do not stall, and the run times per
+line are reported. The trace lines are accumulated in buffers grown by doubling, so that the time
+per line stays flat as the layers get longer.
+
+Usage:
+    python3 -m scalesim.utilities.write_buffer_benchmark -c <config> -l <lines> -s <scales>
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from scalesim.scale_config import scale_config
+from scalesim.memory.write_buffer import write_buffer
+from scalesim.memory.write_port import write_port
+
+
+#
+def get_write_buffer(config):
+    """
+    Function to get a write buffer set up as the OFMAP buffer of the memory system for the config.
+    """
+    _, _, ofmap_buf_size_kb = config.get_mem_sizes()
+    _, arr_col = config.get_array_dims()
+
+    ofmap_backing_bw = arr_col
+    if config.use_user_dram_bandwidth():
+        ofmap_backing_bw = config.get_bandwidths_as_list()[0]
+
+    ofmap_buf = write_buffer()
+    ofmap_buf.set_params(backing_buf_obj=write_port(), total_size_bytes=1024 * ofmap_buf_size_kb,
+                         word_size=1, active_buf_frac=0.5, backing_buf_bw=ofmap_backing_bw)
+    return ofmap_buf
+
+
+#
+def get_ofmap_demands(num_lines, num_cols):
+    """
+    Function to get an OFMAP demand matrix which writes num_cols new outputs in every line, and
+    the cycles of its lines.
+    """
+    demand_mat = np.arange(num_lines * num_cols, dtype=np.int32).reshape((num_lines, num_cols))
+    cycles_arr = np.arange(num_lines, dtype=np.float64).reshape((num_lines, 1))
+    return demand_mat, cycles_arr
+
+
+#
+def run_write_buffer(config, demand_mat, cycles_arr, batched, max_run_lines=4096):
+    """
+    Function to write the demands through a write buffer and drain it. With batched, the runs of
+    lines which neither stall nor drain are serviced together, looking ahead at most max_run_lines
+    lines as in the memory system. Returns the trace matrix of the buffer and the run time (s).
+    """
+    ofmap_buf = get_write_buffer(config)
+
+    start = time.perf_counter()
+    i = 0
+    num_lines = demand_mat.shape[0]
+    while i < num_lines:
+        num_quiet_lines = 0
+        if batched:
+            run_end = min(i + max_run_lines, num_lines)
+            num_quiet_lines = ofmap_buf.get_num_quiet_lines(demand_mat[i:run_end],
+                                                            cycles_arr[i:run_end])
+
+        if num_quiet_lines > 0:
+            ofmap_buf.service_quiet_writes(demand_mat[i:i + num_quiet_lines],
+                                           cycles_arr[i:i + num_quiet_lines])
+            i += num_quiet_lines
+        else:
+            ofmap_buf.service_writes(demand_mat[i:i + 1], cycles_arr[i:i + 1])
+            i += 1
+
+    ofmap_buf.empty_all_buffers(num_lines)
+    trace_matrix = ofmap_buf.get_trace_matrix()
+    run_time = time.perf_counter() - start
+
+    return trace_matrix, run_time
+
+
+#
+def benchmark_write_buffer(config, base_lines, scales):
+    """
+    Function to time the write buffer on OFMAP demand matrices of base_lines times each scale
+    lines. Returns one row per scale: [lines, per line time, batched time, same trace]
+    """
+    _, arr_col = config.get_array_dims()
+
+    rows = []
+    for scale in scales:
+        num_lines = base_lines * scale
+        demand_mat, cycles_arr = get_ofmap_demands(num_lines, arr_col)
+
+        line_trace, line_time = run_write_buffer(config, demand_mat, cycles_arr, batched=False)
+        batched_trace, batched_time = run_write_buffer(config, demand_mat, cycles_arr,
+                                                       batched=True)
+        same = np.array_equal(line_trace, batched_trace)
+
+        rows.append([num_lines, line_time, batched_time, same])
+
+    return rows
+
+
+#
+def print_results(rows):
+    """
+    Function to print the run times per line for every length, relative to the shortest one.
+    """
+    header = ['Lines', 'Per line (s)', 'Per line (us/line)', 'Batched (s)', 'Batched (us/line)',
+              'Same trace']
+    print(', '.join(header))
+
+    for row in rows:
+        log = [str(row[0]), "{:.3f}".format(row[1]), "{:.3f}".format(row[1] * 1e6 / row[0]),
+               "{:.3f}".format(row[2]), "{:.3f}".format(row[2] * 1e6 / row[0]), str(row[3])]
+        print(', '.join(log))
+
+    if len(rows) < 2:
+        return
+
+    print('')
+    print('Time per line of the longest over the shortest demand matrix')
+    print('Per line: \t' + "{:.2f}".format((rows[-1][1] / rows[-1][0]) / (rows[0][1] / rows[0][0])))
+    print('Batched: \t' + "{:.2f}".format((rows[-1][2] / rows[-1][0]) / (rows[0][2] / rows[0][0])))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-c', metavar='Config file', type=str,
+                        default="./configs/scale.cfg",
+                        help="Path to the config file"
+                        )
+    parser.add_argument('-l', metavar='Lines', type=int,
+                        default=10000,
+                        help="Number of lines of the shortest OFMAP demand matrix"
+                        )
+    parser.add_argument('-s', metavar='Scales', type=int, nargs='*',
+                        default=[1, 2, 4, 8],
+                        help="Lengths of the OFMAP demand matrices, as multiples of the lines"
+                        )
+
+    args = parser.parse_args()
+
+    config = scale_config()
+    config.read_conf_file(args.c)
+
+    results = benchmark_write_buffer(config, args.l, args.s)
+    print_results(results)
@@ -0,0 +1,40 @@
+#!/bin/bash
+
+# Runs the analytical benchmark on small conv layers and a 64x256x64 GEMM on an 8x8 array in the
+# user bandwidth mode, for all the dataflows and with 4 kB and 16 kB SRAMs. The benchmark fails if
+# the analytical reports are off the full simulation by more than the tolerance.
+
+path="./"
+run_path=$path/test_runs_analytical
+
+mkdir -p $run_path
+printf 'Layer Name, M, N, K,\nG1, 64, 256, 64,\n' > $run_path/gemm.csv
+printf '%s\n' \
+    'Layer name, IFMAP Height, IFMAP Width, Filter Height, Filter Width, Channels, Num Filter, Strides,' \
+    'C3s1, 20, 20, 3, 3, 16, 24, 1,' \
+    'C5s2, 23, 21, 5, 5, 8, 16, 2,' \
+    'C7s2, 30, 30, 7, 7, 3, 12, 2,' \
+    'C3x5, 16, 19, 3, 5, 10, 9, 1,' > $run_path/conv.csv
+
+source venv/bin/activate
+export PYTHONPATH=.
+
+for df in os ws is; do
+    for sram_kb in 4 16; do
+        config=$run_path/scale_${df}_$sram_kb.cfg
+        cp $path/configs/scale.cfg $config
+        sed -i "s/ArrayHeight: *[0-9]*/ArrayHeight: 8/g" $config
+        sed -i "s/ArrayWidth: *[0-9]*/ArrayWidth: 8/g" $config
+        sed -i "s/IfmapSramSzkB: *[0-9]*/IfmapSramSzkB: $sram_kb/g" $config
+        sed -i "s/FilterSramSzkB: *[0-9]*/FilterSramSzkB: $sram_kb/g" $config
+        sed -i "s/OfmapSramSzkB: *[0-9]*/OfmapSramSzkB: $sram_kb/g" $config
+        sed -i "s/Dataflow : [a-z][a-z]/Dataflow : $df/g" $config
+        sed -i 's/InterfaceBandwidth: CALC/InterfaceBandwidth: USER/g' $config
+
+        if ! python3 -m scalesim.utilities.analytical_benchmark -c $config \
+                -t $run_path/conv.csv -g $run_path/gemm.csv -e 0.01; then
+            echo "Analytical error of the $df dataflow, $sram_kb kB SRAMs, exceeds the tolerance!"
+            exit 1
+        fi
+    done
+done
@@ -0,0 +1,54 @@
+#!/bin/bash
+
+# Runs the fast forward benchmark on a 64x256x64 GEMM on an 8x8 array for all the dataflows, with
+# small SRAMs and with ifmap and filter SRAMs holding the whole operands, and on a deep 256x256x256
+# GEMM with the latter. The benchmark fails if the fast forwarded reports are off the full
+# simulation by more than the tolerance, and the check fails if no fold of the deep GEMM is skipped.
+
+path="./"
+run_path=$path/test_runs_fast_forward
+
+mkdir -p $run_path
+printf 'Layer Name, M, N, K,\nG1, 64, 256, 64,\n' > $run_path/gemm.csv
+printf 'Layer Name, M, N, K,\nG2, 256, 256, 256,\n' > $run_path/deep_gemm.csv
+
+source venv/bin/activate
+export PYTHONPATH=.
+
+for df in os ws is; do
+    for sram_kb in 4 512; do
+        config=$run_path/scale_${df}_$sram_kb.cfg
+        cp $path/configs/scale.cfg $config
+        sed -i "s/ArrayHeight: *[0-9]*/ArrayHeight: 8/g" $config
+        sed -i "s/ArrayWidth: *[0-9]*/ArrayWidth: 8/g" $config
+        sed -i "s/IfmapSramSzkB: *[0-9]*/IfmapSramSzkB: $sram_kb/g" $config
+        sed -i "s/FilterSramSzkB: *[0-9]*/FilterSramSzkB: $sram_kb/g" $config
+        sed -i "s/OfmapSramSzkB: *[0-9]*/OfmapSramSzkB: 4/g" $config
+        sed -i "s/Dataflow : [a-z][a-z]/Dataflow : $df/g" $config
+        sed -i 's/InterfaceBandwidth: CALC/InterfaceBandwidth: USER/g' $config
+
+        if ! python3 -m scalesim.utilities.fast_forward_benchmark -c $config -t \
+                -g $run_path/gemm.csv -e 0.01; then
+            echo "Fast forward error of the $df dataflow, $sram_kb kB SRAMs, exceeds the tolerance!"
+            exit 1
+        fi
+    done
+
+    # The rows of the layers are: topology, layer, times, folds simulated, folds, errors
+    config=$run_path/scale_${df}_512.cfg
+    log=$run_path/deep_gemm_${df}.log
+    python3 -m scalesim.utilities.fast_forward_benchmark -c $config -t \
+        -g $run_path/deep_gemm.csv -e 0.01 > $log
+    status=$?
+    cat $log
+    if [ $status -ne 0 ]; then
+        echo "Fast forward error of the $df dataflow on the deep GEMM exceeds the tolerance!"
+        exit 1
+    fi
+    folds=$(grep '^deep_gemm, G2,' $log | cut -d ',' -f 5,6)
+    if [ -z "$folds" ] || [ $(echo $folds | cut -d ',' -f 1) -ge $(echo $folds | cut -d ',' -f 2) ]
+    then
+        echo "No fold of the deep GEMM was fast forwarded with the $df dataflow ($folds)!"
+        exit 1
+    fi
+done
@@ -0,0 +1,50 @@
+#!/bin/bash
+
+# Runs the user bandwidth mode tests of all the dataflows with the numba and the python memory
+# backends, which have to give the same reports and traces, also matching the golden ones
+
+path="./"
+
+sed -i 's/InterfaceBandwidth: CALC/InterfaceBandwidth: USER/g' $path/configs/scale.cfg
+sed -i "s/save_disk_space=True/save_disk_space=False/" $path/scalesim/scale.py
+
+source venv/bin/activate
+export PYTHONPATH=.
+
+for df in ws os is; do
+    sed -i "2s/.*/run_name = scale_example_run_32x32_$df/" $path/configs/scale.cfg
+    sed -i "s/Dataflow : [a-z][a-z]/Dataflow : $df/g" $path/configs/scale.cfg
+
+    for backend in numba python; do
+        python3 $path/scalesim/scale.py -c $path/configs/scale.cfg \
+            -t $path/topologies/GEMM_mnk/test_mnk_input.csv -i gemm \
+            -p $path/test_runs_$backend --memory-backend $backend
+    done
+
+    for file in BANDWIDTH_REPORT.csv COMPUTE_REPORT.csv DETAILED_ACCESS_REPORT.csv \
+                layer0/FILTER_DRAM_TRACE.csv layer0/FILTER_SRAM_TRACE.csv \
+                layer0/IFMAP_DRAM_TRACE.csv layer0/IFMAP_SRAM_TRACE.csv \
+                layer0/OFMAP_DRAM_TRACE.csv layer0/OFMAP_SRAM_TRACE.csv; do
+        numba_file=$path/test_runs_numba/scale_example_run_32x32_$df/$file
+        python_file=$path/test_runs_python/scale_example_run_32x32_$df/$file
+        golden_file=$path/test/general/golden_trace_user_$df/$file
+
+        if [ ! -f $numba_file ] || [ ! -f $python_file ]; then
+            echo "Output $file is missing!"
+            exit 1
+        fi
+
+        if ! DIFF=$(diff $numba_file $python_file); then
+            echo "Output of the numba backend does not match the python one!"
+            echo "$DIFF"
+            exit 1
+        fi
+
+        # Not all the traces have a golden file
+        if [ -f $golden_file ] && ! DIFF=$(diff $numba_file $golden_file); then
+            echo "Output does not match!"
+            echo "$DIFF"
+            exit 1
+        fi
+    done
+done
@@ -0,0 +1,41 @@
+#!/bin/bash
+
+# Runs a topology with duplicate layers in the user bandwidth mode serially, on a pool of two
+# processes and in the streaming mode. The identical layers have to be reused and all the runs have
+# to give the golden reports and traces, which were generated without any of these modes.
+
+path="./"
+run_path=$path/test_runs_parallel
+golden_path=$path/test/general/golden_trace_user_dup
+
+mkdir -p $run_path
+config=$run_path/scale_dup.cfg
+cp $path/configs/scale.cfg $config
+sed -i "2s/.*/run_name = scale_example_run_32x32_dup/" $config
+sed -i "s/Dataflow : [a-z][a-z]/Dataflow : ws/g" $config
+sed -i 's/InterfaceBandwidth: CALC/InterfaceBandwidth: USER/g' $config
+
+source venv/bin/activate
+export PYTHONPATH=.
+
+for options in "" "-j 2" "--stream" "--stream -j 2"; do
+    rm -rf $run_path/out
+    if ! python3 $path/scalesim/scale.py -c $config \
+            -t $path/topologies/GEMM_mnk/test_mnk_dup_input.csv -i gemm \
+            -p $run_path/out $options > $run_path/run.log; then
+        echo "Run with options '$options' failed!"
+        exit 1
+    fi
+
+    # Layers 2 and 3 are identical to layers 0 and 1
+    if [ "$(grep -c 'Identical to layer' $run_path/run.log)" != "2" ]; then
+        echo "Identical layers are not reused with options '$options'!"
+        exit 1
+    fi
+
+    if ! DIFF=$(diff -r $run_path/out/scale_example_run_32x32_dup $golden_path); then
+        echo "Output with options '$options' does not match!"
+        echo "$DIFF"
+        exit 1
+    fi
+done
@@ -0,0 +1,83 @@
+#!/bin/bash
+
+# Runs a topology with duplicate layers in the user bandwidth mode with a result cache and when
+# resuming an interrupted run. The layers found in the cache or completed by the interrupted run
+# are not simulated again, and the reports and traces have to match the ones of a fresh run.
+
+path="./"
+run_path=$path/test_runs_reuse
+golden_path=$path/test/general/golden_trace_user_dup
+run_name=scale_example_run_32x32_dup
+
+rm -rf $run_path
+mkdir -p $run_path
+config=$run_path/scale_dup.cfg
+cp $path/configs/scale.cfg $config
+sed -i "2s/.*/run_name = $run_name/" $config
+sed -i "s/Dataflow : [a-z][a-z]/Dataflow : ws/g" $config
+sed -i 's/InterfaceBandwidth: CALC/InterfaceBandwidth: USER/g' $config
+
+# The duplicate layer topology followed by a longer layer, during which the run is interrupted
+cp $path/topologies/GEMM_mnk/test_mnk_dup_input.csv $run_path/gemm.csv
+printf 'Test 5, 256, 128, 256,\n' >> $run_path/gemm.csv
+
+source venv/bin/activate
+export PYTHONPATH=.
+
+run_scale() {
+    python3 $path/scalesim/scale.py -c $config -i gemm "$@" > $run_path/run.log
+}
+
+check_output() {
+    if ! DIFF=$(diff -r $1 $2); then
+        echo "$3 does not match!"
+        echo "$DIFF"
+        exit 1
+    fi
+}
+
+# 1. Result cache: the second run finds the two distinct layers in the cache
+for run in fill hit; do
+    if ! run_scale -t $path/topologies/GEMM_mnk/test_mnk_dup_input.csv -p $run_path/cache_$run \
+            --cache-dir $run_path/cache; then
+        echo "Run with the result cache failed!"
+        exit 1
+    fi
+done
+
+if [ "$(grep -c 'Found in the result cache' $run_path/run.log)" != "2" ]; then
+    echo "Layers are not found in the result cache!"
+    exit 1
+fi
+check_output $run_path/cache_hit/$run_name $golden_path "Output of the result cache"
+
+# 2. Resume: the run is killed once the first four layers are checkpointed
+if ! run_scale -t $run_path/gemm.csv -p $run_path/fresh; then
+    echo "Fresh run failed!"
+    exit 1
+fi
+
+run_scale -t $run_path/gemm.csv -p $run_path/resume &
+pid=$!
+checkpoint=$run_path/resume/$run_name/checkpoint/layer3.json
+while [ ! -f $checkpoint ] && kill -0 $pid 2> /dev/null; do
+    sleep 0.1
+done
+kill -9 $pid 2> /dev/null
+wait $pid 2> /dev/null
+
+if [ ! -f $checkpoint ] || [ -f $run_path/resume/$run_name/COMPUTE_REPORT.csv ]; then
+    echo "Run was not interrupted after the first layers!"
+    exit 1
+fi
+
+if ! run_scale -t $run_path/gemm.csv -p $run_path/resume --resume; then
+    echo "Resumed run failed!"
+    exit 1
+fi
+
+if [ "$(grep -c 'Completed by the previous run' $run_path/run.log)" != "4" ]; then
+    echo "Layers completed by the interrupted run are simulated again!"
+    exit 1
+fi
+check_output $run_path/resume/$run_name $run_path/fresh/$run_name "Output of the resumed run"
@@ -0,0 +1,205 @@
+"""
+This file checks the fetch matrix and the line index of the read buffer against the element by
+element re-lining and the per line address sets they replace. Random prefetch matrices, which fill
+whole lines of the buffer or not, are set as the fetch matrix of read buffers, and the buffers are
+run through their prefetches next to buffers holding a copy of the reference fetch matrix. Exits
+with 1 if any shape does not match.
+
+Usage:
+    python3 test/memory/scripts/check_read_buffer_fetch.py
+"""
+
+import math
+import sys
+
+import numpy as np
+
+from scalesim.memory.read_buffer import read_buffer
+from scalesim.memory.read_port import read_port
+
+
+#
+def get_reference_fetch_matrix(prefetch_matrix_np, bandwidth):
+    """
+    Function to re-line the prefetch matrix into lines of bandwidth elements, one element at a
+    time, padding the last line with -1.
+    """
+    num_elems = prefetch_matrix_np.shape[0] * prefetch_matrix_np.shape[1]
+    num_lines = int(math.ceil(num_elems / bandwidth))
+    fetch_matrix = np.full((num_lines, bandwidth), -1, dtype=prefetch_matrix_np.dtype)
+
+    for i in range(num_elems):
+        src_row = math.floor(i / prefetch_matrix_np.shape[1])
+        src_col = math.floor(i % prefetch_matrix_np.shape[1])
+
+        dest_row = math.floor(i / bandwidth)
+        dest_col = math.floor(i % bandwidth)
+
+        fetch_matrix[dest_row][dest_col] = prefetch_matrix_np[src_row][src_col]
+
+    return fetch_matrix
+
+
+#
+def get_reference_hashed_buffer(fetch_matrix_np, elems_per_set):
+    """
+    Function to split the fetch matrix into sets of elems_per_set valid addresses, the last one
+    holding the remaining ones.
+    """
+    hashed_buffer = {}
+    line_id = 0
+    elem_ctr = 0
+    current_line = set()
+
+    for elem in fetch_matrix_np.ravel().tolist():
+        if not elem == -1:
+            current_line.add(elem)
+            elem_ctr += 1
+
+        if not elem_ctr < elems_per_set:
+            hashed_buffer[line_id] = current_line
+            line_id += 1
+            elem_ctr = 0
+            current_line = set()
+
+    hashed_buffer[line_id] = current_line
+    return hashed_buffer
+
+
+#
+def get_indexed_lines(read_buf, addr):
+    """
+    Function to get the lines holding an address, and its positions in them, from the line index
+    of the read buffer.
+    """
+    index_id = addr - read_buf.line_index_base
+    if index_id < 0 or index_id >= read_buf.line_index.shape[0]:
+        return [], []
+
+    line_id = int(read_buf.line_index[index_id])
+    if line_id == -1:
+        return [], []
+    if line_id >= 0:
+        return [line_id], [int(read_buf.col_index[index_id])]
+
+    first_entry = read_buf.multi_line_ptr[-2 - line_id]
+    last_entry = read_buf.multi_line_ptr[-1 - line_id]
+    return read_buf.multi_line_lines[first_entry:last_entry].tolist(), \
+        read_buf.multi_line_cols[first_entry:last_entry].tolist()
+
+
+#
+def get_read_buffer(bandwidth, size, layout):
+    """
+    Function to get a read buffer of size elements and the given backing bandwidth.
+    """
+    read_buf = read_buffer()
+    read_buf.set_params(backing_buf_obj=read_port(), total_size_bytes=size, word_size=1,
+                        active_buf_frac=0.5, hit_latency=1, backing_buf_bw=bandwidth,
+                        num_bank=1, num_port=2, enable_layout_evaluation=layout)
+    return read_buf
+
+
+#
+def check_case(rng, rows, cols, bandwidth, size, layout, dtype):
+    """
+    Function to check one random prefetch matrix. Returns a description of the first mismatch, or
+    an empty string.
+    """
+    # Addresses from a small range, so that some are held by several lines, and some null requests
+    prefetch_matrix = rng.integers(0, max(rows * cols // 2, 2), size=(rows, cols)).astype(dtype)
+    prefetch_matrix[rng.random((rows, cols)) < 0.1] = -1
+    prefetch_copy = prefetch_matrix.copy()
+
+    read_buf = get_read_buffer(bandwidth, size, layout)
+    read_buf.set_fetch_matrix(prefetch_matrix)
+
+    reference_fetch = get_reference_fetch_matrix(prefetch_copy, bandwidth)
+    if not reference_fetch.dtype == read_buf.fetch_matrix.dtype \
+            or not np.array_equal(reference_fetch, read_buf.fetch_matrix):
+        return 'fetch matrix'
+
+    elems_per_set = math.ceil(read_buf.total_size_elems / 100)
+    if layout:
+        elems_per_set = bandwidth
+    hashed_buffer = get_reference_hashed_buffer(reference_fetch, elems_per_set)
+    if not read_buf.num_lines == len(hashed_buffer):
+        return 'number of lines'
+
+    ref_lines = {}
+    for line_id in range(len(hashed_buffer)):
+        this_set = hashed_buffer[line_id]
+        for addr in this_set:
+            ref_lines.setdefault(addr, [[], []])
+            ref_lines[addr][0].append(line_id)
+            ref_lines[addr][1].append(list(this_set).index(addr))
+
+    for addr in range(-2, int(np.amax(prefetch_copy)) + 3):
+        lines, line_cols = get_indexed_lines(read_buf, addr)
+        ref_line_ids, ref_cols = ref_lines.get(addr, [[], []])
+        if not lines == ref_line_ids:
+            return 'lines of address ' + str(addr)
+        if layout and not line_cols == ref_cols:
+            return 'positions of address ' + str(addr)
+
+    # The prefetches drop addresses from the fetch matrix, as they did from the reference one,
+    # and leave the prefetch matrix as it is
+    reference_buf = get_read_buffer(bandwidth, size, layout)
+    reference_buf.fetch_matrix = reference_fetch
+    reference_buf.prepare_hashed_buffer()
+
+    read_buf.prefetch_active_buffer(start_cycle=0)
+    reference_buf.prefetch_active_buffer(start_cycle=0)
+    for _ in range(3):
+        read_buf.new_prefetch()
+        reference_buf.new_prefetch()
+        if not np.array_equal(read_buf.fetch_matrix, reference_buf.fetch_matrix):
+            return 'fetch matrix after the prefetches'
+        if not np.array_equal(read_buf.trace_matrix, reference_buf.trace_matrix):
+            return 'prefetch trace'
+
+    if not np.array_equal(prefetch_matrix, prefetch_copy):
+        return 'prefetch matrix modified'
+
+    return ''
+
+
+#
+def main():
+    """
+    Function to check random prefetch matrices of shapes which fill whole lines of the buffer and
+    of shapes which do not, with and without the layout evaluation.
+    """
+    rng = np.random.default_rng(0)
+
+    cases = []
+    for dtype in [np.int32, np.int64]:
+        for layout in [False, True]:
+            # rows, cols, bandwidth, buffer size. The active buffers of some of them end within a
+            # line, so that the prefetches drop addresses from the fetch matrix
+            cases += [[12, 8, 8, 64, layout, dtype],
+                      [12, 8, 8, 60, layout, dtype],
+                      [40, 6, 4, 90, layout, dtype],
+                      [1, 300, 10, 150, layout, dtype],
+                      [13, 7, 5, 60, layout, dtype],
+                      [9, 11, 8, 128, layout, dtype],
+                      [1, 251, 10, 200, layout, dtype]]
+
+    num_fail = 0
+    for rows, cols, bandwidth, size, layout, dtype in cases:
+        for _ in range(5):
+            mismatch = check_case(rng, rows, cols, bandwidth, size, layout, dtype)
+            if not mismatch == '':
+                print('Mismatch (' + mismatch + ') for ' + str(rows) + 'x' + str(cols)
+                      + ', bandwidth ' + str(bandwidth) + ', layout ' + str(layout)
+                      + ', ' + np.dtype(dtype).name)
+                num_fail += 1
+                break
+
+    if num_fail > 0:
+        sys.exit(1)
+    print('Fetch matrix and line index match the reference for ' + str(len(cases)) + ' shapes')
+
+
+if __name__ == '__main__':
+    main()